@@ -0,0 +1,124 @@
+"""Single-core benchmark of the entity store.
+
+Generates a cube of terrain around the origin, spawns entities wandering over it
+and advances them tick by tick. Reports the time per tick of the vectorized
+update of all entities, of the spatial hash query of the pairs near each other,
+and of building the instances drawing them, along with the time per tick of a
+per-entity Python loop applying gravity and ground collisions only. It also
+checks the pairs found by the spatial hash against comparing all pairs of a
+subset of the entities.
+
+Usage:
+    python benchmarks/entities.py --entity_count 10000 --tick_count 100
+"""
+
+import time
+
+import numpy as np
+from fire import Fire
+
+from pynecraft.entities import EntityStore, SpatialHash
+from pynecraft.parameters import EntityParameters, TerrainParameters, WorldParameters
+from pynecraft.world import World
+from pynecraft.world.blocks import BLOCK_IS_SOLID
+from pynecraft.world.terrain import NoiseTerrainGenerator
+
+
+def tick_per_entity(world: World, entities: list, delta_time: float) -> None:
+    """Applies gravity to entities stored as `[x, y, z, vy]` lists one at a time
+    and lands them on solid blocks.
+    """
+    for entity in entities:
+        entity[3] = max(entity[3] - 32.0 * delta_time, -60.0)
+        entity[1] += entity[3] * delta_time
+        block = world.get_block(
+            int(np.floor(entity[0])), int(np.floor(entity[1])), int(np.floor(entity[2]))
+        )
+        if BLOCK_IS_SOLID[block]:
+            entity[1] = np.floor(entity[1]) + 1.0
+            entity[3] = 0.0
+
+
+def find_pairs_brute_force(positions: np.ndarray, cell_size: float) -> set:
+    """Returns the pairs of points closer than the cell size along every axis."""
+    offsets = np.abs(positions[:, None] - positions[None])
+    first, second = np.nonzero(np.all(offsets < cell_size, axis=2))
+    return {(i, j) for i, j in zip(first.tolist(), second.tolist()) if i < j}
+
+
+def main(
+    entity_count: int = 10000,
+    tick_count: int = 100,
+    extent: int = 256,
+    check_count: int = 2000,
+    seed: int = 0,
+):
+    generator = NoiseTerrainGenerator(TerrainParameters(seed=seed))
+    world = World(WorldParameters())
+    start = (-extent // 2,) * 3
+    world.set_region(start, generator.generate_region(np.asarray(start), (extent,) * 3))
+
+    rng = np.random.default_rng(seed)
+    positions = rng.uniform(-extent / 2 + 2, extent / 2 - 2, (entity_count, 3))
+    positions[:, 1] = (
+        generator.get_heights(np.floor(positions[:, 0]), np.floor(positions[:, 2])) + 1
+    )
+    entity_parameters = EntityParameters()
+    store = EntityStore(world, entity_parameters, capacity=entity_count)
+    store.spawn(
+        positions,
+        yaws=rng.uniform(0, 2 * np.pi, entity_count),
+        yaw_rates=rng.normal(0, 0.5, entity_count),
+        walk_speeds=entity_parameters.walk_speed,
+        colors=rng.uniform(0.3, 1.0, (entity_count, 3)),
+    )
+    delta_time = 1 / 60
+
+    tick_times = np.zeros(tick_count)
+    for tick in range(tick_count):
+        start_time = time.perf_counter()
+        store.tick(delta_time)
+        tick_times[tick] = time.perf_counter() - start_time
+
+    start_time = time.perf_counter()
+    for _ in range(tick_count):
+        pairs = store.spatial_hash.find_neighbour_pairs()
+    pair_time = (time.perf_counter() - start_time) / tick_count
+
+    start_time = time.perf_counter()
+    for _ in range(tick_count):
+        instances = store.get_instances(alpha=0.5)
+    instance_time = (time.perf_counter() - start_time) / tick_count
+
+    entities = [[*position, 0.0] for position in store.positions.tolist()]
+    loop_tick_count = max(tick_count // 10, 1)
+    start_time = time.perf_counter()
+    for _ in range(loop_tick_count):
+        tick_per_entity(world, entities, delta_time)
+    loop_time = (time.perf_counter() - start_time) / loop_tick_count
+
+    spatial_hash = SpatialHash(entity_parameters.cell_size)
+    check_positions = store.positions[:check_count]
+    spatial_hash.build(check_positions)
+    first, second = spatial_hash.find_neighbour_pairs()
+    # The spatial hash finds candidates in adjacent cells, each pair once, which
+    # must include all pairs closer than a cell.
+    candidates = set(zip(first.tolist(), second.tolist()))
+    is_consistent = len(candidates) == len(first) and candidates >= (
+        find_pairs_brute_force(check_positions, spatial_hash.cell_size)
+    )
+
+    print(f"entities:                   {entity_count} ({tick_count} ticks)")
+    print(f"grounded entities:          {100 * store.is_grounded.mean():.1f}%")
+    print(f"neighbour pairs:            {len(pairs[0])}")
+    print(f"instances:                  {len(instances)}")
+    print(f"milliseconds per tick p50:  {1e3 * np.percentile(tick_times, 50):.2f}")
+    print(f"milliseconds per tick p95:  {1e3 * np.percentile(tick_times, 95):.2f}")
+    print(f"  neighbour pairs:          {1e3 * pair_time:.2f}")
+    print(f"  instances:                {1e3 * instance_time:.2f}")
+    print(f"  per-entity loop, gravity: {1e3 * loop_time:.2f}")
+    print(f"spatial hash matches brute force: {is_consistent}")
+
+
+if __name__ == "__main__":
+    Fire(main)
@@ -0,0 +1,129 @@
+"""Benchmark of instanced rendering of repeated geometry.
+
+Draws the same spinning cubes offscreen in two ways: with one draw call and one
+model matrix uniform write per cube, and with a single instanced draw call after
+one bulk write of the per-instance attributes of all cubes. Reports the time per
+frame of both, until the GPU finished drawing it, and checks that both draw the
+same image.
+
+Usage:
+    python benchmarks/instancing.py --instance_count 10000
+"""
+
+import time
+from typing import Optional
+
+import glm
+import moderngl
+import numpy as np
+from fire import Fire
+
+from pynecraft.mesh.base import BaseMesh
+from pynecraft.mesh.instanced import InstancedMesh, get_cube_vertex_data
+from pynecraft.shader_registry import ShaderRegistry
+
+
+class CubeMesh(BaseMesh):
+    """A single cube drawn with the model matrix uniform."""
+
+    def __init__(
+        self, opengl_context: moderngl.Context, program: moderngl.Program
+    ) -> None:
+        super().__init__(opengl_context, program)
+        self.vbo_format = "3f 3f"
+        self.attributes = ["in_position", "in_color"]
+        self.vertex_array_object = self.get_vertex_array_object()
+
+    def get_vertex_data(self) -> np.array:
+        return get_cube_vertex_data()
+
+
+def get_rotations(angles: np.ndarray) -> np.ndarray:
+    """Returns the `(x, y, z, w)` quaternions of rotations around the y axis."""
+    rotations = np.zeros((len(angles), 4), dtype="float32")
+    rotations[:, 1] = np.sin(angles / 2)
+    rotations[:, 3] = np.cos(angles / 2)
+    return rotations
+
+
+def main(
+    instance_count: int = 10000,
+    frame_count: int = 50,
+    resolution: int = 512,
+    seed: int = 0,
+    context_backend: Optional[str] = "egl",
+):
+    opengl_context = moderngl.create_standalone_context(
+        require=330, **({"backend": context_backend} if context_backend else {})
+    )
+    framebuffer = opengl_context.framebuffer(
+        color_attachments=[opengl_context.renderbuffer((resolution, resolution))],
+        depth_attachment=opengl_context.depth_renderbuffer((resolution, resolution)),
+    )
+    framebuffer.use()
+    opengl_context.enable(moderngl.DEPTH_TEST | moderngl.CULL_FACE)
+
+    registry = ShaderRegistry(opengl_context, "shaders")
+    registry.register("default")
+    registry.register("instanced", defines=["INSTANCED"])
+    registry.set_uniform("instanced", "m_model", glm.mat4())
+    registry.write_camera(
+        glm.perspective(glm.radians(60.0), 1.0, 0.1, 1000.0),
+        glm.lookAt(glm.vec3(0, 60, 120), glm.vec3(0), glm.vec3(0, 1, 0)),
+    )
+
+    rng = np.random.default_rng(seed)
+    positions = rng.uniform(-50, 50, (instance_count, 3)).astype("float32")
+    scales = rng.uniform(0.3, 1.5, instance_count).astype("float32")
+    speeds = rng.uniform(-2, 2, instance_count)
+
+    cube_mesh = CubeMesh(opengl_context, registry["default"])
+    instanced_mesh = InstancedMesh(opengl_context, registry["instanced"])
+    m_model = registry.get_uniform("default", "m_model")
+
+    def draw_per_object(frame: int) -> None:
+        for position, scale, rotation in zip(
+            positions, scales, get_rotations(speeds * frame * 0.05)
+        ):
+            model = (
+                glm.translate(glm.vec3(*position))
+                * glm.mat4_cast(glm.quat(rotation[3], *rotation[:3]))
+                * glm.scale(glm.vec3(float(scale)))
+            )
+            m_model.write(model)
+            cube_mesh.render()
+
+    def draw_instanced(frame: int) -> None:
+        instanced_mesh.set_instances(
+            positions, scales, get_rotations(speeds * frame * 0.05)
+        )
+        instanced_mesh.render()
+
+    images = {}
+    draw_functions = {"per object": draw_per_object, "instanced": draw_instanced}
+    draw_call_counts = {"per object": instance_count, "instanced": 1}
+    for name, draw in draw_functions.items():
+        frame_times = []
+        for frame in range(frame_count):
+            start_time = time.perf_counter()
+            framebuffer.clear(0.0, 0.0, 0.0, 1.0, depth=1.0)
+            draw(frame)
+            opengl_context.finish()
+            frame_times.append((time.perf_counter() - start_time) * 1000)
+        images[name] = np.frombuffer(framebuffer.read(), dtype=np.uint8)
+        print(
+            f"{name:<10}  draw calls: {draw_call_counts[name]:>6}"
+            f"  frame time p50: {np.median(frame_times):8.2f} ms"
+        )
+    mismatch = np.mean(
+        np.abs(images["per object"].astype(int) - images["instanced"]) > 2
+    )
+    print(f"pixels differing between both: {100 * mismatch:.3f}%")
+
+    instanced_mesh.release()
+    cube_mesh.release()
+    registry.release()
+
+
+if __name__ == "__main__":
+    Fire(main)
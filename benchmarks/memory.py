@@ -0,0 +1,83 @@
+"""Memory report of dense and palette-compressed chunk storage.
+
+Generates the chunks within the largest render distance around the origin, like
+the chunk streamer does, and reports the memory used by their block IDs with
+dense and palette-compressed storage for each render distance, along with the
+number of palette chunks per number of bits per voxel.
+
+Usage:
+    python benchmarks/memory.py --render_distances 2,4,8 --seed 0
+"""
+
+import time
+from collections import Counter
+from typing import Tuple
+
+import numpy as np
+from fire import Fire
+
+from pynecraft.parameters import TerrainParameters, WorldParameters
+from pynecraft.world import World
+from pynecraft.world.terrain import NoiseTerrainGenerator
+
+
+def main(
+    render_distances: Tuple[int, ...] = (2, 4, 8),
+    chunk_size: int = 32,
+    seed: int = 0,
+):
+    generator = NoiseTerrainGenerator(TerrainParameters(seed=seed))
+    lowest, highest = generator.height_range
+    chunk_ys = range(lowest // chunk_size, highest // chunk_size + 1)
+    largest_distance = max(render_distances)
+    offsets = range(-largest_distance, largest_distance + 1)
+    chunk_blocks = {}
+    start_time = time.perf_counter()
+    for chunk_x in offsets:
+        for chunk_z in offsets:
+            if chunk_x**2 + chunk_z**2 > largest_distance**2:
+                continue
+            for chunk_y in chunk_ys:
+                position = (chunk_x, chunk_y, chunk_z)
+                blocks = generator.generate_region(
+                    np.asarray(position) * chunk_size, (chunk_size,) * 3
+                )
+                # Like the chunk streamer, chunks of air are not stored at all.
+                if blocks.any():
+                    chunk_blocks[position] = blocks
+    print(
+        f"generated {len(chunk_blocks)} chunks in {time.perf_counter() - start_time:.1f}s"
+    )
+    print()
+    print("distance  chunks  dense (MiB)  palette (MiB)  ratio  bytes per chunk")
+
+    for render_distance in sorted(render_distances):
+        worlds = {
+            storage: World(
+                WorldParameters(chunk_size=chunk_size, chunk_storage=storage)
+            )
+            for storage in ("dense", "palette")
+        }
+        for position, blocks in chunk_blocks.items():
+            if position[0] ** 2 + position[2] ** 2 > render_distance**2:
+                continue
+            for world in worlds.values():
+                world.create_chunk(position, blocks=blocks)
+        dense_nbytes = worlds["dense"].nbytes
+        palette_nbytes = worlds["palette"].nbytes
+        chunk_count = len(worlds["palette"])
+        print(
+            f"{render_distance:8d}  {chunk_count:6d}  {dense_nbytes / 2**20:11.2f}"
+            f"  {palette_nbytes / 2**20:13.2f}  {dense_nbytes / palette_nbytes:5.1f}"
+            f"  {palette_nbytes / chunk_count:15.0f}"
+        )
+
+    bit_counts = Counter(chunk.index_bits for chunk in worlds["palette"])
+    print()
+    print("bits per voxel  chunks")
+    for bits, count in sorted(bit_counts.items()):
+        print(f"{bits:14d}  {count:6d}")
+
+
+if __name__ == "__main__":
+    Fire(main)
@@ -0,0 +1,105 @@
+"""CPU-only benchmark of the greedy chunk mesher.
+
+Meshes a set of synthetic terrain chunks and reports the number of chunks meshed
+per second along with the vertices and triangles emitted per chunk, compared to
+naive per-cube meshing and to hidden-face culling without greedy merging, and
+the size of the vertex data in the float and packed vertex formats.
+
+Usage:
+    python benchmarks/meshing.py --num_chunks 64 --chunk_size 32
+"""
+
+import time
+
+import numpy as np
+from fire import Fire
+
+from pynecraft.mesh.meshing import (
+    build_packed_vertex_data,
+    build_vertex_data,
+    get_visible_faces,
+    greedy_mesh,
+)
+from pynecraft.world.blocks import Block
+
+
+def make_terrain_chunk(
+    rng: np.random.Generator, chunk_size: int, block_dtype: str
+) -> np.ndarray:
+    """Returns a padded chunk of rolling hills with layered blocks and sparse ores."""
+    size = chunk_size + 2
+    x, z = np.meshgrid(np.arange(size), np.arange(size), indexing="ij")
+    phase = rng.uniform(0, 2 * np.pi, size=4)
+    height = (
+        size / 2
+        + size / 6 * np.sin(x / 7.0 + phase[0]) * np.cos(z / 9.0 + phase[1])
+        + size / 10 * np.sin(x / 3.0 + phase[2] + z / 4.0 + phase[3])
+    ).astype("int64")
+    y = np.arange(size)[None, :, None]
+    height = height[:, None, :]
+    blocks = np.zeros((size, size, size), dtype=block_dtype)
+    blocks[y < height] = Block.STONE
+    blocks[(y >= height - 3) & (y < height)] = Block.DIRT
+    blocks[y == height - 1] = Block.GRASS
+    ores = (rng.random(blocks.shape) < 0.01) & (y < height - 4)
+    blocks[ores] = Block.BEDROCK
+    return blocks
+
+
+def main(num_chunks: int = 64, chunk_size: int = 32, block_dtype: str = "uint8"):
+    rng = np.random.default_rng(0)
+    chunks = [
+        make_terrain_chunk(rng, chunk_size, block_dtype) for _ in range(num_chunks)
+    ]
+
+    # Warm up so that one-off allocation costs are not measured.
+    build_vertex_data(greedy_mesh(chunks[0]))
+
+    vertex_counts, float_bytes = [], []
+    start_time = time.perf_counter()
+    for padded_blocks in chunks:
+        vertex_data = build_vertex_data(greedy_mesh(padded_blocks))
+        vertex_counts.append(len(vertex_data))
+        float_bytes.append(vertex_data.nbytes)
+    elapsed_time = time.perf_counter() - start_time
+
+    # The packed format additionally needs 6 indices per quad, but those live in
+    # an index buffer shared by every chunk and are not counted here.
+    packed_bytes = []
+    start_time = time.perf_counter()
+    for padded_blocks in chunks:
+        packed_bytes.append(build_packed_vertex_data(greedy_mesh(padded_blocks)).nbytes)
+    packed_elapsed_time = time.perf_counter() - start_time
+
+    naive_triangles = np.mean(
+        [12 * np.count_nonzero(c[1:-1, 1:-1, 1:-1]) for c in chunks]
+    )
+    culled_triangles = np.mean(
+        [2 * sum(np.count_nonzero(f) for f in get_visible_faces(c)) for c in chunks]
+    )
+    vertices_per_chunk = np.mean(vertex_counts)
+    greedy_triangles = vertices_per_chunk / 3
+
+    print(f"chunks meshed:              {num_chunks} ({chunk_size}^3 voxels each)")
+    print(f"chunks meshed per second:   {num_chunks / elapsed_time:.1f}")
+    print(f"milliseconds per chunk:     {1e3 * elapsed_time / num_chunks:.2f}")
+    print(f"packed chunks per second:   {num_chunks / packed_elapsed_time:.1f}")
+    print(f"vertices per chunk:         {vertices_per_chunk:.0f}")
+    print(f"float KiB per chunk:        {np.mean(float_bytes) / 1024:.1f}")
+    print(
+        f"packed KiB per chunk:       {np.mean(packed_bytes) / 1024:.1f} "
+        f"({np.sum(float_bytes) / np.sum(packed_bytes):.1f}x smaller)"
+    )
+    print(f"triangles per chunk:        {greedy_triangles:.0f}")
+    print(
+        f"naive per-cube triangles:   {naive_triangles:.0f} "
+        f"({naive_triangles / greedy_triangles:.1f}x more)"
+    )
+    print(
+        f"culled, unmerged triangles: {culled_triangles:.0f} "
+        f"({culled_triangles / greedy_triangles:.1f}x more)"
+    )
+
+
+if __name__ == "__main__":
+    Fire(main)
@@ -0,0 +1,271 @@
+"""Load test of the chunk server.
+
+Starts a chunk server in a separate process, listening on a Unix domain socket
+by default or on `--address`, and connects `--client_count` clients to it from
+a single event loop. The clients start a few chunks apart and walk along the `x`
+axis, reporting their positions whenever they enter another chunk, taking the
+received chunks out of their queues and acknowledging them like a renderer
+would. Once its first view is loaded, every client edits a block next to it at
+regular intervals.
+
+Reports the bandwidth sent by the server, the compression ratio of the chunks,
+the percentiles of the time until a chunk that came into range arrived and of
+the time until the first view of a client was complete, and the percentiles of
+the time until an edit reached the clients holding the edited chunk along with
+the bytes per edit of the deltas.
+
+Usage:
+    python benchmarks/network.py --client_count 8 --duration 10
+"""
+
+import asyncio
+import multiprocessing
+import os
+import time
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from fire import Fire
+
+from pynecraft.network import AsyncChunkClient
+from pynecraft.network.protocol import MessageType
+from pynecraft.network.server import run_server
+from pynecraft.parameters import ServerParameters, TerrainParameters, WorldParameters
+from pynecraft.streaming import get_chunk_positions_in_range
+from pynecraft.world.blocks import Block
+
+
+def serve(address: str, seed: int, num_workers: Optional[int]) -> None:
+    """Runs a chunk server until the process is terminated."""
+    asyncio.run(
+        run_server(
+            ServerParameters(address=address, num_workers=num_workers),
+            WorldParameters(),
+            TerrainParameters(seed=seed),
+        )
+    )
+
+
+async def connect(address: str, max_chunks_in_flight: int) -> AsyncChunkClient:
+    """Connects a client, retrying while the server is starting."""
+    for _ in range(200):
+        try:
+            client = AsyncChunkClient(address, max_chunks_in_flight)
+            await client.connect()
+            return client
+        except (ConnectionError, FileNotFoundError):
+            await asyncio.sleep(0.05)
+    raise ConnectionError(f"Could not connect to {address}.")
+
+
+class Measurements:
+    """The timings collected from all clients, in seconds."""
+
+    def __init__(self) -> None:
+        self.chunk_latencies: List[float] = []
+        self.view_load_times: List[float] = []
+        self.edit_latencies: List[float] = []
+        self.decoded_bytes = 0
+        # The time every edit was sent, keyed by its block position and ID.
+        self.edit_times: Dict[Tuple[Tuple[int, int, int], int], float] = {}
+
+
+async def walk(
+    client: AsyncChunkClient,
+    start: np.ndarray,
+    speed: float,
+    render_distance: int,
+    edit_interval: float,
+    duration: float,
+    measurements: Measurements,
+) -> None:
+    """Walks a client along the `x` axis, consuming its chunks like a renderer."""
+    chunk_size = client.chunk_size
+    position = start.astype(float)
+    center = None
+    in_range, kept, held = set(), set(), set()
+    requested_times: Dict[Tuple[int, int, int], float] = {}
+    start_time = time.perf_counter()
+    view_start_time = start_time
+    is_view_loaded = False
+    last_edit_time = 0.0
+    edit_index = 0
+    while (now := time.perf_counter()) - start_time < duration:
+        position[0] = start[0] + speed * (now - start_time)
+        new_center = tuple(
+            int(np.floor(coordinate)) // chunk_size for coordinate in position
+        )
+        if new_center != center:
+            center = new_center
+            in_range = get_chunk_positions_in_range(
+                center, render_distance, client.chunk_y_range
+            )
+            kept = get_chunk_positions_in_range(
+                center, render_distance + 1, client.chunk_y_range
+            )
+            held &= kept
+            for chunk_position in in_range - held:
+                requested_times.setdefault(chunk_position, now)
+            client.send_position(tuple(position), render_distance)
+
+        while (message := client.pop_message()) is not None:
+            message_type, content = message
+            received_time = time.perf_counter()
+            if message_type == MessageType.CHUNK:
+                chunk_position, padded_blocks = content
+                is_kept = chunk_position in kept
+                client.acknowledge(chunk_position, is_kept)
+                if padded_blocks is not None:
+                    measurements.decoded_bytes += padded_blocks.nbytes
+                if not is_kept:
+                    continue
+                held.add(chunk_position)
+                requested_time = requested_times.pop(chunk_position, None)
+                if requested_time is not None:
+                    measurements.chunk_latencies.append(received_time - requested_time)
+            elif message_type == MessageType.DELTA:
+                for block_position, block_id in zip(
+                    content["position"].tolist(), content["block"].tolist()
+                ):
+                    edit_time = measurements.edit_times.get(
+                        (tuple(block_position), block_id)
+                    )
+                    if edit_time is not None:
+                        measurements.edit_latencies.append(received_time - edit_time)
+
+        if not is_view_loaded and in_range <= held:
+            is_view_loaded = True
+            measurements.view_load_times.append(time.perf_counter() - view_start_time)
+        if is_view_loaded and now - last_edit_time >= edit_interval:
+            last_edit_time = now
+            block_position = tuple(int(np.floor(coordinate)) for coordinate in position)
+            block_id = Block.STONE if edit_index % 2 == 0 else Block.AIR
+            edit_index += 1
+            measurements.edit_times[block_position, block_id] = time.perf_counter()
+            client.send_edit(block_position, block_id)
+        # The frame loop of a renderer running at 60 frames per second.
+        await asyncio.sleep(1 / 60)
+
+
+async def run_clients(
+    address: str,
+    client_count: int,
+    render_distance: int,
+    speed: float,
+    edit_interval: float,
+    duration: float,
+    max_chunks_in_flight: int,
+) -> Tuple[List[AsyncChunkClient], Measurements, float]:
+    """Connects the clients and walks them for a duration."""
+    clients = [
+        await connect(address, max_chunks_in_flight) for _ in range(client_count)
+    ]
+    chunk_size = clients[0].chunk_size
+    measurements = Measurements()
+    # The clients start two chunks apart along `z`, so that they share chunks
+    # and receive the edits of each other.
+    starts = [
+        np.array([0.5, 20.5, 2 * chunk_size * index + 0.5])
+        for index in range(client_count)
+    ]
+    start_time = time.perf_counter()
+    await asyncio.gather(
+        *(
+            walk(
+                client,
+                start,
+                speed,
+                render_distance,
+                edit_interval,
+                duration,
+                measurements,
+            )
+            for client, start in zip(clients, starts)
+        )
+    )
+    elapsed_time = time.perf_counter() - start_time
+    for client in clients:
+        await client.close()
+    return clients, measurements, elapsed_time
+
+
+def format_percentiles(values: List[float]) -> str:
+    """Returns the p50, p95 and p99 of durations in milliseconds."""
+    if not values:
+        return "n/a"
+    p50, p95, p99 = 1e3 * np.percentile(values, (50, 95, 99))
+    return f"{p50:.1f} / {p95:.1f} / {p99:.1f} ms"
+
+
+def main(
+    client_count: int = 8,
+    duration: float = 10.0,
+    render_distance: int = 8,
+    speed: float = 10.0,
+    edit_interval: float = 0.25,
+    max_chunks_in_flight: int = 32,
+    address: Optional[str] = None,
+    num_workers: Optional[int] = None,
+    seed: int = 0,
+):
+    socket_path = "/tmp/pynecraft-benchmark.sock"
+    if address is None:
+        address = f"unix:{socket_path}"
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+    server_process = multiprocessing.get_context("spawn").Process(
+        target=serve, args=(address, seed, num_workers), daemon=True
+    )
+    server_process.start()
+    try:
+        clients, measurements, elapsed_time = asyncio.run(
+            run_clients(
+                address,
+                client_count,
+                render_distance,
+                speed,
+                edit_interval,
+                duration,
+                max_chunks_in_flight,
+            )
+        )
+    finally:
+        server_process.terminate()
+        server_process.join()
+
+    bytes_received = sum(client.bytes_received for client in clients)
+    chunk_bytes = sum(client.chunk_bytes_received for client in clients)
+    chunk_count = sum(client.chunks_received for client in clients)
+    delta_bytes = sum(client.delta_bytes_received for client in clients)
+    edit_count = len(measurements.edit_latencies)
+    bandwidth = bytes_received / elapsed_time / 2**20
+
+    print(f"clients:                  {client_count} ({address})")
+    print(f"duration:                 {elapsed_time:.1f} s")
+    print(f"chunks received:          {chunk_count}")
+    print(f"bandwidth:                {bandwidth:.2f} MB/s")
+    print(f"  per client:             {bandwidth / client_count:.2f} MB/s")
+    print(f"bytes per chunk:          {chunk_bytes / max(chunk_count, 1):.0f}")
+    print(
+        "compression ratio:        "
+        f"{measurements.decoded_bytes / max(chunk_bytes, 1):.1f}x"
+    )
+    print(
+        "chunk latency p50/95/99:  "
+        f"{format_percentiles(measurements.chunk_latencies)}"
+    )
+    print(
+        "first view load p50/95/99: "
+        f"{format_percentiles(measurements.view_load_times)}"
+    )
+    print(f"edits sent:               {len(measurements.edit_times)}")
+    print(f"edits received:           {edit_count}")
+    print(
+        "edit latency p50/95/99:   "
+        f"{format_percentiles(measurements.edit_latencies)}"
+    )
+    print(f"delta bytes per edit:     {delta_bytes / max(edit_count, 1):.1f}")
+
+
+if __name__ == "__main__":
+    Fire(main)
@@ -0,0 +1,66 @@
+"""Single-core benchmark of voxel raycasting.
+
+Generates a cube of terrain around the origin and casts random rays from above
+the ground, one at a time with `raycast` and all at once with `raycast_batch`.
+It reports the time per ray of both and checks that they hit the same blocks.
+
+Usage:
+    python benchmarks/raycast.py --ray_count 4096 --max_distance 32
+"""
+
+import time
+
+import numpy as np
+from fire import Fire
+
+from pynecraft.parameters import TerrainParameters, WorldParameters
+from pynecraft.world import World
+from pynecraft.world.raycast import raycast, raycast_batch
+from pynecraft.world.terrain import NoiseTerrainGenerator
+
+
+def main(
+    ray_count: int = 4096,
+    max_distance: float = 32.0,
+    extent: int = 128,
+    chunk_storage: str = "palette",
+    seed: int = 0,
+):
+    generator = NoiseTerrainGenerator(TerrainParameters(seed=seed))
+    world = World(WorldParameters(chunk_storage=chunk_storage))
+    start = (-extent // 2,) * 3
+    world.set_region(start, generator.generate_region(np.asarray(start), (extent,) * 3))
+
+    rng = np.random.default_rng(seed)
+    origins = rng.uniform(-extent / 4, extent / 4, (ray_count, 3))
+    origins[:, 1] = rng.uniform(20, 40, ray_count)
+    directions = rng.normal(size=(ray_count, 3))
+    directions[:, 1] -= 0.5
+
+    start_time = time.perf_counter()
+    hits = [
+        raycast(world, origin, direction, max_distance)
+        for origin, direction in zip(origins, directions)
+    ]
+    single_time = time.perf_counter() - start_time
+
+    start_time = time.perf_counter()
+    batch_hits = raycast_batch(world, origins, directions, max_distance)
+    batch_time = time.perf_counter() - start_time
+
+    is_consistent = all(
+        (hit is not None) == is_hit
+        and (hit is None or hit.position == tuple(position.tolist()))
+        for hit, is_hit, position in zip(hits, batch_hits.is_hit, batch_hits.positions)
+    )
+
+    print(f"rays:                      {ray_count} (max distance {max_distance})")
+    print(f"rays hitting a block:      {100 * batch_hits.is_hit.mean():.1f}%")
+    print(f"microseconds per ray:      {1e6 * single_time / ray_count:.2f}")
+    print(f"  batched:                 {1e6 * batch_time / ray_count:.2f}")
+    print(f"batch speedup:             {single_time / batch_time:.1f}x")
+    print(f"batch matches single rays: {is_consistent}")
+
+
+if __name__ == "__main__":
+    Fire(main)
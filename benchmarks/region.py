@@ -0,0 +1,141 @@
+"""Single-core benchmark of loading chunks from region files.
+
+Generates a square of chunk columns around the origin, saves them to region files
+in a temporary directory, and reports the number of chunks per second that are
+loaded back from disk compared to the number that are generated. It also reports
+the size of the region files and checks that the loaded chunks match the
+generated ones.
+
+Since the engine loads chunks in worker processes along with a border of blocks
+for meshing and lighting, it also times the padded blocks read by the workers
+and the whole job system with one worker, with and without the region files.
+
+Usage:
+    python benchmarks/region.py --radius 4 --seed 0
+"""
+
+import os
+import tempfile
+import time
+
+import numpy as np
+from fire import Fire
+
+from pynecraft import jobs
+from pynecraft.jobs import ChunkJobSystem
+from pynecraft.parameters import LightingParameters, TerrainParameters
+from pynecraft.world import Chunk
+from pynecraft.world.region import RegionStorage
+from pynecraft.world.terrain import NoiseTerrainGenerator
+
+
+def main(radius: int = 4, chunk_size: int = 32, seed: int = 0):
+    generator = NoiseTerrainGenerator(TerrainParameters(seed=seed))
+    lowest, highest = generator.height_range
+    chunk_positions = [
+        (chunk_x, chunk_y, chunk_z)
+        for chunk_x in range(-radius, radius)
+        for chunk_y in range(lowest // chunk_size, highest // chunk_size + 1)
+        for chunk_z in range(-radius, radius)
+    ]
+
+    start_time = time.perf_counter()
+    chunks = {
+        position: Chunk(
+            position,
+            size=chunk_size,
+            blocks=generator.generate_region(
+                np.asarray(position) * chunk_size, (chunk_size,) * 3
+            ),
+        )
+        for position in chunk_positions
+    }
+    generation_time = time.perf_counter() - start_time
+
+    with tempfile.TemporaryDirectory() as directory:
+        storage = RegionStorage(directory, chunk_size)
+        start_time = time.perf_counter()
+        storage.save_chunks(chunks.values())
+        save_time = time.perf_counter() - start_time
+        storage.close()
+
+        storage = RegionStorage(directory, chunk_size, writable=False)
+        start_time = time.perf_counter()
+        loaded_blocks = {
+            position: storage.load_chunk(position) for position in chunk_positions
+        }
+        load_time = time.perf_counter() - start_time
+        storage.close()
+
+        # The chunks whose neighbours were all saved, as the workers read them.
+        light_margin = LightingParameters().margin
+        inner_positions = [
+            position
+            for position in chunk_positions
+            if all(-radius < position[axis] < radius - 1 for axis in (0, 2))
+        ]
+        padded_times = {}
+        for storage_directory in (None, directory):
+            jobs._initialize_worker(
+                generator, chunk_size, "uint8", "packed", storage_directory, None, None
+            )
+            start_time = time.perf_counter()
+            for position in inner_positions:
+                jobs._get_padded_blocks(position, light_margin)
+            padded_times[storage_directory] = time.perf_counter() - start_time
+
+        job_times = {}
+        for storage_directory in (None, directory):
+            job_system = ChunkJobSystem(
+                generator,
+                chunk_size,
+                "uint8",
+                "packed",
+                num_workers=1,
+                storage_directory=storage_directory,
+                light_margin=light_margin,
+            )
+            # The worker process is started before the timing.
+            job_system.request((0, 1000, 0))
+            while job_system.drain(lambda *_: None, 1.0) == 0:
+                job_system.wait()
+            start_time = time.perf_counter()
+            for position in inner_positions:
+                job_system.request(position)
+            drained = 0
+            while drained < len(inner_positions):
+                job_system.wait()
+                drained += job_system.drain(lambda *_: None, 1.0)
+            job_times[storage_directory] = time.perf_counter() - start_time
+            job_system.shutdown()
+
+        file_size = sum(
+            os.path.getsize(os.path.join(directory, name))
+            for name in os.listdir(directory)
+        )
+
+    is_identical = all(
+        np.array_equal(loaded_blocks[position], chunk.blocks)
+        for position, chunk in chunks.items()
+    )
+    raw_size = sum(chunk.nbytes for chunk in chunks.values())
+
+    print(f"chunks:                    {len(chunks)} ({chunk_size}^3 voxels each)")
+    print(f"generated per second:      {len(chunks) / generation_time:.1f}")
+    print(f"saved per second:          {len(chunks) / save_time:.1f}")
+    print(f"loaded per second:         {len(chunks) / load_time:.1f}")
+    print(f"speedup over generation:   {generation_time / load_time:.1f}x")
+    print(f"region files size:         {file_size / 1024:.1f} KiB")
+    print(f"compression ratio:         {raw_size / file_size:.1f}x")
+    print(f"loaded chunks identical:   {is_identical}")
+    padded_count = len(inner_positions)
+    print(f"padded chunks (margin {light_margin}):  {padded_count}")
+    print(f"  generated per second:    {padded_count / padded_times[None]:.1f}")
+    print(f"  loaded per second:       {padded_count / padded_times[directory]:.1f}")
+    print(f"job system chunks per second:")
+    print(f"  generated:               {padded_count / job_times[None]:.1f}")
+    print(f"  loaded:                  {padded_count / job_times[directory]:.1f}")
+
+
+if __name__ == "__main__":
+    Fire(main)
@@ -0,0 +1,129 @@
+"""Headless rendering benchmark.
+
+Renders a fixed number of frames into an offscreen framebuffer while the camera
+flies along a scripted path, and reports the frame time percentiles along with
+the number of draw calls and triangles per frame. With `--profile`, it also
+reports the time spent per stage of the frame and can export a Chrome trace of
+the measured frames with `--trace_path`. Distant terrain is rendered at reduced
+levels of detail with `--lod_levels`. Chunk meshes share the vertex buffers of
+an arena and are drawn with indirect multi-draw calls, unless disabled with
+`--use_arena=False` or `--use_indirect_draws=False`. Chunks hidden behind solid
+terrain are culled unless disabled with `--occlusion_culling=False`. Chunks are
+lit by the sky and by lamps with baked ambient occlusion unless disabled with
+`--lighting=False`. Blocks are textured from the images of `--texture_directory`.
+With `--governor`, the render distance and, with `--adaptive_render_scale`, the
+render resolution are adjusted to hold `--target_frame_time`, and the decisions
+of the governor are printed after the report. `--entity_count` entities wander
+over the terrain and are drawn with a single instanced draw call. With
+`--server_address`, the chunks are streamed from a running chunk server.
+It needs no display nor GPU, e.g., it runs with Mesa's llvmpipe software renderer
+through EGL.
+
+Usage:
+    python benchmarks/render.py --frame_count 300 --render_distance 8
+"""
+
+from typing import Literal, Optional, Tuple
+
+from fire import Fire
+
+from pynecraft.headless import HeadlessEngine
+from pynecraft.parameters import (
+    ArenaParameters,
+    CameraParameters,
+    EngineParameters,
+    EntityParameters,
+    FirstPersonPlayerParameters,
+    GovernorParameters,
+    HeadlessParameters,
+    LightingParameters,
+    LodParameters,
+    NetworkParameters,
+    ProfilerParameters,
+    TerrainParameters,
+    TextureParameters,
+)
+
+
+def main(
+    frame_count: int = 300,
+    warmup_frame_count: int = 10,
+    resolution: Tuple[int, int] = (1280, 720),
+    render_distance: int = 8,
+    lod_levels: int = 0,
+    chunk_vertex_format: Literal["float", "packed"] = "packed",
+    use_arena: bool = True,
+    use_indirect_draws: bool = True,
+    occlusion_culling: bool = True,
+    lighting: bool = True,
+    texture_directory: Optional[str] = None,
+    governor: bool = False,
+    target_frame_time: float = 1e3 / 60,
+    adaptive_render_scale: bool = False,
+    entity_count: int = 0,
+    server_address: Optional[str] = None,
+    seed: int = 0,
+    wait_for_chunks: bool = True,
+    context_backend: Optional[str] = "egl",
+    output_directory: Optional[str] = None,
+    output_interval: int = 30,
+    profile: bool = False,
+    trace_path: Optional[str] = None,
+):
+    engine_parameters = EngineParameters(
+        window_resolution=resolution,
+        depth_buffer_size=24,
+        player_parameters=FirstPersonPlayerParameters(
+            camera_parameters=CameraParameters()
+        ),
+        terrain_parameters=TerrainParameters(seed=seed),
+        render_distance=render_distance,
+        chunk_vertex_format=chunk_vertex_format,
+        lod_parameters=LodParameters(level_count=lod_levels),
+        arena_parameters=ArenaParameters(
+            is_enabled=use_arena, use_indirect_draws=use_indirect_draws
+        ),
+        occlusion_culling=occlusion_culling,
+        lighting_parameters=LightingParameters(is_enabled=lighting),
+        texture_parameters=TextureParameters(directory=texture_directory),
+        governor_parameters=GovernorParameters(
+            is_enabled=governor,
+            target_frame_time=target_frame_time,
+            use_render_scale=adaptive_render_scale,
+        ),
+        entity_parameters=EntityParameters(count=entity_count),
+        network_parameters=NetworkParameters(server_address=server_address),
+        profiler_parameters=ProfilerParameters(
+            is_enabled=profile or trace_path is not None, trace_path=trace_path
+        ),
+    )
+    headless_parameters = HeadlessParameters(
+        frame_count=frame_count,
+        warmup_frame_count=warmup_frame_count,
+        wait_for_chunks=wait_for_chunks,
+        context_backend=context_backend,
+        output_directory=output_directory,
+        output_interval=output_interval,
+    )
+    engine = HeadlessEngine(engine_parameters, headless_parameters)
+    report = engine.run()
+    print(report.format())
+    if engine.scene.occlusion_culler is not None:
+        print(f"occluded chunks:        {engine.scene.occluded_chunk_count}")
+    if engine.arena is not None:
+        arena = engine.arena
+        print(f"arena pages:            {arena.page_count}")
+        print(f"arena bytes in use:     {arena.bytes_in_use / 2**20:.1f} MiB")
+        print(f"arena capacity:         {arena.capacity_bytes / 2**20:.1f} MiB")
+        print(f"arena fragmentation:    {arena.fragmentation:.3f}")
+        print(f"arena compactions:      {arena.compaction_count}")
+    if engine.governor is not None:
+        print()
+        print(engine.governor.format_decisions())
+    if engine.profiler.is_enabled:
+        print()
+        print(engine.profiler.format_summary())
+
+
+if __name__ == "__main__":
+    Fire(main)
@@ -0,0 +1,55 @@
+"""Single-core benchmark of the procedural terrain generator.
+
+Generates a square of chunk columns around the origin and reports the number of
+chunks generated per second. It also checks that generation is deterministic by
+generating the same chunks again in a shuffled order and comparing the results.
+
+Usage:
+    python benchmarks/terrain.py --radius 4 --seed 0
+"""
+
+import time
+
+import numpy as np
+from fire import Fire
+
+from pynecraft.parameters import TerrainParameters
+from pynecraft.world.terrain import NoiseTerrainGenerator
+
+
+def main(radius: int = 4, chunk_size: int = 32, seed: int = 0):
+    generator = NoiseTerrainGenerator(TerrainParameters(seed=seed))
+    lowest, highest = generator.height_range
+    chunk_positions = [
+        (chunk_x, chunk_y, chunk_z)
+        for chunk_x in range(-radius, radius)
+        for chunk_y in range(lowest // chunk_size, highest // chunk_size + 1)
+        for chunk_z in range(-radius, radius)
+    ]
+
+    def generate(chunk_position):
+        origin = np.asarray(chunk_position) * chunk_size
+        return generator.generate_region(origin, (chunk_size,) * 3)
+
+    start_time = time.perf_counter()
+    chunks = {position: generate(position) for position in chunk_positions}
+    elapsed_time = time.perf_counter() - start_time
+
+    shuffled_positions = list(chunk_positions)
+    np.random.default_rng(seed + 1).shuffle(shuffled_positions)
+    is_deterministic = all(
+        np.array_equal(generate(position), chunks[position])
+        for position in shuffled_positions
+    )
+    voxel_count = len(chunks) * chunk_size**3
+    solid_count = sum(np.count_nonzero(blocks) for blocks in chunks.values())
+
+    print(f"chunks generated:          {len(chunks)} ({chunk_size}^3 voxels each)")
+    print(f"chunks per second:         {len(chunks) / elapsed_time:.1f}")
+    print(f"milliseconds per chunk:    {1e3 * elapsed_time / len(chunks):.2f}")
+    print(f"solid voxels:              {100 * solid_count / voxel_count:.1f}%")
+    print(f"deterministic (shuffled):  {is_deterministic}")
+
+
+if __name__ == "__main__":
+    Fire(main)
@@ -0,0 +1,70 @@
+"""Benchmark of the block texture atlas and its on-disk cache.
+
+Packs the block textures of a directory into an atlas with its mipmaps, once
+without a cache and once from the cache written by the first run, and reports
+the time taken by both. It also checks that the cached atlas is identical to the
+packed one. Without `--directory`, noisy images of the colors of the blocks are
+generated into a temporary directory first.
+
+Usage:
+    python benchmarks/textures.py --texture_size 64
+"""
+
+import os
+import tempfile
+import time
+from typing import Optional
+
+import numpy as np
+import pygame
+from fire import Fire
+
+from pynecraft.textures import BlockTextureAtlas
+from pynecraft.world.blocks import BLOCK_COLORS, Block
+
+
+def write_noise_images(directory: str, texture_size: int, seed: int) -> None:
+    """Writes a noisy image of the color of every block type into a directory."""
+    rng = np.random.default_rng(seed)
+    for block in Block:
+        if block == Block.AIR:
+            continue
+        noise = rng.uniform(0.7, 1.0, (texture_size, texture_size, 1))
+        pixels = np.round(255 * BLOCK_COLORS[block] * noise).astype(np.uint8)
+        # Surfaces are indexed as `[x, y]`, i.e., column first.
+        surface = pygame.surfarray.make_surface(pixels.transpose(1, 0, 2))
+        pygame.image.save(surface, os.path.join(directory, f"{block.name.lower()}.png"))
+
+
+def main(directory: Optional[str] = None, texture_size: int = 16, seed: int = 0):
+    with tempfile.TemporaryDirectory() as temporary_directory:
+        if directory is None:
+            directory = os.path.join(temporary_directory, "textures")
+            os.makedirs(directory)
+            write_noise_images(directory, texture_size, seed)
+        cache_directory = os.path.join(temporary_directory, "cache")
+
+        start_time = time.perf_counter()
+        atlas = BlockTextureAtlas(directory, texture_size, cache_directory)
+        packing_time = time.perf_counter() - start_time
+
+        start_time = time.perf_counter()
+        cached_atlas = BlockTextureAtlas(directory, texture_size, cache_directory)
+        cached_time = time.perf_counter() - start_time
+
+        is_identical = cached_atlas.is_from_cache and all(
+            np.array_equal(level, cached_level)
+            for level, cached_level in zip(atlas.levels, cached_atlas.levels)
+        )
+        atlas_bytes = sum(level.nbytes for level in atlas.levels)
+        print(f"layers:                 {atlas.layer_count}")
+        print(f"atlas tiles:            {atlas.columns} x {atlas.rows}")
+        print(f"mipmap levels:          {atlas.level_count}")
+        print(f"atlas size:             {atlas_bytes / 2**10:.1f} KiB")
+        print(f"packing time:           {1e3 * packing_time:.2f} ms")
+        print(f"cached loading time:    {1e3 * cached_time:.2f} ms")
+        print(f"cache is identical:     {is_identical}")
+
+
+if __name__ == "__main__":
+    Fire(main)
@@ -1,4 +1,4 @@
-from typing import Optional, Tuple
+from typing import Literal, Optional, Tuple
 
 from fire import Fire
 
@@ -6,7 +6,19 @@ from pynecraft.engine import PyneCraftEngine
 from pynecraft.parameters import (
     CameraParameters,
     EngineParameters,
+    EntityParameters,
     FirstPersonPlayerParameters,
+    GovernorParameters,
+    LightingParameters,
+    LodParameters,
+    NetworkParameters,
+    PhysicsParameters,
+    ProfilerParameters,
+    SchedulerParameters,
+    ShaderParameters,
+    TerrainParameters,
+    TextureParameters,
+    WorldParameters,
 )
 
 
@@ -24,6 +36,25 @@ def main(
     near_plane_of_view_frustum: float = 0.1,
     far_plane_of_view_frustum: float = 2000.0,
     pitch_max: float = 89,
+    render_distance: int = 16,
+    lod_levels: int = 0,
+    chunk_vertex_format: Literal["float", "packed"] = "packed",
+    seed: int = 0,
+    save_directory: Optional[str] = None,
+    profile: bool = False,
+    profile_summary_interval: Optional[float] = 5.0,
+    trace_path: Optional[str] = None,
+    fly: bool = False,
+    lighting: bool = True,
+    texture_directory: Optional[str] = None,
+    hot_reload_shaders: bool = False,
+    tick_rate: float = 60.0,
+    max_frame_rate: Optional[float] = None,
+    governor: bool = False,
+    target_frame_time: float = 1e3 / 60,
+    adaptive_render_scale: bool = False,
+    entity_count: int = 0,
+    server_address: Optional[str] = None,
 ):
     camera_parameters = CameraParameters(
         position=position,
@@ -39,12 +70,36 @@ def main(
         player_rotation_speed=player_rotation_speed,
         mouse_sensitivity=mouse_sensitivity,
         camera_parameters=camera_parameters,
+        physics_parameters=PhysicsParameters(is_enabled=not fly),
     )
     engine_parameters = EngineParameters(
         window_resolution=window_resolution,
         depth_buffer_size=depth_buffer_size,
         background_color=background_color,
         player_parameters=player_parameters,
+        world_parameters=WorldParameters(save_directory=save_directory),
+        terrain_parameters=TerrainParameters(seed=seed),
+        render_distance=render_distance,
+        chunk_vertex_format=chunk_vertex_format,
+        lod_parameters=LodParameters(level_count=lod_levels),
+        lighting_parameters=LightingParameters(is_enabled=lighting),
+        texture_parameters=TextureParameters(directory=texture_directory),
+        shader_parameters=ShaderParameters(hot_reload=hot_reload_shaders),
+        scheduler_parameters=SchedulerParameters(
+            tick_rate=tick_rate, max_frame_rate=max_frame_rate
+        ),
+        governor_parameters=GovernorParameters(
+            is_enabled=governor,
+            target_frame_time=target_frame_time,
+            use_render_scale=adaptive_render_scale,
+        ),
+        entity_parameters=EntityParameters(count=entity_count),
+        network_parameters=NetworkParameters(server_address=server_address),
+        profiler_parameters=ProfilerParameters(
+            is_enabled=profile,
+            summary_interval=profile_summary_interval,
+            trace_path=trace_path,
+        ),
     )
     engine = PyneCraftEngine(engine_parameters=engine_parameters)
     engine.run()
@@ -3,6 +3,7 @@ from typing import Tuple
 
 import glm
 
+from .frustum import Frustum
 from .parameters import CameraParameters
 
 
@@ -82,6 +83,10 @@ class Camera:
         self.update_vectors()
         self.update_view_matrix()
 
+    def get_frustum(self) -> Frustum:
+        """Returns the view frustum of the camera for the current view matrix."""
+        return Frustum.from_matrix(self.projection_matrix * self.view_matrix)
+
     def rotate_pitch(self, vertical_offset):
         """Rotate the camera pitch."""
         self.pitch -= vertical_offset
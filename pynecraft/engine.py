@@ -1,13 +1,31 @@
 import sys
+import time
+from typing import Optional, Tuple
 
 import glm
 import moderngl
+import numpy as np
 import pygame
 
+from .entities import EntityStore
+from .governor import FrameTimeGovernor, GovernorDecision
+from .jobs import ChunkJobSystem
+from .mesh import InstancedMesh, MeshArena
+from .network import ChunkClient, RemoteChunkStreamer
 from .parameters import EngineParameters
 from .player import FirstPersonPlayer
+from .profiler import Profiler
+from .render_scale import RenderScaleFramebuffer
 from .scene import Scene
+from .scheduler import FixedTickScheduler
 from .shader_program import ShaderProgram
+from .streaming import ChunkStreamer
+from .textures import BlockTextureAtlas
+from .world import World
+from .world.blocks import Block
+from .world.raycast import raycast
+from .world.region import RegionStorage
+from .world.terrain import NoiseTerrainGenerator
 
 
 class PyneCraftEngine:
@@ -24,17 +42,13 @@ class PyneCraftEngine:
         self.window_resolution = glm.vec2(engine_parameters.window_resolution)
         self.depth_buffer_size = engine_parameters.depth_buffer_size
         self.background_color = engine_parameters.background_color
+        self.render_distance = engine_parameters.render_distance
+        self.chunk_upload_time_budget = engine_parameters.chunk_upload_time_budget
+        self.caption_update_interval = engine_parameters.caption_update_interval
+        self.profiler_parameters = engine_parameters.profiler_parameters
+        self.profiler = Profiler(profiler_parameters=self.profiler_parameters)
 
-        pygame.init()
-        self.set_opengl_attributes()
-
-        # Create the display surface
-        pygame.display.set_mode(
-            self.window_resolution, flags=pygame.DOUBLEBUF | pygame.OPENGL
-        )
-
-        # Create the opengl context
-        self.opengl_context = moderngl.create_context()
+        self.opengl_context = self.create_opengl_context()
 
         # Enable specific OpenGL capabilities for the rendering context.
         # `moderngl.DEPTH_TEST` enables depth testing which ensures that pixels
@@ -62,21 +76,248 @@ class PyneCraftEngine:
 
         self.clock = pygame.time.Clock()
         self.delta_time = 0  # The time elapsed since the last frame.
+        # The simulation runs in fixed ticks, independent of the frame rate.
+        self.scheduler = FixedTickScheduler(engine_parameters.scheduler_parameters)
+        self.frame_tick_count = 0  # The number of ticks run in the last frame.
         self.time = 0
+        self.last_caption_update_time = 0
+        self.last_summary_time = 0
 
         self.is_engine_running = True
 
+        lighting_parameters = engine_parameters.lighting_parameters
+        # The chunks are streamed from a chunk server, which owns the world, if an
+        # address is given. The light is not sent, so the chunks are lit by the sky.
+        network_parameters = engine_parameters.network_parameters
+        is_remote = network_parameters.server_address is not None
+        is_lit = lighting_parameters.is_enabled and not is_remote
+        self.world = World(
+            world_parameters=engine_parameters.world_parameters, is_lit=is_lit
+        )
         self.player = FirstPersonPlayer(
             window_resolution=engine_parameters.window_resolution,
             player_parameters=engine_parameters.player_parameters,
+            world=self.world,
+        )
+        texture_parameters = engine_parameters.texture_parameters
+        self.block_texture_atlas = (
+            BlockTextureAtlas(
+                directory=texture_parameters.directory,
+                texture_size=texture_parameters.texture_size,
+                cache_directory=texture_parameters.cache_directory,
+            )
+            if texture_parameters.directory is not None
+            and engine_parameters.chunk_vertex_format == "packed"
+            else None
+        )
+        block_layers = (
+            self.block_texture_atlas.block_layers
+            if self.block_texture_atlas is not None
+            else None
         )
         self.shader_program = ShaderProgram(
-            opengl_context=self.opengl_context, player=self.player, shader_dir="shaders"
+            opengl_context=self.opengl_context,
+            player=self.player,
+            shader_dir=engine_parameters.shader_parameters.directory,
+            block_texture_atlas=self.block_texture_atlas,
+            hot_reload=engine_parameters.shader_parameters.hot_reload,
+            reload_interval=engine_parameters.shader_parameters.reload_interval,
+        )
+        is_packed = engine_parameters.chunk_vertex_format == "packed"
+        # The vertex data of the chunk meshes is sub-allocated from a few large
+        # buffers, so that the visible chunks are drawn with few draw calls.
+        self.arena = (
+            MeshArena(
+                opengl_context=self.opengl_context,
+                program=(
+                    self.shader_program.arena_program
+                    if is_packed
+                    else self.shader_program.program
+                ),
+                vertex_format=engine_parameters.chunk_vertex_format,
+                arena_parameters=engine_parameters.arena_parameters,
+            )
+            if engine_parameters.arena_parameters.is_enabled
+            else None
         )
         self.scene = Scene(
-            opengl_context=self.opengl_context, program=self.shader_program.program
+            opengl_context=self.opengl_context,
+            program=(
+                self.shader_program.packed_program
+                if is_packed
+                else self.shader_program.program
+            ),
+            camera=self.player,
+            world=self.world,
+            vertex_format=engine_parameters.chunk_vertex_format,
+            profiler=self.profiler,
+            lod_triangle_budgets=engine_parameters.lod_parameters.triangle_budgets,
+            arena=self.arena,
+            occlusion_culling=engine_parameters.occlusion_culling,
+            block_layers=block_layers,
+        )
+        # The meshes draw with the programs they were created with, so they are
+        # handed the new programs when the shader sources are reloaded.
+        self.scene_program_name = "packed" if is_packed else "default"
+        self.arena_program_name = "arena" if is_packed else "default"
+        self.shader_program.registry.add_reload_listener(self.set_reloaded_program)
+
+        # Chunks are generated and meshed by a pool of worker processes in the
+        # background and streamed into the world as the player moves.
+        terrain_generator = NoiseTerrainGenerator(
+            terrain_parameters=engine_parameters.terrain_parameters
+        )
+        self.place_player_above_ground(terrain_generator)
+
+        # The entities are simulated in bulk every tick and drawn as the instances
+        # of a single cube mesh.
+        entity_parameters = engine_parameters.entity_parameters
+        self.entity_parameters = entity_parameters
+        self.entity_store = EntityStore(
+            world=self.world,
+            entity_parameters=entity_parameters,
+            capacity=entity_parameters.count,
+        )
+        self.entity_mesh = InstancedMesh(
+            opengl_context=self.opengl_context,
+            program=self.shader_program.instanced_program,
+            capacity=entity_parameters.count,
+        )
+        self.spawn_entities(
+            terrain_generator,
+            entity_parameters.count,
+            seed=engine_parameters.terrain_parameters.seed,
+        )
+        save_directory = (
+            engine_parameters.world_parameters.save_directory if not is_remote else None
+        )
+        self.storage = (
+            RegionStorage(directory=save_directory, chunk_size=self.world.chunk_size)
+            if save_directory is not None
+            else None
+        )
+        self.job_system = ChunkJobSystem(
+            generator=terrain_generator,
+            chunk_size=self.world.chunk_size,
+            block_dtype=self.world.block_dtype.name,
+            vertex_format=engine_parameters.chunk_vertex_format,
+            num_workers=engine_parameters.num_chunk_workers,
+            storage_directory=save_directory,
+            light_margin=lighting_parameters.margin if is_lit else None,
+            block_layers=block_layers,
+        )
+        self.client = (
+            ChunkClient(
+                address=network_parameters.server_address,
+                max_chunks_in_flight=network_parameters.max_chunks_in_flight,
+            )
+            if is_remote
+            else None
+        )
+        self.chunk_streamer = (
+            RemoteChunkStreamer(
+                world=self.world,
+                scene=self.scene,
+                job_system=self.job_system,
+                client=self.client,
+                render_distance=self.render_distance,
+            )
+            if is_remote
+            else ChunkStreamer(
+                world=self.world,
+                scene=self.scene,
+                job_system=self.job_system,
+                render_distance=self.render_distance,
+                height_range=terrain_generator.height_range,
+                storage=self.storage,
+                lod_parameters=engine_parameters.lod_parameters,
+            )
         )
 
+        # The render distance, and optionally the resolution the scene is
+        # rendered at, are adjusted to hold a target frame time.
+        governor_parameters = engine_parameters.governor_parameters
+        self.lod_triangle_budgets = engine_parameters.lod_parameters.triangle_budgets
+        self.governor = (
+            FrameTimeGovernor(governor_parameters, self.render_distance)
+            if governor_parameters.is_enabled
+            else None
+        )
+        self.render_scale_framebuffer = (
+            RenderScaleFramebuffer(
+                opengl_context=self.opengl_context,
+                program=self.shader_program.blit_program,
+                resolution=engine_parameters.window_resolution,
+            )
+            if governor_parameters.is_enabled and governor_parameters.use_render_scale
+            else None
+        )
+
+    def create_opengl_context(self) -> moderngl.Context:
+        """Create the window and the OpenGL context rendering to it."""
+        pygame.init()
+        self.set_opengl_attributes()
+
+        # Create the display surface
+        pygame.display.set_mode(
+            self.window_resolution, flags=pygame.DOUBLEBUF | pygame.OPENGL
+        )
+
+        # Create the opengl context
+        return moderngl.create_context()
+
+    def place_player_above_ground(self, terrain_generator) -> None:
+        """Move the player up if its initial position is below the surface of the
+        terrain, so that it does not spawn inside solid ground.
+        """
+        ground_height = terrain_generator.get_heights(
+            np.floor([self.player.position.x]), np.floor([self.player.position.z])
+        )[0]
+        position = glm.vec3(self.player.position)
+        position.y = max(position.y, ground_height + 3)
+        self.player.teleport(position)
+
+    def spawn_entities(
+        self, terrain_generator, count: int, seed: Optional[int] = None
+    ) -> None:
+        """Spawn entities wandering in random directions above the terrain around
+        the player, within the render distance.
+        """
+        if count == 0:
+            return
+        rng = np.random.default_rng(seed)
+        radius = self.render_distance * self.world.chunk_size
+        angles = rng.uniform(0, 2 * np.pi, count)
+        distances = radius * np.sqrt(rng.uniform(0, 1, count))
+        positions = np.empty((count, 3))
+        positions[:, 0] = self.player.position.x + distances * np.cos(angles)
+        positions[:, 2] = self.player.position.z + distances * np.sin(angles)
+        positions[:, 1] = (
+            terrain_generator.get_heights(
+                np.floor(positions[:, 0]), np.floor(positions[:, 2])
+            )
+            + 1
+        )
+        self.entity_store.spawn(
+            positions,
+            half_extents=rng.uniform(0.25, 0.5, (count, 1)) * (1.0, 1.6, 1.0),
+            yaws=rng.uniform(0, 2 * np.pi, count),
+            yaw_rates=rng.normal(0, 0.5, count),
+            walk_speeds=self.entity_parameters.walk_speed,
+            colors=rng.uniform(0.3, 1.0, (count, 3)),
+        )
+
+    def set_reloaded_program(self, name: str, program: moderngl.Program) -> None:
+        """Hand a shader program that was reloaded to the meshes drawn with it."""
+        if self.arena is not None and name == self.arena_program_name:
+            self.arena.set_program(program)
+        if name == self.scene_program_name:
+            self.scene.set_program(program)
+        if name == "instanced":
+            self.entity_mesh.set_program(program)
+        if name == "blit" and self.render_scale_framebuffer is not None:
+            self.render_scale_framebuffer.set_program(program)
+
     def set_opengl_attributes(self) -> None:
         """Set the values of several attributes for the OpenGL context before
         creating the display surface.
@@ -97,20 +338,178 @@ class PyneCraftEngine:
         # of others in a 3D scene by keeping track of the depth of each pixel.
         pygame.display.gl_set_attribute(pygame.GL_DEPTH_SIZE, self.depth_buffer_size)
 
+    def tick(self) -> None:
+        """Advance the simulation by one fixed tick."""
+        # The player is frozen while the chunks around it are not loaded, so that
+        # it does not fall through the ground before it is streamed in.
+        self.player.tick(
+            self.scheduler.tick_duration_ms,
+            is_physics_paused=not self.chunk_streamer.is_loaded_around(
+                self.player.tick_position
+            ),
+        )
+        self.entity_store.tick(self.scheduler.tick_duration)
+
     def update(self) -> None:
-        """Update the game state using the core game logic."""
-        self.player.update(self.delta_time)
-        self.shader_program.update()
-        self.scene.update()
+        """Update the game state using the core game logic, by running the
+        simulation ticks that are due and updating everything that changes every
+        frame.
+        """
+        profiler = self.profiler
+        with profiler.section("tick"):
+            self.frame_tick_count = self.scheduler.advance()
+            for _ in range(self.frame_tick_count):
+                self.tick()
+        with profiler.section("player.update"):
+            self.player.update(self.scheduler.alpha)
+        with profiler.section("chunk_streamer.update"):
+            self.chunk_streamer.update(self.player.position)
+        with profiler.section("chunk_streamer.upload"):
+            self.chunk_streamer.upload(self.chunk_upload_time_budget)
+        with profiler.section("chunk_streamer.remesh"):
+            self.chunk_streamer.remesh_dirty_chunks()
+        with profiler.section("shader_program.update"):
+            self.shader_program.update()
+        with profiler.section("scene.update"):
+            self.scene.update()
         self.delta_time = self.clock.tick()
         self.time = pygame.time.get_ticks() * 1e-3
-        pygame.display.set_caption(f"PyneCraft | FPS: {self.clock.get_fps()}")
+        self.report_statistics()
+
+    def report_statistics(self) -> None:
+        """Update the statistics in the window caption and print the profiler
+        summary at their configured intervals. Setting the caption is not free, so
+        it is not done every frame.
+        """
+        ticks = pygame.time.get_ticks()
+        if ticks - self.last_caption_update_time >= self.caption_update_interval:
+            self.last_caption_update_time = ticks
+            pygame.display.set_caption(
+                f"PyneCraft | FPS: {self.clock.get_fps():.0f} | "
+                f"Chunks: {self.scene.visible_chunk_count} visible, "
+                f"{self.scene.culled_chunk_count} culled "
+                f"({self.scene.occluded_chunk_count} occluded)"
+            )
+        summary_interval = self.profiler_parameters.summary_interval
+        if (
+            self.profiler.is_enabled
+            and summary_interval is not None
+            and ticks - self.last_summary_time >= 1e3 * summary_interval
+        ):
+            self.last_summary_time = ticks
+            print(self.profiler.format_summary(), end="\n\n")
+
+    def record_counters(self) -> None:
+        """Record the per-frame counters of the scene and the job system."""
+        if not self.profiler.is_enabled:
+            return
+        self.profiler.set_counter("draw_calls", self.scene.draw_call_count)
+        self.profiler.set_counter("triangles", self.scene.triangle_count)
+        self.profiler.set_counter("visible_chunks", self.scene.visible_chunk_count)
+        self.profiler.set_counter("occluded_chunks", self.scene.occluded_chunk_count)
+        self.profiler.set_counter(
+            "sorted_translucent_quads", self.scene.sorted_translucent_quad_count
+        )
+        self.profiler.set_counter("pending_chunks", len(self.job_system))
+        if self.client is not None:
+            self.profiler.set_counter("received_chunks", len(self.client))
+        self.profiler.set_counter("ticks", self.frame_tick_count)
+        self.profiler.set_counter("entities", len(self.entity_store))
+        if self.governor is not None:
+            self.profiler.set_counter("render_distance", self.governor.render_distance)
+            self.profiler.set_counter("render_scale", self.governor.render_scale)
+        if self.arena is not None:
+            self.profiler.set_counter("arena_bytes_in_use", self.arena.bytes_in_use)
+            self.profiler.set_counter("arena_fragmentation", self.arena.fragmentation)
+
+    def govern(self, frame_time: float) -> Optional[GovernorDecision]:
+        """Record the time of a frame in milliseconds with the governor, and apply
+        the change of the rendering quality it decides on, if any.
+        """
+        if self.governor is None:
+            return None
+        decision = self.governor.record(frame_time)
+        if decision is None:
+            return None
+        self.chunk_streamer.set_render_distance(decision.render_distance)
+        # The triangle budgets of the rings of distant terrain shrink with the
+        # area covered by the full-detail chunks.
+        area_ratio = (decision.render_distance / self.governor.max_render_distance) ** 2
+        self.scene.lod_triangle_budgets = tuple(
+            int(budget * area_ratio) for budget in self.lod_triangle_budgets
+        )
+        if self.render_scale_framebuffer is not None:
+            self.render_scale_framebuffer.set_scale(decision.render_scale)
+        return decision
+
+    def render_scene(self, output_framebuffer: moderngl.Framebuffer) -> None:
+        """Render the scene into an output framebuffer, through the framebuffer
+        of a lower resolution if the render scale is reduced.
+        """
+        render_scale_framebuffer = self.render_scale_framebuffer
+        is_scaled = (
+            render_scale_framebuffer is not None and render_scale_framebuffer.is_scaled
+        )
+        if is_scaled:
+            render_scale_framebuffer.use()
+        self.opengl_context.clear(*self.background_color)
+        with self.profiler.section("scene.render"):
+            self.scene.render()
+        if len(self.entity_store):
+            with self.profiler.section("entities.render"):
+                self.entity_mesh.write_instances(
+                    self.entity_store.get_instances(self.scheduler.alpha)
+                )
+                self.entity_mesh.render()
+        # Translucent faces are blended over all the opaque geometry, including the
+        # entities.
+        with self.profiler.section("scene.render_translucent"):
+            self.scene.render_translucent()
+        if is_scaled:
+            with self.profiler.section("render_scale.blit"):
+                render_scale_framebuffer.blit(output_framebuffer)
 
     def render(self) -> None:
         """Render the game state to the screen."""
-        self.opengl_context.clear(*self.background_color)
-        self.scene.render()
-        pygame.display.flip()
+        self.render_scene(self.opengl_context.screen)
+        with self.profiler.section("display.flip"):
+            pygame.display.flip()
+
+    def edit_block(self, block_id: int = Block.AIR) -> None:
+        """Break the block the player is looking at if `block_id` is air, or place
+        a block against the face of it the player is looking at. The chunks
+        affected by the edit are relit and remeshed in the background.
+        """
+        hit = raycast(
+            self.world,
+            self.player.position,
+            self.player.forward,
+            self.player.reach_distance,
+        )
+        if hit is None:
+            return
+        if block_id == Block.AIR:
+            self.set_block(hit.position, Block.AIR)
+            return
+        position = hit.adjacent_position
+        if self.player.physics_body is not None:
+            # Do not place a block where it would trap the player.
+            box_min, box_max = self.player.physics_body.get_bounds()
+            if all(
+                position[axis] < box_max[axis] and position[axis] + 1 > box_min[axis]
+                for axis in range(3)
+            ):
+                return
+        self.set_block(position, block_id)
+
+    def set_block(self, position: Tuple[int, int, int], block_id: int) -> None:
+        """Set a block of the world, and send the edit to the chunk server if the
+        chunks are streamed from one. The edit is applied locally right away
+        rather than when the server broadcasts it back.
+        """
+        self.world.set_block(*position, block_id)
+        if self.client is not None:
+            self.client.send_edit(position, block_id)
 
     def handle_events(self) -> None:
         """Handle events such as user input and window events."""
@@ -119,14 +518,49 @@ class PyneCraftEngine:
                 event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE
             ):
                 self.is_engine_running = False
+            elif event.type == pygame.MOUSEBUTTONDOWN and event.button in (1, 2, 3):
+                # Left click breaks blocks, right click places stone and middle
+                # click places lamps.
+                self.edit_block(
+                    {1: Block.AIR, 2: Block.LAMP, 3: Block.STONE}[event.button]
+                )
+
+    def shutdown(self) -> None:
+        """Stop the background workers, close the connection to the chunk server,
+        save the modified chunks and export the profiler trace.
+        """
+        self.job_system.shutdown()
+        if self.client is not None:
+            self.client.close()
+        if self.storage is not None:
+            self.chunk_streamer.save()
+            self.storage.compact()
+            self.storage.close()
+        trace_path = self.profiler_parameters.trace_path
+        if self.profiler.is_enabled and trace_path is not None:
+            self.profiler.export_chrome_trace(trace_path)
 
     def run(self) -> None:
         """Run the main loop of the engine, which updates the game state, renders the
         game, and handles events.
         """
         while self.is_engine_running:
-            self.update()
-            self.render()
-            self.handle_events()
+            start_time = time.perf_counter()
+            with self.profiler.section("frame"):
+                with self.profiler.section("update"):
+                    self.update()
+                with self.profiler.section("render"):
+                    self.render()
+                with self.profiler.section("handle_events"):
+                    self.handle_events()
+            self.record_counters()
+            decision = self.govern(1e3 * (time.perf_counter() - start_time))
+            if decision is not None:
+                print(f"Governor: {decision.format()}")
+            with self.profiler.section("idle"):
+                # The time left until the next frame of a capped frame rate is
+                # spent loading the chunks finished in the background.
+                self.scheduler.wait_for_next_frame(self.chunk_streamer.upload)
+        self.shutdown()
         pygame.quit()
         sys.exit()
@@ -0,0 +1,563 @@
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+from .mesh.instanced import INSTANCE_DTYPE
+from .parameters import EntityParameters
+from .world import World
+from .world.blocks import BLOCK_IS_SOLID
+
+# The number of bits of each coordinate of a cell in the keys of a spatial hash.
+# The coordinates are offset by half their range, so that the keys of cells
+# sorted by key are sorted lexicographically by their coordinates, and the key of
+# a neighbouring cell is the key of the cell plus a constant.
+_CELL_KEY_BITS = 21
+_CELL_KEY_BIAS = 1 << (_CELL_KEY_BITS - 1)
+
+# The offsets of the cells after a cell in the order of their keys, of which
+# every pair of adjacent cells is found once.
+_FORWARD_NEIGHBOUR_OFFSETS = [
+    (x, y, z)
+    for x in (-1, 0, 1)
+    for y in (-1, 0, 1)
+    for z in (-1, 0, 1)
+    if (x, y, z) > (0, 0, 0)
+]
+
+
+def get_cell_keys(cells: np.ndarray) -> np.ndarray:
+    """Packs integer cell coordinates of shape `(n, 3)`, each in
+    `[-2**20, 2**20)`, into `int64` keys.
+    """
+    cells = np.asarray(cells).astype(np.int64) + _CELL_KEY_BIAS
+    return (
+        (cells[:, 0] << (2 * _CELL_KEY_BITS))
+        | (cells[:, 1] << _CELL_KEY_BITS)
+        | cells[:, 2]
+    )
+
+
+def expand_runs(starts: np.ndarray, counts: np.ndarray) -> Tuple[np.ndarray, ...]:
+    """Expands runs of consecutive integers given by their starts and lengths.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: For every integer of every run, the index
+            of its run and the integer.
+    """
+    run_indices = np.repeat(np.arange(len(counts)), counts)
+    # The integers are the starts of their runs plus their offset in the run.
+    offsets = np.arange(len(run_indices)) - np.repeat(
+        np.cumsum(counts) - counts, counts
+    )
+    return run_indices, starts[run_indices] + offsets
+
+
+class SpatialHash:
+    """A uniform grid over points in space, for finding the points near a point
+    or the pairs of points near each other without comparing all pairs.
+
+    Every point is assigned to the cubic cell containing it, and the points are
+    sorted by the key of their cell, so that the points of a cell are a
+    contiguous run. The pairs of points near each other are found per occupied
+    cell: within the cell, and with the points of the 13 of its 26 adjacent cells
+    that come after it, so that every pair is found once. Building the grid and
+    querying it are vectorized over all points and cells, so that the cost does
+    not grow with per-point Python overhead. Points farther apart than the size
+    of a cell along an axis are never paired, so the cell size must be at least
+    the largest distance queried.
+
+    Args:
+        cell_size (float): The edge length of the cells.
+    """
+
+    def __init__(self, cell_size: float) -> None:
+        assert cell_size > 0, "The cell size must be positive."
+        self.cell_size = cell_size
+        self.positions = np.zeros((0, 3))
+        self.order = np.zeros(0, dtype=np.int64)
+        # The keys, first sorted points and numbers of points of the occupied
+        # cells, sorted by key.
+        self.cell_keys = np.zeros(0, dtype=np.int64)
+        self.cell_starts = np.zeros(0, dtype=np.int64)
+        self.cell_counts = np.zeros(0, dtype=np.int64)
+
+    def build(self, positions: np.ndarray) -> None:
+        """Assigns points of shape `(n, 3)` to the cells of the grid, replacing
+        the previous points.
+        """
+        self.positions = np.asarray(positions).reshape(-1, 3)
+        keys = get_cell_keys(np.floor(self.positions / self.cell_size))
+        self.order = np.argsort(keys)
+        sorted_keys = keys[self.order]
+        is_cell_start = np.ones(len(sorted_keys), dtype=bool)
+        is_cell_start[1:] = sorted_keys[1:] != sorted_keys[:-1]
+        self.cell_starts = np.flatnonzero(is_cell_start)
+        self.cell_keys = sorted_keys[self.cell_starts]
+        self.cell_counts = np.diff(np.append(self.cell_starts, len(sorted_keys)))
+
+    def find_cells(self, keys: np.ndarray) -> np.ndarray:
+        """Returns the indices of the occupied cells with the given keys, or -1
+        for the keys of empty cells.
+        """
+        indices = np.searchsorted(self.cell_keys, keys)
+        indices[indices == len(self.cell_keys)] = 0
+        return np.where(self.cell_keys[indices] == keys, indices, -1)
+
+    def query_radius(self, point: np.ndarray, radius: float) -> np.ndarray:
+        """Returns the indices of the points within a distance of a point."""
+        if len(self.positions) == 0:
+            return np.zeros(0, dtype=np.int64)
+        point = np.asarray(point, dtype=self.positions.dtype)
+        lower = np.floor((point - radius) / self.cell_size).astype(np.int64)
+        upper = np.floor((point + radius) / self.cell_size).astype(np.int64)
+        cells = np.stack(
+            np.meshgrid(
+                *(np.arange(lower[axis], upper[axis] + 1) for axis in range(3)),
+                indexing="ij",
+            ),
+            axis=-1,
+        ).reshape(-1, 3)
+        cell_indices = self.find_cells(get_cell_keys(cells))
+        cell_indices = cell_indices[cell_indices >= 0]
+        _, sorted_indices = expand_runs(
+            self.cell_starts[cell_indices], self.cell_counts[cell_indices]
+        )
+        indices = self.order[sorted_indices]
+        distances = np.linalg.norm(self.positions[indices] - point, axis=1)
+        return np.sort(indices[distances <= radius])
+
+    def find_neighbour_pairs(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Returns the pairs of points in the same or in adjacent cells, which
+        include all pairs closer than the cell size along every axis.
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: The indices `i` and `j` of the points
+                of every pair, with `i < j`.
+        """
+        starts, counts = self.cell_starts, self.cell_counts
+        # The pairs within a cell pair every sorted point with the points after
+        # it in its cell.
+        cell_indices = np.repeat(np.arange(len(counts)), counts)
+        sorted_indices = np.arange(len(cell_indices))
+        first_points, second_points = expand_runs(
+            sorted_indices + 1,
+            starts[cell_indices] + counts[cell_indices] - sorted_indices - 1,
+        )
+        first_sorted, second_sorted = [sorted_indices[first_points]], [second_points]
+
+        for offset in _FORWARD_NEIGHBOUR_OFFSETS:
+            key_offset = (
+                (offset[0] << (2 * _CELL_KEY_BITS))
+                + (offset[1] << _CELL_KEY_BITS)
+                + offset[2]
+            )
+            neighbours = self.find_cells(self.cell_keys + key_offset)
+            cells = np.flatnonzero(neighbours >= 0)
+            neighbours = neighbours[cells]
+            # Every point of the cell is paired with every point of the
+            # neighbouring cell.
+            pair_cells, first = expand_runs(starts[cells], counts[cells])
+            neighbours = neighbours[pair_cells]
+            first_points, second = expand_runs(starts[neighbours], counts[neighbours])
+            first_sorted.append(first[first_points])
+            second_sorted.append(second)
+
+        first = self.order[np.concatenate(first_sorted)]
+        second = self.order[np.concatenate(second_sorted)]
+        return np.minimum(first, second), np.maximum(first, second)
+
+
+class EntityStore:
+    """Stores the state of many moving entities, such as mobs, projectiles and
+    dropped items, in a structure of arrays, and advances all of them at once
+    with vectorized NumPy operations instead of a Python call per entity.
+
+    Every entity is an axis-aligned box that stands on its `position`, the
+    center of the bottom face of the box, like the body of the player. It falls
+    under gravity and collides with the solid blocks of the world, which are
+    point sampled below, above and in front of the center of the box, and it is
+    pushed out of the boxes of other entities found through a spatial hash.
+    Entities with a walk speed walk in the direction of their yaw, which turns
+    at their yaw rate. The entities whose chunk is not loaded are frozen, so
+    that they do not fall through the ground before it is streamed in.
+
+    The entities are stored densely in the first `count` rows of the arrays, and
+    removing an entity moves the last entity into its row, so entities are
+    referred to by IDs that never change.
+
+    Args:
+        world (Optional[World]): The world the entities collide with. Entities
+            do not collide with blocks if it is `None`.
+        entity_parameters (EntityParameters): The parameters of the entities.
+        capacity (int): The number of entities the arrays initially have room
+            for. They grow as needed.
+    """
+
+    def __init__(
+        self,
+        world: Optional[World] = None,
+        entity_parameters: EntityParameters = EntityParameters(),
+        capacity: int = 1024,
+    ) -> None:
+        self.world = world
+        self.gravity = entity_parameters.gravity
+        self.terminal_speed = entity_parameters.terminal_speed
+        self.ground_friction = entity_parameters.ground_friction
+        self.spatial_hash = SpatialHash(entity_parameters.cell_size)
+        self.spatial_hash_ids = np.zeros(0, dtype=np.int64)
+
+        self.count = 0
+        self.next_id = 0
+        self.index_of: Dict[int, int] = {}
+        capacity = max(capacity, 1)
+        self.ids = np.zeros(capacity, dtype=np.int64)
+        self.position_array = np.zeros((capacity, 3), dtype=np.float32)
+        self.previous_position_array = np.zeros((capacity, 3), dtype=np.float32)
+        self.velocity_array = np.zeros((capacity, 3), dtype=np.float32)
+        self.half_extent_array = np.zeros((capacity, 3), dtype=np.float32)
+        self.yaw_array = np.zeros(capacity, dtype=np.float32)
+        self.previous_yaw_array = np.zeros(capacity, dtype=np.float32)
+        self.yaw_rate_array = np.zeros(capacity, dtype=np.float32)
+        self.walk_speed_array = np.zeros(capacity, dtype=np.float32)
+        self.color_array = np.ones((capacity, 3), dtype=np.float32)
+        self.is_grounded_array = np.zeros(capacity, dtype=bool)
+
+    def __len__(self) -> int:
+        return self.count
+
+    # The arrays of the entities, without the unused rows.
+
+    @property
+    def positions(self) -> np.ndarray:
+        return self.position_array[: self.count]
+
+    @property
+    def previous_positions(self) -> np.ndarray:
+        return self.previous_position_array[: self.count]
+
+    @property
+    def velocities(self) -> np.ndarray:
+        return self.velocity_array[: self.count]
+
+    @property
+    def half_extents(self) -> np.ndarray:
+        return self.half_extent_array[: self.count]
+
+    @property
+    def yaws(self) -> np.ndarray:
+        return self.yaw_array[: self.count]
+
+    @property
+    def previous_yaws(self) -> np.ndarray:
+        return self.previous_yaw_array[: self.count]
+
+    @property
+    def yaw_rates(self) -> np.ndarray:
+        return self.yaw_rate_array[: self.count]
+
+    @property
+    def walk_speeds(self) -> np.ndarray:
+        return self.walk_speed_array[: self.count]
+
+    @property
+    def colors(self) -> np.ndarray:
+        return self.color_array[: self.count]
+
+    @property
+    def is_grounded(self) -> np.ndarray:
+        return self.is_grounded_array[: self.count]
+
+    def reserve(self, capacity: int) -> None:
+        """Grows the arrays to have room for at least `capacity` entities."""
+        old_capacity = len(self.ids)
+        if capacity <= old_capacity:
+            return
+        new_capacity = max(capacity, 2 * old_capacity)
+        for name, value in list(vars(self).items()):
+            if name == "ids" or name.endswith("_array"):
+                grown = np.zeros((new_capacity, *value.shape[1:]), dtype=value.dtype)
+                grown[:old_capacity] = value
+                setattr(self, name, grown)
+        self.color_array[old_capacity:] = 1.0
+
+    def spawn(
+        self,
+        positions: np.ndarray,
+        half_extents: np.ndarray = (0.3, 0.9, 0.3),
+        velocities: Optional[np.ndarray] = None,
+        yaws: Optional[np.ndarray] = None,
+        yaw_rates: Optional[np.ndarray] = None,
+        walk_speeds: Optional[np.ndarray] = None,
+        colors: Optional[np.ndarray] = None,
+    ) -> np.ndarray:
+        """Adds entities to the store.
+
+        Args:
+            positions (np.ndarray): The positions of the centers of the bottom
+                faces of the boxes of the entities, of shape `(n, 3)`.
+            half_extents (np.ndarray): The half sizes of the boxes along each
+                axis, of shape `(n, 3)` or `(3,)`.
+            velocities (Optional[np.ndarray]): The velocities in blocks per
+                second, of shape `(n, 3)`. Defaults to 0.
+            yaws (Optional[np.ndarray]): The angles in radians of the entities
+                around the `y` axis. Defaults to 0.
+            yaw_rates (Optional[np.ndarray]): The speeds in radians per second at
+                which the yaws turn. Defaults to 0.
+            walk_speeds (Optional[np.ndarray]): The speeds in blocks per second at
+                which the entities walk in the direction of their yaw. Entities
+                with a walk speed of 0 keep their horizontal velocity, slowed down
+                by friction on the ground. Defaults to 0.
+            colors (Optional[np.ndarray]): The colors of the entities, of shape
+                `(n, 3)` or `(3,)`. Defaults to white.
+
+        Returns:
+            np.ndarray: The IDs of the new entities.
+        """
+        positions = np.asarray(positions, dtype=np.float32).reshape(-1, 3)
+        spawn_count = len(positions)
+        self.reserve(self.count + spawn_count)
+        rows = slice(self.count, self.count + spawn_count)
+        ids = np.arange(self.next_id, self.next_id + spawn_count, dtype=np.int64)
+        self.ids[rows] = ids
+        self.position_array[rows] = positions
+        self.previous_position_array[rows] = positions
+        self.half_extent_array[rows] = half_extents
+        self.velocity_array[rows] = 0.0 if velocities is None else velocities
+        self.yaw_array[rows] = 0.0 if yaws is None else yaws
+        self.previous_yaw_array[rows] = self.yaw_array[rows]
+        self.yaw_rate_array[rows] = 0.0 if yaw_rates is None else yaw_rates
+        self.walk_speed_array[rows] = 0.0 if walk_speeds is None else walk_speeds
+        self.color_array[rows] = 1.0 if colors is None else colors
+        self.is_grounded_array[rows] = False
+        self.index_of.update(zip(ids.tolist(), range(rows.start, rows.stop)))
+        self.count += spawn_count
+        self.next_id += spawn_count
+        return ids
+
+    def despawn(self, ids: np.ndarray) -> None:
+        """Removes entities from the store, moving the last entities into the
+        rows of the removed ones.
+        """
+        for entity_id in np.atleast_1d(ids).tolist():
+            index = self.index_of.pop(entity_id)
+            last = self.count - 1
+            if index != last:
+                for name, value in vars(self).items():
+                    if name == "ids" or name.endswith("_array"):
+                        value[index] = value[last]
+                self.index_of[int(self.ids[index])] = index
+            self.count -= 1
+
+    def get_indices(self, ids: np.ndarray) -> np.ndarray:
+        """Returns the rows of the arrays of entities given by their IDs."""
+        return np.array(
+            [self.index_of[entity_id] for entity_id in np.atleast_1d(ids).tolist()],
+            dtype=np.int64,
+        )
+
+    def get_active_mask(self) -> np.ndarray:
+        """Returns which entities are in a loaded chunk, or all of them if the
+        entities do not collide with a world.
+        """
+        if self.world is None:
+            return np.ones(self.count, dtype=bool)
+        chunk_positions = np.floor(self.positions / self.world.chunk_size).astype(
+            np.int64
+        )
+        # The entities are grouped by the key of their chunk, so that every chunk
+        # is looked up once.
+        unique_keys, first_indices, inverse = np.unique(
+            get_cell_keys(chunk_positions), return_index=True, return_inverse=True
+        )
+        is_loaded = np.array(
+            [
+                tuple(position) in self.world
+                for position in chunk_positions[first_indices].tolist()
+            ],
+            dtype=bool,
+        )
+        return is_loaded[inverse]
+
+    def tick(self, delta_time: float) -> None:
+        """Advances all entities by a tick.
+
+        Args:
+            delta_time (float): The duration of the tick in seconds.
+        """
+        if self.count == 0:
+            return
+        self.previous_positions[:] = self.positions
+        self.previous_yaws[:] = self.yaws
+        is_active = self.get_active_mask()
+        self.integrate(delta_time, is_active)
+        # The entities are separated before they collide with the world, so that
+        # they are not pushed into solid blocks.
+        self.separate_overlapping()
+        if self.world is not None:
+            self.collide_with_world(is_active)
+
+    def integrate(self, delta_time: float, is_active: np.ndarray) -> None:
+        """Turns and accelerates the active entities and moves them along their
+        velocity, without collisions.
+        """
+        yaws, velocities = self.yaws, self.velocities
+        yaws += np.where(is_active, self.yaw_rates * delta_time, 0.0)
+        is_walking = is_active & (self.walk_speeds > 0)
+        velocities[is_walking, 0] = self.walk_speeds[is_walking] * np.cos(
+            yaws[is_walking]
+        )
+        velocities[is_walking, 2] = self.walk_speeds[is_walking] * np.sin(
+            yaws[is_walking]
+        )
+        is_sliding = is_active & ~is_walking & self.is_grounded
+        velocities[is_sliding, 0::2] *= max(
+            1.0 - self.ground_friction * delta_time, 0.0
+        )
+        velocities[is_active, 1] = np.maximum(
+            velocities[is_active, 1] - self.gravity * delta_time,
+            -self.terminal_speed,
+        )
+        self.positions[is_active] += velocities[is_active] * delta_time
+
+    def get_solid_mask(self, points: np.ndarray) -> np.ndarray:
+        """Returns whether the voxels containing points of shape `(n, 3)` are
+        solid.
+        """
+        return BLOCK_IS_SOLID[self.world.get_blocks_at(np.floor(points))]
+
+    def collide_with_world(self, is_active: np.ndarray) -> None:
+        """Moves the active entities out of the solid blocks they moved into since
+        the previous tick, and stops them along the axes they collided on. The
+        entities are assumed to move less than a block per tick.
+        """
+        positions, previous_positions = self.positions, self.previous_positions
+        velocities, half_extents = self.velocities, self.half_extents
+
+        # Vertical collisions, below the feet when falling and above the head when
+        # rising, from the previous horizontal position.
+        points = positions.copy()
+        points[:, 0::2] = previous_positions[:, 0::2]
+        is_falling = is_active & (velocities[:, 1] <= 0)
+        is_rising = is_active & ~is_falling
+        points[is_rising, 1] += 2 * half_extents[is_rising, 1]
+        is_hit = self.get_solid_mask(points)
+        is_landed = is_falling & is_hit
+        positions[is_landed, 1] = np.floor(points[is_landed, 1]) + 1.0
+        is_bumped = is_rising & is_hit
+        positions[is_bumped, 1] = (
+            np.floor(points[is_bumped, 1]) - 2 * half_extents[is_bumped, 1] - 1e-3
+        )
+        velocities[is_landed | is_bumped, 1] = 0.0
+        self.is_grounded[is_active] = is_landed[is_active]
+
+        # Horizontal collisions, at the middle of the height of the box in front
+        # of its leading face along each axis it moved along, which may differ
+        # from its velocity after it was pushed by other entities, sampled for
+        # both axes at once.
+        points = np.repeat(previous_positions[None], 2, axis=0)
+        is_blocked = np.zeros((2, len(positions)), dtype=bool)
+        for index, axis in enumerate((0, 2)):
+            points[index, :, 1] = positions[:, 1] + half_extents[:, 1]
+            points[index, :, axis] = (
+                positions[:, axis]
+                + np.sign(positions[:, axis] - previous_positions[:, axis])
+                * half_extents[:, axis]
+            )
+            is_blocked[index] = is_active & (
+                positions[:, axis] != previous_positions[:, axis]
+            )
+        is_blocked &= self.get_solid_mask(points.reshape(-1, 3)).reshape(2, -1)
+        for index, axis in enumerate((0, 2)):
+            positions[is_blocked[index], axis] = previous_positions[
+                is_blocked[index], axis
+            ]
+            velocities[is_blocked[index], axis] = 0.0
+        # Walking entities turn around at walls.
+        self.yaws[np.any(is_blocked, axis=0) & (self.walk_speeds > 0)] += np.pi
+
+    def separate_overlapping(self) -> int:
+        """Pushes apart the pairs of entities whose boxes overlap, half each along
+        the horizontal axis of the smallest overlap.
+
+        Returns:
+            int: The number of overlapping pairs.
+        """
+        # The coordinates are gathered per axis from contiguous copies, which is
+        # faster than gathering the rows of the arrays of the pairs.
+        positions = self.positions
+        half_extents = [self.half_extents[:, axis].copy() for axis in range(3)]
+        centers = [positions[:, axis].copy() for axis in range(3)]
+        centers[1] += half_extents[1]
+        self.spatial_hash.build(np.stack(centers, axis=1))
+        # The IDs of the points of the spatial hash, which stay valid when
+        # entities are removed before the next tick.
+        self.spatial_hash_ids = self.ids[: self.count].copy()
+        first, second = self.spatial_hash.find_neighbour_pairs()
+        overlaps = []
+        offsets = []
+        is_overlapping = np.ones(len(first), dtype=bool)
+        for axis in (1, 0, 2):
+            offsets.append(centers[axis][second] - centers[axis][first])
+            overlaps.append(
+                half_extents[axis][first]
+                + half_extents[axis][second]
+                - np.abs(offsets[-1])
+            )
+            is_overlapping &= overlaps[-1] > 0
+        first, second = first[is_overlapping], second[is_overlapping]
+        if len(first) == 0:
+            return 0
+
+        overlap_x, overlap_z = overlaps[1][is_overlapping], overlaps[2][is_overlapping]
+        is_along_x = overlap_x < overlap_z
+        for axis, overlap, offset, is_along_axis in (
+            (0, overlap_x, offsets[1][is_overlapping], is_along_x),
+            (2, overlap_z, offsets[2][is_overlapping], ~is_along_x),
+        ):
+            # Entities exactly on top of each other are pushed apart in a fixed
+            # direction.
+            pushes = np.where(is_along_axis, 0.5 * overlap, 0.0) * np.where(
+                offset < 0, -1.0, 1.0
+            )
+            positions[:, axis] += np.bincount(
+                second, pushes, minlength=self.count
+            ) - np.bincount(first, pushes, minlength=self.count)
+        return len(first)
+
+    def query_radius(self, point: np.ndarray, radius: float) -> np.ndarray:
+        """Returns the IDs of the entities whose box center was within a distance
+        of a point when the entities were separated in the last tick. The radius
+        may exceed the cell size of the spatial hash.
+        """
+        return self.spatial_hash_ids[self.spatial_hash.query_radius(point, radius)]
+
+    def get_instances(self, alpha: float = 1.0) -> np.ndarray:
+        """Returns the instances of a unit cube drawing the boxes of all entities
+        with an `InstancedMesh`, built in bulk.
+
+        Args:
+            alpha (float): The fraction of a tick elapsed since the last tick, by
+                which the positions and yaws are interpolated from the previous
+                tick to the last one.
+
+        Returns:
+            np.ndarray: An array of `INSTANCE_DTYPE` with one instance per entity.
+        """
+        instances = np.empty(self.count, dtype=INSTANCE_DTYPE)
+        positions = self.previous_positions + alpha * (
+            self.positions - self.previous_positions
+        )
+        positions[:, 1] += self.half_extents[:, 1]
+        instances["position"] = positions
+        instances["scale"] = 2 * self.half_extents
+        # Rotations around the `y` axis, with the yaw measured from `x` towards
+        # `z` like the yaw of the camera.
+        half_yaws = -0.5 * (
+            self.previous_yaws + alpha * (self.yaws - self.previous_yaws)
+        )
+        rotations = np.zeros((self.count, 4), dtype=np.float32)
+        rotations[:, 1] = np.sin(half_yaws)
+        rotations[:, 3] = np.cos(half_yaws)
+        instances["rotation"] = rotations
+        instances["color"] = self.colors
+        return instances
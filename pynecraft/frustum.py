@@ -0,0 +1,72 @@
+import glm
+import numpy as np
+
+
+class Frustum:
+    """The view frustum of a camera, represented by its six clipping planes, used
+    to cull objects that lie entirely outside the camera's field of view.
+
+    Every plane is stored as `(a, b, c, d)` with a unit normal `(a, b, c)` pointing
+    into the frustum, so that a point `p` lies inside the frustum if
+    `a * p.x + b * p.y + c * p.z + d >= 0` holds for all six planes.
+
+    Args:
+        planes (np.ndarray): An array of shape `(6, 4)` holding the left, right,
+            bottom, top, near and far planes.
+    """
+
+    def __init__(self, planes: np.ndarray) -> None:
+        self.planes = np.asarray(planes, dtype="float64")
+
+    @classmethod
+    def from_matrix(cls, view_projection_matrix: glm.mat4) -> "Frustum":
+        """Extracts the clipping planes from a combined projection and view matrix,
+        using the method of Gribb and Hartmann.
+
+        Args:
+            view_projection_matrix (glm.mat4): The product of the projection matrix
+                and the view matrix.
+
+        Returns:
+            Frustum: The view frustum.
+        """
+        # glm matrices are column-major, so transposing the nested list of columns
+        # gives the rows of the matrix.
+        rows = np.array(view_projection_matrix.to_list(), dtype="float64").T
+        planes = np.stack(
+            [
+                rows[3] + rows[0],
+                rows[3] - rows[0],
+                rows[3] + rows[1],
+                rows[3] - rows[1],
+                rows[3] + rows[2],
+                rows[3] - rows[2],
+            ]
+        )
+        planes /= np.linalg.norm(planes[:, :3], axis=1, keepdims=True)
+        return cls(planes)
+
+    def intersects_aabbs(
+        self, bounds_min: np.ndarray, bounds_max: np.ndarray
+    ) -> np.ndarray:
+        """Tests a batch of axis-aligned bounding boxes against the frustum. The
+        test is conservative: boxes close to a corner of the frustum may be
+        reported as visible although they lie just outside of it.
+
+        Args:
+            bounds_min (np.ndarray): The lower corners of the boxes, of shape
+                `(n, 3)`.
+            bounds_max (np.ndarray): The upper corners of the boxes, of shape
+                `(n, 3)`.
+
+        Returns:
+            np.ndarray: A boolean array of shape `(n,)` which is `True` for every
+                box that intersects or lies inside the frustum.
+        """
+        centers = (bounds_min + bounds_max) * 0.5
+        extents = (bounds_max - bounds_min) * 0.5
+        normals, offsets = self.planes[:, :3], self.planes[:, 3]
+        # The signed distance of each box's corner that lies furthest along the
+        # normal of each plane, i.e., the box is outside if it is negative.
+        distances = centers @ normals.T + extents @ np.abs(normals).T + offsets
+        return np.all(distances >= 0, axis=1)
@@ -0,0 +1,176 @@
+from typing import List, NamedTuple, Optional
+
+import numpy as np
+
+from .parameters import GovernorParameters
+
+
+class GovernorDecision(NamedTuple):
+    """A change of the rendering quality made by a `FrameTimeGovernor`.
+
+    Args:
+        frame (int): The index of the frame after which the change was made.
+        frame_time (float): The rolling frame time in milliseconds that triggered
+            the change.
+        render_distance (int): The new render distance in chunks.
+        render_scale (float): The new scale of the internal render resolution
+            relative to the window resolution.
+        reason (str): Why the quality was changed.
+    """
+
+    frame: int
+    frame_time: float
+    render_distance: int
+    render_scale: float
+    reason: str
+
+    def format(self) -> str:
+        """Returns a human readable description of the decision."""
+        return (
+            f"frame {self.frame}: {self.reason} at {self.frame_time:.2f} ms, "
+            f"render distance {self.render_distance}, "
+            f"render scale {self.render_scale:.3f}"
+        )
+
+
+class FrameTimeGovernor:
+    """Holds a target frame time by adjusting the render distance, and with it the
+    radii of the rings of distant terrain, and optionally the resolution the
+    scene is rendered at.
+
+    The governor keeps the times of the most recent frames in a ring buffer and
+    compares a high percentile of them with the target, so that it reacts to
+    stutters rather than to the average. Hysteresis keeps it from oscillating:
+    the quality is only lowered when the frame time exceeds the target by an
+    upper threshold, only raised when it is below the target by a lower
+    threshold, and after every change the governor waits for the window to be
+    filled with frames rendered at the new quality before deciding again.
+
+    The quality is lowered by reducing the render distance first and then the
+    render scale, and raised in the reverse order, so that the resolution is
+    only reduced once the render distance cannot be. Every change is recorded in
+    `decisions`.
+
+    Args:
+        governor_parameters (GovernorParameters): The parameters of the governor.
+        render_distance (int): The initial render distance in chunks, which is
+            also the largest one unless the parameters set another.
+    """
+
+    def __init__(
+        self, governor_parameters: GovernorParameters, render_distance: int
+    ) -> None:
+        self.parameters = governor_parameters
+        self.min_render_distance = min(
+            governor_parameters.min_render_distance, render_distance
+        )
+        self.max_render_distance = (
+            governor_parameters.max_render_distance
+            if governor_parameters.max_render_distance is not None
+            else render_distance
+        )
+        self.min_render_scale = (
+            governor_parameters.min_render_scale
+            if governor_parameters.use_render_scale
+            else 1.0
+        )
+        self.render_distance = render_distance
+        self.render_scale = 1.0
+
+        self.frame_times = np.zeros(governor_parameters.window_size)
+        self.frame_time_count = 0
+        self.frame = 0
+        self.decisions: List[GovernorDecision] = []
+
+    @property
+    def rolling_frame_time(self) -> float:
+        """The percentile of the frame times in the window compared with the
+        target, in milliseconds.
+        """
+        count = min(self.frame_time_count, len(self.frame_times))
+        return float(
+            np.percentile(self.frame_times[:count], self.parameters.percentile)
+        )
+
+    def record(self, frame_time: float) -> Optional[GovernorDecision]:
+        """Records the time of a frame and changes the quality if the window of
+        frame times is full and misses the target.
+
+        Args:
+            frame_time (float): The time in milliseconds spent on the frame.
+
+        Returns:
+            Optional[GovernorDecision]: The change of the quality, or `None` if
+                it was kept.
+        """
+        self.frame_times[self.frame_time_count % len(self.frame_times)] = frame_time
+        self.frame_time_count += 1
+        self.frame += 1
+        if self.frame_time_count < len(self.frame_times):
+            return None
+
+        rolling_frame_time = self.rolling_frame_time
+        target = self.parameters.target_frame_time
+        if rolling_frame_time > target * self.parameters.upper_threshold:
+            decision = self.lower_quality(rolling_frame_time)
+        elif rolling_frame_time < target * self.parameters.lower_threshold:
+            decision = self.raise_quality(rolling_frame_time)
+        else:
+            decision = None
+        if decision is not None:
+            # The frames rendered at the previous quality no longer say anything
+            # about the new one.
+            self.frame_time_count = 0
+            self.decisions.append(decision)
+        return decision
+
+    def lower_quality(self, frame_time: float) -> Optional[GovernorDecision]:
+        """Lowers the render distance, or the render scale once the render
+        distance is at its minimum.
+        """
+        if self.render_distance > self.min_render_distance:
+            self.render_distance = max(
+                self.render_distance - self.parameters.render_distance_step,
+                self.min_render_distance,
+            )
+            reason = "over budget, lowered render distance"
+        elif self.render_scale > self.min_render_scale:
+            self.render_scale = max(
+                self.render_scale - self.parameters.render_scale_step,
+                self.min_render_scale,
+            )
+            reason = "over budget, lowered render scale"
+        else:
+            return None
+        return self.get_decision(frame_time, reason)
+
+    def raise_quality(self, frame_time: float) -> Optional[GovernorDecision]:
+        """Raises the render scale, or the render distance once the render scale
+        is back at full resolution.
+        """
+        if self.render_scale < 1.0:
+            self.render_scale = min(
+                self.render_scale + self.parameters.render_scale_step, 1.0
+            )
+            reason = "under budget, raised render scale"
+        elif self.render_distance < self.max_render_distance:
+            self.render_distance = min(
+                self.render_distance + self.parameters.render_distance_step,
+                self.max_render_distance,
+            )
+            reason = "under budget, raised render distance"
+        else:
+            return None
+        return self.get_decision(frame_time, reason)
+
+    def get_decision(self, frame_time: float, reason: str) -> GovernorDecision:
+        """Returns the decision of the current quality."""
+        return GovernorDecision(
+            self.frame, frame_time, self.render_distance, self.render_scale, reason
+        )
+
+    def format_decisions(self) -> str:
+        """Returns the log of all decisions, one per line."""
+        if not self.decisions:
+            return "no quality changes"
+        return "\n".join(decision.format() for decision in self.decisions)
@@ -0,0 +1,206 @@
+import os
+import time
+from typing import List, NamedTuple, Tuple
+
+import glm
+import moderngl
+import numpy as np
+import pygame
+
+from .engine import PyneCraftEngine
+from .parameters import EngineParameters, HeadlessParameters
+
+
+class HeadlessReport(NamedTuple):
+    """The measurements of a headless run, with one entry per measured frame.
+
+    Args:
+        frame_times (np.ndarray): The time in milliseconds spent updating and
+            rendering each frame, until the GPU finished drawing it.
+        draw_call_counts (np.ndarray): The number of draw calls of each frame.
+        triangle_counts (np.ndarray): The number of triangles drawn in each frame.
+        chunk_counts (np.ndarray): The number of chunks loaded in each frame.
+    """
+
+    frame_times: np.ndarray
+    draw_call_counts: np.ndarray
+    triangle_counts: np.ndarray
+    chunk_counts: np.ndarray
+
+    def get_frame_time_percentiles(
+        self, percentiles: Tuple[float, ...] = (50, 95, 99)
+    ) -> List[float]:
+        """Returns percentiles of the frame times in milliseconds."""
+        return list(np.percentile(self.frame_times, percentiles))
+
+    def format(self) -> str:
+        """Returns a human readable summary of the report."""
+        p50, p95, p99 = self.get_frame_time_percentiles()
+        return "\n".join(
+            [
+                f"frames:                 {len(self.frame_times)}",
+                f"frame time p50:         {p50:.2f} ms",
+                f"frame time p95:         {p95:.2f} ms",
+                f"frame time p99:         {p99:.2f} ms",
+                f"frame time max:         {self.frame_times.max():.2f} ms",
+                f"draw calls per frame:   {self.draw_call_counts.mean():.1f}",
+                f"triangles per frame:    {self.triangle_counts.mean():.0f}",
+                f"loaded chunks:          {self.chunk_counts.max()}",
+            ]
+        )
+
+
+class HeadlessEngine(PyneCraftEngine):
+    """A PyneCraft engine that renders into an offscreen framebuffer of a
+    standalone OpenGL context instead of a window, so that it runs on machines
+    without a display or a GPU, e.g., with Mesa's llvmpipe software renderer.
+
+    Instead of being controlled by the user, the camera follows a scripted path
+    for a fixed number of frames while the time of every frame is measured, which
+    gives reproducible rendering performance numbers.
+
+    Args:
+        engine_parameters (EngineParameters): The parameters of the PyneCraft.
+        headless_parameters (HeadlessParameters): The parameters of the headless
+            run.
+    """
+
+    def __init__(
+        self,
+        engine_parameters: EngineParameters,
+        headless_parameters: HeadlessParameters,
+    ) -> None:
+        assert (
+            len(headless_parameters.camera_path) > 0
+        ), "The camera path needs at least one keyframe."
+        self.headless_parameters = headless_parameters
+        super().__init__(engine_parameters=engine_parameters)
+
+    def create_opengl_context(self) -> moderngl.Context:
+        """Create a standalone OpenGL context and the offscreen framebuffer that is
+        rendered to.
+        """
+        backend = self.headless_parameters.context_backend
+        opengl_context = moderngl.create_standalone_context(
+            require=330, **({"backend": backend} if backend is not None else {})
+        )
+        resolution = tuple(int(extent) for extent in self.window_resolution)
+        self.framebuffer = opengl_context.framebuffer(
+            color_attachments=[opengl_context.renderbuffer(resolution)],
+            depth_attachment=opengl_context.depth_renderbuffer(resolution),
+        )
+        self.framebuffer.use()
+        return opengl_context
+
+    def get_camera_pose(self, frame: int) -> Tuple[glm.vec3, float, float]:
+        """Returns the position, yaw and pitch in degrees of the camera at a
+        measured frame, interpolated linearly between the keyframes of the path.
+        """
+        keyframes = np.asarray(self.headless_parameters.camera_path, dtype=float)
+        progress = frame / max(self.headless_parameters.frame_count - 1, 1)
+        segment = progress * (len(keyframes) - 1)
+        index = min(int(segment), len(keyframes) - 2) if len(keyframes) > 1 else 0
+        fraction = segment - index
+        pose = keyframes[index]
+        if len(keyframes) > 1:
+            pose = (1 - fraction) * pose + fraction * keyframes[index + 1]
+        return glm.vec3(*pose[:3]), float(pose[3]), float(pose[4])
+
+    def move_camera(self, frame: int) -> None:
+        """Move the camera of the player to its pose at a measured frame."""
+        position, yaw, pitch = self.get_camera_pose(frame)
+        self.player.position = position
+        self.player.yaw = glm.radians(yaw)
+        self.player.pitch = glm.radians(pitch)
+        self.player.update_vectors()
+        self.player.update_view_matrix()
+
+    def load_chunks_in_range(self) -> None:
+        """Block until all the chunks in range of the camera are loaded."""
+        self.chunk_streamer.update(self.player.position)
+        while self.chunk_streamer.is_loading:
+            self.chunk_streamer.upload(float("inf"))
+            self.chunk_streamer.wait()
+
+    def update(self) -> None:
+        """Update the game state without user input. The entities advance by one
+        tick per frame, so that the measured frames are deterministic.
+        """
+        profiler = self.profiler
+        with profiler.section("entities.tick"):
+            self.entity_store.tick(self.scheduler.tick_duration)
+        with profiler.section("chunk_streamer.update"):
+            self.chunk_streamer.update(self.player.position)
+        with profiler.section("chunk_streamer.upload"):
+            self.chunk_streamer.upload(self.chunk_upload_time_budget)
+        with profiler.section("chunk_streamer.remesh"):
+            self.chunk_streamer.remesh_dirty_chunks()
+        with profiler.section("shader_program.update"):
+            self.shader_program.update()
+        with profiler.section("scene.update"):
+            self.scene.update()
+
+    def render(self) -> None:
+        """Render the game state to the offscreen framebuffer and wait for the GPU
+        to finish drawing it.
+        """
+        self.render_scene(self.framebuffer)
+        with self.profiler.section("finish"):
+            self.opengl_context.finish()
+
+    def save_frame(self, frame: int) -> None:
+        """Save the content of the offscreen framebuffer as a PNG image."""
+        resolution = self.framebuffer.size
+        surface = pygame.image.frombuffer(
+            self.framebuffer.read(components=3), resolution, "RGB"
+        )
+        path = os.path.join(
+            self.headless_parameters.output_directory, f"frame_{frame:05d}.png"
+        )
+        # OpenGL stores the rows of the framebuffer from the bottom up.
+        pygame.image.save(pygame.transform.flip(surface, False, True), path)
+
+    def run(self) -> HeadlessReport:
+        """Render the warmup and measured frames along the camera path and return
+        the measurements of the measured frames.
+        """
+        parameters = self.headless_parameters
+        if parameters.output_directory is not None:
+            os.makedirs(parameters.output_directory, exist_ok=True)
+
+        frame_count = parameters.frame_count
+        frame_times = np.zeros(frame_count)
+        draw_call_counts = np.zeros(frame_count, dtype=np.int64)
+        triangle_counts = np.zeros(frame_count, dtype=np.int64)
+        chunk_counts = np.zeros(frame_count, dtype=np.int64)
+        try:
+            for frame in range(-parameters.warmup_frame_count, frame_count):
+                self.move_camera(max(frame, 0))
+                if parameters.wait_for_chunks:
+                    self.load_chunks_in_range()
+                if frame == 0:
+                    self.profiler.clear()
+                start_time = time.perf_counter()
+                with self.profiler.section("frame"):
+                    with self.profiler.section("update"):
+                        self.update()
+                    with self.profiler.section("render"):
+                        self.render()
+                self.record_counters()
+                if frame < 0:
+                    continue
+                frame_times[frame] = 1e3 * (time.perf_counter() - start_time)
+                self.govern(frame_times[frame])
+                draw_call_counts[frame] = self.scene.draw_call_count
+                triangle_counts[frame] = self.scene.triangle_count
+                chunk_counts[frame] = len(self.world)
+                if (
+                    parameters.output_directory is not None
+                    and frame % parameters.output_interval == 0
+                ):
+                    self.save_frame(frame)
+        finally:
+            self.shutdown()
+        return HeadlessReport(
+            frame_times, draw_call_counts, triangle_counts, chunk_counts
+        )
@@ -0,0 +1,816 @@
+import heapq
+import itertools
+import os
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import get_context
+from multiprocessing.shared_memory import SharedMemory
+from typing import Callable, Dict, Hashable, List, NamedTuple, Optional, Set, Tuple
+
+import numpy as np
+
+from .lod import LodTile
+from .mesh.meshing import build_packed_vertex_data, build_vertex_data, greedy_mesh
+from .occlusion import FULL_CONNECTIVITY, get_face_connectivity
+from .world.lighting import compute_light
+from .world.region import RegionStorage
+
+ChunkPosition = Tuple[int, int, int]
+
+# The number of times a failed job of the same chunk or tile is resubmitted before
+# it is given up on.
+MAX_JOB_RETRIES = 3
+
+
+class ChunkJobResult(NamedTuple):
+    """The result of generating and meshing a chunk in a worker process. The block
+    IDs, the light and the vertex data are not part of the result itself but are
+    written back to back into a shared memory block, so that they do not need to
+    be pickled and copied between processes.
+
+    Args:
+        chunk_position (ChunkPosition): The position of the chunk.
+        shared_memory_name (Optional[str]): The name of the shared memory block, or
+            `None` if the chunk consists entirely of air.
+        block_shape (Tuple[int, int, int]): The shape of the block IDs.
+        block_dtype (str): The data type of the block IDs.
+        vertex_dtype (str): The data type of the vertex data.
+        vertex_shape (Tuple[int, int]): The shape of the vertex data.
+        is_from_storage (bool): Whether the chunk was loaded from disk rather than
+            generated.
+        version (int): The version of a remeshed chunk, which tells apart the
+            results of successive remeshes of the same chunk. Results of chunks
+            that were generated or loaded carry no block IDs to remesh and have a
+            version of `0`.
+        lod_level (int): The level of detail of a distant tile, whose position is
+            given by `chunk_position` in tile coordinates. Chunks have a level of
+            `0`.
+        connectivity (int): The mask of the pairs of faces of the chunk connected
+            through see-through voxels, used for occlusion culling.
+        has_light (bool): Whether the packed light of the chunk, of the same shape
+            as its block IDs, follows the block IDs in the shared memory block.
+    """
+
+    chunk_position: ChunkPosition
+    shared_memory_name: Optional[str]
+    block_shape: Tuple[int, int, int]
+    block_dtype: str
+    vertex_dtype: str
+    vertex_shape: Tuple[int, int]
+    is_from_storage: bool
+    version: int = 0
+    lod_level: int = 0
+    connectivity: int = FULL_CONNECTIVITY
+    has_light: bool = False
+
+
+# The state of a worker process, which is set once by `_initialize_worker` rather
+# than being pickled along with every job.
+_worker_state = {}
+
+
+def _initialize_worker(
+    generator,
+    chunk_size: int,
+    block_dtype: str,
+    vertex_format: str,
+    storage_directory: Optional[str],
+    light_margin: Optional[int],
+    block_layers: Optional[np.ndarray],
+) -> None:
+    _worker_state.update(
+        generator=generator,
+        chunk_size=chunk_size,
+        block_dtype=block_dtype,
+        vertex_format=vertex_format,
+        light_margin=light_margin,
+        block_layers=block_layers,
+        storage=(
+            RegionStorage(storage_directory, chunk_size, writable=False)
+            if storage_directory is not None
+            else None
+        ),
+    )
+
+
+def _get_padded_blocks(
+    chunk_position: ChunkPosition, padding: int = 1
+) -> Tuple[np.ndarray, bool]:
+    """Returns the blocks of a chunk along with a border of `padding` voxels, and
+    whether the chunk was loaded from disk. Saved chunks take precedence over
+    generated ones, both for the chunk and its border, and only the smallest box
+    covering the parts of the region that were not saved is generated, so that an
+    area saved to disk is loaded without generating it again.
+    """
+    size = _worker_state["chunk_size"]
+    block_dtype = _worker_state["block_dtype"]
+    generator = _worker_state["generator"]
+    region_start = np.asarray(chunk_position) * size - padding
+    region_size = size + 2 * padding
+    storage = _worker_state["storage"]
+    if storage is None:
+        padded_blocks = generator.generate_region(region_start, (region_size,) * 3)
+        return padded_blocks.astype(block_dtype, copy=False), False
+
+    padded_blocks = np.empty((region_size,) * 3, dtype=block_dtype)
+    saved_parts = []
+    is_from_storage = False
+    lower, upper = np.full(3, region_size), np.zeros(3, dtype=np.int64)
+    reach = -(-padding // size)
+    for offset in itertools.product(range(-reach, reach + 1), repeat=3):
+        # The overlap of the neighbour with the padded region, in the coordinates
+        # of the padded region.
+        starts = np.maximum(padding + np.asarray(offset) * size, 0)
+        ends = np.minimum(padding + (np.asarray(offset) + 1) * size, region_size)
+        if np.any(ends <= starts):
+            continue
+        neighbour_position = tuple(a + b for a, b in zip(chunk_position, offset))
+        neighbour_blocks = storage.load_chunk(neighbour_position)
+        if neighbour_blocks is None:
+            lower, upper = np.minimum(lower, starts), np.maximum(upper, ends)
+            continue
+        padded_slices = tuple(map(slice, starts, ends))
+        neighbour_slices = tuple(
+            slice(
+                start - padding - axis_offset * size, end - padding - axis_offset * size
+            )
+            for start, end, axis_offset in zip(starts, ends, offset)
+        )
+        saved_parts.append((padded_slices, neighbour_blocks[neighbour_slices]))
+        is_from_storage |= offset == (0, 0, 0)
+
+    if np.all(upper > lower):
+        padded_blocks[tuple(map(slice, lower, upper))] = generator.generate_region(
+            region_start + lower, tuple(upper - lower)
+        )
+    for padded_slices, blocks in saved_parts:
+        padded_blocks[padded_slices] = blocks
+    return padded_blocks, is_from_storage
+
+
+def _get_light(region_blocks: np.ndarray, region_origin: np.ndarray) -> np.ndarray:
+    """Computes the light of a region of blocks, lit from above by the sky in the
+    columns that the terrain generator leaves open to the sky above the region.
+    """
+    size_x, size_y, size_z = region_blocks.shape
+    column_x, column_z = np.meshgrid(
+        np.arange(size_x) + region_origin[0],
+        np.arange(size_z) + region_origin[2],
+        indexing="ij",
+    )
+    sky_heights = _worker_state["generator"].get_sky_heights(column_x, column_z)
+    return compute_light(region_blocks, sky_heights <= region_origin[1] + size_y)
+
+
+def _generate_and_mesh_chunk(chunk_position: ChunkPosition) -> ChunkJobResult:
+    """Generates or loads the blocks of a chunk along with a border, computes its
+    light, meshes it and writes the results into a new shared memory block. Runs
+    in a worker process.
+
+    The light is computed over a margin of blocks around the chunk, so that the
+    light coming from its neighbours is included, while the edits to chunks above
+    the margin are not known and the sky light comes from the terrain generator.
+    """
+    size = _worker_state["chunk_size"]
+    block_dtype = _worker_state["block_dtype"]
+    light_margin = _worker_state["light_margin"]
+    origin = np.asarray(chunk_position) * size
+    padding = 1 if light_margin is None else max(light_margin, 1)
+    region_blocks, is_from_storage = _get_padded_blocks(chunk_position, padding)
+    inner = slice(padding, padding + size)
+    blocks = region_blocks[inner, inner, inner]
+    if not blocks.any():
+        return ChunkJobResult(
+            chunk_position,
+            None,
+            blocks.shape,
+            block_dtype,
+            "float32",
+            (0, 0),
+            is_from_storage,
+        )
+
+    border = slice(padding - 1, padding + size + 1)
+    padded_blocks = region_blocks[border, border, border]
+    light = padded_light = None
+    if light_margin is not None:
+        region_light = _get_light(region_blocks, origin - padding)
+        padded_light = region_light[border, border, border]
+        light = region_light[inner, inner, inner]
+    vertex_data = _mesh_padded_blocks(padded_blocks, origin, padded_light=padded_light)
+    return _share_result(
+        chunk_position,
+        blocks,
+        vertex_data,
+        is_from_storage,
+        connectivity=get_face_connectivity(blocks),
+        light=light,
+    )
+
+
+def _mesh_chunk(
+    chunk_position: ChunkPosition,
+    padded_blocks: np.ndarray,
+    version: int,
+    padded_light: Optional[np.ndarray] = None,
+) -> ChunkJobResult:
+    """Meshes the blocks of an edited chunk along with a one voxel border, and
+    writes the vertex data into a new shared memory block. Runs in a worker
+    process.
+    """
+    origin = np.asarray(chunk_position) * _worker_state["chunk_size"]
+    vertex_data = _mesh_padded_blocks(padded_blocks, origin, padded_light=padded_light)
+    connectivity = get_face_connectivity(padded_blocks[1:-1, 1:-1, 1:-1])
+    blocks = np.zeros((0, 0, 0), dtype=padded_blocks.dtype)
+    return _share_result(
+        chunk_position, blocks, vertex_data, False, version, connectivity=connectivity
+    )
+
+
+def _generate_and_mesh_tile(tile: LodTile) -> ChunkJobResult:
+    """Generates the downsampled blocks of a distant tile along with a one voxel
+    border, meshes them and writes the vertex data into a new shared memory block.
+    Runs in a worker process.
+
+    The horizontal border is meshed as if it were air, so that the mesh is closed
+    by walls, or skirts, along its four sides. They fill the cracks that would
+    open between neighbouring tiles of different levels of detail, whose surfaces
+    are at slightly different heights, and are otherwise hidden by the terrain.
+    """
+    size = _worker_state["chunk_size"]
+    origin = np.asarray(tile.position) * size * tile.scale
+    padded_blocks = _worker_state["generator"].generate_region(
+        origin - tile.scale, (size + 2,) * 3, step=tile.scale
+    )
+    padded_blocks = padded_blocks.astype(_worker_state["block_dtype"], copy=False)
+    padded_blocks[[0, -1], :, :] = 0
+    padded_blocks[:, :, [0, -1]] = 0
+    blocks = np.zeros((0, 0, 0), dtype=padded_blocks.dtype)
+    if not padded_blocks.any():
+        vertex_data = np.zeros((0, 0), dtype="float32")
+    else:
+        vertex_data = _mesh_padded_blocks(padded_blocks, origin, tile.scale)
+    return _share_result(
+        tile.position, blocks, vertex_data, False, lod_level=tile.level
+    )
+
+
+def _mesh_padded_blocks(
+    padded_blocks: np.ndarray,
+    origin: np.ndarray,
+    scale: int = 1,
+    padded_light: Optional[np.ndarray] = None,
+) -> np.ndarray:
+    """Returns the vertex data of the blocks of a chunk with a one voxel border, in
+    the vertex format of the worker. The corners of the faces are shaded by
+    ambient occlusion when the worker computes light.
+    """
+    quads = greedy_mesh(
+        padded_blocks,
+        padded_light=padded_light,
+        ambient_occlusion=_worker_state["light_margin"] is not None,
+    )
+    if _worker_state["vertex_format"] == "packed":
+        return build_packed_vertex_data(quads, _worker_state["block_layers"])
+    return build_vertex_data(quads, origin=origin, scale=scale)
+
+
+def _share_result(
+    chunk_position: ChunkPosition,
+    blocks: np.ndarray,
+    vertex_data: np.ndarray,
+    is_from_storage: bool,
+    version: int = 0,
+    lod_level: int = 0,
+    connectivity: int = FULL_CONNECTIVITY,
+    light: Optional[np.ndarray] = None,
+) -> ChunkJobResult:
+    """Writes block IDs, light and vertex data back to back into a new shared
+    memory block and returns the result describing them.
+    """
+    has_light = light is not None
+    light_nbytes = light.nbytes if has_light else 0
+    size = blocks.nbytes + light_nbytes + vertex_data.nbytes
+    if size == 0:
+        return ChunkJobResult(
+            chunk_position,
+            None,
+            blocks.shape,
+            blocks.dtype.str,
+            vertex_data.dtype.str,
+            vertex_data.shape,
+            is_from_storage,
+            version,
+            lod_level,
+            connectivity,
+        )
+    shared_memory = SharedMemory(create=True, size=size)
+    np.ndarray(blocks.shape, blocks.dtype, shared_memory.buf)[...] = blocks
+    if has_light:
+        np.ndarray(light.shape, light.dtype, shared_memory.buf, offset=blocks.nbytes)[
+            ...
+        ] = light
+    np.ndarray(
+        vertex_data.shape,
+        vertex_data.dtype,
+        shared_memory.buf,
+        offset=blocks.nbytes + light_nbytes,
+    )[...] = vertex_data
+    shared_memory.close()
+    return ChunkJobResult(
+        chunk_position,
+        shared_memory.name,
+        blocks.shape,
+        blocks.dtype.str,
+        vertex_data.dtype.str,
+        vertex_data.shape,
+        is_from_storage,
+        version,
+        lod_level,
+        connectivity,
+        has_light,
+    )
+
+
+class ChunkJobSystem:
+    """Generates or loads and meshes chunks in a pool of worker processes so that
+    the main loop never stalls on terrain generation, decompression or meshing.
+
+    Requested chunks are submitted to the pool nearest to the focus (usually the
+    chunk of the player) first, with only a few jobs in flight per worker, so that
+    chunks requested earlier further away never delay nearby ones once the player
+    moves. Finished chunks are queued by their distance to the focus as well and
+    handed to the main thread by `drain` until its per-frame time budget runs out.
+
+    Chunks whose blocks were edited are remeshed by the same pool through `remesh`.
+    These jobs skip the queue, since they are few and the player is waiting for
+    them, and are handed to the main thread by `drain_meshes`.
+
+    Distant tiles rendered at a reduced level of detail are requested with
+    `request_tile`. They only take the slots left free by the chunks, so that the
+    terrain around the player always comes first, and are handed to the main
+    thread by `drain_tiles`.
+
+    A job that fails is reported and resubmitted up to `MAX_JOB_RETRIES` times in
+    a row, so that a failing worker never crashes the main loop. If a worker
+    process dies, the pool is replaced by a new one.
+
+    Args:
+        generator: The terrain generator, which must be picklable and provide a
+            `generate_region(origin, shape)` method.
+        chunk_size (int): The number of voxels along each edge of a chunk.
+        block_dtype (str): The data type used to store the block IDs.
+        vertex_format (str): The vertex format of the chunk meshes, either
+            `"float"` or `"packed"`.
+        num_workers (Optional[int]): The number of worker processes. Defaults to
+            the number of CPU cores.
+        storage_directory (Optional[str]): The directory of the region files that
+            saved chunks are loaded from instead of being generated.
+        light_margin (Optional[int]): The number of voxels around a chunk whose
+            blocks are generated to compute the light of the chunk, in which case
+            the generator must also provide a `get_sky_heights(x, z)` method. The
+            chunks are not lit if it is `None`.
+        block_layers (Optional[np.ndarray]): The texture layer of every block ID,
+            which is written into packed vertices.
+    """
+
+    def __init__(
+        self,
+        generator,
+        chunk_size: int,
+        block_dtype: str,
+        vertex_format: str,
+        num_workers: Optional[int] = None,
+        storage_directory: Optional[str] = None,
+        light_margin: Optional[int] = None,
+        block_layers: Optional[np.ndarray] = None,
+    ) -> None:
+        self.num_workers = num_workers or os.cpu_count() or 1
+        self.worker_arguments = (
+            generator,
+            chunk_size,
+            block_dtype,
+            vertex_format,
+            storage_directory,
+            light_margin,
+            block_layers,
+        )
+        self.executor = self.create_executor()
+        self.max_jobs_in_flight = 2 * self.num_workers
+        # The number of times in a row the job of every chunk or tile failed.
+        self.failure_counts: Dict[Hashable, int] = {}
+
+        self.focus: ChunkPosition = (0, 0, 0)
+        self.requested: Set[ChunkPosition] = set()
+        self.in_flight: Dict[ChunkPosition, Future] = {}
+        # Finished jobs are appended by the executor's thread, along with their key
+        # and the executor they ran in, and moved into the priority queue
+        # `completed` on the main thread.
+        self.finished: deque = deque()
+        self.completed: List[Tuple[int, int, ChunkJobResult]] = []
+        # The positions of the chunks in `completed`, which are not requested
+        # again until they are drained.
+        self.pending: Set[ChunkPosition] = set()
+        self._sequence = 0
+
+        # The latest version of every chunk with a remesh in flight, so that the
+        # results of older remeshes that finish late are dropped.
+        self.mesh_versions: Dict[ChunkPosition, int] = {}
+        self.mesh_jobs: Dict[Tuple[ChunkPosition, int], Future] = {}
+        # The padded blocks and light of every remesh in flight, which are
+        # submitted again if the remesh fails.
+        self.mesh_arguments: Dict[
+            Tuple[ChunkPosition, int], Tuple[np.ndarray, Optional[np.ndarray]]
+        ] = {}
+        self.finished_meshes: deque = deque()
+        self._mesh_version = 0
+
+        self.requested_tiles: Set[LodTile] = set()
+        self.tiles_in_flight: Dict[LodTile, Future] = {}
+        self.finished_tiles: deque = deque()
+
+    def create_executor(self) -> ProcessPoolExecutor:
+        """Returns a new pool of worker processes."""
+        # Worker processes are spawned rather than forked, since forking a process
+        # that owns an OpenGL context and SDL threads is not safe.
+        return ProcessPoolExecutor(
+            max_workers=self.num_workers,
+            mp_context=get_context("spawn"),
+            initializer=_initialize_worker,
+            initargs=self.worker_arguments,
+        )
+
+    def submit(self, finished: deque, key: Hashable, function, *args) -> Future:
+        """Submits a job to the worker pool, replacing the pool first if it broke,
+        and appends the key, the executor and the future of the job to `finished`
+        once it is done.
+        """
+        try:
+            future = self.executor.submit(function, *args)
+        except BrokenProcessPool:
+            self.executor.shutdown(wait=False)
+            self.executor = self.create_executor()
+            future = self.executor.submit(function, *args)
+        executor = self.executor
+        future.add_done_callback(
+            lambda future: finished.append((key, executor, future))
+        )
+        return future
+
+    def pop_finished(
+        self, finished: deque
+    ) -> Tuple[Hashable, Optional[ChunkJobResult], bool]:
+        """Pops a finished job from the front of a queue.
+
+        Returns:
+            Tuple[Hashable, Optional[ChunkJobResult], bool]: The key of the job, its
+                result or `None` if it failed, and whether a failed job should be
+                resubmitted.
+        """
+        key, executor, future = finished.popleft()
+        error = future.exception()
+        if error is None:
+            self.failure_counts.pop(key, None)
+            return key, future.result(), False
+        failure_count = self.failure_counts.get(key, 0) + 1
+        self.failure_counts[key] = failure_count
+        should_retry = failure_count <= MAX_JOB_RETRIES
+        print(
+            f"Job of {key} failed with {error!r}, "
+            + ("resubmitting it." if should_retry else "giving up on it.")
+        )
+        if not should_retry:
+            del self.failure_counts[key]
+        if isinstance(error, BrokenProcessPool) and executor is self.executor:
+            self.executor.shutdown(wait=False)
+            self.executor = self.create_executor()
+        return key, None, should_retry
+
+    def __len__(self) -> int:
+        """The number of chunks and tiles requested but not yet drained."""
+        return (
+            len(self.requested)
+            + len(self.in_flight)
+            + len(self.completed)
+            + len(self.requested_tiles)
+            + len(self.tiles_in_flight)
+        )
+
+    def get_priority(self, chunk_position: ChunkPosition) -> int:
+        """Returns the priority of a chunk, which is its squared distance in chunks
+        to the focus. Lower values are processed first.
+        """
+        return sum((a - b) ** 2 for a, b in zip(chunk_position, self.focus))
+
+    def set_focus(self, chunk_position: ChunkPosition) -> None:
+        """Sets the chunk around which chunks are prioritized."""
+        if chunk_position == self.focus:
+            return
+        self.focus = chunk_position
+        self.completed = [
+            (self.get_priority(result.chunk_position), sequence, result)
+            for _, sequence, result in self.completed
+        ]
+        heapq.heapify(self.completed)
+
+    def request(self, chunk_position: ChunkPosition) -> None:
+        """Requests a chunk to be generated and meshed, unless it is already being
+        generated or waiting to be drained.
+        """
+        if chunk_position not in self.in_flight and chunk_position not in self.pending:
+            self.requested.add(chunk_position)
+
+    def cancel(self, chunk_position: ChunkPosition) -> None:
+        """Cancels the request of a chunk if it has not been submitted yet."""
+        self.requested.discard(chunk_position)
+
+    def get_tile_priority(self, tile: LodTile) -> float:
+        """Returns the priority of a tile, which is the squared distance in chunks
+        from its center to the focus. Lower values are processed first.
+        """
+        return sum(
+            ((a + 0.5) * tile.scale - b - 0.5) ** 2
+            for a, b in zip(tile.position, self.focus)
+        )
+
+    def request_tile(self, tile: LodTile) -> None:
+        """Requests a distant tile to be generated and meshed."""
+        if tile not in self.tiles_in_flight:
+            self.requested_tiles.add(tile)
+
+    def cancel_tile(self, tile: LodTile) -> None:
+        """Cancels the request of a tile if it has not been submitted yet."""
+        self.requested_tiles.discard(tile)
+
+    def pump(self) -> None:
+        """Submits the requested chunks nearest to the focus to the worker pool,
+        keeping a bounded number of jobs in flight.
+        """
+        free_slots = (
+            self.max_jobs_in_flight - len(self.in_flight) - len(self.tiles_in_flight)
+        )
+        if free_slots <= 0:
+            return
+        for chunk_position in heapq.nsmallest(
+            free_slots, self.requested, key=self.get_priority
+        ):
+            self.requested.remove(chunk_position)
+            self.in_flight[chunk_position] = self.submit(
+                self.finished, chunk_position, _generate_and_mesh_chunk, chunk_position
+            )
+            free_slots -= 1
+        if free_slots <= 0 or not self.requested_tiles:
+            return
+        for tile in heapq.nsmallest(
+            free_slots, self.requested_tiles, key=self.get_tile_priority
+        ):
+            self.requested_tiles.remove(tile)
+            self.tiles_in_flight[tile] = self.submit(
+                self.finished_tiles, tile, _generate_and_mesh_tile, tile
+            )
+
+    def collect(self) -> None:
+        """Moves the jobs finished by the worker pool into the priority queue."""
+        while self.finished:
+            chunk_position, result, should_retry = self.pop_finished(self.finished)
+            del self.in_flight[chunk_position]
+            if result is None:
+                if should_retry:
+                    self.request(chunk_position)
+                continue
+            self._sequence += 1
+            heapq.heappush(
+                self.completed,
+                (self.get_priority(result.chunk_position), self._sequence, result),
+            )
+            self.pending.add(result.chunk_position)
+
+    def wait(self, timeout: Optional[float] = None) -> None:
+        """Blocks until at least one job in flight finishes or the timeout in
+        seconds expires, submitting the requested chunks first.
+        """
+        self.pump()
+        futures = [*self.in_flight.values(), *self.tiles_in_flight.values()]
+        if futures:
+            wait(futures, timeout, FIRST_COMPLETED)
+
+    def remesh(
+        self,
+        chunk_position: ChunkPosition,
+        padded_blocks: np.ndarray,
+        padded_light: Optional[np.ndarray] = None,
+    ) -> None:
+        """Submits an edited chunk to be remeshed from its blocks and light along
+        with a one voxel border, superseding any remesh of the chunk still in
+        flight.
+        """
+        self._mesh_version += 1
+        version = self._mesh_version
+        self.mesh_versions[chunk_position] = version
+        self.mesh_jobs[chunk_position, version] = self.submit(
+            self.finished_meshes,
+            (chunk_position, version),
+            _mesh_chunk,
+            chunk_position,
+            padded_blocks,
+            version,
+            padded_light,
+        )
+        self.mesh_arguments[chunk_position, version] = (padded_blocks, padded_light)
+
+    @property
+    def pending_mesh_count(self) -> int:
+        """The number of remeshes submitted but not yet drained."""
+        return len(self.mesh_jobs)
+
+    def drain_meshes(
+        self, handler: Callable[[ChunkPosition, np.ndarray, int], None]
+    ) -> int:
+        """Hands the vertex data of every finished remesh to the main thread, and
+        drops the results that were superseded by a later remesh.
+
+        Args:
+            handler (Callable[[ChunkPosition, np.ndarray, int], None]): Called with
+                the position, the vertex data and the connectivity mask of every
+                remeshed chunk. The vertex data is a view of shared memory that is
+                released once the handler returns.
+
+        Returns:
+            int: The number of chunks handed over.
+        """
+
+        def handle_vertex_data(
+            chunk_position, blocks, vertex_data, is_from_storage, connectivity, light
+        ):
+            handler(chunk_position, vertex_data, connectivity)
+
+        count = 0
+        while self.finished_meshes:
+            key, result, should_retry = self.pop_finished(self.finished_meshes)
+            position, version = key
+            del self.mesh_jobs[key]
+            arguments = self.mesh_arguments.pop(key)
+            is_latest = self.mesh_versions.get(position) == version
+            if result is None:
+                if is_latest:
+                    del self.mesh_versions[position]
+                    if should_retry:
+                        self.remesh(position, *arguments)
+                continue
+            if not is_latest:
+                self._handle_result(result, None)
+                continue
+            del self.mesh_versions[position]
+            self._handle_result(result, handle_vertex_data)
+            count += 1
+        return count
+
+    def drain_tiles(
+        self, handler: Callable[[LodTile, np.ndarray], None], time_budget: float
+    ) -> int:
+        """Hands finished tiles to the main thread until the time budget in
+        milliseconds is spent, handing over at least one tile when available.
+
+        Args:
+            handler (Callable[[LodTile, np.ndarray], None]): Called with every tile
+                and its vertex data, which is a view of shared memory that is
+                released once the handler returns.
+            time_budget (float): The time budget in milliseconds.
+
+        Returns:
+            int: The number of tiles handed over.
+        """
+
+        def handle_vertex_data(
+            tile_position, blocks, vertex_data, is_from_storage, connectivity, light
+        ):
+            handler(LodTile(result.lod_level, tile_position), vertex_data)
+
+        deadline = time.perf_counter() + time_budget * 1e-3
+        count = 0
+        while self.finished_tiles and (count == 0 or time.perf_counter() < deadline):
+            tile, result, should_retry = self.pop_finished(self.finished_tiles)
+            del self.tiles_in_flight[tile]
+            if result is None:
+                if should_retry:
+                    self.request_tile(tile)
+                continue
+            self._handle_result(result, handle_vertex_data)
+            count += 1
+        return count
+
+    def drain(
+        self,
+        handler: Callable[
+            [
+                ChunkPosition,
+                Optional[np.ndarray],
+                np.ndarray,
+                bool,
+                int,
+                Optional[np.ndarray],
+            ],
+            None,
+        ],
+        time_budget: float,
+    ) -> int:
+        """Hands finished chunks to the main thread, nearest to the focus first,
+        until the time budget is spent. At least one chunk is handed over per call
+        when available, so that progress is made with any budget.
+
+        Args:
+            handler (Callable[[ChunkPosition, Optional[np.ndarray], np.ndarray, bool, int, Optional[np.ndarray]], None]):
+                Called with the position, the block IDs (`None` for a chunk of air),
+                the vertex data of every chunk, whether it was loaded from disk, the
+                connectivity mask of its faces and its light (`None` if the chunk
+                is not lit). The arrays are views of shared memory that is released
+                once the handler returns, so they must be copied or uploaded and
+                not be referenced afterwards.
+            time_budget (float): The time budget in milliseconds.
+
+        Returns:
+            int: The number of chunks handed over.
+        """
+        self.collect()
+        self.pump()
+        deadline = time.perf_counter() + time_budget * 1e-3
+        count = 0
+        while self.completed and (count == 0 or time.perf_counter() < deadline):
+            _, _, result = heapq.heappop(self.completed)
+            self.pending.discard(result.chunk_position)
+            self._handle_result(result, handler)
+            count += 1
+        return count
+
+    @staticmethod
+    def _handle_result(result: ChunkJobResult, handler: Optional[Callable]) -> None:
+        """Calls the handler with views of the shared memory of a result, then
+        releases the shared memory.
+        """
+        vertex_dtype = np.dtype(result.vertex_dtype)
+        if result.shared_memory_name is None:
+            if handler is not None:
+                empty_vertices = np.zeros(result.vertex_shape, vertex_dtype)
+                handler(
+                    result.chunk_position,
+                    None,
+                    empty_vertices,
+                    result.is_from_storage,
+                    result.connectivity,
+                    None,
+                )
+            return
+        shared_memory = SharedMemory(name=result.shared_memory_name)
+        try:
+            if handler is not None:
+                blocks = np.ndarray(
+                    result.block_shape, result.block_dtype, shared_memory.buf
+                )
+                offset = blocks.nbytes
+                light = None
+                if result.has_light:
+                    light = np.ndarray(
+                        result.block_shape, np.uint8, shared_memory.buf, offset=offset
+                    )
+                    offset += light.nbytes
+                vertex_data = np.ndarray(
+                    result.vertex_shape, vertex_dtype, shared_memory.buf, offset=offset
+                )
+                handler(
+                    result.chunk_position,
+                    blocks,
+                    vertex_data,
+                    result.is_from_storage,
+                    result.connectivity,
+                    light,
+                )
+                # The views must be gone before the shared memory can be closed.
+                del blocks, light, vertex_data
+        finally:
+            shared_memory.close()
+            shared_memory.unlink()
+
+    def shutdown(self) -> None:
+        """Stops the worker pool and releases the shared memory of every chunk that
+        has not been drained.
+        """
+        self.requested.clear()
+        self.requested_tiles.clear()
+        self.executor.shutdown(wait=True, cancel_futures=True)
+        # Every job that was not cancelled has finished by now and was appended to
+        # `finished` by its done callback.
+        self.in_flight.clear()
+        self.tiles_in_flight.clear()
+        self.mesh_jobs.clear()
+        self.mesh_arguments.clear()
+        self.mesh_versions.clear()
+        for finished in (self.finished, self.finished_meshes, self.finished_tiles):
+            while finished:
+                _, _, future = finished.popleft()
+                if not future.cancelled() and future.exception() is None:
+                    self._handle_result(future.result(), None)
+        while self.completed:
+            self._handle_result(heapq.heappop(self.completed)[2], None)
+        self.pending.clear()
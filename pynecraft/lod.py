@@ -0,0 +1,116 @@
+import math
+from typing import List, NamedTuple, Set, Tuple
+
+ChunkPosition = Tuple[int, int, int]
+
+
+class LodTile(NamedTuple):
+    """A tile of distant terrain rendered at a reduced level of detail.
+
+    A tile of level `level` covers `2 ** level` chunks along each axis and is
+    meshed from a grid of the size of a single chunk, downsampled `2 ** level`
+    times. Tiles of the same level are aligned to multiples of their size, so
+    that tiles of different levels nest into each other like the nodes of an
+    octree.
+
+    Args:
+        level (int): The level of detail, from `1` for tiles downsampled twice.
+        position (Tuple[int, int, int]): The position of the tile in tile
+            coordinates, i.e., the position of its first chunk divided by
+            `2 ** level`.
+    """
+
+    level: int
+    position: Tuple[int, int, int]
+
+    @property
+    def scale(self) -> int:
+        """The number of voxels of the world covered by a voxel of the tile along
+        each axis, which is also the number of chunks covered by the tile.
+        """
+        return 1 << self.level
+
+
+def get_ring_radius(level: int, render_distance: int, distance_factor: float) -> float:
+    """Returns the horizontal distance in chunks up to which tiles of a level of
+    detail are rendered, with level `0` being the full-detail chunks.
+    """
+    return render_distance * distance_factor**level
+
+
+def select_lod_tiles(
+    center: ChunkPosition,
+    render_distance: int,
+    level_count: int,
+    distance_factor: float,
+    chunk_y_range: Tuple[int, int],
+) -> Tuple[Set[ChunkPosition], Set[LodTile]]:
+    """Selects the chunks rendered at full detail and the tiles rendered at each
+    reduced level of detail around a chunk.
+
+    Columns of the world are subdivided like a quadtree: starting from columns of
+    the coarsest level, a column is split into the four columns of the next finer
+    level while its nearest point is within the ring of that finer level. The
+    selected columns therefore cover the whole area within the outermost ring
+    exactly once, without gaps or overlaps. Every selected column spans the
+    vertical range of the terrain.
+
+    Args:
+        center (ChunkPosition): The chunk of the camera.
+        render_distance (int): The distance in chunks up to which chunks are
+            rendered at full detail.
+        level_count (int): The number of reduced levels of detail.
+        distance_factor (float): The factor by which the radius of a ring grows
+            from one level to the next.
+        chunk_y_range (Tuple[int, int]): The lowest and highest chunk `y`
+            coordinate that may contain blocks.
+
+    Returns:
+        Tuple[Set[ChunkPosition], Set[LodTile]]: The positions of the chunks to be
+            rendered at full detail, and the tiles to be rendered at a reduced
+            level of detail.
+    """
+    # Distances are measured from the center of the camera's chunk, in chunks.
+    center_x, center_z = center[0] + 0.5, center[2] + 0.5
+    radii = [
+        get_ring_radius(level, render_distance, distance_factor)
+        for level in range(level_count + 1)
+    ]
+    columns: List[Tuple[int, int, int]] = []
+
+    def get_distance(level: int, tile_x: int, tile_z: int) -> float:
+        size = 1 << level
+        nearest_x = min(max(center_x, tile_x * size), (tile_x + 1) * size)
+        nearest_z = min(max(center_z, tile_z * size), (tile_z + 1) * size)
+        return math.hypot(nearest_x - center_x, nearest_z - center_z)
+
+    def select(level: int, tile_x: int, tile_z: int) -> None:
+        if level > 0 and get_distance(level, tile_x, tile_z) <= radii[level - 1]:
+            for offset_x in (0, 1):
+                for offset_z in (0, 1):
+                    select(level - 1, 2 * tile_x + offset_x, 2 * tile_z + offset_z)
+        else:
+            columns.append((level, tile_x, tile_z))
+
+    top_level = level_count
+    top_size = 1 << top_level
+    outer_radius = radii[top_level]
+    first_x = math.floor((center_x - outer_radius) / top_size)
+    last_x = math.floor((center_x + outer_radius) / top_size)
+    first_z = math.floor((center_z - outer_radius) / top_size)
+    last_z = math.floor((center_z + outer_radius) / top_size)
+    for tile_x in range(first_x, last_x + 1):
+        for tile_z in range(first_z, last_z + 1):
+            if get_distance(top_level, tile_x, tile_z) <= outer_radius:
+                select(top_level, tile_x, tile_z)
+
+    chunks: Set[ChunkPosition] = set()
+    tiles: Set[LodTile] = set()
+    for level, tile_x, tile_z in columns:
+        size = 1 << level
+        tile_ys = range(chunk_y_range[0] // size, chunk_y_range[1] // size + 1)
+        if level == 0:
+            chunks.update((tile_x, tile_y, tile_z) for tile_y in tile_ys)
+        else:
+            tiles.update(LodTile(level, (tile_x, tile_y, tile_z)) for tile_y in tile_ys)
+    return chunks, tiles
@@ -1,4 +1,7 @@
+from .arena import MeshArena
+from .chunk import ChunkMesh
+from .instanced import InstancedMesh
 from .quad import QuadMesh
 from .triangle import TriangleMesh
 
-__all__ = ["QuadMesh", "TriangleMesh"]
+__all__ = ["ChunkMesh", "InstancedMesh", "MeshArena", "QuadMesh", "TriangleMesh"]
@@ -0,0 +1,507 @@
+import bisect
+from typing import Dict, List, Literal, Optional, Tuple
+
+import moderngl
+import numpy as np
+
+from ..parameters import ArenaParameters
+from .base import parse_vbo_format
+from .chunk import CHUNK_VERTEX_LAYOUTS, get_quad_index_buffer
+
+
+class FreeListAllocator:
+    """Sub-allocates ranges of a contiguous space of `capacity` units, keeping the
+    free ranges in a list sorted by offset.
+
+    Allocations take the smallest free range they fit in, which keeps the large
+    free ranges intact for large allocations, and freed ranges are merged with
+    the free ranges next to them, so that the free list never holds two adjacent
+    ranges.
+
+    Args:
+        capacity (int): The number of units of the space.
+    """
+
+    def __init__(self, capacity: int) -> None:
+        self.capacity = capacity
+        self.free_offsets: List[int] = [0]
+        self.free_sizes: Dict[int, int] = {0: capacity}
+        self.used_size = 0
+
+    @property
+    def free_size(self) -> int:
+        """The number of free units."""
+        return self.capacity - self.used_size
+
+    @property
+    def largest_free_size(self) -> int:
+        """The size of the largest free range, i.e., of the largest allocation
+        that can currently succeed.
+        """
+        return max(self.free_sizes.values(), default=0)
+
+    def allocate(self, size: int) -> Optional[int]:
+        """Allocates a range of `size` units and returns its offset, or `None` if
+        no free range is large enough.
+        """
+        assert size > 0, "Cannot allocate an empty range."
+        best_offset, best_size = None, None
+        for offset, free_size in self.free_sizes.items():
+            if free_size >= size and (best_size is None or free_size < best_size):
+                best_offset, best_size = offset, free_size
+                if free_size == size:
+                    break
+        if best_offset is None:
+            return None
+
+        index = bisect.bisect_left(self.free_offsets, best_offset)
+        del self.free_sizes[best_offset]
+        if best_size > size:
+            # The rest of the free range stays at the same place in the list.
+            self.free_offsets[index] = best_offset + size
+            self.free_sizes[best_offset + size] = best_size - size
+        else:
+            del self.free_offsets[index]
+        self.used_size += size
+        return best_offset
+
+    def free(self, offset: int, size: int) -> None:
+        """Frees a range returned by `allocate`, merging it with the free ranges
+        next to it.
+        """
+        self.used_size -= size
+        index = bisect.bisect_left(self.free_offsets, offset)
+        if index < len(self.free_offsets) and self.free_offsets[index] == offset + size:
+            size += self.free_sizes.pop(self.free_offsets.pop(index))
+        if index > 0:
+            previous_offset = self.free_offsets[index - 1]
+            if previous_offset + self.free_sizes[previous_offset] == offset:
+                self.free_sizes[previous_offset] += size
+                return
+        self.free_offsets.insert(index, offset)
+        self.free_sizes[offset] = size
+
+    def reset(self, used_size: int) -> None:
+        """Marks the first `used_size` units as used and the rest as free, which
+        is the state of the space after its allocations were moved to its start.
+        """
+        self.used_size = used_size
+        if used_size < self.capacity:
+            self.free_offsets = [used_size]
+            self.free_sizes = {used_size: self.capacity - used_size}
+        else:
+            self.free_offsets = []
+            self.free_sizes = {}
+
+
+class ArenaPage:
+    """A vertex buffer of a mesh arena and the vertex array object drawing from
+    it.
+
+    Args:
+        buffer (moderngl.Buffer): The vertex buffer.
+        quad_capacity (int): The number of quads the vertex buffer can hold.
+    """
+
+    def __init__(self, buffer: moderngl.Buffer, quad_capacity: int) -> None:
+        self.buffer = buffer
+        self.allocator = FreeListAllocator(quad_capacity)
+        self.vertex_array_object: Optional[moderngl.VertexArray] = None
+
+
+class MeshArena:
+    """A set of large vertex buffers that the vertex data of chunk meshes is
+    sub-allocated from, so that thousands of chunks share a few buffers and the
+    visible chunks of a buffer are drawn together.
+
+    Every mesh is assigned a slot, which keeps the same ID for the lifetime of the
+    mesh while its vertex data may move within and across pages. The ranges of
+    the pages are allocated in whole quads from a free list. When an allocation
+    does not fit in any page, a page whose free space is fragmented enough to
+    hold it is compacted by copying its allocations to its start on the GPU, and
+    a new page is created otherwise. `compact_fragmented_pages` compacts pages
+    whose free space is too fragmented ahead of time.
+
+    With OpenGL 4.3 or later, the visible slots of each page are drawn with a
+    single `glMultiDraw*Indirect` call built from the culled list of slots. The
+    chunk origin and scale of packed vertices are then read from a per-slot
+    instanced attribute, selected by the base instance of each draw, instead of
+    from uniforms. Older contexts draw every slot with its own call.
+
+    Args:
+        opengl_context (moderngl.Context): The OpenGL context.
+        program (moderngl.Program): The shader program used to draw the meshes.
+            For packed vertices, it must be compiled with both
+            `PACKED_VERTICES` and `CHUNK_ARENA` defined.
+        vertex_format (Literal["float", "packed"]): The vertex format of the
+            chunk meshes.
+        arena_parameters (ArenaParameters): The parameters of the arena.
+    """
+
+    def __init__(
+        self,
+        opengl_context: moderngl.Context,
+        program: moderngl.Program,
+        vertex_format: Literal["float", "packed"],
+        arena_parameters: ArenaParameters,
+    ) -> None:
+        self.opengl_context = opengl_context
+        self.program = program
+        self.vertex_format = vertex_format
+        self.vbo_format, self.attributes, self.vertices_per_quad = CHUNK_VERTEX_LAYOUTS[
+            vertex_format
+        ]
+        self.is_indexed = vertex_format == "packed"
+        self.bytes_per_quad = (
+            self.vertices_per_quad * parse_vbo_format(self.vbo_format).itemsize
+        )
+        self.page_quad_capacity = max(
+            arena_parameters.page_size // self.bytes_per_quad, 1
+        )
+        self.compaction_threshold = arena_parameters.compaction_threshold
+        self.use_indirect_draws = (
+            arena_parameters.use_indirect_draws and opengl_context.version_code >= 430
+        )
+        self.pages: List[ArenaPage] = []
+
+        # The pages of the slots, or `-1` for slots without vertex data, and the
+        # offsets, sizes and allocated capacities of their ranges in quads.
+        self.slot_pages = np.zeros(0, dtype=np.int64)
+        self.slot_offsets = np.zeros(0, dtype=np.int64)
+        self.slot_quad_counts = np.zeros(0, dtype=np.int64)
+        self.slot_capacities = np.zeros(0, dtype=np.int64)
+        # The origin and scale of every slot, uploaded to the instanced
+        # attribute of packed vertices.
+        self.slot_transforms = np.zeros((0, 4), dtype=np.float32)
+        self.free_slots: List[int] = []
+        self.transform_buffer: Optional[moderngl.Buffer] = None
+        self.index_buffer: Optional[moderngl.Buffer] = None
+        self.indirect_buffer: Optional[moderngl.Buffer] = None
+
+        # The number of pages compacted so far.
+        self.compaction_count = 0
+
+    @property
+    def page_count(self) -> int:
+        """The number of vertex buffers of the arena."""
+        return len(self.pages)
+
+    @property
+    def capacity_bytes(self) -> int:
+        """The number of bytes of the vertex buffers of the arena."""
+        return sum(page.buffer.size for page in self.pages)
+
+    @property
+    def allocated_bytes(self) -> int:
+        """The number of bytes allocated to slots, including their headroom."""
+        return self.bytes_per_quad * sum(
+            page.allocator.used_size for page in self.pages
+        )
+
+    @property
+    def bytes_in_use(self) -> int:
+        """The number of bytes holding the vertex data of the slots."""
+        is_allocated = self.slot_pages >= 0
+        return self.bytes_per_quad * int(self.slot_quad_counts[is_allocated].sum())
+
+    @property
+    def fragmentation(self) -> float:
+        """The fraction of the free space of the arena that is outside its largest
+        free range, which is `0` when all the free space is contiguous.
+        """
+        free_size = sum(page.allocator.free_size for page in self.pages)
+        if free_size == 0:
+            return 0.0
+        largest_free_size = max(page.allocator.largest_free_size for page in self.pages)
+        return 1.0 - largest_free_size / free_size
+
+    def get_slot(self) -> int:
+        """Returns the ID of an unused slot, growing the slot arrays if needed."""
+        if not self.free_slots:
+            slot_count = len(self.slot_pages)
+            added_slot_count = max(slot_count, 256)
+            for name in ("slot_offsets", "slot_quad_counts", "slot_capacities"):
+                setattr(self, name, np.pad(getattr(self, name), (0, added_slot_count)))
+            self.slot_pages = np.pad(
+                self.slot_pages, (0, added_slot_count), constant_values=-1
+            )
+            self.slot_transforms = np.pad(
+                self.slot_transforms, ((0, added_slot_count), (0, 0))
+            )
+            new_slot_count = slot_count + added_slot_count
+            self.free_slots = list(range(new_slot_count - 1, slot_count - 1, -1))
+            if self.vertex_format == "packed":
+                if self.transform_buffer is not None:
+                    self.transform_buffer.release()
+                self.transform_buffer = self.opengl_context.buffer(self.slot_transforms)
+                self.rebuild_vertex_array_objects()
+        return self.free_slots.pop()
+
+    def allocate(
+        self,
+        vertex_data: np.ndarray,
+        origin: Tuple[int, int, int],
+        scale: int = 1,
+        headroom: float = 0.0,
+    ) -> int:
+        """Creates a slot holding the vertex data of a mesh.
+
+        Args:
+            vertex_data (np.ndarray): The vertex data, cast to the buffer format.
+            origin (Tuple[int, int, int]): The world coordinate of the first voxel
+                of the mesh, added to the positions of packed vertices.
+            scale (int): The factor the positions of packed vertices are
+                multiplied by.
+            headroom (float): The fraction of extra space allocated for the vertex
+                data to grow into.
+
+        Returns:
+            int: The ID of the slot.
+        """
+        slot = self.get_slot()
+        self.slot_transforms[slot] = (*origin, scale)
+        if self.transform_buffer is not None:
+            self.transform_buffer.write(self.slot_transforms[slot], offset=16 * slot)
+        self.slot_pages[slot] = -1
+        self.slot_quad_counts[slot] = 0
+        self.slot_capacities[slot] = 0
+        self.write(slot, vertex_data, headroom)
+        return slot
+
+    def write(self, slot: int, vertex_data: np.ndarray, headroom: float = 0.0) -> None:
+        """Replaces the vertex data of a slot, in place if it fits into the range
+        of the slot, and in a new range with `headroom` otherwise.
+        """
+        quad_count = len(vertex_data) // self.vertices_per_quad
+        if quad_count > self.slot_capacities[slot]:
+            self.free_range(slot)
+            capacity = quad_count + int(quad_count * headroom)
+            page_index, offset = self.allocate_range(capacity)
+            self.slot_pages[slot] = page_index
+            self.slot_offsets[slot] = offset
+            self.slot_capacities[slot] = capacity
+        self.slot_quad_counts[slot] = quad_count
+        if quad_count:
+            page = self.pages[self.slot_pages[slot]]
+            page.buffer.write(
+                vertex_data, offset=int(self.slot_offsets[slot]) * self.bytes_per_quad
+            )
+
+    def free(self, slot: int) -> None:
+        """Releases a slot and the range of its vertex data."""
+        self.free_range(slot)
+        self.slot_quad_counts[slot] = 0
+        self.free_slots.append(slot)
+
+    def free_range(self, slot: int) -> None:
+        """Releases the range of the vertex data of a slot, if it has one."""
+        page_index = self.slot_pages[slot]
+        if page_index >= 0:
+            self.pages[page_index].allocator.free(
+                int(self.slot_offsets[slot]), int(self.slot_capacities[slot])
+            )
+        self.slot_pages[slot] = -1
+        self.slot_capacities[slot] = 0
+
+    def allocate_range(self, quad_count: int) -> Tuple[int, int]:
+        """Allocates a range of `quad_count` quads in the first page it fits in,
+        compacting or creating a page if it fits in none, and returns the index of
+        the page and the offset of the range.
+        """
+        if self.is_indexed:
+            index_buffer = get_quad_index_buffer(self.opengl_context, quad_count)
+            if index_buffer is not self.index_buffer:
+                self.index_buffer = index_buffer
+                self.rebuild_vertex_array_objects()
+
+        for page_index, page in enumerate(self.pages):
+            offset = page.allocator.allocate(quad_count)
+            if offset is not None:
+                return page_index, offset
+        for page_index, page in enumerate(self.pages):
+            if page.allocator.free_size >= quad_count:
+                self.compact(page_index)
+                return page_index, page.allocator.allocate(quad_count)
+
+        quad_capacity = max(self.page_quad_capacity, quad_count)
+        page = ArenaPage(
+            self.opengl_context.buffer(reserve=quad_capacity * self.bytes_per_quad),
+            quad_capacity,
+        )
+        self.pages.append(page)
+        self.rebuild_vertex_array_object(page)
+        return len(self.pages) - 1, page.allocator.allocate(quad_count)
+
+    def compact(self, page_index: int) -> None:
+        """Moves the ranges of a page to its start in their current order, so that
+        all its free space is contiguous. The vertex data is copied on the GPU into
+        a new buffer that replaces the old one.
+        """
+        page = self.pages[page_index]
+        slots = np.flatnonzero(self.slot_pages == page_index)
+        slots = slots[np.argsort(self.slot_offsets[slots])]
+        old_offsets = self.slot_offsets[slots]
+        capacities = self.slot_capacities[slots]
+        new_offsets = np.cumsum(capacities) - capacities
+
+        buffer = self.opengl_context.buffer(reserve=page.buffer.size)
+        # Ranges that were adjacent stay adjacent, so each run of them is moved
+        # with a single copy.
+        run_starts = np.flatnonzero(np.diff(old_offsets - new_offsets, prepend=-1) != 0)
+        run_ends = np.append(run_starts[1:], len(slots))
+        for start, end in zip(run_starts, run_ends):
+            self.opengl_context.copy_buffer(
+                buffer,
+                page.buffer,
+                size=int(
+                    new_offsets[end - 1] + capacities[end - 1] - new_offsets[start]
+                )
+                * self.bytes_per_quad,
+                read_offset=int(old_offsets[start]) * self.bytes_per_quad,
+                write_offset=int(new_offsets[start]) * self.bytes_per_quad,
+            )
+        page.buffer.release()
+        page.buffer = buffer
+        self.slot_offsets[slots] = new_offsets
+        page.allocator.reset(int(capacities.sum()))
+        self.rebuild_vertex_array_object(page)
+        self.compaction_count += 1
+
+    def compact_fragmented_pages(self, max_page_count: int = 1) -> int:
+        """Compacts up to `max_page_count` pages in which the free space outside
+        the largest free range exceeds the compaction threshold, as a fraction of
+        the page, and returns the number of pages compacted.
+        """
+        compacted_page_count = 0
+        for page_index, page in enumerate(self.pages):
+            if compacted_page_count >= max_page_count:
+                break
+            allocator = page.allocator
+            scattered_free_size = allocator.free_size - allocator.largest_free_size
+            if scattered_free_size > self.compaction_threshold * allocator.capacity:
+                self.compact(page_index)
+                compacted_page_count += 1
+        return compacted_page_count
+
+    def rebuild_vertex_array_object(self, page: ArenaPage) -> None:
+        """Creates the vertex array object drawing from the buffer of a page."""
+        if page.vertex_array_object is not None:
+            page.vertex_array_object.release()
+        content = [(page.buffer, self.vbo_format, *self.attributes)]
+        if self.vertex_format == "packed":
+            content.append((self.transform_buffer, "4f/i", "in_chunk_transform"))
+        page.vertex_array_object = self.opengl_context.vertex_array(
+            self.program,
+            content,
+            index_buffer=self.index_buffer if self.is_indexed else None,
+            index_element_size=4,
+            skip_errors=True,
+        )
+
+    def set_program(self, program: moderngl.Program) -> None:
+        """Replaces the shader program drawing the meshes, e.g., after it was
+        reloaded, and recreates the vertex array objects of all pages.
+        """
+        self.program = program
+        self.rebuild_vertex_array_objects()
+
+    def rebuild_vertex_array_objects(self) -> None:
+        """Recreates the vertex array objects of all pages, after a buffer they
+        refer to was replaced.
+        """
+        for page in self.pages:
+            self.rebuild_vertex_array_object(page)
+
+    def get_draw_commands(self, slots: np.ndarray) -> np.ndarray:
+        """Returns the indirect draw commands of a set of slots, as an array of
+        `uint32` with one row of five words per slot, which is the stride moderngl
+        reads both indexed and non-indexed commands with.
+        """
+        vertex_counts = 6 * self.slot_quad_counts[slots]
+        first_vertices = self.slot_offsets[slots] * self.vertices_per_quad
+        ones = np.ones_like(slots)
+        zeros = np.zeros_like(slots)
+        if self.is_indexed:
+            # `count, instanceCount, firstIndex, baseVertex, baseInstance`
+            columns = (vertex_counts, ones, zeros, first_vertices, slots)
+        else:
+            # `count, instanceCount, first, baseInstance` and a padding word.
+            columns = (vertex_counts, ones, first_vertices, slots, zeros)
+        return np.stack(columns, axis=1).astype(np.uint32)
+
+    def render(self, slots: np.ndarray) -> int:
+        """Draws the vertex data of a set of slots and returns the number of draw
+        calls issued.
+        """
+        slots = np.asarray(slots, dtype=np.int64)
+        slots = slots[self.slot_quad_counts[slots] > 0]
+        if len(slots) == 0:
+            return 0
+        slots = slots[np.argsort(self.slot_pages[slots], kind="stable")]
+        pages = self.slot_pages[slots]
+        page_starts = np.flatnonzero(np.diff(pages, prepend=-1))
+        page_ends = np.append(page_starts[1:], len(slots))
+
+        if not self.use_indirect_draws:
+            for start, end in zip(page_starts, page_ends):
+                self.render_each(self.pages[pages[start]], slots[start:end])
+            return len(slots)
+
+        commands = self.get_draw_commands(slots)
+        if self.indirect_buffer is None or self.indirect_buffer.size < commands.nbytes:
+            if self.indirect_buffer is not None:
+                self.indirect_buffer.release()
+            self.indirect_buffer = self.opengl_context.buffer(
+                reserve=1 << max(commands.nbytes - 1, 4095).bit_length(),
+                dynamic=True,
+            )
+        self.indirect_buffer.write(commands)
+        for start, end in zip(page_starts, page_ends):
+            self.pages[pages[start]].vertex_array_object.render_indirect(
+                self.indirect_buffer, count=int(end - start), first=int(start)
+            )
+        return len(page_starts)
+
+    def render_each(self, page: ArenaPage, slots: np.ndarray) -> None:
+        """Draws the vertex data of slots of a page with one draw call per slot,
+        for contexts without indirect draws.
+        """
+        vertex_array_object = page.vertex_array_object
+        for slot in slots.tolist():
+            vertex_count = 6 * int(self.slot_quad_counts[slot])
+            first_vertex = int(self.slot_offsets[slot]) * self.vertices_per_quad
+            if not self.is_indexed:
+                vertex_array_object.render(vertices=vertex_count, first=first_vertex)
+                continue
+            # Without a base vertex, the attributes are pointed at the first
+            # vertex of the slot and at its transform instead.
+            vertex_array_object.bind(
+                self.program["in_packed"].location,
+                # Integer attributes of any signedness are bound as `"i"`.
+                "i",
+                page.buffer,
+                "2u",
+                offset=8 * first_vertex,
+            )
+            vertex_array_object.bind(
+                self.program["in_chunk_transform"].location,
+                "f",
+                self.transform_buffer,
+                "4f",
+                offset=16 * slot,
+                divisor=1,
+            )
+            vertex_array_object.render(vertices=vertex_count, instances=1)
+
+    def release(self) -> None:
+        """Releases the OpenGL objects owned by the arena."""
+        for page in self.pages:
+            if page.vertex_array_object is not None:
+                page.vertex_array_object.release()
+            page.buffer.release()
+        self.pages = []
+        for buffer in (self.transform_buffer, self.indirect_buffer):
+            if buffer is not None:
+                buffer.release()
+        self.transform_buffer = None
+        self.indirect_buffer = None
@@ -1,9 +1,44 @@
+import re
 from abc import ABC, abstractmethod
-from typing import List
+from typing import List, Optional
 
 import moderngl
 import numpy as np
 
+# The NumPy type corresponding to each moderngl attribute type, where `f` is a
+# float, `i` a signed integer, `u` an unsigned integer and `x` padding.
+_VBO_FORMAT_TYPES = {"f": "f", "i": "i", "u": "u", "x": "V"}
+_VBO_FORMAT_TOKEN = re.compile(r"^(\d*)n?([fiux])(\d?)$")
+
+
+def parse_vbo_format(vbo_format: str) -> np.dtype:
+    """Parses a moderngl buffer format string such as `"3f 3f"` or `"2u"` into
+    the structured NumPy data type of a single vertex. Divisor markers such as
+    `"/i"` are ignored.
+
+    Args:
+        vbo_format (str): The buffer format string.
+
+    Returns:
+        np.dtype: The data type of a single vertex, with one field per attribute.
+    """
+    fields = []
+    for token in vbo_format.split():
+        if token.startswith("/"):
+            continue
+        match = _VBO_FORMAT_TOKEN.match(token)
+        assert match is not None, f"Invalid buffer format '{token}'."
+        count, kind, size = match.groups()
+        count = int(count or 1)
+        size = int(size or (1 if kind == "x" else 4))
+        if kind == "x":
+            fields.append((f"f{len(fields)}", f"V{count * size}"))
+        else:
+            fields.append(
+                (f"f{len(fields)}", f"{_VBO_FORMAT_TYPES[kind]}{size}", count)
+            )
+    return np.dtype(fields)
+
 
 class BaseMesh(ABC):
     """A base class for a mesh object that can be rendered in an OpenGL context.
@@ -21,39 +56,113 @@ class BaseMesh(ABC):
         self.program = program
         self.vbo_format: str = None
         self.attributes: List[str] = None
+        self.vertex_buffer_object: moderngl.Buffer = None
         self.vertex_array_object: moderngl.VertexArray = None
+        # The fraction of extra space allocated in the vertex buffer, so that the
+        # vertex data can grow and be rewritten in place without reallocating it.
+        self.vertex_buffer_headroom = 0.0
 
     @abstractmethod
     def get_vertex_data(self) -> np.array:
         """Returns the vertex data for the mesh."""
         pass
 
+    def get_index_buffer(self) -> Optional[moderngl.Buffer]:
+        """Returns the buffer of `uint32` vertex indices used to draw the mesh, or
+        `None` if the vertices are drawn in order.
+        """
+        return None
+
+    def cast_vertex_data(self, vertex_data: np.ndarray) -> np.ndarray:
+        """Returns vertex data cast to the types of the attributes of the buffer
+        format of the mesh.
+        """
+        # Cast the vertex data to the type of the attributes in the buffer format,
+        # so that for example integer attributes receive integers rather than the
+        # bit patterns of floats. Casting floats to integers is refused.
+        vertex_dtype = parse_vbo_format(self.vbo_format)
+        attribute_types = {vertex_dtype[name].base for name in vertex_dtype.names}
+        if len(attribute_types) == 1 and vertex_data.dtype.names is None:
+            vertex_data = np.ascontiguousarray(vertex_data).astype(
+                attribute_types.pop(), casting="same_kind", copy=False
+            )
+        assert (
+            vertex_data.nbytes % vertex_dtype.itemsize == 0
+        ), f"Vertex data does not match the buffer format '{self.vbo_format}'."
+        return vertex_data
+
     def get_vertex_array_object(self) -> moderngl.VertexArray:
         """Returns a VertexArray object for the mesh.
 
         Returns:
             moderngl.VertexArray: The VertexArray object.
         """
-        vertex_data = self.get_vertex_data()
+        vertex_data = self.cast_vertex_data(self.get_vertex_data())
 
         # A vertex buffer object is an OpenGL object that stores vertex data
         # such as position, color, texture coordinates, and normals in GPU
         # memory, which is efficient for rendering because it minimizes the
         # data transfer between CPU and GPU.
-        vertex_buffer_object = self.opengl_context.buffer(vertex_data)
+        self.vertex_buffer_object = self.opengl_context.buffer(
+            reserve=vertex_data.nbytes
+            + int(vertex_data.nbytes * self.vertex_buffer_headroom)
+        )
+        self.vertex_buffer_object.write(vertex_data)
+        return self.create_vertex_array_object()
 
+    def create_vertex_array_object(self) -> moderngl.VertexArray:
+        """Returns a VertexArray object drawing the existing vertex buffer of the
+        mesh with its shader program.
+        """
         # A vertext array object is an OpenGL object that stores the format of
         # the vertex data as well as the method of extracting vertex data from
         # one or more vertex buffer objects. Essentially it stores the parameters
         # to interpret the vertex data structure.
-        vertex_array_object = self.opengl_context.vertex_array(
+        return self.opengl_context.vertex_array(
             self.program,
-            [(vertex_buffer_object, self.vbo_format, *self.attributes)],
+            [(self.vertex_buffer_object, self.vbo_format, *self.attributes)],
+            index_buffer=self.get_index_buffer(),
+            index_element_size=4,
             skip_errors=True,
         )
 
-        return vertex_array_object
+    def set_program(self, program: moderngl.Program) -> None:
+        """Replaces the shader program of the mesh, e.g., after it was reloaded,
+        and recreates the vertex array object on the existing vertex buffer.
+        """
+        self.program = program
+        if self.vertex_array_object is None:
+            return
+        self.vertex_array_object.release()
+        self.vertex_array_object = self.create_vertex_array_object()
+
+    def write_vertex_data(self, vertex_data: np.ndarray) -> bool:
+        """Overwrites the content of the vertex buffer in place with new vertex
+        data, which avoids reallocating the buffer and recreating the vertex array
+        object.
+
+        Returns:
+            bool: Whether the vertex data fit into the vertex buffer and was
+                written. If not, the vertex buffer is left unchanged.
+        """
+        vertex_data = self.cast_vertex_data(vertex_data)
+        if (
+            self.vertex_buffer_object is None
+            or vertex_data.nbytes > self.vertex_buffer_object.size
+        ):
+            return False
+        self.vertex_buffer_object.write(vertex_data, offset=0)
+        return True
 
     def render(self):
         """Renders the mesh."""
         self.vertex_array_object.render()
+
+    def release(self):
+        """Releases the OpenGL objects owned by the mesh."""
+        if self.vertex_array_object is not None:
+            self.vertex_array_object.release()
+            self.vertex_array_object = None
+        if self.vertex_buffer_object is not None:
+            self.vertex_buffer_object.release()
+            self.vertex_buffer_object = None
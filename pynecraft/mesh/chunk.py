@@ -0,0 +1,411 @@
+import weakref
+from typing import TYPE_CHECKING, Literal, Optional, Tuple
+
+import moderngl
+import numpy as np
+
+from ..world import World
+from .base import BaseMesh
+from .meshing import (
+    build_packed_vertex_data,
+    build_vertex_data,
+    get_packed_quad_centers,
+    get_quad_index_data,
+    get_translucent_quad_count,
+    greedy_mesh,
+)
+
+if TYPE_CHECKING:
+    from .arena import MeshArena
+
+# The buffer format, attribute names and number of vertices per quad of each
+# vertex format of chunk meshes.
+CHUNK_VERTEX_LAYOUTS = {
+    "float": ("3f 3f", ["in_position", "in_color"], 6),
+    "packed": ("2u", ["in_packed"], 4),
+}
+
+# The index buffer shared by every packed chunk mesh of an OpenGL context.
+_quad_index_buffers: "weakref.WeakKeyDictionary[moderngl.Context, moderngl.Buffer]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def get_quad_index_buffer(
+    opengl_context: moderngl.Context, quad_count: int
+) -> moderngl.Buffer:
+    """Returns an index buffer that can draw at least `quad_count` quads of packed
+    vertices. A single buffer is shared by all meshes of an OpenGL context and is
+    only reallocated, to the next power of two, when a mesh needs more quads than
+    it holds.
+
+    Args:
+        opengl_context (moderngl.Context): The OpenGL context.
+        quad_count (int): The number of quads to be drawn.
+
+    Returns:
+        moderngl.Buffer: The index buffer.
+    """
+    index_buffer = _quad_index_buffers.get(opengl_context)
+    if index_buffer is None or index_buffer.size < quad_count * 6 * 4:
+        capacity = 1 << max(quad_count - 1, 1023).bit_length()
+        index_buffer = opengl_context.buffer(get_quad_index_data(capacity))
+        _quad_index_buffers[opengl_context] = index_buffer
+    return index_buffer
+
+
+class TranslucentChunkMesh(BaseMesh):
+    """The translucent faces of a packed chunk mesh, such as water and glass, held
+    in a vertex buffer of their own so that they can be drawn after the opaque
+    geometry, blended over it without writing depth.
+
+    Blending is only correct if overlapping faces are drawn from back to front,
+    so the quads are reordered by `sort`, which rewrites the vertex buffer in
+    place. The vertex data and the centers of the quads are kept on the CPU for
+    that. Until the quads are first sorted, the vertex buffer holds them in the
+    order of the mesher.
+
+    Args:
+        opengl_context (moderngl.Context): The OpenGL context.
+        program (moderngl.Program): The shader program compiled with
+            `PACKED_VERTICES` defined.
+        vertex_data (np.ndarray): The packed vertex data of the translucent quads,
+            which must not be empty.
+        origin (Tuple[int, int, int]): The world coordinate of the first voxel of
+            the chunk.
+        scale (int): The size in world voxels of a voxel of the mesh.
+    """
+
+    def __init__(
+        self,
+        opengl_context: moderngl.Context,
+        program: moderngl.Program,
+        vertex_data: np.ndarray,
+        origin: Tuple[int, int, int],
+        scale: int = 1,
+    ) -> None:
+        super().__init__(opengl_context, program)
+        self.vbo_format, self.attributes, self.vertices_per_quad = CHUNK_VERTEX_LAYOUTS[
+            "packed"
+        ]
+        self.origin = origin
+        self.scale = scale
+        self.index_buffer: Optional[moderngl.Buffer] = None
+        self.set_vertex_data(vertex_data)
+        self.vertex_array_object = self.get_vertex_array_object()
+
+    @property
+    def triangle_count(self) -> int:
+        """The number of triangles in the mesh."""
+        return 2 * self.quad_count
+
+    def set_vertex_data(self, vertex_data: np.ndarray) -> None:
+        """Replaces the vertex data kept on the CPU and the centers of the quads,
+        which invalidates the order of the quads.
+        """
+        assert len(vertex_data), "Translucent chunk meshes cannot be empty."
+        # The vertex data of worker processes lives in shared memory that is
+        # released once the chunk is uploaded, so the mesh keeps a copy.
+        self.vertex_data = self.cast_vertex_data(vertex_data).copy()
+        self.quad_count = len(vertex_data) // self.vertices_per_quad
+        self.quad_centers = get_packed_quad_centers(
+            self.vertex_data
+        ) * self.scale + np.asarray(self.origin, dtype="float32")
+        # The key of the camera position the quads were last sorted for, which is
+        # set by the caller of `sort`.
+        self.sort_key = None
+
+    def get_vertex_data(self) -> np.array:
+        """Returns the vertex data for the mesh.
+
+        Returns:
+            np.array: The vertex data.
+        """
+        return self.vertex_data
+
+    def get_index_buffer(self) -> Optional[moderngl.Buffer]:
+        """Returns the shared quad index buffer."""
+        self.index_buffer = get_quad_index_buffer(self.opengl_context, self.quad_count)
+        return self.index_buffer
+
+    def update_vertex_data(self, vertex_data: np.ndarray) -> None:
+        """Replaces the vertex data of the mesh after the chunk was edited."""
+        self.set_vertex_data(vertex_data)
+        if (
+            self.index_buffer.size >= self.quad_count * 6 * 4
+            and self.write_vertex_data(self.vertex_data)
+        ):
+            return
+        self.release()
+        self.vertex_buffer_headroom = ChunkMesh.EDITED_VERTEX_BUFFER_HEADROOM
+        self.vertex_array_object = self.get_vertex_array_object()
+
+    def sort(self, camera_position: np.ndarray) -> None:
+        """Reorders the quads in the vertex buffer from the farthest to the nearest
+        to a camera position.
+
+        The squared distances to the centers of the quads are quantized to 16-bit
+        keys, which NumPy sorts with a stable radix sort in linear time.
+
+        Args:
+            camera_position (np.ndarray): The world-space position of the camera.
+        """
+        distances = np.square(self.quad_centers - camera_position).sum(axis=1)
+        nearest, farthest = distances.min(), distances.max()
+        keys = (farthest - distances) * (0xFFFF / max(farthest - nearest, 1e-6))
+        order = np.argsort(keys.astype("uint16"), kind="stable")
+        self.write_vertex_data(
+            self.vertex_data.reshape(self.quad_count, self.vertices_per_quad, -1)[
+                order
+            ].reshape(-1, 2)
+        )
+
+    def render(self):
+        """Renders the mesh."""
+        self.program["u_chunk_origin"].value = self.origin
+        self.program["u_chunk_scale"].value = self.scale
+        self.vertex_array_object.render(vertices=6 * self.quad_count)
+
+
+class ChunkMesh(BaseMesh):
+    """A mesh of the visible surface of a single chunk of a voxel world, built by
+    the greedy mesher. Faces touching the neighbouring chunks are culled against
+    the blocks of those chunks, so that no faces are emitted between two solid
+    voxels on a chunk border.
+
+    Two vertex formats are supported:
+
+    - `"float"`: six vertices of `"3f 3f"` world-space position and colour per
+        quad, which can be drawn with the default shader program.
+    - `"packed"`: four vertices of `"2u"` bit-packed chunk-local position, normal
+        index, ambient occlusion, light, block ID and texture layer per quad,
+        drawn through a shared index buffer. This needs the shader program
+        compiled with `PACKED_VERTICES` defined and uses 4.5x less memory.
+
+    The translucent quads of packed meshes, which the mesher emits last, are
+    split off into a `TranslucentChunkMesh` held in `translucent_mesh`, which is
+    drawn separately after all the opaque geometry. Float vertices carry no
+    opacity, so translucent quads are drawn along with the opaque ones in the
+    float format.
+
+    Args:
+        opengl_context (moderngl.Context): The OpenGL context.
+        program (moderngl.Program): The shader program used to render the mesh.
+        world (World): The world the chunk belongs to.
+        chunk_position (Tuple[int, int, int]): The position of the chunk in chunk
+            coordinates.
+        vertex_format (Literal["float", "packed"]): The vertex format of the mesh.
+        vertex_data (Optional[np.ndarray]): Vertex data of the chunk built ahead of
+            time, e.g. by a worker process. If not provided, the chunk is meshed
+            from the blocks of the world.
+        lod_level (int): The level of detail of the mesh. Meshes of a level above
+            `0` cover a tile of `2 ** lod_level` chunks along each axis, whose
+            position is given by `chunk_position` in tile coordinates, and must be
+            given their vertex data.
+        arena (Optional[MeshArena]): The arena the vertex data of the mesh is
+            sub-allocated from. If not provided, the mesh owns its own vertex
+            buffer and vertex array object.
+        block_layers (Optional[np.ndarray]): The texture layer of every block ID,
+            which is written into packed vertices.
+
+    When the chunk is edited, `update_vertex_data` rewrites the vertex buffer in
+    place if the new vertex data fits. Otherwise the buffer is reallocated with
+    headroom for later edits to grow into.
+    """
+
+    # The headroom of the vertex buffer of a chunk that had to be reallocated
+    # after an edit. Chunks that are never edited are allocated without headroom.
+    EDITED_VERTEX_BUFFER_HEADROOM = 0.5
+
+    def __init__(
+        self,
+        opengl_context: moderngl.Context,
+        program: moderngl.Program,
+        world: World,
+        chunk_position: Tuple[int, int, int],
+        vertex_format: Literal["float", "packed"] = "float",
+        vertex_data: Optional[np.ndarray] = None,
+        lod_level: int = 0,
+        arena: Optional["MeshArena"] = None,
+        block_layers: Optional[np.ndarray] = None,
+    ) -> None:
+        super().__init__(opengl_context, program)
+        self.world = world
+        self.chunk_position = chunk_position
+        self.lod_level = lod_level
+        self.scale = 1 << lod_level
+        # The number of world voxels covered by the mesh along each axis.
+        self.extent = world.chunk_size * self.scale
+        self.origin = tuple(coordinate * self.extent for coordinate in chunk_position)
+        self.vertex_format = vertex_format
+        self.vbo_format, self.attributes, self.vertices_per_quad = CHUNK_VERTEX_LAYOUTS[
+            vertex_format
+        ]
+        self.arena = arena
+        self.block_layers = block_layers
+        self.arena_slot: Optional[int] = None
+        self.index_buffer: Optional[moderngl.Buffer] = None
+        if vertex_data is None:
+            assert lod_level == 0, "Meshes of distant tiles must be given vertex data."
+            vertex_data = self.build_vertex_data(self.get_quads())
+        self.translucent_mesh: Optional[TranslucentChunkMesh] = None
+        vertex_data, translucent_vertex_data = self.split_vertex_data(vertex_data)
+        self.set_translucent_vertex_data(translucent_vertex_data)
+        self.vertex_data = vertex_data
+        self.quad_count = len(vertex_data) // self.vertices_per_quad
+        if arena is not None:
+            self.arena_slot = arena.allocate(
+                self.cast_vertex_data(vertex_data), self.origin, self.scale
+            )
+        else:
+            self.vertex_array_object = self.get_vertex_array_object()
+        # The vertex data lives on the GPU from now on.
+        self.vertex_data = None
+
+    @property
+    def triangle_count(self) -> int:
+        """The number of opaque and translucent triangles in the mesh."""
+        if self.translucent_mesh is None:
+            return 2 * self.quad_count
+        return 2 * self.quad_count + self.translucent_mesh.triangle_count
+
+    def split_vertex_data(
+        self, vertex_data: np.ndarray
+    ) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+        """Splits vertex data into the vertices of the opaque quads and of the
+        translucent quads, which are `None` for float vertices.
+        """
+        if self.vertex_format != "packed":
+            return vertex_data, None
+        translucent_quad_count = get_translucent_quad_count(vertex_data)
+        split_index = len(vertex_data) - translucent_quad_count * self.vertices_per_quad
+        return vertex_data[:split_index], vertex_data[split_index:]
+
+    def set_translucent_vertex_data(self, vertex_data: Optional[np.ndarray]) -> None:
+        """Replaces the translucent quads of the mesh, creating or releasing its
+        translucent mesh as needed.
+        """
+        if vertex_data is None or len(vertex_data) == 0:
+            if self.translucent_mesh is not None:
+                self.translucent_mesh.release()
+                self.translucent_mesh = None
+        elif self.translucent_mesh is not None:
+            self.translucent_mesh.update_vertex_data(vertex_data)
+        else:
+            self.translucent_mesh = TranslucentChunkMesh(
+                opengl_context=self.opengl_context,
+                program=self.program,
+                vertex_data=vertex_data,
+                origin=self.origin,
+                scale=self.scale,
+            )
+
+    def get_quads(self) -> np.ndarray:
+        """Returns the quads of the chunk built by the greedy mesher, lit by the
+        light of the world if it has any.
+        """
+        size = self.world.chunk_size
+        origin = np.asarray(self.origin)
+        padded_blocks = self.world.get_region(origin - 1, origin + size + 1)
+        light_map = self.world.light_map
+        if light_map is None:
+            return greedy_mesh(padded_blocks)
+        padded_light = light_map.get_region(tuple(origin - 1), tuple(origin + size + 1))
+        return greedy_mesh(
+            padded_blocks, padded_light=padded_light, ambient_occlusion=True
+        )
+
+    def build_vertex_data(self, quads: np.ndarray) -> np.ndarray:
+        """Builds the vertex data of a set of quads in the format of the mesh."""
+        if self.vertex_format == "packed":
+            return build_packed_vertex_data(quads, self.block_layers)
+        return build_vertex_data(quads, origin=self.origin)
+
+    def get_vertex_data(self) -> np.array:
+        """Returns the vertex data for the mesh.
+
+        Returns:
+            np.array: The vertex data.
+        """
+        return self.vertex_data
+
+    def get_index_buffer(self) -> Optional[moderngl.Buffer]:
+        """Returns the shared quad index buffer for packed meshes."""
+        if self.vertex_format == "packed":
+            self.index_buffer = get_quad_index_buffer(
+                self.opengl_context, self.quad_count
+            )
+        return self.index_buffer
+
+    def get_vertex_array_object(self) -> Optional[moderngl.VertexArray]:
+        """Returns a VertexArray object for the mesh, or `None` if the chunk has no
+        visible faces, since OpenGL buffers cannot be empty.
+
+        Returns:
+            moderngl.VertexArray: The VertexArray object.
+        """
+        if not self.quad_count:
+            return None
+        return super().get_vertex_array_object()
+
+    def update_vertex_data(self, vertex_data: np.ndarray) -> None:
+        """Replaces the vertex data of the mesh after the chunk was edited."""
+        vertex_data, translucent_vertex_data = self.split_vertex_data(vertex_data)
+        self.set_translucent_vertex_data(translucent_vertex_data)
+        quad_count = len(vertex_data) // self.vertices_per_quad
+        if self.arena is not None:
+            self.arena.write(
+                self.arena_slot,
+                self.cast_vertex_data(vertex_data),
+                headroom=self.EDITED_VERTEX_BUFFER_HEADROOM,
+            )
+            self.quad_count = quad_count
+            return
+        is_index_buffer_valid = (
+            self.index_buffer is None or self.index_buffer.size >= quad_count * 6 * 4
+        )
+        if (
+            quad_count == 0
+            or is_index_buffer_valid
+            and self.vertex_array_object is not None
+            and self.write_vertex_data(vertex_data)
+        ):
+            self.quad_count = quad_count
+            return
+
+        super().release()
+        self.vertex_buffer_headroom = self.EDITED_VERTEX_BUFFER_HEADROOM
+        self.vertex_data = vertex_data
+        self.quad_count = quad_count
+        self.vertex_array_object = self.get_vertex_array_object()
+        self.vertex_data = None
+
+    def set_program(self, program: moderngl.Program) -> None:
+        """Replaces the shader program of the mesh and of its translucent mesh."""
+        super().set_program(program)
+        if self.translucent_mesh is not None:
+            self.translucent_mesh.set_program(program)
+
+    def render(self):
+        """Renders the opaque quads of the mesh."""
+        if self.arena is not None:
+            self.arena.render([self.arena_slot])
+            return
+        if self.vertex_array_object is None or self.quad_count == 0:
+            return
+        if self.vertex_format == "packed":
+            self.program["u_chunk_origin"].value = self.origin
+            self.program["u_chunk_scale"].value = self.scale
+        self.vertex_array_object.render(vertices=6 * self.quad_count)
+
+    def release(self):
+        """Releases the OpenGL objects owned by the mesh, or its slot in the
+        arena, and its translucent mesh.
+        """
+        if self.translucent_mesh is not None:
+            self.translucent_mesh.release()
+            self.translucent_mesh = None
+        if self.arena_slot is not None:
+            self.arena.free(self.arena_slot)
+            self.arena_slot = None
+        super().release()
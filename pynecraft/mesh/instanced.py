@@ -0,0 +1,184 @@
+from typing import Optional
+
+import moderngl
+import numpy as np
+
+from .base import BaseMesh
+from .meshing import FACE_NORMALS, FACE_SHADES
+
+# The per-instance attributes of an instanced mesh: the world-space position of
+# the instance, its scale along each axis, its rotation as a unit quaternion in
+# `(x, y, z, w)` order and a color that multiplies the colors of the vertices.
+# The shader builds the model matrix of an instance from them, which takes 52
+# bytes per instance instead of the 64 bytes of a matrix.
+INSTANCE_DTYPE = np.dtype(
+    [
+        ("position", "f4", 3),
+        ("scale", "f4", 3),
+        ("rotation", "f4", 4),
+        ("color", "f4", 3),
+    ]
+)
+
+# The buffer format of the per-instance attributes, which advance once per
+# instance rather than once per vertex.
+INSTANCE_VBO_FORMAT = "3f 3f 4f 3f/i"
+INSTANCE_ATTRIBUTES = [
+    "in_instance_position",
+    "in_instance_scale",
+    "in_instance_rotation",
+    "in_instance_color",
+]
+
+
+def get_cube_vertex_data(size: float = 1.0) -> np.ndarray:
+    """Returns the `"3f 3f"` position and color vertices of a cube centered on the
+    origin, with the two triangles of every face wound counter-clockwise seen from
+    outside the cube and colored white with the shade of the face.
+
+    Args:
+        size (float): The length of the edges of the cube.
+
+    Returns:
+        np.ndarray: A `float32` array of shape `(36, 6)`.
+    """
+    vertices = []
+    for normal, shade in zip(FACE_NORMALS, FACE_SHADES):
+        # The tangents of the face, whose cross product is the normal.
+        axis = int(np.flatnonzero(normal)[0])
+        u = np.eye(3)[(axis + 1) % 3]
+        v = np.eye(3)[(axis + 2) % 3]
+        if normal[axis] < 0:
+            u, v = v, u
+        center = normal * 0.5
+        corners = [center - u / 2 - v / 2, center + u / 2 - v / 2]
+        corners += [center + u / 2 + v / 2, center - u / 2 + v / 2]
+        for corner in (0, 1, 2, 0, 2, 3):
+            vertices.append([*corners[corner] * size, shade, shade, shade])
+    return np.array(vertices, dtype="float32")
+
+
+class InstancedMesh(BaseMesh):
+    """A mesh drawing many copies of the same geometry with a single draw call,
+    e.g., entities, particles or debug cubes.
+
+    The geometry is held in a vertex buffer of `"3f 3f"` position and color
+    vertices, and the position, scale, rotation and color of every copy in a
+    second buffer whose attributes advance once per instance. The instances are
+    replaced in bulk from NumPy arrays with a single buffer write, instead of a
+    draw call and model matrix uniform writes per copy. It needs the shader
+    program compiled with `INSTANCED` defined.
+
+    Args:
+        opengl_context (moderngl.Context): The OpenGL context.
+        program (moderngl.Program): The shader program used to render the mesh.
+        vertex_data (Optional[np.ndarray]): The `"3f 3f"` vertices of the geometry
+            of an instance. Defaults to a unit cube.
+        capacity (int): The number of instances the instance buffer initially
+            has room for. It grows as needed.
+    """
+
+    def __init__(
+        self,
+        opengl_context: moderngl.Context,
+        program: moderngl.Program,
+        vertex_data: Optional[np.ndarray] = None,
+        capacity: int = 64,
+    ) -> None:
+        super().__init__(opengl_context, program)
+        self.vbo_format = "3f 3f"
+        self.attributes = ["in_position", "in_color"]
+        self.vertex_data = (
+            vertex_data if vertex_data is not None else get_cube_vertex_data()
+        )
+        self.instance_count = 0
+        self.instance_buffer = opengl_context.buffer(
+            reserve=max(capacity, 1) * INSTANCE_DTYPE.itemsize, dynamic=True
+        )
+        self.vertex_array_object = self.get_vertex_array_object()
+
+    @property
+    def capacity(self) -> int:
+        """The number of instances the instance buffer has room for."""
+        return self.instance_buffer.size // INSTANCE_DTYPE.itemsize
+
+    def get_vertex_data(self) -> np.array:
+        """Returns the vertex data of the geometry of an instance."""
+        return self.vertex_data
+
+    def create_vertex_array_object(self) -> moderngl.VertexArray:
+        """Returns a VertexArray object reading the vertices of the geometry and
+        the attributes of the instances.
+        """
+        return self.opengl_context.vertex_array(
+            self.program,
+            [
+                (self.vertex_buffer_object, self.vbo_format, *self.attributes),
+                (self.instance_buffer, INSTANCE_VBO_FORMAT, *INSTANCE_ATTRIBUTES),
+            ],
+            skip_errors=True,
+        )
+
+    def set_instances(
+        self,
+        positions: np.ndarray,
+        scales: Optional[np.ndarray] = None,
+        rotations: Optional[np.ndarray] = None,
+        colors: Optional[np.ndarray] = None,
+    ) -> None:
+        """Replaces all instances of the mesh.
+
+        Args:
+            positions (np.ndarray): The world-space positions of the instances, of
+                shape `(N, 3)`.
+            scales (Optional[np.ndarray]): The scales of the instances, of shape
+                `(N, 3)` for a scale per axis, `(N,)` for uniform scales or a
+                scalar. Defaults to 1.
+            rotations (Optional[np.ndarray]): The rotations of the instances as
+                unit quaternions in `(x, y, z, w)` order, of shape `(N, 4)`.
+                Defaults to no rotation.
+            colors (Optional[np.ndarray]): The colors of the instances, of shape
+                `(N, 3)` or `(3,)`. Defaults to white.
+        """
+        instances = np.empty(len(positions), dtype=INSTANCE_DTYPE)
+        instances["position"] = positions
+        if scales is None:
+            instances["scale"] = 1.0
+        else:
+            scales = np.asarray(scales)
+            instances["scale"] = scales[:, None] if scales.ndim == 1 else scales
+        instances["rotation"] = (0.0, 0.0, 0.0, 1.0) if rotations is None else rotations
+        instances["color"] = 1.0 if colors is None else colors
+        self.write_instances(instances)
+
+    def write_instances(self, instances: np.ndarray) -> None:
+        """Replaces all instances of the mesh with an array of `INSTANCE_DTYPE`,
+        with a single buffer write.
+
+        The instance buffer is orphaned before it is written, so that the driver
+        hands out fresh storage instead of waiting for the draws of the previous
+        frame to finish reading it. It doubles in size when the instances do not
+        fit. Orphaning keeps the buffer object, so the vertex array object stays
+        valid.
+        """
+        assert instances.dtype == INSTANCE_DTYPE, "Instances must be INSTANCE_DTYPE."
+        capacity = self.capacity
+        while capacity < len(instances):
+            capacity *= 2
+        self.instance_buffer.orphan(capacity * INSTANCE_DTYPE.itemsize)
+        if len(instances):
+            self.instance_buffer.write(np.ascontiguousarray(instances))
+        self.instance_count = len(instances)
+
+    def render(self):
+        """Renders all instances of the mesh with a single draw call."""
+        if self.instance_count == 0:
+            return
+        self.vertex_array_object.render(instances=self.instance_count)
+
+    def release(self):
+        """Releases the OpenGL objects owned by the mesh."""
+        super().release()
+        if self.instance_buffer is not None:
+            self.instance_buffer.release()
+            self.instance_buffer = None
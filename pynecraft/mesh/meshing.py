@@ -0,0 +1,582 @@
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from ..world.blocks import BLOCK_COLORS, BLOCK_IS_OPAQUE, BLOCK_IS_TRANSLUCENT
+from ..world.lighting import (
+    BLOCK_LIGHT_MASK,
+    FULL_SKY_LIGHT,
+    LIGHT_LEVEL_BRIGHTNESS,
+    SKY_LIGHT_SHIFT,
+)
+
+# The outward normal of each of the six faces of a voxel. The index of a face in
+# this array is used as the face (or normal) index throughout the mesher.
+FACE_NORMALS = np.array(
+    [(1, 0, 0), (-1, 0, 0), (0, 1, 0), (0, -1, 0), (0, 0, 1), (0, 0, -1)],
+    dtype="int32",
+)
+
+# For each face, the axis the face is perpendicular to followed by the two axes
+# spanning the face. The spanning axes are ordered such that `u x v` points along
+# the positive direction of the normal axis, which keeps the winding order of the
+# emitted triangles consistent.
+FACE_AXES = np.array(
+    [(0, 1, 2), (0, 1, 2), (1, 2, 0), (1, 2, 0), (2, 0, 1), (2, 0, 1)],
+    dtype="int64",
+)
+
+# A constant brightness per face, which gives a cheap directional shading so that
+# neighbouring faces of the same block remain distinguishable.
+FACE_SHADES = np.array([0.8, 0.8, 1.0, 0.5, 0.65, 0.65], dtype="float32")
+
+# The columns of the quad array returned by `greedy_mesh`.
+(
+    QUAD_FACE,
+    QUAD_DEPTH,
+    QUAD_U,
+    QUAD_V,
+    QUAD_DU,
+    QUAD_DV,
+    QUAD_BLOCK,
+    QUAD_LIGHT,
+    QUAD_AMBIENT_OCCLUSION,
+) = range(9)
+
+# The bit layout of the packed vertex format, in which every vertex is stored as
+# two `uint32` words. The first word holds the chunk-local position, the face
+# (normal) index, the ambient occlusion level, the sky light and the block light,
+# the second word holds the block ID used to look up the colour of the vertex and
+# the texture layer of the block above it. The unused high bit of the first word
+# is reserved and must be zero.
+PACKED_POSITION_BITS = 6
+PACKED_NORMAL_SHIFT = 18
+PACKED_AMBIENT_OCCLUSION_SHIFT = 21
+PACKED_SKY_LIGHT_SHIFT = 23
+PACKED_BLOCK_LIGHT_SHIFT = 27
+PACKED_BLOCK_BITS = 16
+
+# The ambient occlusion level written for vertices that are not occluded.
+MAX_AMBIENT_OCCLUSION = 3
+
+# The brightness of each ambient occlusion level, from a corner enclosed by blocks
+# to an unoccluded one, matching the vertex shader.
+AMBIENT_OCCLUSION_SHADES = np.array([0.5, 0.7, 0.85, 1.0], dtype="float32")
+
+# The ambient occlusion of the four corners of a quad, with two bits per corner in
+# the order of `get_quad_corners`, when none of them is occluded.
+UNOCCLUDED_CORNERS = 0b11111111
+
+# The offsets along the two axes spanning a face, from the voxel in front of the
+# face, of the two side voxels and the corner voxel that occlude each corner of
+# the face, in the order of `get_quad_corners`.
+_AMBIENT_OCCLUSION_OFFSETS = [
+    ((-1, 0), (0, -1), (-1, -1)),
+    ((1, 0), (0, -1), (1, -1)),
+    ((1, 0), (0, 1), (1, 1)),
+    ((-1, 0), (0, 1), (-1, 1)),
+]
+
+# The bits of a merge key of `greedy_mesh` above the block ID, holding the light
+# and the ambient occlusion of a face, and the bits above them, which tell apart
+# faces that must not be merged with each other.
+_KEY_LIGHT_SHIFT = 16
+_KEY_AMBIENT_OCCLUSION_SHIFT = 24
+_KEY_GROUP_SHIFT = 32
+
+# The order in which the four corners of a quad are emitted as two triangles,
+# for faces pointing along the positive and negative direction of their axis.
+_POSITIVE_TRIANGLE_ORDER = np.array([0, 1, 2, 0, 2, 3])
+_NEGATIVE_TRIANGLE_ORDER = np.array([0, 2, 1, 0, 3, 2])
+
+# The order in which the four corners of a quad are emitted as indexed vertices,
+# so that the shared index pattern returned by `get_quad_index_data` winds the
+# triangles counter-clockwise for faces of both directions.
+_POSITIVE_CORNER_ORDER = np.array([0, 1, 2, 3])
+_NEGATIVE_CORNER_ORDER = np.array([0, 3, 2, 1])
+_QUAD_INDEX_PATTERN = np.array([0, 1, 2, 0, 2, 3], dtype="uint32")
+
+
+def get_visible_faces(padded_blocks: np.ndarray) -> List[np.ndarray]:
+    """Performs hidden-face culling on a chunk.
+
+    A face is hidden by an opaque neighbour or by a neighbour of the same block
+    type, so that the faces of a block are visible through translucent blocks,
+    while no faces are emitted between two voxels of water.
+
+    Args:
+        padded_blocks (np.ndarray): The block IDs of the chunk surrounded by a one
+            voxel thick border taken from the neighbouring chunks, i.e., an array
+            of shape `(size + 2, size + 2, size + 2)`.
+
+    Returns:
+        List[np.ndarray]: For each of the six faces, an array of shape
+            `(size, size, size)` holding the block ID of every voxel whose face
+            is exposed and `0` everywhere else.
+    """
+    interior = (slice(1, -1),) * 3
+    blocks = padded_blocks[interior]
+    solid = blocks != 0
+    is_see_through = ~BLOCK_IS_OPAQUE[padded_blocks]
+    visible_faces = []
+    for normal in FACE_NORMALS:
+        neighbour_slices = tuple(
+            slice(1 + offset, padded_blocks.shape[axis] - 1 + offset)
+            for axis, offset in enumerate(normal)
+        )
+        exposed = (
+            solid
+            & is_see_through[neighbour_slices]
+            & (padded_blocks[neighbour_slices] != blocks)
+        )
+        visible_faces.append(np.where(exposed, blocks, 0))
+    return visible_faces
+
+
+def _merge_faces(faces: np.ndarray) -> np.ndarray:
+    """Greedily merges the visible faces of one face direction into rectangles.
+
+    Faces are first merged into runs along the last axis, then runs that share
+    the same start, length and key on consecutive rows are stacked on top of each
+    other. Both passes are expressed as array operations over every slice at once.
+
+    Args:
+        faces (np.ndarray): An array of shape `(depth, rows, columns)` that holds
+            a non-zero merge key for every visible face and `0` everywhere else.
+
+    Returns:
+        np.ndarray: An array of shape `(n, 6)` holding the depth, row, column,
+            height, width and key of every merged rectangle.
+    """
+    depth, rows, columns = faces.shape
+    padded = np.zeros((depth * rows, columns + 2), dtype=faces.dtype)
+    padded[:, 1:-1] = faces.reshape(depth * rows, columns)
+
+    # Every change of value along a row marks the end of a run and the start of
+    # the next. A non-zero run is always followed by a boundary on the same row
+    # because rows are padded with zeros on both sides.
+    boundary_rows, boundary_columns = np.nonzero(padded[:, 1:] != padded[:, :-1])
+    boundary_values = padded[boundary_rows, boundary_columns + 1]
+    run_starts = np.flatnonzero(boundary_values != 0)
+    run_rows = boundary_rows[run_starts]
+    run_columns = boundary_columns[run_starts]
+    run_lengths = boundary_columns[run_starts + 1] - run_columns
+    run_keys = boundary_values[run_starts]
+    run_depths, run_rows = np.divmod(run_rows, rows)
+    if not len(run_keys):
+        return np.zeros((0, 6), dtype="int64")
+
+    # Sort runs so that identical runs on consecutive rows become neighbours,
+    # then start a new rectangle wherever a run cannot extend the previous one.
+    order = np.lexsort((run_rows, run_keys, run_lengths, run_columns, run_depths))
+    run_depths, run_rows = run_depths[order], run_rows[order]
+    run_columns, run_lengths = run_columns[order], run_lengths[order]
+    run_keys = run_keys[order]
+    extends_previous = (
+        (run_depths[1:] == run_depths[:-1])
+        & (run_columns[1:] == run_columns[:-1])
+        & (run_lengths[1:] == run_lengths[:-1])
+        & (run_keys[1:] == run_keys[:-1])
+        & (run_rows[1:] == run_rows[:-1] + 1)
+    )
+    rectangle_starts = np.flatnonzero(np.concatenate([[True], ~extends_previous]))
+    heights = np.diff(np.append(rectangle_starts, len(run_keys)))
+    return np.stack(
+        [
+            run_depths[rectangle_starts],
+            run_rows[rectangle_starts],
+            run_columns[rectangle_starts],
+            heights,
+            run_lengths[rectangle_starts],
+            run_keys[rectangle_starts],
+        ],
+        axis=1,
+    ).astype("int64")
+
+
+def get_ambient_occlusion(
+    padded_blocks: np.ndarray, face: int, voxels: np.ndarray
+) -> np.ndarray:
+    """Computes the ambient occlusion of the four corners of one face of voxels of
+    a chunk, from the blocks next to the voxel in front of the face.
+
+    A corner is darker the more of its two side voxels and its corner voxel are
+    blocks, and fully dark if both side voxels are, since the corner voxel is then
+    hidden.
+
+    Args:
+        padded_blocks (np.ndarray): The block IDs of the chunk surrounded by a one
+            voxel thick border taken from the neighbouring chunks.
+        face (int): The index of the face.
+        voxels (np.ndarray): The flat indices of the voxels into the chunk without
+            its border.
+
+    Returns:
+        np.ndarray: The levels of the four corners of the face of every voxel,
+            packed into two bits per corner in the order of `get_quad_corners`.
+    """
+    padded_shape = np.asarray(padded_blocks.shape)
+    strides = np.array([padded_shape[1] * padded_shape[2], padded_shape[2], 1])
+    is_occluding = (padded_blocks != 0).reshape(-1)
+    _, u_axis, v_axis = FACE_AXES[face]
+    positions = np.stack(np.unravel_index(voxels, tuple(padded_shape - 2)), axis=1)
+    fronts = (positions + 1 + FACE_NORMALS[face]) @ strides
+
+    def is_occluded(u_offset: int, v_offset: int) -> np.ndarray:
+        offset = u_offset * strides[u_axis] + v_offset * strides[v_axis]
+        return is_occluding[fronts + offset].astype("int64")
+
+    corners = np.zeros(len(voxels), dtype="int64")
+    for corner, (side_a, side_b, diagonal) in enumerate(_AMBIENT_OCCLUSION_OFFSETS):
+        is_side_a, is_side_b = is_occluded(*side_a), is_occluded(*side_b)
+        level = np.where(
+            is_side_a & is_side_b,
+            0,
+            MAX_AMBIENT_OCCLUSION - is_side_a - is_side_b - is_occluded(*diagonal),
+        )
+        corners |= level << (2 * corner)
+    return corners
+
+
+def _get_merge_group(
+    corners: np.ndarray, face: int, voxels: np.ndarray, shape: Tuple[int, int, int]
+) -> np.ndarray:
+    """Returns the group of faces that each face may be merged with given the
+    ambient occlusion of its corners. Faces whose corners are uniform may be merged
+    with any face, faces whose corners only vary along one of the axes spanning
+    the face only with the faces on the same line along the other axis, and all
+    other faces with none.
+    """
+    levels = [corners >> (2 * corner) & 3 for corner in range(4)]
+    is_constant_along_u = (levels[0] == levels[1]) & (levels[3] == levels[2])
+    is_constant_along_v = (levels[0] == levels[3]) & (levels[1] == levels[2])
+    positions = np.unravel_index(voxels, shape)
+    _, u_axis, v_axis = FACE_AXES[face]
+    return np.select(
+        [
+            is_constant_along_u & is_constant_along_v,
+            is_constant_along_u,
+            is_constant_along_v,
+        ],
+        [0, positions[v_axis] + 1, positions[u_axis] + 1],
+        voxels + 1,
+    )
+
+
+def greedy_mesh(
+    padded_blocks: np.ndarray,
+    padded_light: Optional[np.ndarray] = None,
+    ambient_occlusion: bool = False,
+) -> np.ndarray:
+    """Builds the quads of a chunk by culling hidden faces and greedily merging
+    adjacent coplanar faces of the same block type into larger rectangles.
+
+    With light or ambient occlusion, only faces that also have the same light and
+    the same ambient occlusion are merged. The ambient occlusion of a merged quad
+    is interpolated across it, so faces whose corners differ are only merged
+    along the axis their ambient occlusion does not vary along, if any, which
+    keeps the interpolation exact.
+
+    Args:
+        padded_blocks (np.ndarray): The block IDs of the chunk surrounded by a one
+            voxel thick border taken from the neighbouring chunks.
+        padded_light (Optional[np.ndarray]): The packed light of the chunk and of
+            its border. Every face is lit by the voxel in front of it. If not
+            provided, every face is fully lit by the sky.
+        ambient_occlusion (bool): Whether to compute the ambient occlusion of the
+            corners of the faces. Otherwise no corner is occluded.
+
+    Returns:
+        np.ndarray: An integer array of shape `(n, 9)`, one row per quad, whose
+            columns are indexed by the `QUAD_*` constants: the face index, the
+            position of the face along its normal axis, the lower corner and the
+            extents of the quad along the two spanning axes, the block ID, the
+            packed light and the ambient occlusion of the four corners. The
+            quads of translucent blocks come after all the opaque quads.
+    """
+    is_shaded = padded_light is not None or ambient_occlusion
+    quads = []
+    for face, visible_faces in enumerate(get_visible_faces(padded_blocks)):
+        keys = visible_faces
+        if is_shaded:
+            # Faces are merged by a key made of their block ID, light and ambient
+            # occlusion, which is only computed for the visible faces.
+            voxels = np.flatnonzero(visible_faces)
+            face_keys = visible_faces.reshape(-1)[voxels].astype("int64")
+            if padded_light is not None:
+                normal = FACE_NORMALS[face]
+                front_light = padded_light[
+                    tuple(
+                        slice(1 + offset, padded_light.shape[axis] - 1 + offset)
+                        for axis, offset in enumerate(normal)
+                    )
+                ]
+                face_light = front_light.reshape(-1)[voxels].astype("int64")
+            else:
+                face_light = FULL_SKY_LIGHT
+            face_keys |= face_light << _KEY_LIGHT_SHIFT
+            if ambient_occlusion:
+                corners = get_ambient_occlusion(padded_blocks, face, voxels)
+                face_keys |= corners << _KEY_AMBIENT_OCCLUSION_SHIFT
+                face_keys |= (
+                    _get_merge_group(corners, face, voxels, visible_faces.shape)
+                    << _KEY_GROUP_SHIFT
+                )
+            else:
+                face_keys |= UNOCCLUDED_CORNERS << _KEY_AMBIENT_OCCLUSION_SHIFT
+            keys = np.zeros(visible_faces.shape, dtype="int64")
+            keys.reshape(-1)[voxels] = face_keys
+
+        rectangles = _merge_faces(keys.transpose(FACE_AXES[face]))
+        merged_keys = rectangles[:, -1]
+        if is_shaded:
+            attributes = [
+                merged_keys & ((1 << _KEY_LIGHT_SHIFT) - 1),
+                merged_keys >> _KEY_LIGHT_SHIFT & 0xFF,
+                merged_keys >> _KEY_AMBIENT_OCCLUSION_SHIFT & 0xFF,
+            ]
+        else:
+            attributes = [
+                merged_keys,
+                np.full(len(merged_keys), FULL_SKY_LIGHT),
+                np.full(len(merged_keys), UNOCCLUDED_CORNERS),
+            ]
+        face_column = np.full(len(rectangles), face, dtype="int64")
+        quads.append(
+            np.column_stack([face_column, rectangles[:, :-1], *attributes]).astype(
+                "int64"
+            )
+        )
+    quads = np.concatenate(quads)
+    is_translucent = BLOCK_IS_TRANSLUCENT[quads[:, QUAD_BLOCK]]
+    if not is_translucent.any():
+        return quads
+    return quads[np.argsort(is_translucent, kind="stable")]
+
+
+def get_quad_corners(quads: np.ndarray) -> np.ndarray:
+    """Returns the chunk-local positions of the four corners of every quad, in
+    counter-clockwise order around the axis the quad is perpendicular to.
+
+    Args:
+        quads (np.ndarray): The quads returned by `greedy_mesh`.
+
+    Returns:
+        np.ndarray: An integer array of shape `(n, 4, 3)`.
+    """
+    faces = quads[:, QUAD_FACE]
+    u, v = quads[:, QUAD_U], quads[:, QUAD_V]
+    u_end, v_end = u + quads[:, QUAD_DU], v + quads[:, QUAD_DV]
+    # Faces pointing along the positive direction of their axis lie on the far
+    # side of the voxel.
+    plane = quads[:, QUAD_DEPTH] + (FACE_NORMALS[faces].sum(axis=1) > 0)
+
+    corners = np.empty((len(quads), 4, 3), dtype="int64")
+    rows = np.arange(len(quads))[:, None]
+    corner_indices = np.arange(4)[None, :]
+    axes = FACE_AXES[faces]
+    corners[rows, corner_indices, axes[:, :1]] = plane[:, None]
+    corners[rows, corner_indices, axes[:, 1:2]] = np.stack([u, u_end, u_end, u], 1)
+    corners[rows, corner_indices, axes[:, 2:]] = np.stack([v, v, v_end, v_end], 1)
+    return corners
+
+
+def get_corner_ambient_occlusion(quads: np.ndarray) -> np.ndarray:
+    """Returns the ambient occlusion level of the four corners of every quad, in
+    the order of `get_quad_corners`, as an integer array of shape `(n, 4)`.
+    """
+    shifts = 2 * np.arange(4)
+    return quads[:, QUAD_AMBIENT_OCCLUSION, None] >> shifts & MAX_AMBIENT_OCCLUSION
+
+
+def get_flipped_quads(corner_ambient_occlusion: np.ndarray) -> np.ndarray:
+    """Returns whether the diagonal along which each quad is split into two
+    triangles must run between its corners `1` and `3` rather than `0` and `2`.
+
+    The ambient occlusion of a corner is interpolated across both triangles that
+    share it, so the diagonal is chosen to avoid the darker corners, which keeps
+    the shading symmetric around them.
+    """
+    corners = corner_ambient_occlusion
+    return corners[:, 0] + corners[:, 2] < corners[:, 1] + corners[:, 3]
+
+
+def get_vertex_brightness(quads: np.ndarray, corner_order: np.ndarray) -> np.ndarray:
+    """Returns the brightness of the vertices of every quad, from its face, its
+    light and the ambient occlusion of the corners each vertex is placed at.
+
+    Args:
+        quads (np.ndarray): The quads returned by `greedy_mesh`.
+        corner_order (np.ndarray): The index of the corner of every vertex of
+            every quad, as an integer array of shape `(n, vertices per quad)`.
+
+    Returns:
+        np.ndarray: A `float32` array of the shape of `corner_order`.
+    """
+    light = quads[:, QUAD_LIGHT]
+    level = np.maximum(light >> SKY_LIGHT_SHIFT, light & BLOCK_LIGHT_MASK)
+    brightness = FACE_SHADES[quads[:, QUAD_FACE]] * LIGHT_LEVEL_BRIGHTNESS[level]
+    corner_ambient_occlusion = np.take_along_axis(
+        get_corner_ambient_occlusion(quads), corner_order, axis=1
+    )
+    return brightness[:, None] * AMBIENT_OCCLUSION_SHADES[corner_ambient_occlusion]
+
+
+def get_triangle_order(quads: np.ndarray) -> np.ndarray:
+    """Returns the index of the corner of every vertex of the two triangles of
+    every quad, as an integer array of shape `(n, 6)`.
+    """
+    is_positive = FACE_NORMALS[quads[:, QUAD_FACE]].sum(axis=1) > 0
+    order = np.where(
+        is_positive[:, None], _POSITIVE_TRIANGLE_ORDER, _NEGATIVE_TRIANGLE_ORDER
+    )
+    # Moving every vertex to the next corner keeps the winding order and splits
+    # the quad along its other diagonal.
+    is_flipped = get_flipped_quads(get_corner_ambient_occlusion(quads))
+    return (order + is_flipped[:, None]) % 4
+
+
+def get_triangle_corners(quads: np.ndarray) -> np.ndarray:
+    """Returns the chunk-local positions of the vertices of the two triangles of
+    every quad, wound counter-clockwise when seen from outside the voxel.
+
+    Args:
+        quads (np.ndarray): The quads returned by `greedy_mesh`.
+
+    Returns:
+        np.ndarray: An integer array of shape `(n, 6, 3)`.
+    """
+    order = get_triangle_order(quads)
+    return np.take_along_axis(get_quad_corners(quads), order[:, :, None], axis=1)
+
+
+def build_vertex_data(
+    quads: np.ndarray, origin=(0, 0, 0), scale: int = 1
+) -> np.ndarray:
+    """Builds interleaved `"3f 3f"` vertex data of positions and colours from the
+    quads of a chunk, with the light and the ambient occlusion of every vertex
+    baked into its colour.
+
+    Args:
+        quads (np.ndarray): The quads returned by `greedy_mesh`.
+        origin (Tuple[int, int, int]): The world coordinate of the chunk's first
+            voxel, which is added to every vertex position.
+        scale (int): The size in world voxels of a voxel of the chunk, which is
+            larger than `1` for the downsampled grids of distant terrain.
+
+    Returns:
+        np.ndarray: A `float32` array of shape `(6 * n, 6)`.
+    """
+    order = get_triangle_order(quads)
+    corners = np.take_along_axis(get_quad_corners(quads), order[:, :, None], axis=1)
+    positions = corners * scale + np.asarray(origin)
+    colors = (
+        BLOCK_COLORS[quads[:, QUAD_BLOCK], None, :]
+        * get_vertex_brightness(quads, order)[:, :, None]
+    )
+    return np.concatenate([positions, colors], axis=2, dtype="float32").reshape(-1, 6)
+
+
+def build_packed_vertex_data(
+    quads: np.ndarray, block_layers: Optional[np.ndarray] = None
+) -> np.ndarray:
+    """Builds `"2u"` packed vertex data from the quads of a chunk, with the light
+    and the ambient occlusion of every vertex. Every quad is emitted as four
+    vertices of 8 bytes each, which are meant to be drawn with the shared index
+    pattern returned by `get_quad_index_data`. Compared to the 6 vertices of 24
+    bytes each emitted per quad by `build_vertex_data`, this cuts the size of the
+    vertex data by 4.5x.
+
+    Positions are local to the chunk, so the chunk size must not exceed
+    `2 ** PACKED_POSITION_BITS - 1` voxels.
+
+    Args:
+        quads (np.ndarray): The quads returned by `greedy_mesh`.
+        block_layers (Optional[np.ndarray]): The texture layer of every block ID,
+            such as `BlockTextureAtlas.block_layers`. The texture layer of every
+            vertex is `0` if it is not provided.
+
+    Returns:
+        np.ndarray: A `uint32` array of shape `(4 * n, 2)`.
+    """
+    is_positive = FACE_NORMALS[quads[:, QUAD_FACE]].sum(axis=1) > 0
+    order = np.where(
+        is_positive[:, None], _POSITIVE_CORNER_ORDER, _NEGATIVE_CORNER_ORDER
+    )
+    # Starting from the next corner keeps the winding order and splits the quad
+    # along its other diagonal.
+    corner_ambient_occlusion = get_corner_ambient_occlusion(quads)
+    is_flipped = get_flipped_quads(corner_ambient_occlusion)
+    order = np.where(is_flipped[:, None], order[:, [1, 2, 3, 0]], order)
+    corners = np.take_along_axis(get_quad_corners(quads), order[:, :, None], axis=1)
+    assert not len(corners) or corners.max() < 1 << PACKED_POSITION_BITS, (
+        "Packed vertices hold chunks of at most "
+        f"{(1 << PACKED_POSITION_BITS) - 1} voxels per edge."
+    )
+    corners = corners.astype("uint32")
+    ambient_occlusion = np.take_along_axis(corner_ambient_occlusion, order, axis=1)
+    light = quads[:, QUAD_LIGHT, None].astype("uint32")
+
+    geometry = (
+        corners[:, :, 0]
+        | (corners[:, :, 1] << PACKED_POSITION_BITS)
+        | (corners[:, :, 2] << (2 * PACKED_POSITION_BITS))
+        | (quads[:, QUAD_FACE, None].astype("uint32") << PACKED_NORMAL_SHIFT)
+        | (ambient_occlusion.astype("uint32") << PACKED_AMBIENT_OCCLUSION_SHIFT)
+        | ((light >> SKY_LIGHT_SHIFT) << PACKED_SKY_LIGHT_SHIFT)
+        | ((light & BLOCK_LIGHT_MASK) << PACKED_BLOCK_LIGHT_SHIFT)
+    )
+    materials = quads[:, QUAD_BLOCK].astype("uint32")
+    if block_layers is not None:
+        materials |= block_layers[quads[:, QUAD_BLOCK]].astype("uint32") << np.uint32(
+            PACKED_BLOCK_BITS
+        )
+    materials = np.broadcast_to(materials[:, None], geometry.shape)
+    return np.stack([geometry, materials], axis=2).reshape(-1, 2)
+
+
+def get_quad_index_data(quad_count: int) -> np.ndarray:
+    """Returns the indices that draw `quad_count` quads of four vertices each as
+    pairs of triangles. The pattern only depends on the number of quads, so a
+    single index buffer can be shared by every mesh built with
+    `build_packed_vertex_data`.
+
+    Args:
+        quad_count (int): The number of quads.
+
+    Returns:
+        np.ndarray: A `uint32` array of shape `(6 * quad_count,)`.
+    """
+    first_vertices = np.arange(quad_count, dtype="uint32")[:, None] * 4
+    return (first_vertices + _QUAD_INDEX_PATTERN).reshape(-1)
+
+
+def get_translucent_quad_count(packed_vertex_data: np.ndarray) -> int:
+    """Returns the number of quads of translucent blocks at the end of packed
+    vertex data built by `build_packed_vertex_data` from the quads returned by
+    `greedy_mesh`.
+
+    Args:
+        packed_vertex_data (np.ndarray): A `uint32` array of shape `(4 * n, 2)`.
+
+    Returns:
+        int: The number of translucent quads.
+    """
+    block_ids = packed_vertex_data[::4, 1] & ((1 << PACKED_BLOCK_BITS) - 1)
+    return int(np.count_nonzero(BLOCK_IS_TRANSLUCENT[block_ids]))
+
+
+def get_packed_quad_centers(packed_vertex_data: np.ndarray) -> np.ndarray:
+    """Returns the chunk-local centers of the quads of packed vertex data, e.g.,
+    to sort translucent quads by their distance to the camera.
+
+    Args:
+        packed_vertex_data (np.ndarray): A `uint32` array of shape `(4 * n, 2)`.
+
+    Returns:
+        np.ndarray: A `float32` array of shape `(n, 3)`.
+    """
+    geometry = packed_vertex_data[:, 0].reshape(-1, 4, 1)
+    shifts = np.arange(3, dtype="uint32") * PACKED_POSITION_BITS
+    corners = (geometry >> shifts) & ((1 << PACKED_POSITION_BITS) - 1)
+    return corners.mean(axis=1, dtype="float32")
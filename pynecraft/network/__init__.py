@@ -0,0 +1,4 @@
+from .client import AsyncChunkClient, ChunkClient, RemoteChunkStreamer
+from .server import ChunkServer
+
+__all__ = ["AsyncChunkClient", "ChunkClient", "ChunkServer", "RemoteChunkStreamer"]
@@ -0,0 +1,428 @@
+import asyncio
+import itertools
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, wait
+from typing import Deque, Dict, Optional, Set, Tuple
+
+import glm
+import numpy as np
+
+from ..jobs import ChunkJobSystem
+from ..scene import Scene
+from ..streaming import ChunkStreamer
+from ..world import World
+from .protocol import (
+    ACK_BODY,
+    EDIT_BODY,
+    HELLO_BODY,
+    POSITION_BODY,
+    WELCOME_BODY,
+    BlockPosition,
+    ChunkPosition,
+    MessageType,
+    ProtocolError,
+    decode_chunk,
+    decode_delta,
+    open_connection,
+    read_message,
+    unpack_body,
+    write_message,
+)
+
+
+class AsyncChunkClient:
+    """The connection of a client to a `ChunkServer`, running on an asyncio event
+    loop.
+
+    The received chunks are decompressed as they arrive and queued along with the
+    received edits, in the order the server sent them, until they are taken out
+    with `pop_message`. Every chunk taken out must be acknowledged, since the
+    server sends at most `max_chunks_in_flight` chunks ahead of the
+    acknowledgements.
+
+    Args:
+        address (str): The address of the server, `<host>:<port>` for TCP or
+            `unix:<path>` for a Unix domain socket.
+        max_chunks_in_flight (int): The number of chunks the server may send
+            before they are acknowledged.
+    """
+
+    def __init__(self, address: str, max_chunks_in_flight: int = 32) -> None:
+        self.address = address
+        self.max_chunks_in_flight = max_chunks_in_flight
+        self.reader: Optional[asyncio.StreamReader] = None
+        self.writer: Optional[asyncio.StreamWriter] = None
+        self.chunk_size = 0
+        self.chunk_y_range = (0, 0)
+        # The received messages, as `(MessageType.CHUNK, (chunk_position,
+        # padded_blocks))` or `(MessageType.DELTA, edits)` pairs.
+        self.messages: Deque[Tuple[MessageType, object]] = deque()
+        self.message_event = asyncio.Event()
+        self.receive_task: Optional[asyncio.Task] = None
+
+        self.bytes_received = 0
+        self.chunks_received = 0
+        self.chunk_bytes_received = 0
+        self.deltas_received = 0
+        self.delta_bytes_received = 0
+
+    async def connect(self) -> None:
+        """Opens the connection and waits for the server to describe its chunks."""
+        self.reader, self.writer = await open_connection(self.address)
+        write_message(
+            self.writer, MessageType.HELLO, HELLO_BODY.pack(self.max_chunks_in_flight)
+        )
+        message_type, body = await read_message(self.reader)
+        if message_type != MessageType.WELCOME:
+            self.writer.close()
+            raise ProtocolError(f"Expected WELCOME, got {message_type.name}.")
+        self.bytes_received += len(body)
+        chunk_size, itemsize, *chunk_y_range = unpack_body(
+            message_type, WELCOME_BODY, body
+        )
+        self.chunk_size = chunk_size
+        self.chunk_y_range = tuple(chunk_y_range)
+        self.receive_task = asyncio.create_task(self.receive_loop())
+
+    async def close(self) -> None:
+        """Closes the connection."""
+        if self.receive_task is not None:
+            self.receive_task.cancel()
+        if self.writer is not None:
+            self.writer.close()
+            try:
+                await self.writer.wait_closed()
+            except ConnectionError:
+                pass
+
+    async def receive_loop(self) -> None:
+        """Decodes and queues the messages of the server until it disconnects."""
+        try:
+            while True:
+                message_type, body = await read_message(self.reader)
+                self.bytes_received += len(body)
+                if message_type == MessageType.CHUNK:
+                    self.messages.append(
+                        (message_type, decode_chunk(body, self.chunk_size))
+                    )
+                    self.chunks_received += 1
+                    self.chunk_bytes_received += len(body)
+                elif message_type == MessageType.DELTA:
+                    self.messages.append((message_type, decode_delta(body)))
+                    self.deltas_received += 1
+                    self.delta_bytes_received += len(body)
+                self.message_event.set()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+
+    async def wait_for_message(self) -> None:
+        """Waits until a message was received since the queue was last emptied."""
+        while not self.messages:
+            self.message_event.clear()
+            await self.message_event.wait()
+
+    def pop_message(self) -> Optional[Tuple[MessageType, object]]:
+        """Takes the oldest received message out of the queue, or returns `None`."""
+        return self.messages.popleft() if self.messages else None
+
+    def send_position(
+        self, position: Tuple[float, float, float], render_distance: int
+    ) -> None:
+        """Reports the position of the camera and the render distance."""
+        write_message(
+            self.writer,
+            MessageType.POSITION,
+            POSITION_BODY.pack(*position, render_distance),
+        )
+
+    def acknowledge(self, chunk_position: ChunkPosition, is_kept: bool) -> None:
+        """Acknowledges a chunk taken out of the queue, telling whether it was
+        kept or dropped because the camera moved away.
+        """
+        write_message(
+            self.writer, MessageType.ACK, ACK_BODY.pack(*chunk_position, is_kept)
+        )
+
+    def send_edit(self, block_position: BlockPosition, block_id: int) -> None:
+        """Sends a block edit to the server."""
+        write_message(
+            self.writer, MessageType.EDIT, EDIT_BODY.pack(*block_position, block_id)
+        )
+
+
+class ChunkClient:
+    """Runs an `AsyncChunkClient` on an event loop in a background thread, so that
+    chunks are received and decompressed while the frame loop runs.
+
+    Messages are sent from the thread calling the methods of the client by
+    scheduling them on the event loop.
+
+    Args:
+        address (str): The address of the server, `<host>:<port>` for TCP or
+            `unix:<path>` for a Unix domain socket.
+        max_chunks_in_flight (int): The number of chunks the server may send
+            before they are acknowledged.
+        timeout (float): The time in seconds to wait for the connection.
+    """
+
+    def __init__(
+        self, address: str, max_chunks_in_flight: int = 32, timeout: float = 10.0
+    ) -> None:
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(
+            target=self.loop.run_forever, name="chunk-client", daemon=True
+        )
+        self.thread.start()
+        self.client = self.run(
+            self._connect(address, max_chunks_in_flight), timeout=timeout
+        )
+
+    @staticmethod
+    async def _connect(address: str, max_chunks_in_flight: int) -> AsyncChunkClient:
+        client = AsyncChunkClient(address, max_chunks_in_flight)
+        await client.connect()
+        return client
+
+    def run(self, coroutine, timeout: Optional[float] = None):
+        """Runs a coroutine on the event loop and waits for its result."""
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop).result(timeout)
+
+    @property
+    def chunk_size(self) -> int:
+        """The number of voxels along each edge of the chunks of the server."""
+        return self.client.chunk_size
+
+    @property
+    def chunk_y_range(self) -> Tuple[int, int]:
+        """The lowest and highest chunk `y` coordinate that may contain blocks."""
+        return self.client.chunk_y_range
+
+    @property
+    def bytes_received(self) -> int:
+        """The number of bytes received from the server."""
+        return self.client.bytes_received
+
+    def __len__(self) -> int:
+        """The number of received messages not taken out of the queue yet."""
+        return len(self.client.messages)
+
+    def pop_message(self) -> Optional[Tuple[MessageType, object]]:
+        """Takes the oldest received message out of the queue, or returns `None`."""
+        return self.client.pop_message()
+
+    def wait(self, timeout: Optional[float] = None) -> None:
+        """Blocks until a message is received or `timeout` seconds expire."""
+        future = asyncio.run_coroutine_threadsafe(
+            self.client.wait_for_message(), self.loop
+        )
+        try:
+            future.result(timeout)
+        except TimeoutError:
+            future.cancel()
+
+    def send_position(
+        self, position: Tuple[float, float, float], render_distance: int
+    ) -> None:
+        """Reports the position of the camera and the render distance."""
+        self.loop.call_soon_threadsafe(
+            self.client.send_position, tuple(position), render_distance
+        )
+
+    def acknowledge(self, chunk_position: ChunkPosition, is_kept: bool) -> None:
+        """Acknowledges a chunk taken out of the queue."""
+        self.loop.call_soon_threadsafe(self.client.acknowledge, chunk_position, is_kept)
+
+    def send_edit(self, block_position: BlockPosition, block_id: int) -> None:
+        """Sends a block edit to the server."""
+        self.loop.call_soon_threadsafe(
+            self.client.send_edit, tuple(block_position), int(block_id)
+        )
+
+    def close(self) -> None:
+        """Closes the connection and stops the event loop."""
+        self.run(self.client.close(), timeout=1.0)
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+        self.loop.close()
+
+
+class RemoteChunkStreamer(ChunkStreamer):
+    """Keeps the chunks within the render distance of the player loaded by
+    streaming them from a `ChunkServer` instead of generating them.
+
+    The server is told the position of the player whenever it moves to another
+    chunk and sends the chunks in range, nearest first, with a border of one
+    voxel, so that every chunk is meshed once by the job system as it arrives
+    instead of once more when its neighbours arrive. The received chunks count as
+    unmodified, since the server owns the world, and are lit by the sky. Edits
+    of the server are applied in the order they were received along with the
+    chunks.
+
+    Args:
+        world (World): The world the chunks are loaded into.
+        scene (Scene): The scene the chunk meshes are added to.
+        job_system (ChunkJobSystem): The job system that meshes the chunks.
+        client (ChunkClient): The connection to the server.
+        render_distance (int): The distance in chunks up to which chunks are
+            loaded.
+    """
+
+    def __init__(
+        self,
+        world: World,
+        scene: Scene,
+        job_system: ChunkJobSystem,
+        client: ChunkClient,
+        render_distance: int,
+    ) -> None:
+        assert (
+            client.chunk_size == world.chunk_size
+        ), f"The server has chunks of size {client.chunk_size}, not {world.chunk_size}."
+        super().__init__(
+            world=world,
+            scene=scene,
+            job_system=job_system,
+            render_distance=render_distance,
+            height_range=(
+                client.chunk_y_range[0] * world.chunk_size,
+                client.chunk_y_range[1] * world.chunk_size,
+            ),
+        )
+        self.client = client
+        self.in_range = set()
+        # The loaded chunks meshed before edits of the blocks in their border that
+        # belong to chunks not loaded yet, by the positions of these chunks.
+        self.stale_neighbours: Dict[ChunkPosition, Set[ChunkPosition]] = {}
+
+    @property
+    def is_loading(self) -> bool:
+        """Whether chunks in range are still being received or meshed."""
+        return (
+            not self.in_range <= self.loaded
+            or len(self.client) > 0
+            or self.job_system.pending_mesh_count > 0
+        )
+
+    def wait(self, timeout: Optional[float] = None) -> None:
+        """Blocks until a chunk is received or meshed, or `timeout` seconds
+        expire.
+        """
+        if not self.is_loading or len(self.client) > 0:
+            return
+        mesh_jobs = list(self.job_system.mesh_jobs.values())
+        if mesh_jobs:
+            wait(mesh_jobs, timeout, FIRST_COMPLETED)
+        else:
+            self.client.wait(timeout)
+
+    def update(self, position: glm.vec3) -> None:
+        """Reports the position of the player to the server after it has moved to
+        another chunk, and unloads the chunks it has moved away from.
+
+        Args:
+            position (glm.vec3): The position of the player.
+        """
+        center = self.world.get_chunk_position(
+            int(np.floor(position.x)),
+            int(np.floor(position.y)),
+            int(np.floor(position.z)),
+        )
+        if center == self.center:
+            return
+        self.center = center
+        self.in_range = self.get_chunk_positions_in_range(center, self.render_distance)
+        self.kept = self.get_chunk_positions_in_range(center, self.render_distance + 1)
+        for chunk_position in self.loaded - self.kept:
+            self.unload_chunk(chunk_position)
+        for chunk_position in list(self.stale_neighbours):
+            self.stale_neighbours[chunk_position] &= self.loaded
+            if not self.stale_neighbours[chunk_position]:
+                del self.stale_neighbours[chunk_position]
+        self.client.send_position(
+            (position.x, position.y, position.z), self.render_distance
+        )
+
+    def upload(self, time_budget: float) -> int:
+        """Loads the received chunks and applies the received edits in order, with
+        a time budget in milliseconds, then uploads the meshes of the chunks that
+        finished meshing. Returns the number of chunks loaded.
+        """
+        start_time = time.perf_counter()
+        count = 0
+        while 1e3 * (time.perf_counter() - start_time) < time_budget:
+            message = self.client.pop_message()
+            if message is None:
+                break
+            message_type, content = message
+            if message_type == MessageType.CHUNK:
+                chunk_position, padded_blocks = content
+                is_kept = chunk_position in self.kept
+                self.client.acknowledge(chunk_position, is_kept)
+                if is_kept:
+                    self.load_received_chunk(chunk_position, padded_blocks)
+                    count += 1
+            elif message_type == MessageType.DELTA:
+                self.apply_edits(content)
+        self.job_system.drain_meshes(self.update_chunk_mesh)
+        return count
+
+    def load_received_chunk(
+        self, chunk_position: ChunkPosition, padded_blocks: Optional[np.ndarray]
+    ) -> None:
+        """Adds a received chunk to the world and submits it to be meshed from its
+        blocks and border, along with the loaded neighbours that missed edits of
+        its blocks. Chunks of air have no blocks.
+        """
+        self.loaded.add(chunk_position)
+        if padded_blocks is None:
+            self.world.remove_chunk(chunk_position)
+            self.scene.remove_chunk(chunk_position)
+        else:
+            self.world.create_chunk(
+                chunk_position,
+                blocks=padded_blocks[1:-1, 1:-1, 1:-1].copy(),
+                is_modified=False,
+            )
+            if self.world.light_map is not None:
+                self.world.light_map.set_chunk_light(chunk_position, None)
+            self.job_system.remesh(chunk_position, padded_blocks)
+        for neighbour_position in self.stale_neighbours.pop(chunk_position, set()):
+            if neighbour_position in self.loaded:
+                self.remesh_chunk(neighbour_position)
+
+    def apply_edits(self, edits: np.ndarray) -> None:
+        """Applies the edits of the server to the loaded chunks, skipping the edits
+        already predicted locally. The edits of the other chunks are already part
+        of them if they are received later, but the loaded neighbours meshed with
+        the edited blocks in their border are remeshed once they are received.
+        """
+        for block_position, block_id in zip(
+            edits["position"].tolist(), edits["block"].tolist()
+        ):
+            chunk_position = self.world.get_chunk_position(*block_position)
+            if chunk_position in self.loaded:
+                if self.world.get_block(*block_position) != block_id:
+                    self.world.set_block(*block_position, block_id)
+                continue
+            first_chunk = self.world.get_chunk_position(
+                *(coordinate - 1 for coordinate in block_position)
+            )
+            last_chunk = self.world.get_chunk_position(
+                *(coordinate + 1 for coordinate in block_position)
+            )
+            for neighbour_position in itertools.product(
+                *(
+                    range(first, last + 1)
+                    for first, last in zip(first_chunk, last_chunk)
+                )
+            ):
+                if neighbour_position in self.loaded:
+                    self.stale_neighbours.setdefault(chunk_position, set()).add(
+                        neighbour_position
+                    )
+
+    def save(self) -> int:
+        """Saves nothing, since the server owns the world."""
+        return 0
@@ -0,0 +1,191 @@
+import asyncio
+import struct
+import zlib
+from enum import IntEnum
+from typing import Dict, Tuple
+
+import numpy as np
+
+from ..world.region import decode_blocks, encode_blocks
+
+ChunkPosition = Tuple[int, int, int]
+BlockPosition = Tuple[int, int, int]
+
+# The header of every message: the length in bytes of its body and its type.
+MESSAGE_HEADER = struct.Struct("<IB")
+MAX_MESSAGE_SIZE = 1 << 24
+
+
+class MessageType(IntEnum):
+    """The types of the messages exchanged between a chunk server and its clients.
+
+    The client opens a session with `HELLO`, announcing how many chunks it accepts
+    before acknowledging them, and the server replies with `WELCOME`, describing
+    its chunks. The client then reports the position of its camera and its render
+    distance with `POSITION` whenever it moves to another chunk, and the server
+    streams the chunks in range as `CHUNK` messages, nearest first. The client
+    acknowledges every chunk with `ACK` once it took it out of its queue, telling
+    whether it kept it. Block edits are sent to the server as `EDIT` messages and
+    broadcast by the server to every client holding the edited chunk, including
+    the one that made the edit, as batches of `DELTA` records.
+    """
+
+    HELLO = 0
+    WELCOME = 1
+    POSITION = 2
+    CHUNK = 3
+    ACK = 4
+    EDIT = 5
+    DELTA = 6
+
+
+# The bodies of the messages of a fixed layout.
+HELLO_BODY = struct.Struct("<I")  # The number of chunks in flight accepted.
+WELCOME_BODY = struct.Struct("<IBii")  # Chunk size, item size, chunk y range.
+POSITION_BODY = struct.Struct("<3dI")  # Camera position, render distance.
+CHUNK_HEADER = struct.Struct("<3i")  # Chunk position, followed by the payload.
+ACK_BODY = struct.Struct("<3i?")  # Chunk position, whether it was kept.
+EDIT_BODY = struct.Struct("<3iH")  # Block position, block ID.
+DELTA_HEADER = struct.Struct("<BI")  # Encoding, number of edits.
+
+# The records of the edits of a `DELTA` message.
+EDIT_DTYPE = np.dtype([("position", "<i4", 3), ("block", "<u2")])
+_DELTA_RAW = 0
+_DELTA_ZLIB = 1
+
+
+class ProtocolError(ConnectionError):
+    """Raised when a peer sends a message that breaks the protocol, such as a
+    message of an unknown type or size, after which the connection is closed.
+    """
+
+
+def parse_address(address: str) -> Tuple[str, ...]:
+    """Parses the address of a chunk server, either `unix:<path>` for a Unix
+    domain socket or `<host>:<port>` for TCP.
+
+    Returns:
+        Tuple[str, ...]: `("unix", path)` or `("tcp", host, port)`.
+    """
+    if address.startswith("unix:"):
+        return ("unix", address[len("unix:") :])
+    host, _, port = address.rpartition(":")
+    assert host and port.isdigit(), f"Invalid server address '{address}'."
+    return ("tcp", host, port)
+
+
+async def open_connection(
+    address: str,
+) -> Tuple[asyncio.StreamReader, asyncio.StreamWriter]:
+    """Opens a connection to a chunk server."""
+    kind, *location = parse_address(address)
+    if kind == "unix":
+        return await asyncio.open_unix_connection(location[0])
+    return await asyncio.open_connection(location[0], int(location[1]))
+
+
+async def start_server(client_connected_callback, address: str) -> asyncio.Server:
+    """Starts listening for the clients of a chunk server."""
+    kind, *location = parse_address(address)
+    if kind == "unix":
+        return await asyncio.start_unix_server(client_connected_callback, location[0])
+    return await asyncio.start_server(
+        client_connected_callback, location[0], int(location[1])
+    )
+
+
+def write_message(
+    writer: asyncio.StreamWriter, message_type: MessageType, body: bytes = b""
+) -> int:
+    """Writes a message to a stream without waiting for it to be sent, and returns
+    its size in bytes.
+    """
+    assert len(body) < MAX_MESSAGE_SIZE, "Message too large."
+    writer.write(MESSAGE_HEADER.pack(len(body), message_type) + body)
+    return MESSAGE_HEADER.size + len(body)
+
+
+async def read_message(reader: asyncio.StreamReader) -> Tuple[MessageType, bytes]:
+    """Reads the next message from a stream.
+
+    Raises:
+        asyncio.IncompleteReadError: If the stream was closed.
+        ProtocolError: If the message is too large or of an unknown type.
+    """
+    length, message_type = MESSAGE_HEADER.unpack(
+        await reader.readexactly(MESSAGE_HEADER.size)
+    )
+    if length >= MAX_MESSAGE_SIZE:
+        raise ProtocolError(f"Message of {length} bytes is too large.")
+    try:
+        message_type = MessageType(message_type)
+    except ValueError:
+        raise ProtocolError(f"Unknown message type {message_type}.") from None
+    return message_type, await reader.readexactly(length)
+
+
+def unpack_body(
+    message_type: MessageType, body_struct: struct.Struct, body: bytes
+) -> Tuple:
+    """Unpacks the body of a message of a fixed layout.
+
+    Raises:
+        ProtocolError: If the body does not have the size of the layout.
+    """
+    if len(body) != body_struct.size:
+        raise ProtocolError(
+            f"Expected {body_struct.size} bytes in the body of {message_type.name}, "
+            f"got {len(body)}."
+        )
+    return body_struct.unpack(body)
+
+
+def encode_chunk(
+    chunk_position: ChunkPosition,
+    padded_blocks: np.ndarray,
+    compression_level: int = 1,
+) -> bytes:
+    """Encodes the body of a `CHUNK` message from the blocks of a chunk along with
+    a border of one voxel, which lets the client mesh the chunk without its
+    neighbours. Chunks of air have an empty payload.
+    """
+    header = CHUNK_HEADER.pack(*chunk_position)
+    if not padded_blocks[1:-1, 1:-1, 1:-1].any():
+        return header
+    return header + encode_blocks(padded_blocks, compression_level)
+
+
+def decode_chunk(body: bytes, chunk_size: int) -> Tuple[ChunkPosition, np.ndarray]:
+    """Decodes the body of a `CHUNK` message into the position of the chunk and
+    its blocks along with a border of one voxel, or `None` for a chunk of air.
+    """
+    chunk_position = CHUNK_HEADER.unpack_from(body)
+    if len(body) == CHUNK_HEADER.size:
+        return chunk_position, None
+    return chunk_position, decode_blocks(body[CHUNK_HEADER.size :], chunk_size + 2)
+
+
+def encode_delta(edits: Dict[BlockPosition, int]) -> bytes:
+    """Encodes the body of a `DELTA` message from the latest block ID of every
+    edited block position. The records are compressed when that makes them
+    smaller, e.g., for large fills.
+    """
+    records = np.empty(len(edits), dtype=EDIT_DTYPE)
+    records["position"] = list(edits.keys())
+    records["block"] = list(edits.values())
+    data = records.tobytes()
+    compressed_data = zlib.compress(data, 1)
+    if len(compressed_data) < len(data):
+        return DELTA_HEADER.pack(_DELTA_ZLIB, len(records)) + compressed_data
+    return DELTA_HEADER.pack(_DELTA_RAW, len(records)) + data
+
+
+def decode_delta(body: bytes) -> np.ndarray:
+    """Decodes the body of a `DELTA` message into an array of `EDIT_DTYPE`."""
+    encoding, count = DELTA_HEADER.unpack_from(body)
+    data = body[DELTA_HEADER.size :]
+    if encoding == _DELTA_ZLIB:
+        data = zlib.decompress(data)
+    records = np.frombuffer(data, dtype=EDIT_DTYPE)
+    assert len(records) == count, "Corrupt delta."
+    return records
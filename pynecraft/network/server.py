@@ -0,0 +1,498 @@
+import asyncio
+import heapq
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Set, Tuple
+
+import numpy as np
+
+from ..parameters import ServerParameters, TerrainParameters, WorldParameters
+from ..streaming import get_chunk_positions_in_range
+from ..world import World
+from ..world.region import RegionStorage
+from ..world.terrain import NoiseTerrainGenerator
+from .protocol import (
+    ACK_BODY,
+    EDIT_BODY,
+    HELLO_BODY,
+    POSITION_BODY,
+    WELCOME_BODY,
+    BlockPosition,
+    ChunkPosition,
+    MessageType,
+    ProtocolError,
+    encode_chunk,
+    encode_delta,
+    read_message,
+    start_server,
+    unpack_body,
+    write_message,
+)
+
+
+class ClientSession:
+    """The state of the connection of a client to a `ChunkServer`.
+
+    Args:
+        writer (asyncio.StreamWriter): The stream the messages to the client are
+            written to.
+        max_chunks_in_flight (int): The number of chunks sent to the client that
+            it has not acknowledged yet, beyond which no chunks are sent.
+    """
+
+    def __init__(self, writer: asyncio.StreamWriter, max_chunks_in_flight: int) -> None:
+        self.writer = writer
+        self.max_chunks_in_flight = max_chunks_in_flight
+        self.position: Optional[np.ndarray] = None
+        self.center: Optional[ChunkPosition] = None
+        self.render_distance = 0
+        # The chunks in range that were not sent yet, as a heap of their squared
+        # distances to the camera, and the chunks the client holds or will hold
+        # once it received them, of which `in_flight` were not acknowledged yet.
+        self.queue: List[Tuple[float, ChunkPosition]] = []
+        self.sent: Set[ChunkPosition] = set()
+        self.in_flight: Set[ChunkPosition] = set()
+        # The latest block ID of every block edited since the last delta.
+        self.edits: Dict[BlockPosition, int] = {}
+        self.wake_event = asyncio.Event()
+
+        self.bytes_sent = 0
+        self.chunks_sent = 0
+        self.deltas_sent = 0
+
+
+class ChunkServer:
+    """Runs a world authoritatively for clients connected over TCP or a Unix
+    domain socket, e.g., renderers running in other processes or machines.
+
+    Every client reports the position of its camera and its render distance, and
+    the server streams it the chunks in range, nearest to the camera first. The
+    chunks are sent compressed, with a border of one voxel so that the client can
+    mesh them without their neighbours. Chunks are generated, or loaded from the
+    region files of a storage, and compressed by a pool of threads, and their
+    compressed payloads are cached so that clients in the same area share them.
+
+    Block edits are applied to the world of the server and broadcast to every
+    client holding a chunk within one voxel of the edit, as small records of the
+    positions and block IDs of the edited blocks rather than as whole chunks. The
+    client that made an edit receives it too, so that all clients end up with the
+    edits in the order the server applied them.
+
+    A client accepts a limited number of chunks before acknowledging them, and no
+    more chunks are sent to it until it does, so that a client whose frame loop
+    falls behind is not flooded. The server also waits for the data of a client
+    to be sent before sending it more, so that slow connections apply
+    backpressure instead of buffering without bound.
+
+    Args:
+        server_parameters (ServerParameters): The parameters of the server.
+        world_parameters (WorldParameters): The parameters of the world, whose
+            modified chunks are saved to its save directory when the server
+            stops.
+        terrain_parameters (TerrainParameters): The parameters of the terrain
+            generator.
+    """
+
+    def __init__(
+        self,
+        server_parameters: ServerParameters = ServerParameters(),
+        world_parameters: WorldParameters = WorldParameters(),
+        terrain_parameters: TerrainParameters = TerrainParameters(),
+    ) -> None:
+        self.parameters = server_parameters
+        self.world = World(world_parameters=world_parameters, is_lit=False)
+        self.chunk_size = self.world.chunk_size
+        self.generator = NoiseTerrainGenerator(terrain_parameters=terrain_parameters)
+        height_range = self.generator.height_range
+        self.chunk_y_range = (
+            height_range[0] // self.chunk_size,
+            height_range[1] // self.chunk_size,
+        )
+        self.storage = (
+            RegionStorage(
+                directory=world_parameters.save_directory, chunk_size=self.chunk_size
+            )
+            if world_parameters.save_directory is not None
+            else None
+        )
+        self.executor = ThreadPoolExecutor(max_workers=server_parameters.num_workers)
+
+        self.sessions: Set[ClientSession] = set()
+        self.connection_tasks: Set[asyncio.Task] = set()
+        self.payloads: OrderedDict = OrderedDict()
+        self.payload_tasks: Dict[ChunkPosition, asyncio.Future] = {}
+        # The number of edits within one voxel of every chunk, which tells
+        # whether a payload compressed while the chunk was edited is outdated.
+        self.versions: Dict[ChunkPosition, int] = {}
+        self.server: Optional[asyncio.AbstractServer] = None
+
+        self.edit_count = 0
+        self.generation_time = 0.0
+
+    async def start(self) -> None:
+        """Starts listening for clients."""
+        self.server = await start_server(
+            self.handle_connection, self.parameters.address
+        )
+
+    async def serve_forever(self) -> None:
+        """Listens for clients until the server is closed."""
+        if self.server is None:
+            await self.start()
+        async with self.server:
+            await self.server.serve_forever()
+
+    async def close(self) -> None:
+        """Disconnects all clients, stops listening and saves the modified chunks."""
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+        for session in list(self.sessions):
+            session.writer.close()
+        # The connections end once their streams see the end of the data.
+        await asyncio.gather(*self.connection_tasks, return_exceptions=True)
+        self.executor.shutdown(wait=True, cancel_futures=True)
+        if self.storage is not None:
+            self.storage.save_chunks(self.world)
+            self.storage.close()
+
+    @property
+    def bytes_sent(self) -> int:
+        """The number of bytes sent to the connected clients."""
+        return sum(session.bytes_sent for session in self.sessions)
+
+    async def handle_connection(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        """Serves a client from its `HELLO` until it disconnects, or until it
+        breaks the protocol, in which case the connection is closed.
+        """
+        try:
+            message_type, body = await read_message(reader)
+            if message_type != MessageType.HELLO:
+                raise ProtocolError(f"Expected HELLO, got {message_type.name}.")
+            (max_chunks_in_flight,) = unpack_body(message_type, HELLO_BODY, body)
+        except ProtocolError as error:
+            print(f"Closing the connection of a client: {error}")
+            writer.close()
+            return
+        except (asyncio.IncompleteReadError, ConnectionError):
+            writer.close()
+            return
+        session = ClientSession(
+            writer,
+            max(min(max_chunks_in_flight, self.parameters.max_chunks_in_flight), 1),
+        )
+        session.bytes_sent += write_message(
+            writer,
+            MessageType.WELCOME,
+            WELCOME_BODY.pack(
+                self.chunk_size, self.world.block_dtype.itemsize, *self.chunk_y_range
+            ),
+        )
+        self.sessions.add(session)
+        self.connection_tasks.add(asyncio.current_task())
+        send_task = asyncio.create_task(self.send_loop(session))
+        try:
+            while True:
+                message_type, body = await read_message(reader)
+                if message_type == MessageType.POSITION:
+                    *position, render_distance = unpack_body(
+                        message_type, POSITION_BODY, body
+                    )
+                    if not np.isfinite(position).all():
+                        raise ProtocolError(f"Invalid camera position {position}.")
+                    self.set_position(session, position, render_distance)
+                elif message_type == MessageType.ACK:
+                    *chunk_position, is_kept = unpack_body(message_type, ACK_BODY, body)
+                    self.acknowledge(session, tuple(chunk_position), is_kept)
+                elif message_type == MessageType.EDIT:
+                    *block_position, block_id = unpack_body(
+                        message_type, EDIT_BODY, body
+                    )
+                    if self.is_valid_edit(session, tuple(block_position), block_id):
+                        await self.edit(tuple(block_position), block_id)
+                else:
+                    raise ProtocolError(f"Unexpected {message_type.name} message.")
+        except ProtocolError as error:
+            print(f"Closing the connection of a client: {error}")
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            self.sessions.discard(session)
+            self.connection_tasks.discard(asyncio.current_task())
+            send_task.cancel()
+            writer.close()
+            self.evict_chunks()
+
+    def set_position(
+        self, session: ClientSession, position: List[float], render_distance: int
+    ) -> None:
+        """Queues the chunks in range of the new camera position of a client,
+        nearest first, and forgets the chunks the client unloads.
+        """
+        session.position = np.asarray(position)
+        render_distance = min(render_distance, self.parameters.max_render_distance)
+        center = self.world.get_chunk_position(
+            *(int(np.floor(coordinate)) for coordinate in position)
+        )
+        if center == session.center and render_distance == session.render_distance:
+            return
+        session.center = center
+        session.render_distance = render_distance
+        # The client unloads the chunks one chunk beyond its render distance, like
+        # a `ChunkStreamer`.
+        kept = get_chunk_positions_in_range(
+            center, render_distance + 1, self.chunk_y_range
+        )
+        session.sent &= kept
+        chunk_positions = list(
+            get_chunk_positions_in_range(center, render_distance, self.chunk_y_range)
+            - session.sent
+        )
+        centers = (np.asarray(chunk_positions) + 0.5) * self.chunk_size
+        distances = np.sum((centers - session.position) ** 2, axis=1)
+        session.queue = list(zip(distances.tolist(), chunk_positions))
+        heapq.heapify(session.queue)
+        session.wake_event.set()
+        self.evict_chunks()
+
+    def evict_chunks(self) -> None:
+        """Removes the chunks that no client holds or waits for from the world,
+        saving the modified ones first, and forgets the versions of the chunks
+        that are neither loaded nor being prepared. Without a storage, modified
+        chunks are kept, since their edits would be lost otherwise.
+        """
+        referenced = set(self.payload_tasks)
+        for session in self.sessions:
+            referenced |= session.sent
+            referenced.update(chunk_position for _, chunk_position in session.queue)
+        for chunk_position in list(self.world.chunks):
+            if chunk_position in referenced:
+                continue
+            chunk = self.world.chunks[chunk_position]
+            if chunk.is_modified:
+                if self.storage is None:
+                    continue
+                self.storage.save_chunk(chunk)
+            self.world.remove_chunk(chunk_position)
+        for chunk_position in list(self.versions):
+            if (
+                chunk_position not in self.world
+                and chunk_position not in self.payload_tasks
+            ):
+                del self.versions[chunk_position]
+
+    def acknowledge(
+        self, session: ClientSession, chunk_position: ChunkPosition, is_kept: bool
+    ) -> None:
+        """Frees the slot of a chunk the client took out of its queue, and forgets
+        the chunk if the client dropped it because it moved away.
+        """
+        session.in_flight.discard(chunk_position)
+        if not is_kept:
+            session.sent.discard(chunk_position)
+        session.wake_event.set()
+
+    def is_valid_edit(
+        self, session: ClientSession, block_position: BlockPosition, block_id: int
+    ) -> bool:
+        """Returns whether a client may make a block edit, i.e., whether the block
+        ID fits the block IDs of the world and the block is within the render
+        distance of the client, horizontally and from the vertical range of the
+        terrain. Other edits are ignored.
+        """
+        if block_id > np.iinfo(self.world.block_dtype).max or session.center is None:
+            return False
+        chunk_position = self.world.get_chunk_position(*block_position)
+        return (
+            self.is_in_range(session, chunk_position)
+            and self.chunk_y_range[0] - session.render_distance
+            <= chunk_position[1]
+            <= self.chunk_y_range[1] + session.render_distance
+        )
+
+    async def edit(self, block_position: BlockPosition, block_id: int) -> None:
+        """Applies a block edit to the world and queues it for every client
+        holding a chunk whose mesh depends on the edited block. The chunk of the
+        block is generated in the background first if it is not loaded yet.
+        """
+        chunk_position = self.world.get_chunk_position(*block_position)
+        if chunk_position not in self.world:
+            padded_blocks = await asyncio.get_running_loop().run_in_executor(
+                self.executor, self.generate_padded_blocks, chunk_position
+            )
+            # The chunk may have been loaded while it was being generated.
+            if chunk_position not in self.world:
+                self.load_chunk(chunk_position, padded_blocks)
+        self.world.set_block(*block_position, block_id)
+        self.edit_count += 1
+        affected = self.world.pop_dirty_chunks()
+        for affected_position in affected:
+            self.versions[affected_position] = (
+                self.versions.get(affected_position, 0) + 1
+            )
+            self.payloads.pop(affected_position, None)
+        for session in self.sessions:
+            if not session.sent.isdisjoint(affected):
+                session.edits[block_position] = block_id
+                session.wake_event.set()
+
+    async def send_loop(self, session: ClientSession) -> None:
+        """Sends the queued edits and chunks to a client whenever there are any and
+        it has free slots for chunks.
+        """
+        while True:
+            await session.wake_event.wait()
+            session.wake_event.clear()
+            self.send_edits(session)
+            # The payloads of the next chunks are prepared concurrently.
+            free_slots = session.max_chunks_in_flight - len(session.in_flight)
+            for _, chunk_position in heapq.nsmallest(free_slots, session.queue):
+                self.request_payload(chunk_position)
+            while (
+                session.queue and len(session.in_flight) < session.max_chunks_in_flight
+            ):
+                _, chunk_position = heapq.heappop(session.queue)
+                if chunk_position in session.sent:
+                    continue
+                # Edits invalidate the cached payloads of the chunks, so a payload
+                # edited before this task resumed is prepared again.
+                while (payload := self.payloads.get(chunk_position)) is None:
+                    await self.request_payload(chunk_position)
+                self.payloads.move_to_end(chunk_position)
+                if not self.is_in_range(session, chunk_position):
+                    # The client moved away while the chunk was being generated.
+                    continue
+                session.bytes_sent += write_message(
+                    session.writer, MessageType.CHUNK, payload
+                )
+                session.chunks_sent += 1
+                session.sent.add(chunk_position)
+                session.in_flight.add(chunk_position)
+                await session.writer.drain()
+                # Edits made meanwhile are not held back by the remaining chunks.
+                self.send_edits(session)
+            await session.writer.drain()
+
+    def send_edits(self, session: ClientSession) -> None:
+        """Sends the edits queued for a client as a single delta."""
+        if not session.edits:
+            return
+        session.bytes_sent += write_message(
+            session.writer, MessageType.DELTA, encode_delta(session.edits)
+        )
+        session.deltas_sent += 1
+        session.edits = {}
+
+    def is_in_range(
+        self, session: ClientSession, chunk_position: ChunkPosition
+    ) -> bool:
+        """Returns whether a chunk is within the render distance of a client."""
+        return (chunk_position[0] - session.center[0]) ** 2 + (
+            chunk_position[2] - session.center[2]
+        ) ** 2 <= session.render_distance**2
+
+    def request_payload(self, chunk_position: ChunkPosition) -> asyncio.Future:
+        """Returns a future of the compressed payload of a chunk, preparing it in
+        the background unless it is cached or already being prepared.
+        """
+        task = self.payload_tasks.get(chunk_position)
+        if task is None:
+            task = asyncio.ensure_future(self.prepare_payload(chunk_position))
+            self.payload_tasks[chunk_position] = task
+            task.add_done_callback(
+                lambda _: self.payload_tasks.pop(chunk_position, None)
+            )
+        return task
+
+    async def prepare_payload(self, chunk_position: ChunkPosition) -> bytes:
+        """Generates the blocks of a chunk and its border, overlays the blocks the
+        world holds, and compresses them into the payload of a `CHUNK` message.
+        Payloads of chunks edited while they were compressed are prepared again.
+        """
+        payload = self.payloads.get(chunk_position)
+        if payload is not None:
+            return payload
+        loop = asyncio.get_running_loop()
+        while True:
+            version = self.versions.get(chunk_position, 0)
+            start_time = time.perf_counter()
+            padded_blocks = await loop.run_in_executor(
+                self.executor, self.generate_padded_blocks, chunk_position
+            )
+            self.generation_time += time.perf_counter() - start_time
+            if chunk_position not in self.world:
+                self.load_chunk(chunk_position, padded_blocks)
+            self.overlay_world(chunk_position, padded_blocks)
+            payload = await loop.run_in_executor(
+                self.executor,
+                encode_chunk,
+                chunk_position,
+                padded_blocks,
+                self.parameters.compression_level,
+            )
+            if self.versions.get(chunk_position, 0) == version:
+                break
+        self.payloads[chunk_position] = payload
+        while len(self.payloads) > self.parameters.payload_cache_size:
+            self.payloads.popitem(last=False)
+        return payload
+
+    def generate_padded_blocks(self, chunk_position: ChunkPosition) -> np.ndarray:
+        """Returns the generated blocks of a chunk along with a border of one voxel."""
+        origin = np.asarray(chunk_position) * self.chunk_size
+        padded_blocks = self.generator.generate_region(
+            origin - 1, (self.chunk_size + 2,) * 3
+        )
+        return padded_blocks.astype(self.world.block_dtype, copy=False)
+
+    def load_chunk(
+        self, chunk_position: ChunkPosition, padded_blocks: np.ndarray
+    ) -> None:
+        """Adds a chunk to the world, from the storage if it was saved or from its
+        generated blocks otherwise.
+        """
+        blocks = (
+            self.storage.load_chunk(chunk_position)
+            if self.storage is not None
+            else None
+        )
+        if blocks is None:
+            blocks = padded_blocks[1:-1, 1:-1, 1:-1]
+        self.world.create_chunk(chunk_position, blocks=blocks.copy(), is_modified=False)
+
+    def overlay_world(
+        self, chunk_position: ChunkPosition, padded_blocks: np.ndarray
+    ) -> None:
+        """Writes the blocks of the chunks in the world over the generated blocks of
+        a chunk and its border, since they may have been edited or saved.
+        """
+        origin = np.asarray(chunk_position) * self.chunk_size
+        start, end = tuple(origin - 1), tuple(origin + self.chunk_size + 1)
+        for (
+            neighbour_position,
+            chunk_slices,
+            region_slices,
+        ) in self.world.iterate_region(start, end):
+            chunk = self.world.chunks.get(neighbour_position)
+            if chunk is not None:
+                padded_blocks[region_slices] = chunk.get_region(
+                    tuple(chunk_slice.start for chunk_slice in chunk_slices),
+                    tuple(chunk_slice.stop for chunk_slice in chunk_slices),
+                )
+
+
+async def run_server(
+    server_parameters: ServerParameters = ServerParameters(),
+    world_parameters: WorldParameters = WorldParameters(),
+    terrain_parameters: TerrainParameters = TerrainParameters(),
+) -> None:
+    """Runs a chunk server until it is cancelled."""
+    server = ChunkServer(server_parameters, world_parameters, terrain_parameters)
+    await server.start()
+    try:
+        await server.serve_forever()
+    finally:
+        await server.close()
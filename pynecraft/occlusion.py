@@ -0,0 +1,238 @@
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+from .mesh.meshing import FACE_NORMALS
+from .world.blocks import BLOCK_IS_OPAQUE
+
+ChunkPosition = Tuple[int, int, int]
+
+
+def _get_face_pair_bits() -> np.ndarray:
+    """Returns the bit of the connectivity mask of a chunk telling whether each pair
+    of distinct faces is connected, as an array of shape `(7, 6)`. Row `6` stands
+    for the camera's chunk, which was not entered through any face, and maps to
+    bit `15`, which is set for every chunk during the search.
+    """
+    face_pair_bits = np.full((7, 6), 15, dtype=np.int64)
+    face_pairs = [(a, b) for a in range(6) for b in range(a + 1, 6)]
+    for bit, (face_a, face_b) in enumerate(face_pairs):
+        face_pair_bits[face_a, face_b] = face_pair_bits[face_b, face_a] = bit
+    return face_pair_bits
+
+
+# The faces are indexed in the order of the faces of the mesher, so that the
+# opposite of face `f` is face `f ^ 1`.
+_FACE_PAIR_BITS = _get_face_pair_bits()
+
+# The connectivity mask of a chunk in which every face is connected to every other
+# face, such as a chunk of air.
+FULL_CONNECTIVITY = (1 << 15) - 1
+
+
+def are_faces_connected(connectivity: int, face_a: int, face_b: int) -> bool:
+    """Returns whether two distinct faces of a chunk are connected according to its
+    connectivity mask.
+    """
+    return bool(connectivity >> int(_FACE_PAIR_BITS[face_a, face_b]) & 1)
+
+
+def _propagate_labels_along_axis(
+    labels: np.ndarray, is_open: np.ndarray, axis: int
+) -> np.ndarray:
+    """Replaces the label of every open voxel by the smallest label of the run of
+    open voxels it belongs to along an axis.
+    """
+    row_labels = np.moveaxis(labels, axis, -1).reshape(-1, labels.shape[axis])
+    row_is_open = np.moveaxis(is_open, axis, -1).reshape(row_labels.shape)
+    is_run_start = row_is_open.copy()
+    is_run_start[:, 1:] &= ~row_is_open[:, :-1]
+    open_labels = row_labels[row_is_open]
+    run_starts = np.flatnonzero(is_run_start[row_is_open])
+    run_ids = np.cumsum(is_run_start[row_is_open]) - 1
+    row_labels[row_is_open] = np.minimum.reduceat(open_labels, run_starts)[run_ids]
+    return np.moveaxis(
+        row_labels.reshape(np.moveaxis(labels, axis, -1).shape), -1, axis
+    )
+
+
+def get_face_connectivity(blocks: np.ndarray) -> int:
+    """Computes which pairs of faces of a chunk are connected by a path through the
+    voxels that do not hide what is behind them, such as air.
+
+    The open voxels are labeled by connected component with a flood fill made of
+    vectorized sweeps: every sweep gives each run of open voxels along an axis the
+    smallest label in the run, then every label jumps to the label of the voxel it
+    names, until no label changes. Two faces are connected if a component touches
+    both.
+
+    Args:
+        blocks (np.ndarray): The block IDs of the chunk, indexed as `[x, y, z]`.
+
+    Returns:
+        int: The connectivity mask of the chunk, with one bit per pair of faces.
+    """
+    is_open = ~BLOCK_IS_OPAQUE[blocks]
+    if is_open.all():
+        return FULL_CONNECTIVITY
+    face_slices = [
+        (slice(-1, None), slice(None), slice(None)),
+        (slice(0, 1), slice(None), slice(None)),
+        (slice(None), slice(-1, None), slice(None)),
+        (slice(None), slice(0, 1), slice(None)),
+        (slice(None), slice(None), slice(-1, None)),
+        (slice(None), slice(None), slice(0, 1)),
+    ]
+    open_face_count = sum(bool(is_open[face_slice].any()) for face_slice in face_slices)
+    if open_face_count < 2:
+        return 0
+
+    labels = np.arange(blocks.size, dtype=np.int64).reshape(blocks.shape)
+    open_indices = np.flatnonzero(is_open)
+    while True:
+        previous_labels = labels.ravel()[open_indices]
+        for axis in range(3):
+            labels = _propagate_labels_along_axis(labels, is_open, axis)
+        flat_labels = labels.ravel()
+        # Every label is the index of an open voxel of the same component, whose
+        # own label may already be smaller.
+        flat_labels[open_indices] = flat_labels[flat_labels[open_indices]]
+        if np.array_equal(flat_labels[open_indices], previous_labels):
+            break
+
+    face_labels = [
+        np.unique(labels[face_slice][is_open[face_slice]]) for face_slice in face_slices
+    ]
+    connectivity = 0
+    for face_a in range(6):
+        for face_b in range(face_a + 1, 6):
+            if np.intersect1d(
+                face_labels[face_a], face_labels[face_b], assume_unique=True
+            ).size:
+                connectivity |= 1 << int(_FACE_PAIR_BITS[face_a, face_b])
+    return connectivity
+
+
+class OcclusionCuller:
+    """Finds the chunks that may be visible from the camera's chunk by searching
+    through the chunks that are connected to each other, so that caves and other
+    chunks hidden behind solid terrain are not drawn.
+
+    Every chunk has a connectivity mask telling which of its faces are connected to
+    each other through see-through voxels, computed by `get_face_connectivity`
+    when the chunk is meshed. A breadth-first search starts from the camera's chunk
+    and steps into a neighbouring chunk through a face only if that face is
+    connected to the face the current chunk was entered through, and only if the
+    search never stepped in the opposite direction before, since a line of sight
+    never turns back. This follows Tommaso Checchi's "Advanced Cave Culling
+    Algorithm" used by Minecraft.
+
+    The search does not depend on the direction the camera looks in, so its result
+    is kept until the camera enters another chunk or a connectivity mask changes,
+    and is combined with frustum culling afterwards. Chunks whose connectivity is
+    unknown, such as chunks of air or chunks that are not loaded yet, count as
+    fully connected, so that loading chunks only ever hides more chunks. The
+    search covers the box around the chunks with a known connectivity and the
+    camera's chunk, with a margin of one chunk.
+    """
+
+    def __init__(self) -> None:
+        self.connectivities: Dict[ChunkPosition, int] = {}
+        self._camera_chunk: Optional[ChunkPosition] = None
+        self._is_dirty = True
+        self._grid_origin = np.zeros(3, dtype=np.int64)
+        self._is_reached = np.zeros((0, 0, 0), dtype=bool)
+
+        # Statistics of the last search.
+        self.reached_chunk_count = 0
+
+    def set_connectivity(self, chunk_position: ChunkPosition, connectivity: int):
+        """Sets the connectivity mask of a chunk."""
+        if self.connectivities.get(chunk_position) != connectivity:
+            self.connectivities[chunk_position] = connectivity
+            self._is_dirty = True
+
+    def remove(self, chunk_position: ChunkPosition) -> None:
+        """Forgets the connectivity mask of a chunk, which then counts as fully
+        connected.
+        """
+        if self.connectivities.pop(chunk_position, None) is not None:
+            self._is_dirty = True
+
+    def update(self, camera_chunk: ChunkPosition) -> None:
+        """Searches for the chunks reachable from the camera's chunk, unless the
+        camera's chunk and the connectivity masks did not change since the last
+        search.
+        """
+        camera_chunk = tuple(int(coordinate) for coordinate in camera_chunk)
+        if not self._is_dirty and camera_chunk == self._camera_chunk:
+            return
+        self._camera_chunk = camera_chunk
+        self._is_dirty = False
+
+        known_positions = np.array(
+            list(self.connectivities) + [camera_chunk], dtype=np.int64
+        ).reshape(-1, 3)
+        grid_origin = known_positions.min(axis=0) - 1
+        grid_shape = tuple(known_positions.max(axis=0) + 2 - grid_origin)
+        connectivities = np.full(grid_shape, FULL_CONNECTIVITY, dtype=np.int64)
+        if self.connectivities:
+            local_positions = known_positions[:-1] - grid_origin
+            connectivities[tuple(local_positions.T)] = list(
+                self.connectivities.values()
+            )
+        # The bit every chunk has for the camera's chunk, which was entered
+        # through no face.
+        connectivities |= 1 << 15
+
+        is_reached = np.zeros(grid_shape, dtype=bool)
+        frontier = (np.asarray(camera_chunk) - grid_origin)[None, :]
+        entry_faces = np.array([6], dtype=np.int64)
+        # The directions each path stepped in so far, one bit per face.
+        directions = np.zeros(1, dtype=np.int64)
+        is_reached[tuple(frontier.T)] = True
+        while len(frontier):
+            frontier_connectivities = connectivities[tuple(frontier.T)]
+            next_frontiers, next_entry_faces, next_directions = [], [], []
+            for face in range(6):
+                can_exit = (
+                    frontier_connectivities >> _FACE_PAIR_BITS[entry_faces, face] & 1
+                ).astype(bool)
+                can_exit &= directions & (1 << (face ^ 1)) == 0
+                exits = np.flatnonzero(can_exit)
+                neighbours = frontier[exits] + FACE_NORMALS[face]
+                is_inside = np.all(
+                    (neighbours >= 0) & (neighbours < grid_shape), axis=1
+                )
+                exits, neighbours = exits[is_inside], neighbours[is_inside]
+                is_new = ~is_reached[tuple(neighbours.T)]
+                exits, neighbours = exits[is_new], neighbours[is_new]
+                # A chunk reached by several paths at once keeps the first one.
+                neighbours, first_indices = np.unique(
+                    neighbours, axis=0, return_index=True
+                )
+                is_reached[tuple(neighbours.T)] = True
+                next_frontiers.append(neighbours)
+                next_entry_faces.append(np.full(len(neighbours), face ^ 1))
+                next_directions.append(directions[exits[first_indices]] | 1 << face)
+            frontier = np.concatenate(next_frontiers)
+            entry_faces = np.concatenate(next_entry_faces)
+            directions = np.concatenate(next_directions)
+
+        self._grid_origin = grid_origin
+        self._is_reached = is_reached
+        self.reached_chunk_count = int(is_reached.sum())
+
+    def is_potentially_visible(self, chunk_positions: np.ndarray) -> np.ndarray:
+        """Returns whether each chunk of an array of chunk positions of shape
+        `(n, 3)` was reached by the last search. Chunks outside the searched box
+        have an unknown connectivity and count as visible.
+        """
+        local_positions = np.asarray(chunk_positions, dtype=np.int64).reshape(-1, 3)
+        local_positions = local_positions - self._grid_origin
+        is_inside = np.all(
+            (local_positions >= 0) & (local_positions < self._is_reached.shape), axis=1
+        )
+        is_visible = np.ones(len(local_positions), dtype=bool)
+        is_visible[is_inside] = self._is_reached[tuple(local_positions[is_inside].T)]
+        return is_visible
@@ -1,4 +1,4 @@
-from typing import Tuple
+from typing import List, Literal, Optional, Tuple
 
 from pydantic import BaseModel
 
@@ -29,6 +29,30 @@ class CameraParameters(BaseModel):
     pitch_max: float = 89
 
 
+class PhysicsParameters(BaseModel):
+    """Player physics parameters. Distances are in blocks and times in seconds.
+
+    Args:
+        is_enabled (bool): Whether the player walks and collides with the world.
+            Otherwise the player flies freely through it.
+        gravity (float): The downward acceleration.
+        jump_speed (float): The upward speed at the start of a jump.
+        terminal_speed (float): The maximum falling speed.
+        width (float): The width of the bounding box of the player along `x` and
+            `z`.
+        height (float): The height of the bounding box of the player.
+        eye_height (float): The height of the camera above the feet.
+    """
+
+    is_enabled: bool = True
+    gravity: float = 32.0
+    jump_speed: float = 9.0
+    terminal_speed: float = 60.0
+    width: float = 0.6
+    height: float = 1.8
+    eye_height: float = 1.62
+
+
 class FirstPersonPlayerParameters(BaseModel):
     """First person player parameters.
 
@@ -37,12 +61,346 @@ class FirstPersonPlayerParameters(BaseModel):
         player_rotation_speed (float): The rotation speed of the player.
         mouse_sensitivity (float): The sensitivity of the mouse control.
         camera_parameters (CameraParameters): The parameters of the camera.
+        physics_parameters (PhysicsParameters): The parameters of the physics of
+            the player.
+        reach_distance (float): The largest distance in voxels at which the
+            player can break and place blocks.
     """
 
     player_speed: float = 5e-3
     player_rotation_speed: float = 3e-3
     mouse_sensitivity: float = 2e-3
     camera_parameters: CameraParameters
+    physics_parameters: PhysicsParameters = PhysicsParameters()
+    reach_distance: float = 8.0
+
+
+class WorldParameters(BaseModel):
+    """Voxel world parameters.
+
+    Args:
+        chunk_size (int): The number of voxels along each edge of a chunk.
+        block_dtype (Literal["uint8", "uint16"]): The data type used to store
+            block IDs. `uint8` supports 256 block types, while `uint16` supports
+            65536 block types at twice the memory cost.
+        chunk_storage (Literal["dense", "palette"]): How chunks store their block
+            IDs. `dense` stores one integer per voxel, while `palette` stores
+            bit-packed indices into a per-chunk palette of block IDs, which uses
+            far less memory at the cost of slower bulk operations.
+        save_directory (Optional[str]): The directory the world is saved to as
+            region files. The world is not saved if it is `None`.
+    """
+
+    chunk_size: int = 32
+    block_dtype: Literal["uint8", "uint16"] = "uint8"
+    chunk_storage: Literal["dense", "palette"] = "palette"
+    save_directory: Optional[str] = None
+
+
+class TerrainParameters(BaseModel):
+    """Procedural terrain generation parameters.
+
+    Args:
+        seed (int): The seed of the terrain. The same seed always generates the
+            same world.
+        sea_level (int): The world `y` coordinate below which empty space above
+            the ground is filled with water.
+        base_height (int): The world `y` coordinate of the ground around which the
+            height of the terrain varies.
+        height_amplitude (float): The scale of the deviation of the ground from
+            `base_height`, in voxels. The ground lies between `0.7` times this
+            below `base_height` and `1.3` times this above it.
+        height_scale (float): The horizontal distance in voxels over which the
+            height of the terrain varies the most.
+        octaves (int): The number of octaves of noise that make up the height of
+            the terrain. More octaves add finer detail.
+        persistence (float): The factor by which the amplitude of each octave
+            decreases.
+        lacunarity (float): The factor by which the frequency of each octave
+            increases.
+        biome_scale (float): The horizontal distance in voxels over which the
+            biome changes.
+        cave_scale (float): The distance in voxels over which the shape of caves
+            varies.
+        cave_threshold (float): The noise value above which a voxel is hollowed
+            out into a cave. Lower values produce more caves.
+        bedrock_height (int): The world `y` coordinate of the bedrock layer, which
+            is the bottom of the world.
+        snow_height (int): The world `y` coordinate above which the surface is
+            covered with snow.
+    """
+
+    seed: int = 0
+    sea_level: int = 0
+    base_height: int = 4
+    height_amplitude: float = 32.0
+    height_scale: float = 160.0
+    octaves: int = 5
+    persistence: float = 0.5
+    lacunarity: float = 2.0
+    biome_scale: float = 512.0
+    cave_scale: float = 40.0
+    cave_threshold: float = 0.25
+    bedrock_height: int = -48
+    snow_height: int = 20
+
+
+class ProfilerParameters(BaseModel):
+    """Frame profiler parameters.
+
+    Args:
+        is_enabled (bool): Whether the stages of the engine loop are timed.
+        capacity (int): The number of most recent sections and counter values
+            kept in the ring buffers of the profiler.
+        summary_interval (Optional[float]): The interval in seconds at which a
+            summary of the time spent per stage is printed to the console. No
+            summary is printed if it is `None`.
+        trace_path (Optional[str]): The path of the Chrome trace JSON file that
+            the recorded sections are exported to when the engine exits. No trace
+            is exported if it is `None`.
+    """
+
+    is_enabled: bool = False
+    capacity: int = 65536
+    summary_interval: Optional[float] = None
+    trace_path: Optional[str] = None
+
+
+class LodParameters(BaseModel):
+    """Level-of-detail parameters of distant terrain.
+
+    Beyond the render distance, terrain is rendered in rings of tiles whose
+    voxel grids are downsampled 2x, 4x, 8x, and so on, so that each ring covers
+    a larger area with about the same number of triangles.
+
+    Args:
+        level_count (int): The number of rings of reduced detail beyond the
+            full-detail chunks. No distant terrain is rendered if it is `0`.
+        distance_factor (float): The factor by which the radius of a ring grows
+            from one level to the next, starting from the render distance.
+        triangle_budgets (Tuple[int, ...]): The largest number of triangles
+            drawn per frame in each ring, from the first ring of reduced detail
+            outwards. When the visible tiles of a ring exceed its budget, the
+            tiles nearest to the camera are drawn first. Rings without a budget
+            are not limited.
+    """
+
+    level_count: int = 0
+    distance_factor: float = 2.0
+    triangle_budgets: Tuple[int, ...] = (1_000_000, 500_000, 250_000)
+
+
+class ArenaParameters(BaseModel):
+    """Parameters of the buffer arena that the vertex data of chunk meshes is
+    sub-allocated from.
+
+    Args:
+        is_enabled (bool): Whether chunk meshes share the large vertex buffers of
+            an arena. Otherwise every chunk mesh owns its own vertex buffer and is
+            drawn with its own draw call.
+        page_size (int): The size in bytes of each vertex buffer of the arena.
+        compaction_threshold (float): The fraction of a vertex buffer made of free
+            space outside its largest free range above which the buffer is
+            compacted.
+        use_indirect_draws (bool): Whether the visible chunks of each vertex
+            buffer are drawn with a single indirect multi-draw call when the
+            OpenGL context supports it, i.e., from OpenGL 4.3. Otherwise every
+            chunk is drawn with its own draw call.
+    """
+
+    is_enabled: bool = True
+    page_size: int = 1 << 25
+    compaction_threshold: float = 0.25
+    use_indirect_draws: bool = True
+
+
+class LightingParameters(BaseModel):
+    """Parameters of the sky and block light of the voxels.
+
+    Args:
+        is_enabled (bool): Whether light is spread from the sky and from light
+            emitting blocks and baked into the chunk meshes along with the ambient
+            occlusion of their corners. Otherwise every face is fully lit.
+        margin (int): The number of voxels around a chunk whose blocks are
+            generated to compute the light of the chunk in the background. Light
+            spreads at most `15` voxels, so smaller margins generate chunks faster
+            but may miss light coming from further away.
+    """
+
+    is_enabled: bool = True
+    margin: int = 15
+
+
+class TextureParameters(BaseModel):
+    """Parameters of the textures of the blocks.
+
+    Args:
+        directory (Optional[str]): The directory of the images of the blocks, named
+            after the blocks in lower case, e.g., `stone.png`. Blocks without an
+            image are plain colored. Blocks are not textured if it is `None`,
+            and neither are the chunks of the `float` vertex format.
+        texture_size (int): The width and height in pixels of the texture of every
+            block, which must be a power of two.
+        cache_directory (Optional[str]): The directory in which the packed texture
+            atlas and its mipmaps are cached, so that they are only packed again
+            when an image changes. The atlas is packed at every start if it is
+            `None`.
+    """
+
+    directory: Optional[str] = None
+    texture_size: int = 16
+    cache_directory: Optional[str] = ".cache/textures"
+
+
+class ShaderParameters(BaseModel):
+    """Parameters of the shader programs.
+
+    Args:
+        directory (str): The directory containing the shader source files.
+        hot_reload (bool): Whether the shader programs are recompiled when their
+            source files change while the engine is running. A program that fails
+            to compile keeps its previous version.
+        reload_interval (float): The interval in seconds at which the source files
+            are checked for changes with hot reload.
+    """
+
+    directory: str = "shaders"
+    hot_reload: bool = False
+    reload_interval: float = 0.5
+
+
+class SchedulerParameters(BaseModel):
+    """Parameters of the scheduling of the simulation ticks and of the frames.
+
+    Args:
+        tick_rate (float): The number of simulation ticks per second, which is
+            independent of the frame rate.
+        max_ticks_per_frame (int): The maximum number of ticks run per frame, so
+            that slow frames do not trigger ever more ticks. The time of the ticks
+            beyond it is dropped, which slows the simulation down instead.
+        max_frame_rate (Optional[float]): The maximum number of frames rendered per
+            second. The time left until the next frame is used to load chunks
+            finished in the background before sleeping. Frames are not capped if
+            it is `None`.
+    """
+
+    tick_rate: float = 60.0
+    max_ticks_per_frame: int = 5
+    max_frame_rate: Optional[float] = None
+
+
+class GovernorParameters(BaseModel):
+    """Parameters of the governor adjusting the rendering quality to hold a
+    target frame time.
+
+    Args:
+        is_enabled (bool): Whether the render distance and render scale are
+            adjusted while the engine is running.
+        target_frame_time (float): The frame time in milliseconds to hold.
+        window_size (int): The number of most recent frames whose times are
+            compared with the target.
+        percentile (float): The percentile of the frame times of the window that
+            is compared with the target.
+        upper_threshold (float): The factor of the target frame time above which
+            the quality is lowered.
+        lower_threshold (float): The factor of the target frame time below which
+            the quality is raised.
+        min_render_distance (int): The smallest render distance in chunks.
+        max_render_distance (Optional[int]): The largest render distance in
+            chunks. Defaults to the render distance of the engine.
+        render_distance_step (int): The number of chunks by which the render
+            distance changes at once.
+        use_render_scale (bool): Whether the scene may be rendered at a lower
+            resolution than the window once the render distance is at its
+            minimum.
+        min_render_scale (float): The smallest fraction of the window resolution
+            the scene is rendered at.
+        render_scale_step (float): The amount by which the render scale changes at
+            once.
+    """
+
+    is_enabled: bool = False
+    target_frame_time: float = 1e3 / 60
+    window_size: int = 60
+    percentile: float = 90.0
+    upper_threshold: float = 1.1
+    lower_threshold: float = 0.7
+    min_render_distance: int = 4
+    max_render_distance: Optional[int] = None
+    render_distance_step: int = 2
+    use_render_scale: bool = False
+    min_render_scale: float = 0.5
+    render_scale_step: float = 0.125
+
+
+class EntityParameters(BaseModel):
+    """Parameters of the entities moving through the world.
+
+    Args:
+        count (int): The number of wandering entities spawned around the player
+            when the engine starts.
+        gravity (float): The downward acceleration of the entities in blocks per
+            second squared.
+        terminal_speed (float): The maximum falling speed of the entities in
+            blocks per second.
+        ground_friction (float): The fraction of their horizontal speed per second
+            that entities which do not walk lose on the ground.
+        walk_speed (float): The walk speed of the spawned entities in blocks per
+            second.
+        cell_size (float): The edge length in blocks of the cells of the spatial
+            hash finding the entities near each other. It must be at least the
+            size of the largest entity.
+    """
+
+    count: int = 0
+    gravity: float = 32.0
+    terminal_speed: float = 60.0
+    ground_friction: float = 8.0
+    walk_speed: float = 2.0
+    cell_size: float = 2.0
+
+
+class ServerParameters(BaseModel):
+    """Parameters of a chunk server running the world authoritatively for its
+    clients.
+
+    Args:
+        address (str): The address the server listens on, `<host>:<port>` for TCP
+            or `unix:<path>` for a Unix domain socket.
+        max_render_distance (int): The largest render distance in chunks a client
+            may ask for.
+        max_chunks_in_flight (int): The largest number of chunks sent to a client
+            that it has not acknowledged yet, whatever the client asks for.
+        num_workers (Optional[int]): The number of threads generating and
+            compressing chunks. Defaults to the number of CPU cores.
+        compression_level (int): The zlib compression level of the chunks sent.
+        payload_cache_size (int): The number of compressed chunks kept to be sent
+            to other clients without compressing them again.
+    """
+
+    address: str = "localhost:25565"
+    max_render_distance: int = 32
+    max_chunks_in_flight: int = 256
+    num_workers: Optional[int] = None
+    compression_level: int = 1
+    payload_cache_size: int = 4096
+
+
+class NetworkParameters(BaseModel):
+    """Parameters of the connection of the engine to a chunk server.
+
+    Args:
+        server_address (Optional[str]): The address of the chunk server the chunks
+            are streamed from instead of being generated locally, `<host>:<port>`
+            for TCP or `unix:<path>` for a Unix domain socket. Chunks are
+            generated locally if it is `None`.
+        max_chunks_in_flight (int): The largest number of chunks the server may
+            send before the engine acknowledges them, which bounds the chunks
+            waiting to be loaded when the frame loop falls behind.
+    """
+
+    server_address: Optional[str] = None
+    max_chunks_in_flight: int = 32
 
 
 class EngineParameters(BaseModel):
@@ -61,9 +419,99 @@ class EngineParameters(BaseModel):
         background_color (Optional[Tuple[int, int, int]], optional): The background
             color of the window.
         player_parameters (FirstPersonPlayerParameters): The parameters of the player.
+        world_parameters (WorldParameters): The parameters of the voxel world.
+        terrain_parameters (TerrainParameters): The parameters of the procedural
+            terrain generator.
+        render_distance (int): The distance in chunks up to which chunks around
+            the player are loaded and rendered.
+        chunk_vertex_format (Literal["float", "packed"]): The vertex format of the
+            chunk meshes. `packed` uses 4.5x less GPU memory than `float`.
+        chunk_upload_time_budget (float): The time in milliseconds per frame that
+            may be spent adding chunks generated in the background to the world
+            and uploading their meshes to the GPU.
+        num_chunk_workers (Optional[int]): The number of worker processes that
+            generate and mesh chunks. Defaults to the number of CPU cores.
+        caption_update_interval (float): The interval in milliseconds at which the
+            statistics in the window caption are updated.
+        profiler_parameters (ProfilerParameters): The parameters of the frame
+            profiler.
+        lod_parameters (LodParameters): The parameters of the level of detail of
+            distant terrain.
+        arena_parameters (ArenaParameters): The parameters of the buffer arena
+            of the chunk meshes.
+        occlusion_culling (bool): Whether the chunks that cannot be seen from the
+            player's chunk through caves and open air, such as caves hidden below
+            the surface, are culled.
+        lighting_parameters (LightingParameters): The parameters of the light of
+            the voxels.
+        texture_parameters (TextureParameters): The parameters of the textures of
+            the blocks.
+        shader_parameters (ShaderParameters): The parameters of the shader
+            programs.
+        scheduler_parameters (SchedulerParameters): The parameters of the
+            scheduling of the simulation ticks and of the frames.
+        governor_parameters (GovernorParameters): The parameters of the governor
+            adjusting the rendering quality to hold a target frame time.
+        entity_parameters (EntityParameters): The parameters of the entities.
+        network_parameters (NetworkParameters): The parameters of the connection
+            to a chunk server.
     """
 
     window_resolution: Tuple[int, int]
     depth_buffer_size: int
     background_color: Tuple[int, int, int] = (0, 0, 0)
     player_parameters: FirstPersonPlayerParameters
+    world_parameters: WorldParameters = WorldParameters()
+    terrain_parameters: TerrainParameters = TerrainParameters()
+    render_distance: int = 16
+    chunk_vertex_format: Literal["float", "packed"] = "packed"
+    chunk_upload_time_budget: float = 4.0
+    num_chunk_workers: Optional[int] = None
+    caption_update_interval: float = 500.0
+    profiler_parameters: ProfilerParameters = ProfilerParameters()
+    lod_parameters: LodParameters = LodParameters()
+    arena_parameters: ArenaParameters = ArenaParameters()
+    occlusion_culling: bool = True
+    lighting_parameters: LightingParameters = LightingParameters()
+    texture_parameters: TextureParameters = TextureParameters()
+    shader_parameters: ShaderParameters = ShaderParameters()
+    scheduler_parameters: SchedulerParameters = SchedulerParameters()
+    governor_parameters: GovernorParameters = GovernorParameters()
+    entity_parameters: EntityParameters = EntityParameters()
+    network_parameters: NetworkParameters = NetworkParameters()
+
+
+class HeadlessParameters(BaseModel):
+    """Headless rendering parameters.
+
+    Args:
+        frame_count (int): The number of frames to render and measure.
+        warmup_frame_count (int): The number of frames rendered before measuring,
+            so that shader compilation and buffer allocation are not measured.
+        camera_path (List[Tuple[float, float, float, float, float]]): The
+            keyframes of the camera path as `(x, y, z, yaw, pitch)` tuples, with
+            the angles in degrees. The camera moves linearly between consecutive
+            keyframes, spending the same number of frames between each pair.
+        wait_for_chunks (bool): Whether every frame waits until all the chunks
+            in range of the camera are loaded, outside of the measured frame time.
+            This makes the rendered frames independent of the speed of the
+            machine, so that runs are reproducible.
+        context_backend (Optional[str]): The backend of the standalone OpenGL
+            context, such as `egl` to render without a display server. The default
+            backend of the platform is used if it is `None`.
+        output_directory (Optional[str]): The directory that rendered frames are
+            saved to as PNG images. Frames are not saved if it is `None`.
+        output_interval (int): Every how many frames a frame is saved.
+    """
+
+    frame_count: int = 300
+    warmup_frame_count: int = 10
+    camera_path: List[Tuple[float, float, float, float, float]] = [
+        (0.0, 64.0, 0.0, -90.0, -20.0),
+        (128.0, 56.0, -128.0, -45.0, -10.0),
+        (256.0, 72.0, 0.0, 90.0, -30.0),
+    ]
+    wait_for_chunks: bool = True
+    context_backend: Optional[str] = "egl"
+    output_directory: Optional[str] = None
+    output_interval: int = 1
@@ -0,0 +1,171 @@
+import math
+from typing import List, Tuple
+
+import glm
+import numpy as np
+
+from .parameters import PhysicsParameters
+from .world import World
+from .world.blocks import BLOCK_IS_SOLID
+
+# The distance kept between a body and the blocks it collides with, so that a body
+# resting against a block is not considered to overlap it.
+COLLISION_SKIN = 1e-3
+
+
+def sweep_box(
+    world: World,
+    box_min: glm.vec3,
+    box_max: glm.vec3,
+    axis: int,
+    displacement: float,
+) -> float:
+    """Moves an axis-aligned box along one axis until it hits a solid block.
+
+    Only the voxels swept by the face of the box leading the movement are looked
+    up, so that the cost depends on the size of the box and the length of the
+    movement, but not on the size of the world. Voxels the box already overlaps
+    are ignored, so that a box stuck inside a block can move out of it.
+
+    Args:
+        world (World): The world the box moves in.
+        box_min (glm.vec3): The lower corner of the box.
+        box_max (glm.vec3): The upper corner of the box.
+        axis (int): The axis of the movement.
+        displacement (float): The signed length of the movement.
+
+    Returns:
+        float: The signed length the box can move before touching a solid block,
+            which is `displacement` if it hits none.
+    """
+    if displacement == 0:
+        return 0.0
+
+    # The range of voxels overlapped by the box along the two other axes.
+    lower, upper = [], []
+    for other_axis in range(3):
+        if other_axis == axis:
+            lower.append(0)
+            upper.append(0)
+            continue
+        lower.append(math.floor(box_min[other_axis] + COLLISION_SKIN))
+        upper.append(math.ceil(box_max[other_axis] - COLLISION_SKIN))
+
+    # The range of layers of voxels swept along the axis, ordered from the nearest
+    # to the farthest.
+    if displacement > 0:
+        nearest_layer = math.ceil(box_max[axis] - COLLISION_SKIN)
+        farthest_layer = math.ceil(box_max[axis] + displacement) - 1
+        layers = range(nearest_layer, farthest_layer + 1)
+    else:
+        nearest_layer = math.floor(box_min[axis] + COLLISION_SKIN) - 1
+        farthest_layer = math.floor(box_min[axis] + displacement)
+        layers = range(nearest_layer, farthest_layer - 1, -1)
+    if len(layers) == 0:
+        return displacement
+
+    lower[axis] = min(layers[0], layers[-1])
+    upper[axis] = max(layers[0], layers[-1]) + 1
+    grid = np.meshgrid(
+        *(np.arange(lower[index], upper[index]) for index in range(3)),
+        indexing="ij",
+    )
+    positions = np.stack([coordinates.ravel() for coordinates in grid], axis=1)
+    is_solid = BLOCK_IS_SOLID[world.get_blocks_at(positions)]
+    solid_layers = set(positions[is_solid, axis].tolist())
+    for layer in layers:
+        if layer in solid_layers:
+            if displacement > 0:
+                return max(
+                    0.0, min(displacement, layer - COLLISION_SKIN - box_max[axis])
+                )
+            return min(
+                0.0, max(displacement, layer + 1 + COLLISION_SKIN - box_min[axis])
+            )
+    return displacement
+
+
+class PhysicsBody:
+    """A body with an axis-aligned bounding box that falls under gravity and
+    collides with the solid blocks of a voxel world.
+
+    The body is advanced by one step per tick of the engine, whose fixed
+    duration keeps the simulation independent of the frame rate, and the
+    rendered position is interpolated between ticks by the owner of the body.
+    Every step, its movement is swept along the `y`, `x` and `z` axes in turn,
+    stopping at the first solid block, so that it slides along walls and lands on
+    the ground instead of tunneling through them at any speed.
+
+    Args:
+        world (World): The world the body moves in.
+        physics_parameters (PhysicsParameters): The parameters of the physics.
+        position (glm.vec3): The position of the center of the bottom face of
+            the bounding box.
+    """
+
+    def __init__(
+        self,
+        world: World,
+        physics_parameters: PhysicsParameters,
+        position: glm.vec3,
+    ) -> None:
+        self.world = world
+        self.gravity = physics_parameters.gravity
+        self.jump_speed = physics_parameters.jump_speed
+        self.terminal_speed = physics_parameters.terminal_speed
+        self.half_width = physics_parameters.width / 2
+        self.height = physics_parameters.height
+
+        self.position = glm.vec3(position)
+        self.velocity = glm.vec3(0.0)
+        self.is_grounded = False
+
+    def get_bounds(self) -> Tuple[glm.vec3, glm.vec3]:
+        """Returns the lower and upper corners of the bounding box."""
+        half_extent = glm.vec3(self.half_width, 0.0, self.half_width)
+        return (
+            self.position - half_extent,
+            self.position + half_extent + glm.vec3(0.0, self.height, 0.0),
+        )
+
+    def teleport(self, position: glm.vec3) -> None:
+        """Moves the body without sweeping it and stops it."""
+        self.position = glm.vec3(position)
+        self.velocity = glm.vec3(0.0)
+
+    def move(self, displacement: glm.vec3) -> List[int]:
+        """Sweeps the body along a displacement, axis by axis, and returns the
+        axes along which it collided with a solid block.
+        """
+        collided_axes = []
+        for axis in (1, 0, 2):
+            box_min, box_max = self.get_bounds()
+            allowed_displacement = sweep_box(
+                self.world, box_min, box_max, axis, displacement[axis]
+            )
+            self.position[axis] += allowed_displacement
+            if allowed_displacement != displacement[axis]:
+                collided_axes.append(axis)
+        return collided_axes
+
+    def step(self, time_step: float, walk_velocity: glm.vec2, is_jumping: bool) -> None:
+        """Advances the body by one time step.
+
+        Args:
+            time_step (float): The duration of the step in seconds.
+            walk_velocity (glm.vec2): The horizontal velocity along `x` and `z`
+                the body walks at.
+            is_jumping (bool): Whether the body jumps if it stands on the ground.
+        """
+        self.velocity.x = walk_velocity.x
+        self.velocity.z = walk_velocity.y
+        if is_jumping and self.is_grounded:
+            self.velocity.y = self.jump_speed
+        self.velocity.y = max(
+            self.velocity.y - self.gravity * time_step, -self.terminal_speed
+        )
+
+        collided_axes = self.move(self.velocity * time_step)
+        self.is_grounded = 1 in collided_axes and self.velocity.y < 0
+        for axis in collided_axes:
+            self.velocity[axis] = 0.0
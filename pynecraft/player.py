@@ -1,37 +1,75 @@
-from typing import Tuple
+from typing import Optional, Tuple
 
+import glm
 import pygame
 
 from .camera import Camera
 from .parameters import FirstPersonPlayerParameters
+from .physics import PhysicsBody
+from .world import World
 
 
 class FirstPersonPlayer(Camera):
     """Manages the first-person player's movement and camera control within the 3D game world.
 
+    If a world is given and physics is enabled, the player walks on the ground,
+    jumps and collides with the solid blocks of the world, stepping a physics
+    body once per tick. Otherwise the player flies freely.
+
+    The movement of the player is simulated in the fixed ticks of the engine with
+    `tick`, while the camera is turned by the mouse every frame with `update`,
+    which places the camera between the positions of the last two ticks.
+
     Args:
         window_resolution (Tuple[float, float]): The resolution of the window.
         player_parameters (FirstPersonPlayerParameters): The parameters of the first-person player.
+        world (Optional[World]): The world the player collides with.
     """
 
     def __init__(
         self,
         window_resolution: Tuple[float, float],
         player_parameters: FirstPersonPlayerParameters,
+        world: Optional[World] = None,
     ) -> None:
         self.player_speed = player_parameters.player_speed
         self.player_rotation_speed = player_parameters.player_rotation_speed
         self.mouse_sensitivity = player_parameters.mouse_sensitivity
+        self.reach_distance = player_parameters.reach_distance
         super().__init__(
             window_resolution=window_resolution,
             camera_parameters=player_parameters.camera_parameters,
         )
+        physics_parameters = player_parameters.physics_parameters
+        self.eye_offset = glm.vec3(0.0, physics_parameters.eye_height, 0.0)
+        self.physics_body = (
+            PhysicsBody(
+                world=world,
+                physics_parameters=physics_parameters,
+                position=self.position - self.eye_offset,
+            )
+            if world is not None and physics_parameters.is_enabled
+            else None
+        )
+        # The positions of the camera at the last two ticks, between which the
+        # rendered position is interpolated.
+        self.tick_position = glm.vec3(self.position)
+        self.previous_tick_position = glm.vec3(self.position)
+
+    def teleport(self, position: glm.vec3) -> None:
+        """Moves the camera of the player to a position, along with its body."""
+        self.position = glm.vec3(position)
+        self.tick_position = glm.vec3(position)
+        self.previous_tick_position = glm.vec3(position)
+        if self.physics_body is not None:
+            self.physics_body.teleport(self.position - self.eye_offset)
 
     def keyboard_control(self, delta_time: float):
         """Handles the keyboard input for controlling the player's movement.
 
         Args:
-            delta_time (float): The time elapsed since the last frame.
+            delta_time (float): The time elapsed since the last tick in
+                milliseconds.
         """
         key_state = pygame.key.get_pressed()
         velocity = self.player_speed * delta_time
@@ -48,6 +86,41 @@ class FirstPersonPlayer(Camera):
         if key_state[pygame.K_e]:
             self.move_down(velocity)
 
+    def physics_control(self, delta_time: float, is_physics_paused: bool = False):
+        """Handles the keyboard input for walking and jumping, and steps the
+        physics body of the player by one tick.
+
+        Args:
+            delta_time (float): The time elapsed since the last tick in
+                milliseconds.
+            is_physics_paused (bool): Whether the physics body is frozen in place,
+                e.g., while the chunks around it are not loaded yet.
+        """
+        key_state = pygame.key.get_pressed()
+        forward = glm.vec2(glm.cos(self.yaw), glm.sin(self.yaw))
+        right = glm.vec2(-forward.y, forward.x)
+        direction = glm.vec2(0.0)
+        if key_state[pygame.K_w]:
+            direction += forward
+        if key_state[pygame.K_s]:
+            direction -= forward
+        if key_state[pygame.K_a]:
+            direction -= right
+        if key_state[pygame.K_d]:
+            direction += right
+        if glm.length(direction) > 0:
+            direction = glm.normalize(direction)
+
+        # The player speed is in blocks per millisecond like the tick duration,
+        # while the physics body works in seconds.
+        if not is_physics_paused:
+            self.physics_body.step(
+                time_step=delta_time * 1e-3,
+                walk_velocity=direction * self.player_speed * 1e3,
+                is_jumping=key_state[pygame.K_SPACE],
+            )
+        self.position = self.physics_body.position + self.eye_offset
+
     def mouse_control(self):
         """Handles the mouse input for controlling the player's camera orientation."""
         mouse_change_horizontal, mouse_change_vertical = pygame.mouse.get_rel()
@@ -60,12 +133,30 @@ class FirstPersonPlayer(Camera):
                 vertical_offset=mouse_change_vertical * self.mouse_sensitivity
             )
 
-    def update(self, delta_time: float):
-        """Update the player's movement and camera control using the core game logic.
+    def tick(self, delta_time: float, is_physics_paused: bool = False):
+        """Simulate the player's movement over a tick of the engine.
+
+        Args:
+            delta_time (float): The duration of the tick in milliseconds.
+            is_physics_paused (bool): Whether the physics body is frozen in place.
+        """
+        self.previous_tick_position = glm.vec3(self.tick_position)
+        # The movement continues from the simulated position rather than from
+        # the interpolated one the camera was last rendered at.
+        self.position = glm.vec3(self.tick_position)
+        if self.physics_body is not None:
+            self.physics_control(delta_time, is_physics_paused=is_physics_paused)
+        else:
+            self.keyboard_control(delta_time=delta_time)
+        self.tick_position = glm.vec3(self.position)
+
+    def update(self, alpha: float = 1.0):
+        """Update the player's camera control every frame, placing the camera
+        between the positions of the last two ticks.
 
         Args:
-            delta_time (float): The time elapsed since the last frame.
+            alpha (float): The fraction of a tick elapsed since the last tick.
         """
-        self.keyboard_control(delta_time=delta_time)
+        self.position = glm.mix(self.previous_tick_position, self.tick_position, alpha)
         self.mouse_control()
         super().update()
@@ -0,0 +1,214 @@
+import json
+import time
+from contextlib import nullcontext
+from typing import ContextManager, Dict, List, Tuple
+
+import numpy as np
+
+from .parameters import ProfilerParameters
+
+# The context manager returned for every section while the profiler is disabled,
+# so that profiling a disabled section costs no more than a method call.
+_NULL_SECTION = nullcontext()
+
+
+class ProfilerSection:
+    """A context manager that records the time spent inside it as a section of a
+    profiler.
+
+    Args:
+        profiler (Profiler): The profiler the section is recorded into.
+        name (str): The name of the section.
+    """
+
+    __slots__ = ("profiler", "name", "start_time")
+
+    def __init__(self, profiler: "Profiler", name: str) -> None:
+        self.profiler = profiler
+        self.name = name
+        self.start_time = 0
+
+    def __enter__(self) -> "ProfilerSection":
+        self.profiler.depth += 1
+        self.start_time = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exception_info) -> None:
+        end_time = time.perf_counter_ns()
+        self.profiler.depth -= 1
+        self.profiler.record_section(
+            self.name, self.start_time, end_time, self.profiler.depth
+        )
+
+
+class Profiler:
+    """Records the time spent in named sections of the engine loop, such as the
+    update and render stages, along with per-frame counters such as the number of
+    draw calls.
+
+    Sections and counter values are written into fixed-size ring buffers of NumPy
+    arrays, so that memory use stays constant and recording never allocates. Only
+    the most recent `capacity` sections and counter values are kept. When the
+    profiler is disabled, `section` returns a shared no-op context manager and
+    nothing is recorded.
+
+    The recorded sections can be summarized per stage or exported as a Chrome
+    trace, which can be opened in `chrome://tracing` or https://ui.perfetto.dev.
+
+    Args:
+        profiler_parameters (ProfilerParameters): The parameters of the profiler.
+    """
+
+    def __init__(self, profiler_parameters: ProfilerParameters) -> None:
+        self.is_enabled = profiler_parameters.is_enabled
+        self.capacity = profiler_parameters.capacity
+        self.names: List[str] = []
+        self.name_ids: Dict[str, int] = {}
+        self.depth = 0
+        self.origin_time = time.perf_counter_ns()
+
+        self.section_count = 0
+        self.section_name_ids = np.zeros(self.capacity, dtype=np.int32)
+        self.section_start_times = np.zeros(self.capacity, dtype=np.int64)
+        self.section_durations = np.zeros(self.capacity, dtype=np.int64)
+        self.section_depths = np.zeros(self.capacity, dtype=np.int32)
+
+        self.counter_count = 0
+        self.counter_name_ids = np.zeros(self.capacity, dtype=np.int32)
+        self.counter_times = np.zeros(self.capacity, dtype=np.int64)
+        self.counter_values = np.zeros(self.capacity, dtype=np.float64)
+
+    def get_name_id(self, name: str) -> int:
+        """Returns the ID of a section or counter name, registering it if needed."""
+        name_id = self.name_ids.get(name)
+        if name_id is None:
+            name_id = self.name_ids[name] = len(self.names)
+            self.names.append(name)
+        return name_id
+
+    def section(self, name: str) -> ContextManager:
+        """Returns a context manager that records the time spent inside it as a
+        section with the given name.
+        """
+        if not self.is_enabled:
+            return _NULL_SECTION
+        return ProfilerSection(self, name)
+
+    def record_section(
+        self, name: str, start_time: int, end_time: int, depth: int = 0
+    ) -> None:
+        """Records a section given its start and end times in nanoseconds of
+        `time.perf_counter_ns` and its nesting depth.
+        """
+        index = self.section_count % self.capacity
+        self.section_name_ids[index] = self.get_name_id(name)
+        self.section_start_times[index] = start_time - self.origin_time
+        self.section_durations[index] = end_time - start_time
+        self.section_depths[index] = depth
+        self.section_count += 1
+
+    def set_counter(self, name: str, value: float) -> None:
+        """Records the current value of a counter."""
+        if not self.is_enabled:
+            return
+        index = self.counter_count % self.capacity
+        self.counter_name_ids[index] = self.get_name_id(name)
+        self.counter_times[index] = time.perf_counter_ns() - self.origin_time
+        self.counter_values[index] = value
+        self.counter_count += 1
+
+    def clear(self) -> None:
+        """Discards all recorded sections and counter values."""
+        self.section_count = 0
+        self.counter_count = 0
+
+    @staticmethod
+    def _get_chronological_order(count: int, capacity: int) -> np.ndarray:
+        """Returns the indices of the entries of a ring buffer from the oldest to
+        the newest.
+        """
+        if count <= capacity:
+            return np.arange(count)
+        return np.roll(np.arange(capacity), -(count % capacity))
+
+    def get_sections(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """Returns the name IDs, start times and durations in nanoseconds and the
+        depths of the recorded sections, from the oldest to the newest.
+        """
+        order = self._get_chronological_order(self.section_count, self.capacity)
+        return (
+            self.section_name_ids[order],
+            self.section_start_times[order],
+            self.section_durations[order],
+            self.section_depths[order],
+        )
+
+    def get_counters(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Returns the name IDs, times in nanoseconds and values of the recorded
+        counter values, from the oldest to the newest.
+        """
+        order = self._get_chronological_order(self.counter_count, self.capacity)
+        return (
+            self.counter_name_ids[order],
+            self.counter_times[order],
+            self.counter_values[order],
+        )
+
+    def get_statistics(self) -> Dict[str, Tuple[float, float, float]]:
+        """Returns the mean, 95th percentile and maximum time in milliseconds
+        spent in each section, over the recorded sections.
+        """
+        name_ids, _, durations, _ = self.get_sections()
+        statistics = {}
+        for name_id in np.unique(name_ids):
+            section_durations = durations[name_ids == name_id] * 1e-6
+            statistics[self.names[name_id]] = (
+                float(section_durations.mean()),
+                float(np.percentile(section_durations, 95)),
+                float(section_durations.max()),
+            )
+        return statistics
+
+    def format_summary(self) -> str:
+        """Returns a table of the statistics of each section, slowest first."""
+        statistics = sorted(
+            self.get_statistics().items(), key=lambda item: item[1][1], reverse=True
+        )
+        width = max([len(name) for name, _ in statistics] + [len("section")])
+        lines = [f"{'section':<{width}}  mean (ms)  p95 (ms)  max (ms)"]
+        for name, (mean, p95, maximum) in statistics:
+            lines.append(f"{name:<{width}}  {mean:9.3f}  {p95:8.3f}  {maximum:8.3f}")
+        return "\n".join(lines)
+
+    def export_chrome_trace(self, path: str) -> None:
+        """Writes the recorded sections and counter values to a JSON file in the
+        Chrome trace event format.
+        """
+        events = []
+        name_ids, start_times, durations, _ = self.get_sections()
+        for name_id, start_time, duration in zip(name_ids, start_times, durations):
+            events.append(
+                {
+                    "name": self.names[name_id],
+                    "ph": "X",
+                    "ts": start_time * 1e-3,
+                    "dur": duration * 1e-3,
+                    "pid": 0,
+                    "tid": 0,
+                }
+            )
+        for name_id, counter_time, value in zip(*self.get_counters()):
+            name = self.names[name_id]
+            events.append(
+                {
+                    "name": name,
+                    "ph": "C",
+                    "ts": counter_time * 1e-3,
+                    "pid": 0,
+                    "args": {name: value},
+                }
+            )
+        with open(path, "w") as file:
+            json.dump(
+                {"traceEvents": events, "displayTimeUnit": "ms"}, file, default=float
+            )
@@ -0,0 +1,106 @@
+from typing import Tuple
+
+import moderngl
+
+
+class RenderScaleFramebuffer:
+    """An offscreen framebuffer that the scene is rendered into at a fraction of
+    the output resolution, and that is then stretched over the output
+    framebuffer with bilinear filtering. Rendering fewer pixels reduces the cost
+    of the fragment shaders and of the memory bandwidth, at the cost of a
+    blurrier image.
+
+    The framebuffer is stretched by drawing a single triangle covering the
+    output with the blit shader program, which samples its color texture.
+
+    Args:
+        opengl_context (moderngl.Context): The OpenGL context.
+        program (moderngl.Program): The blit shader program.
+        resolution (Tuple[int, int]): The resolution of the output framebuffer.
+        scale (float): The fraction of the output resolution rendered at.
+    """
+
+    def __init__(
+        self,
+        opengl_context: moderngl.Context,
+        program: moderngl.Program,
+        resolution: Tuple[int, int],
+        scale: float = 1.0,
+    ) -> None:
+        self.opengl_context = opengl_context
+        self.program = program
+        self.resolution = (int(resolution[0]), int(resolution[1]))
+        self.scale = None
+        self.color_texture: moderngl.Texture = None
+        self.depth_buffer: moderngl.Renderbuffer = None
+        self.framebuffer: moderngl.Framebuffer = None
+        # The triangle is generated from the vertex index in the vertex shader,
+        # so the vertex array object has no buffers.
+        self.vertex_array_object = opengl_context.vertex_array(program, [])
+        self.set_scale(scale)
+
+    @property
+    def is_scaled(self) -> bool:
+        """Whether the scene is rendered at a lower resolution than the output."""
+        return self.scale < 1.0
+
+    @property
+    def scaled_resolution(self) -> Tuple[int, int]:
+        """The resolution the scene is rendered at."""
+        return tuple(max(round(extent * self.scale), 1) for extent in self.resolution)
+
+    def set_scale(self, scale: float) -> None:
+        """Changes the fraction of the output resolution rendered at, recreating
+        the attachments of the framebuffer.
+        """
+        assert 0.0 < scale <= 1.0, "The render scale must be in (0, 1]."
+        if scale == self.scale:
+            return
+        self.scale = scale
+        self.release_framebuffer()
+        if not self.is_scaled:
+            return
+        resolution = self.scaled_resolution
+        self.color_texture = self.opengl_context.texture(resolution, 3)
+        self.color_texture.filter = (moderngl.LINEAR, moderngl.LINEAR)
+        self.color_texture.repeat_x = False
+        self.color_texture.repeat_y = False
+        self.depth_buffer = self.opengl_context.depth_renderbuffer(resolution)
+        self.framebuffer = self.opengl_context.framebuffer(
+            color_attachments=[self.color_texture],
+            depth_attachment=self.depth_buffer,
+        )
+
+    def set_program(self, program: moderngl.Program) -> None:
+        """Replaces the blit shader program, e.g., after it was reloaded."""
+        self.program = program
+        self.vertex_array_object.release()
+        self.vertex_array_object = self.opengl_context.vertex_array(program, [])
+
+    def use(self) -> None:
+        """Binds the framebuffer, so that the scene is rendered into it."""
+        self.framebuffer.use()
+
+    def blit(self, output_framebuffer: moderngl.Framebuffer) -> None:
+        """Stretches the rendered scene over an output framebuffer."""
+        output_framebuffer.use()
+        self.color_texture.use(location=2)
+        self.program["u_source"].value = 2
+        # The triangle covers the whole output, so it is never hidden.
+        self.opengl_context.disable(moderngl.DEPTH_TEST)
+        self.vertex_array_object.render(moderngl.TRIANGLES, vertices=3)
+        self.opengl_context.enable(moderngl.DEPTH_TEST)
+
+    def release_framebuffer(self) -> None:
+        """Releases the framebuffer and its attachments."""
+        for resource in (self.framebuffer, self.color_texture, self.depth_buffer):
+            if resource is not None:
+                resource.release()
+        self.framebuffer = None
+        self.color_texture = None
+        self.depth_buffer = None
+
+    def release(self) -> None:
+        """Releases the OpenGL objects owned by the framebuffer."""
+        self.release_framebuffer()
+        self.vertex_array_object.release()
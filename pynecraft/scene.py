@@ -1,24 +1,420 @@
+from typing import Dict, Literal, Optional, Sequence, Tuple
+
 import moderngl
+import numpy as np
+
+from .camera import Camera
+from .lod import LodTile
+from .mesh import ChunkMesh, MeshArena
+from .mesh.meshing import PACKED_POSITION_BITS
+from .occlusion import OcclusionCuller, get_face_connectivity
+from .parameters import ProfilerParameters
+from .profiler import Profiler
+from .world import World
 
-from .mesh import QuadMesh
+ChunkPosition = Tuple[int, int, int]
 
 
 class Scene:
-    """A scene that defines a collection of meshes and renders them.
+    """A scene that holds the meshes of the chunks of a voxel world and renders
+    the ones that are inside the view frustum of the camera.
+
+    The bounding boxes of all chunk meshes are kept in a single NumPy array, so
+    that the whole scene is culled against the view frustum with one vectorized
+    test per frame.
+
+    Distant terrain is held as meshes of tiles at reduced levels of detail next
+    to the chunk meshes, and culled along with them. The visible tiles of each
+    level are drawn nearest to the camera first until the triangle budget of
+    their level is spent.
+
+    If the scene is given a buffer arena, the vertex data of all its meshes is
+    sub-allocated from the arena, and the visible meshes are drawn with one draw
+    call per vertex buffer of the arena instead of one per mesh.
+
+    With occlusion culling enabled, the chunks that cannot be seen from the
+    camera's chunk through the see-through voxels of the chunks in between, such
+    as caves below the surface, are culled as well. Distant tiles are never
+    occlusion culled.
+
+    The translucent faces of the visible meshes are drawn by `render_translucent`
+    after all the opaque geometry, meshes from back to front, and without writing
+    depth. The faces within a mesh are only re-sorted once the camera moves far
+    enough to change their order: into another voxel for meshes next to the
+    camera, and into another chunk for the rest.
 
     Args:
         opengl_context (moderngl.Context): The OpenGL context.
         program (moderngl.Program): The shader program used to render the scene.
+            It must match `vertex_format`.
+        camera (Camera): The camera the scene is viewed from.
+        world (World): The voxel world to be rendered.
+        vertex_format (Literal["float", "packed"]): The vertex format of the
+            chunk meshes.
+        profiler (Optional[Profiler]): The profiler that times the culling and
+            drawing of the scene. Defaults to a disabled profiler.
+        lod_triangle_budgets (Sequence[int]): The largest number of triangles
+            drawn per frame for the tiles of each level of detail, starting from
+            level `1`. Levels without a budget are not limited.
+        arena (Optional[MeshArena]): The buffer arena the meshes are allocated
+            from. It must use the same vertex format as the scene. If not
+            provided, every mesh owns its own vertex buffer.
+        occlusion_culling (bool): Whether the chunks hidden behind solid terrain
+            are culled using the connectivity of the faces of the chunks.
+        block_layers (Optional[np.ndarray]): The texture layer of every block ID,
+            which is written into the packed vertices of the chunks meshed on the
+            main thread.
     """
 
     def __init__(
-        self, opengl_context: moderngl.Context, program: moderngl.Program
+        self,
+        opengl_context: moderngl.Context,
+        program: moderngl.Program,
+        camera: Camera,
+        world: World,
+        vertex_format: Literal["float", "packed"] = "packed",
+        profiler: Optional[Profiler] = None,
+        lod_triangle_budgets: Sequence[int] = (),
+        arena: Optional[MeshArena] = None,
+        occlusion_culling: bool = False,
+        block_layers: Optional[np.ndarray] = None,
+    ) -> None:
+        self.opengl_context = opengl_context
+        self.program = program
+        self.camera = camera
+        self.world = world
+        self.vertex_format = vertex_format
+        self.profiler = profiler or Profiler(ProfilerParameters())
+        self.lod_triangle_budgets = tuple(lod_triangle_budgets)
+        assert (
+            arena is None or arena.vertex_format == vertex_format
+        ), "The arena must use the vertex format of the scene."
+        assert (
+            vertex_format != "packed" or world.chunk_size < 1 << PACKED_POSITION_BITS
+        ), (
+            "Packed vertices hold chunks of at most "
+            f"{(1 << PACKED_POSITION_BITS) - 1} voxels per edge."
+        )
+        self.arena = arena
+        self.occlusion_culler = OcclusionCuller() if occlusion_culling else None
+        self.block_layers = block_layers
+
+        self.chunk_meshes: Dict[ChunkPosition, ChunkMesh] = {}
+        self.lod_meshes: Dict[LodTile, ChunkMesh] = {}
+        self._mesh_list = []
+        self._bounds = np.zeros((0, 2, 3), dtype="float64")
+        self._lod_levels = np.zeros(0, dtype="int64")
+        self._triangle_counts = np.zeros(0, dtype="int64")
+        self._arena_slots = np.zeros(0, dtype="int64")
+        self._chunk_positions = np.zeros((0, 3), dtype="int64")
+        self._is_bounds_dirty = False
+
+        # Statistics of the last rendered frame.
+        self.visible_chunk_count = 0
+        self.culled_chunk_count = 0
+        self.occluded_chunk_count = 0
+        self.over_budget_tile_count = 0
+        self.draw_call_count = 0
+        self.triangle_count = 0
+        self.sorted_translucent_mesh_count = 0
+        self.sorted_translucent_quad_count = 0
+        self._visible_indices = np.zeros(0, dtype="int64")
+
+        for chunk in self.world:
+            self.add_chunk(chunk.position)
+
+    def set_program(self, program: moderngl.Program) -> None:
+        """Replaces the shader program drawing the meshes of the scene that own
+        their vertex buffer, e.g., after it was reloaded. Meshes drawn from an
+        arena are drawn with the program of the arena.
+        """
+        self.program = program
+        for mesh in [*self.chunk_meshes.values(), *self.lod_meshes.values()]:
+            mesh.set_program(program)
+
+    def create_chunk_mesh(
+        self,
+        chunk_position: ChunkPosition,
+        vertex_data: Optional[np.ndarray] = None,
+        lod_level: int = 0,
+    ) -> ChunkMesh:
+        """Creates a mesh of a chunk or of a distant tile in the vertex format and
+        arena of the scene, without adding it to the scene. The chunk is meshed
+        from the blocks of the world if no vertex data is given.
+        """
+        return ChunkMesh(
+            opengl_context=self.opengl_context,
+            program=self.program,
+            world=self.world,
+            chunk_position=chunk_position,
+            vertex_format=self.vertex_format,
+            vertex_data=vertex_data,
+            lod_level=lod_level,
+            arena=self.arena,
+            block_layers=self.block_layers,
+        )
+
+    def add_chunk(self, chunk_position: ChunkPosition) -> ChunkMesh:
+        """Meshes a chunk of the world and adds it to the scene, replacing any
+        previous mesh of the same chunk.
+        """
+        mesh = self.create_chunk_mesh(chunk_position)
+        self.add_chunk_mesh(mesh)
+        if self.occlusion_culler is not None:
+            chunk = self.world.get_chunk(chunk_position)
+            if chunk is not None:
+                self.set_chunk_connectivity(
+                    chunk_position, get_face_connectivity(chunk.get_blocks())
+                )
+        return mesh
+
+    def add_chunk_mesh(self, mesh: ChunkMesh) -> None:
+        """Adds a chunk mesh to the scene, replacing any previous mesh of the same
+        chunk.
+        """
+        previous_mesh = self.chunk_meshes.pop(mesh.chunk_position, None)
+        if previous_mesh is not None:
+            previous_mesh.release()
+        self.chunk_meshes[mesh.chunk_position] = mesh
+        self._is_bounds_dirty = True
+
+    def detach_chunk_mesh(self, chunk_position: ChunkPosition) -> Optional[ChunkMesh]:
+        """Removes the mesh of a chunk from the scene without releasing its
+        buffers, so that it can be added back later, and returns it.
+        """
+        mesh = self.chunk_meshes.pop(chunk_position, None)
+        if mesh is not None:
+            self._is_bounds_dirty = True
+        return mesh
+
+    def set_chunk_connectivity(
+        self, chunk_position: ChunkPosition, connectivity: int
     ) -> None:
-        self.mesh = QuadMesh(opengl_context=opengl_context, program=program)
+        """Sets the connectivity mask of the faces of a chunk used for occlusion
+        culling, which is ignored if occlusion culling is disabled.
+        """
+        if self.occlusion_culler is not None:
+            self.occlusion_culler.set_connectivity(chunk_position, connectivity)
+
+    def update_chunk_mesh(
+        self, chunk_position: ChunkPosition, vertex_data: np.ndarray
+    ) -> None:
+        """Replaces the vertex data of the mesh of an edited chunk, creating the
+        mesh if the chunk had none.
+        """
+        mesh = self.chunk_meshes.get(chunk_position)
+        if mesh is None:
+            if len(vertex_data):
+                self.add_chunk_mesh(self.create_chunk_mesh(chunk_position, vertex_data))
+            return
+        was_empty = mesh.triangle_count == 0
+        mesh.update_vertex_data(vertex_data)
+        if was_empty != (mesh.triangle_count == 0):
+            self._is_bounds_dirty = True
+
+    def remove_chunk(self, chunk_position: ChunkPosition) -> None:
+        """Removes the mesh of a chunk from the scene and releases its buffers."""
+        if self.occlusion_culler is not None:
+            self.occlusion_culler.remove(chunk_position)
+        mesh = self.chunk_meshes.pop(chunk_position, None)
+        if mesh is not None:
+            mesh.release()
+            self._is_bounds_dirty = True
+
+    def add_lod_mesh(self, mesh: ChunkMesh) -> None:
+        """Adds the mesh of a distant tile to the scene, replacing any previous mesh
+        of the same tile.
+        """
+        tile = LodTile(mesh.lod_level, mesh.chunk_position)
+        self.remove_lod_tile(tile)
+        self.lod_meshes[tile] = mesh
+        self._is_bounds_dirty = True
+
+    def remove_lod_tile(self, tile: LodTile) -> None:
+        """Removes the mesh of a distant tile from the scene and releases its
+        buffers.
+        """
+        mesh = self.lod_meshes.pop(tile, None)
+        if mesh is not None:
+            mesh.release()
+            self._is_bounds_dirty = True
+
+    def get_bounds(self) -> np.ndarray:
+        """Returns the bounding boxes of the non-empty chunk and tile meshes as an
+        array of shape `(n, 2, 3)` holding the lower and upper corner of every box,
+        in the same order as `self._mesh_list`.
+        """
+        if self._is_bounds_dirty:
+            self._mesh_list = [
+                mesh
+                for meshes in (self.chunk_meshes, self.lod_meshes)
+                for mesh in meshes.values()
+                if mesh.triangle_count > 0
+            ]
+            origins = np.array(
+                [mesh.origin for mesh in self._mesh_list], dtype="float64"
+            ).reshape(-1, 3)
+            extents = np.array(
+                [mesh.extent for mesh in self._mesh_list], dtype="float64"
+            )
+            self._bounds = np.stack([origins, origins + extents[:, None]], axis=1)
+            # The meshes of distant tiles are never updated, so the triangle
+            # counts taken here stay valid for them.
+            self._lod_levels = np.array(
+                [mesh.lod_level for mesh in self._mesh_list], dtype="int64"
+            )
+            self._triangle_counts = np.array(
+                [mesh.triangle_count for mesh in self._mesh_list], dtype="int64"
+            )
+            self._arena_slots = np.array(
+                [
+                    -1 if mesh.arena_slot is None else mesh.arena_slot
+                    for mesh in self._mesh_list
+                ],
+                dtype="int64",
+            )
+            self._chunk_positions = np.array(
+                [mesh.chunk_position for mesh in self._mesh_list], dtype="int64"
+            ).reshape(-1, 3)
+            self._is_bounds_dirty = False
+        return self._bounds
+
+    def apply_lod_triangle_budgets(
+        self, visible_indices: np.ndarray, bounds: np.ndarray
+    ) -> np.ndarray:
+        """Returns the indices of the visible meshes without the distant tiles that
+        exceed the triangle budget of their level of detail, keeping the tiles
+        nearest to the camera.
+        """
+        levels = self._lod_levels[visible_indices]
+        is_kept = (levels == 0) | (levels > len(self.lod_triangle_budgets))
+        if is_kept.all():
+            return visible_indices
+        centers = bounds[visible_indices].mean(axis=1)
+        distances = np.linalg.norm(centers - np.asarray(self.camera.position), axis=1)
+        for level, budget in enumerate(self.lod_triangle_budgets, start=1):
+            at_level = np.flatnonzero(levels == level)
+            at_level = at_level[np.argsort(distances[at_level], kind="stable")]
+            triangle_counts = self._triangle_counts[visible_indices[at_level]]
+            is_kept[at_level[np.cumsum(triangle_counts) <= budget]] = True
+        return visible_indices[is_kept]
+
+    def get_visible_mesh_indices(self) -> np.ndarray:
+        """Returns the indices into `self._mesh_list` of the meshes that intersect
+        the view frustum of the camera, are not occluded and fit into the triangle
+        budgets.
+        """
+        bounds = self.get_bounds()
+        frustum = self.camera.get_frustum()
+        is_visible = frustum.intersects_aabbs(bounds[:, 0], bounds[:, 1])
+        self.occluded_chunk_count = 0
+        if self.occlusion_culler is not None:
+            with self.profiler.section("scene.occlusion"):
+                camera_chunk = np.floor(
+                    np.asarray(self.camera.position) / self.world.chunk_size
+                )
+                self.occlusion_culler.update(tuple(camera_chunk.astype(int)))
+                is_unoccluded = self.occlusion_culler.is_potentially_visible(
+                    self._chunk_positions
+                )
+                # Tiles are positioned in tile coordinates, and are not culled.
+                is_unoccluded |= self._lod_levels > 0
+                self.occluded_chunk_count = int(np.sum(is_visible & ~is_unoccluded))
+                is_visible &= is_unoccluded
+        visible_indices = np.flatnonzero(is_visible)
+        within_budget_indices = self.apply_lod_triangle_budgets(visible_indices, bounds)
+        self.visible_chunk_count = len(within_budget_indices)
+        self.culled_chunk_count = len(self._mesh_list) - len(visible_indices)
+        self.over_budget_tile_count = len(visible_indices) - len(within_budget_indices)
+        return within_budget_indices
+
+    def get_visible_chunk_meshes(self):
+        """Returns the chunk meshes that intersect the view frustum of the camera."""
+        return [self._mesh_list[index] for index in self.get_visible_mesh_indices()]
 
     def update(self) -> None:
-        pass
+        """Compacts the vertex buffers of the arena whose free space became too
+        fragmented, one per frame at most.
+        """
+        if self.arena is not None:
+            self.arena.compact_fragmented_pages(max_page_count=1)
 
     def render(self):
-        """Render the scene."""
-        self.mesh.render()
+        """Render the opaque geometry of the visible meshes of the scene."""
+        self.draw_call_count = 0
+        self.triangle_count = 0
+        with self.profiler.section("scene.cull"):
+            visible_indices = self.get_visible_mesh_indices()
+        self._visible_indices = visible_indices
+        with self.profiler.section("scene.draw"):
+            if self.arena is not None:
+                visible_slots = self._arena_slots[visible_indices]
+                self.draw_call_count = self.arena.render(visible_slots)
+                self.triangle_count = 2 * int(
+                    self.arena.slot_quad_counts[visible_slots].sum()
+                )
+                return
+            for index in visible_indices:
+                mesh = self._mesh_list[index]
+                mesh.render()
+                self.draw_call_count += 1
+                self.triangle_count += 2 * mesh.quad_count
+
+    def sort_translucent_meshes(self, meshes: Sequence[ChunkMesh]) -> None:
+        """Sorts the translucent faces of meshes from back to front if the camera
+        moved into another voxel, for the meshes within a chunk of the camera, or
+        into another chunk, for the others, since they were last sorted.
+        """
+        self.sorted_translucent_mesh_count = 0
+        self.sorted_translucent_quad_count = 0
+        chunk_size = self.world.chunk_size
+        camera_position = np.asarray(self.camera.position, dtype="float32")
+        camera_voxel = np.floor(camera_position).astype("int64")
+        voxel_key = tuple(camera_voxel.tolist())
+        chunk_key = tuple((camera_voxel // chunk_size).tolist())
+        for mesh in meshes:
+            translucent_mesh = mesh.translucent_mesh
+            origin = np.asarray(mesh.origin)
+            is_near = np.all(
+                (camera_voxel >= origin - chunk_size)
+                & (camera_voxel < origin + mesh.extent + chunk_size)
+            )
+            sort_key = voxel_key if is_near else chunk_key
+            if translucent_mesh.sort_key == sort_key:
+                continue
+            translucent_mesh.sort(camera_position)
+            translucent_mesh.sort_key = sort_key
+            self.sorted_translucent_mesh_count += 1
+            self.sorted_translucent_quad_count += translucent_mesh.quad_count
+
+    def render_translucent(self):
+        """Render the translucent faces of the meshes drawn by the last call to
+        `render`, blended over the geometry rendered so far.
+        """
+        meshes = [
+            mesh
+            for mesh in (self._mesh_list[index] for index in self._visible_indices)
+            if mesh.translucent_mesh is not None
+        ]
+        if not meshes:
+            self.sorted_translucent_mesh_count = 0
+            self.sorted_translucent_quad_count = 0
+            return
+        with self.profiler.section("scene.translucent_sort"):
+            self.sort_translucent_meshes(meshes)
+        with self.profiler.section("scene.translucent_draw"):
+            centers = np.array([mesh.origin for mesh in meshes], dtype="float64") + (
+                np.array([mesh.extent for mesh in meshes], dtype="float64")[:, None] / 2
+            )
+            distances = np.square(centers - np.asarray(self.camera.position)).sum(
+                axis=1
+            )
+            # Translucent faces do not hide what is drawn behind them later.
+            framebuffer = self.opengl_context.fbo
+            framebuffer.depth_mask = False
+            for index in np.argsort(-distances, kind="stable"):
+                translucent_mesh = meshes[index].translucent_mesh
+                translucent_mesh.render()
+                self.draw_call_count += 1
+                self.triangle_count += translucent_mesh.triangle_count
+            framebuffer.depth_mask = True
@@ -0,0 +1,122 @@
+import time
+from typing import Callable, Optional
+
+from .parameters import SchedulerParameters
+
+
+class FixedTickScheduler:
+    """Decouples the simulation from the frame rate by running it in ticks of a
+    fixed duration, while frames are rendered as often as possible or at a
+    capped rate.
+
+    Every frame, the real time elapsed since the previous frame is accumulated
+    and `advance` returns how many whole ticks fit into it, carrying the rest
+    over to the next frame. The fraction of a tick left over, `alpha`, is used to
+    interpolate the rendered state between the last two ticks, so that movement
+    looks smooth at any frame rate.
+
+    A frame that takes longer than the ticks it triggers would make the next
+    frame trigger even more ticks, a spiral of death in which the simulation
+    never catches up. At most `max_ticks_per_frame` ticks are therefore run per
+    frame, and the time of the other ticks is dropped, which slows the
+    simulation down instead.
+
+    With a frame rate cap, `wait_for_next_frame` hands the time left until the
+    next frame to an idle callback, e.g., to load chunks finished in the
+    background, before sleeping for the rest of it.
+
+    Args:
+        scheduler_parameters (SchedulerParameters): The parameters of the
+            scheduler.
+        clock (Callable[[], float]): The function returning the current time in
+            seconds.
+    """
+
+    def __init__(
+        self,
+        scheduler_parameters: SchedulerParameters,
+        clock: Callable[[], float] = time.perf_counter,
+    ) -> None:
+        assert scheduler_parameters.tick_rate > 0, "The tick rate must be positive."
+        self.tick_duration = 1.0 / scheduler_parameters.tick_rate
+        self.max_ticks_per_frame = scheduler_parameters.max_ticks_per_frame
+        max_frame_rate = scheduler_parameters.max_frame_rate
+        self.frame_duration = 1.0 / max_frame_rate if max_frame_rate else None
+        self.clock = clock
+
+        self.accumulated_time = 0.0
+        self.last_time: Optional[float] = None
+        self.next_frame_time: Optional[float] = None
+        # The total number of ticks run, and of seconds dropped by the spiral of
+        # death guard and spent idle before frames.
+        self.tick_count = 0
+        self.dropped_time = 0.0
+        self.idle_time = 0.0
+
+    @property
+    def tick_duration_ms(self) -> float:
+        """The duration of a tick in milliseconds."""
+        return 1e3 * self.tick_duration
+
+    @property
+    def alpha(self) -> float:
+        """The fraction of a tick accumulated since the last tick, by which the
+        rendered state is interpolated from the previous tick to the last one.
+        """
+        return min(self.accumulated_time / self.tick_duration, 1.0)
+
+    def advance(self) -> int:
+        """Accumulates the time elapsed since the previous frame and returns the
+        number of ticks to run in this frame.
+        """
+        now = self.clock()
+        if self.last_time is not None:
+            self.accumulated_time += now - self.last_time
+        self.last_time = now
+
+        tick_count = int(self.accumulated_time / self.tick_duration)
+        if tick_count > self.max_ticks_per_frame:
+            # Drop the whole ticks that cannot be caught up with, but keep the
+            # fraction of a tick so that interpolation does not jump.
+            dropped_time = (tick_count - self.max_ticks_per_frame) * self.tick_duration
+            self.accumulated_time -= dropped_time
+            self.dropped_time += dropped_time
+            tick_count = self.max_ticks_per_frame
+        self.accumulated_time -= tick_count * self.tick_duration
+        self.tick_count += tick_count
+        return tick_count
+
+    def wait_for_next_frame(
+        self, idle_callback: Optional[Callable[[float], None]] = None
+    ) -> float:
+        """Waits until the next frame is due if the frame rate is capped, running
+        an idle callback first.
+
+        Args:
+            idle_callback (Optional[Callable[[float], None]]): A function called
+                with the time in milliseconds left until the next frame, which it
+                should not exceed.
+
+        Returns:
+            float: The time in seconds spent waiting, including the idle callback.
+        """
+        if self.frame_duration is None:
+            return 0.0
+        start_time = self.clock()
+        if self.next_frame_time is None:
+            self.next_frame_time = start_time
+        self.next_frame_time += self.frame_duration
+        if self.next_frame_time < start_time:
+            # The frame overran its slot, so the next frames are paced from now
+            # instead of being rushed to make up for it.
+            self.next_frame_time = start_time
+            return 0.0
+
+        if idle_callback is not None:
+            idle_callback(1e3 * (self.next_frame_time - start_time))
+        remaining_time = self.next_frame_time - self.clock()
+        if remaining_time > 0:
+            time.sleep(remaining_time)
+        waited_time = self.clock() - start_time
+        self.idle_time += waited_time
+        return waited_time
@@ -1,19 +1,45 @@
-import os
+from typing import Optional, Tuple
 
 import glm
 import moderngl
+import numpy as np
 
 from .player import FirstPersonPlayer
+from .shader_registry import ShaderRegistry
+from .textures import BlockTextureAtlas
+from .world.blocks import BLOCK_ALPHAS, BLOCK_COLORS
 
 
 class ShaderProgram:
     """ShaderProgram encapsulates the handling of shaders by interacting
     directly with an OpenGL context provided by moderngl.
 
+    Four programs are compiled from the same shader sources by a
+    `ShaderRegistry`: `program`, which reads `"3f 3f"` position and color
+    vertices, `packed_program`, which is compiled with `PACKED_VERTICES` defined
+    and decodes the `"2u"` packed vertices of chunk meshes, `arena_program`,
+    which is additionally compiled with `CHUNK_ARENA` defined and reads the origin
+    and scale of packed chunks from a per-draw attribute, so that the chunks of a
+    buffer arena can be drawn with a single draw call, and `instanced_program`,
+    which is compiled with `INSTANCED` defined and transforms `"3f 3f"` vertices
+    by the per-instance attributes of an `InstancedMesh`. They share the camera
+    matrices through the uniform buffer of the registry. A separate `blit_program`
+    stretches the scene rendered at a lower resolution over the window.
+
+    With a block texture atlas, both packed programs are also compiled with
+    `BLOCK_TEXTURES` defined and color packed vertices from the texture layer of
+    their block rather than from its color.
+
     Args:
         opengl_context (moderngl.Context): The OpenGL context.
         shader_dir (str): The directory containing the vertex and fragment
             shader source code files.
+        block_texture_atlas (Optional[BlockTextureAtlas]): The textures of the
+            blocks. Blocks are plain colored if it is `None`.
+        hot_reload (bool): Whether the programs are recompiled when their shader
+            sources change while the engine is running.
+        reload_interval (float): The interval in seconds at which the shader
+            sources are checked for changes with hot reload.
     """
 
     def __init__(
@@ -21,44 +47,118 @@ class ShaderProgram:
         opengl_context: moderngl.Context,
         player: FirstPersonPlayer,
         shader_dir: str,
+        block_texture_atlas: Optional[BlockTextureAtlas] = None,
+        hot_reload: bool = False,
+        reload_interval: float = 0.5,
     ) -> None:
         self.opengl_context = opengl_context
         self.player = player
+        self.block_texture_atlas = block_texture_atlas
+
+        self.registry = ShaderRegistry(
+            opengl_context=opengl_context,
+            shader_dir=shader_dir,
+            hot_reload=hot_reload,
+            reload_interval=reload_interval,
+        )
+        packed_defines = ["PACKED_VERTICES"]
+        if block_texture_atlas is not None:
+            packed_defines.append("BLOCK_TEXTURES")
+        self.registry.register("default")
+        self.registry.register("packed", defines=packed_defines)
+        self.registry.register("arena", defines=[*packed_defines, "CHUNK_ARENA"])
+        self.registry.register("instanced", defines=["INSTANCED"])
+        self.registry.register(
+            "blit",
+            vertex_shader="blit_vertex_shader.glsl",
+            fragment_shader="blit_fragment_shader.glsl",
+        )
+        # Reloaded programs lose the values of their uniforms.
+        self.registry.add_reload_listener(lambda name, program: self.set_uniforms())
+
+        # A 256x1 texture holding the color and the opacity of the first 256
+        # block ids, which is looked up by the packed vertex shader. Larger ids
+        # are clamped to the last entry, the grey of unknown blocks.
+        block_colors = np.column_stack([BLOCK_COLORS[:256], BLOCK_ALPHAS[:256]])
+        self.block_color_texture = self.opengl_context.texture(
+            (len(block_colors), 1), 4, block_colors.tobytes(), dtype="f4"
+        )
+        self.block_color_texture.filter = (moderngl.NEAREST, moderngl.NEAREST)
+        self.block_texture = (
+            block_texture_atlas.create_texture(self.opengl_context)
+            if block_texture_atlas is not None
+            else None
+        )
 
-        self.program = self.get_program(shader_dir=shader_dir)
         self.set_uniforms()
 
-    def get_program(self, shader_dir: str) -> moderngl.Program:
-        """Create a shader program from the vertex and fragment shader source
+    @property
+    def program(self) -> moderngl.Program:
+        """The program drawing `"3f 3f"` position and color vertices."""
+        return self.registry["default"]
 
-        Args:
-            shader_dir (str): The directory containing the vertex and fragment
-                shader source code files.
-        """
-        assert os.path.isdir(
-            shader_dir
-        ), f"Shader directory '{shader_dir}' does not exist."
+    @property
+    def packed_program(self) -> moderngl.Program:
+        """The program drawing the packed vertices of a chunk mesh."""
+        return self.registry["packed"]
+
+    @property
+    def arena_program(self) -> moderngl.Program:
+        """The program drawing the packed vertices of the chunks of an arena."""
+        return self.registry["arena"]
 
-        with open(os.path.join(shader_dir, "vertex_shader.glsl"), "r") as file:
-            vertex_shader_source = file.read()
+    @property
+    def instanced_program(self) -> moderngl.Program:
+        """The program drawing the instances of an instanced mesh."""
+        return self.registry["instanced"]
 
-        with open(os.path.join(shader_dir, "fragment_shader.glsl"), "r") as file:
-            fragment_shader_source = file.read()
+    @property
+    def blit_program(self) -> moderngl.Program:
+        """The program stretching a texture over the output framebuffer."""
+        return self.registry["blit"]
 
-        return self.opengl_context.program(
-            vertex_shader=vertex_shader_source, fragment_shader=fragment_shader_source
+    @property
+    def programs(self) -> Tuple[moderngl.Program, ...]:
+        """All the shader programs, which share the camera uniforms."""
+        return (
+            self.program,
+            self.packed_program,
+            self.arena_program,
+            self.instanced_program,
         )
 
     def set_uniforms(self):
         """Set the uniform variables of the shader program, the values of which
         remain constant for all vertices processed during a single draw call.
         """
-        # Set the projection matrix uniform variable to the vertex shader
-        self.program["m_proj"].write(self.player.projection_matrix)
-        # Set the model matrix uniform variable to the vertex shader
-        self.program["m_model"].write(glm.mat4())
+        registry = self.registry
+        for name in ("default", "packed", "arena", "instanced"):
+            # Set the model matrix uniform variable to the vertex shader
+            registry.set_uniform(name, "m_model", glm.mat4())
+
+        # Bind the block color texture to texture unit 0 of the packed programs,
+        # which also holds the opacity of textured blocks, and the block texture
+        # atlas to texture unit 1 if blocks are textured
+        self.block_color_texture.use(location=0)
+        for name in ("packed", "arena"):
+            registry.set_uniform(name, "u_block_colors", 0)
+        if self.block_texture is None:
+            return
+        atlas = self.block_texture_atlas
+        self.block_texture.use(location=1)
+        for name in ("packed", "arena"):
+            registry.set_uniform(name, "u_block_textures", 1)
+            registry.set_uniform(name, "u_atlas_columns", atlas.columns)
+            registry.set_uniform(
+                name, "u_tile_size", (1 / atlas.columns, 1 / atlas.rows)
+            )
 
     def update(self):
-        """Update the uniform variables of the shader program."""
-        # Set the view matrix uniform variable to the vertex shader
-        self.program["m_view"].write(self.player.view_matrix)
+        """Update the uniform variables of the shader program, by writing the
+        camera matrices of the player into the uniform buffer shared by every
+        program, and reload the programs whose shader sources changed.
+        """
+        self.registry.reload_changed()
+        self.registry.write_camera(
+            self.player.projection_matrix, self.player.view_matrix
+        )
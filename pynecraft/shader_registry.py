@@ -0,0 +1,259 @@
+import hashlib
+import os
+import time
+from typing import Callable, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+import glm
+import moderngl
+
+# The binding point of the uniform block holding the camera matrices, which every
+# program registered with a `ShaderRegistry` shares.
+CAMERA_UNIFORM_BLOCK_BINDING = 0
+
+# The name of the uniform block holding the camera matrices in the shaders.
+CAMERA_UNIFORM_BLOCK = "Camera"
+
+
+class ProgramSource(NamedTuple):
+    """The sources a named shader program is compiled from.
+
+    Args:
+        vertex_shader (str): The path of the vertex shader source.
+        fragment_shader (str): The path of the fragment shader source.
+        defines (Tuple[str, ...]): The preprocessor macros defined in both shaders.
+    """
+
+    vertex_shader: str
+    fragment_shader: str
+    defines: Tuple[str, ...]
+
+
+def add_defines(source: str, defines: Sequence[str]) -> str:
+    """Inserts `#define` directives into a shader source right after its `#version`
+    directive, which must come before anything else.
+    """
+    if not defines:
+        return source
+    directives = "".join(f"#define {define}\n" for define in defines)
+    version_end = source.index("\n", source.index("#version")) + 1
+    return source[:version_end] + directives + source[version_end:]
+
+
+class ShaderRegistry:
+    """Compiles and owns named shader programs, caches the handles of their
+    uniforms, and shares the camera matrices across all of them through a uniform
+    buffer that is written once per frame.
+
+    Every source file is read once and every distinct combination of sources and
+    defines is compiled once, however many names it is registered under. With hot
+    reload, the registry polls the modification times of the source files and
+    recompiles the programs of the files that changed, keeping the previous
+    program if the new sources do not compile. Code holding on to a program, such
+    as its vertex array objects, is told about the new program by the listeners
+    added with `add_reload_listener`.
+
+    Args:
+        opengl_context (moderngl.Context): The OpenGL context.
+        shader_dir (str): The directory containing the shader source files.
+        hot_reload (bool): Whether changed shader sources are recompiled while the
+            engine is running.
+        reload_interval (float): The interval in seconds at which the modification
+            times of the shader sources are polled with hot reload.
+    """
+
+    def __init__(
+        self,
+        opengl_context: moderngl.Context,
+        shader_dir: str,
+        hot_reload: bool = False,
+        reload_interval: float = 0.5,
+    ) -> None:
+        assert os.path.isdir(
+            shader_dir
+        ), f"Shader directory '{shader_dir}' does not exist."
+        self.opengl_context = opengl_context
+        self.shader_dir = shader_dir
+        self.hot_reload = hot_reload
+        self.reload_interval = reload_interval
+        self.last_reload_check_time = time.perf_counter()
+
+        self.sources: Dict[str, ProgramSource] = {}
+        self.programs: Dict[str, moderngl.Program] = {}
+        self.uniforms: Dict[Tuple[str, str], Optional[moderngl.Uniform]] = {}
+        self.reload_listeners: List[Callable[[str, moderngl.Program], None]] = []
+        # The contents and modification times of the source files, and the
+        # programs compiled from every distinct set of preprocessed sources.
+        self.file_contents: Dict[str, str] = {}
+        self.file_modification_times: Dict[str, float] = {}
+        self.compiled_programs: Dict[str, moderngl.Program] = {}
+
+        # Two `mat4` of the camera in the `std140` layout: the projection matrix
+        # followed by the view matrix.
+        self.camera_buffer = opengl_context.buffer(reserve=2 * 64, dynamic=True)
+        self.camera_buffer.bind_to_uniform_block(CAMERA_UNIFORM_BLOCK_BINDING)
+
+    def __getitem__(self, name: str) -> moderngl.Program:
+        """Returns the current program registered under a name."""
+        return self.programs[name]
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.programs
+
+    def read_source(self, path: str) -> str:
+        """Returns the content of a source file, which is only read from disk the
+        first time or after it was modified.
+        """
+        modification_time = os.path.getmtime(path)
+        if self.file_modification_times.get(path) != modification_time:
+            with open(path, "r") as file:
+                self.file_contents[path] = file.read()
+            self.file_modification_times[path] = modification_time
+        return self.file_contents[path]
+
+    def compile(self, source: ProgramSource) -> moderngl.Program:
+        """Returns the program compiled from a set of sources, compiling it only if
+        no program was compiled from the same preprocessed sources before.
+        """
+        vertex_shader = add_defines(
+            self.read_source(source.vertex_shader), source.defines
+        )
+        fragment_shader = add_defines(
+            self.read_source(source.fragment_shader), source.defines
+        )
+        key = hashlib.sha256(f"{vertex_shader}\0{fragment_shader}".encode()).hexdigest()
+        program = self.compiled_programs.get(key)
+        if program is None:
+            program = self.opengl_context.program(
+                vertex_shader=vertex_shader, fragment_shader=fragment_shader
+            )
+            camera_block = program.get(CAMERA_UNIFORM_BLOCK, None)
+            if isinstance(camera_block, moderngl.UniformBlock):
+                camera_block.binding = CAMERA_UNIFORM_BLOCK_BINDING
+            self.compiled_programs[key] = program
+        return program
+
+    def register(
+        self,
+        name: str,
+        defines: Sequence[str] = (),
+        vertex_shader: str = "vertex_shader.glsl",
+        fragment_shader: str = "fragment_shader.glsl",
+    ) -> moderngl.Program:
+        """Compiles a program and registers it under a name.
+
+        Args:
+            name (str): The name of the program.
+            defines (Sequence[str]): Preprocessor macros to define in both shaders,
+                which select optional code paths of the shader sources.
+            vertex_shader (str): The file name of the vertex shader source in the
+                shader directory.
+            fragment_shader (str): The file name of the fragment shader source in
+                the shader directory.
+
+        Returns:
+            moderngl.Program: The compiled program.
+        """
+        source = ProgramSource(
+            os.path.join(self.shader_dir, vertex_shader),
+            os.path.join(self.shader_dir, fragment_shader),
+            tuple(defines),
+        )
+        self.sources[name] = source
+        self.programs[name] = self.compile(source)
+        return self.programs[name]
+
+    def get_uniform(self, name: str, uniform: str) -> Optional[moderngl.Uniform]:
+        """Returns the cached handle of a uniform of a program, or `None` if the
+        program has no such uniform, e.g., because the compiler optimized it away.
+        """
+        key = (name, uniform)
+        if key not in self.uniforms:
+            member = self.programs[name].get(uniform, None)
+            self.uniforms[key] = (
+                member if isinstance(member, moderngl.Uniform) else None
+            )
+        return self.uniforms[key]
+
+    def set_uniform(self, name: str, uniform: str, value) -> None:
+        """Sets a uniform of a program through its cached handle, unless the
+        program has no such uniform.
+        """
+        handle = self.get_uniform(name, uniform)
+        if handle is None:
+            return
+        if isinstance(value, (glm.mat4, glm.vec3, glm.vec4)):
+            handle.write(value)
+        else:
+            handle.value = value
+
+    def write_camera(self, projection_matrix: glm.mat4, view_matrix: glm.mat4) -> None:
+        """Writes the camera matrices shared by all programs into the uniform
+        buffer, with a single write.
+        """
+        self.camera_buffer.write(projection_matrix.to_bytes() + view_matrix.to_bytes())
+
+    def add_reload_listener(
+        self, listener: Callable[[str, moderngl.Program], None]
+    ) -> None:
+        """Adds a function called with the name and the new program of every
+        program that is reloaded.
+        """
+        self.reload_listeners.append(listener)
+
+    def reload_changed(self) -> List[str]:
+        """Recompiles the programs whose source files were modified since they were
+        compiled, if hot reload is enabled and the reload interval has passed.
+
+        Returns:
+            List[str]: The names of the reloaded programs.
+        """
+        now = time.perf_counter()
+        if (
+            not self.hot_reload
+            or now - self.last_reload_check_time < self.reload_interval
+        ):
+            return []
+        self.last_reload_check_time = now
+        changed_paths = {
+            path
+            for path, modification_time in self.file_modification_times.items()
+            if os.path.exists(path) and os.path.getmtime(path) != modification_time
+        }
+        if not changed_paths:
+            return []
+
+        reloaded_names = []
+        for name, source in self.sources.items():
+            if not changed_paths.intersection(source[:2]):
+                continue
+            try:
+                program = self.compile(source)
+            except moderngl.Error as error:
+                print(f"Failed to reload shader program '{name}': {error}")
+                continue
+            if program is self.programs[name]:
+                continue
+            self.programs[name] = program
+            self.uniforms = {
+                key: handle for key, handle in self.uniforms.items() if key[0] != name
+            }
+            reloaded_names.append(name)
+        # Programs that are no longer registered under any name are released.
+        in_use = {id(program) for program in self.programs.values()}
+        for key, program in list(self.compiled_programs.items()):
+            if id(program) not in in_use:
+                program.release()
+                del self.compiled_programs[key]
+        for name in reloaded_names:
+            for listener in self.reload_listeners:
+                listener(name, self.programs[name])
+        return reloaded_names
+
+    def release(self) -> None:
+        """Releases the programs and the camera uniform buffer."""
+        for program in self.compiled_programs.values():
+            program.release()
+        self.compiled_programs.clear()
+        self.programs.clear()
+        self.uniforms.clear()
+        self.camera_buffer.release()
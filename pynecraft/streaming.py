@@ -0,0 +1,463 @@
+import itertools
+import time
+from typing import Dict, Iterable, Optional, Set, Tuple
+
+import glm
+import numpy as np
+
+from .jobs import ChunkJobSystem
+from .lod import LodTile, select_lod_tiles
+from .mesh import ChunkMesh
+from .occlusion import FULL_CONNECTIVITY
+from .parameters import LodParameters
+from .scene import Scene
+from .world import World
+from .world.region import RegionStorage
+
+ChunkPosition = Tuple[int, int, int]
+
+
+def get_tile_bounds(tiles: Iterable[LodTile]) -> np.ndarray:
+    """Returns the lower and upper corners in chunk coordinates of the boxes
+    covered by tiles as an array of shape `(n, 2, 3)`. Chunks can be passed as
+    tiles of level `0`.
+    """
+    positions = np.array([tile.position for tile in tiles], dtype="int64")
+    scales = np.array([tile.scale for tile in tiles], dtype="int64")
+    lower = positions.reshape(-1, 3) * scales[:, None]
+    return np.stack([lower, lower + scales[:, None]], axis=1)
+
+
+def get_overlapping(bounds: np.ndarray, other_bounds: np.ndarray) -> np.ndarray:
+    """Returns whether every box of `bounds` overlaps any box of `other_bounds`."""
+    if len(bounds) == 0 or len(other_bounds) == 0:
+        return np.zeros(len(bounds), dtype=bool)
+    is_overlapping = (bounds[:, None, 0] < other_bounds[None, :, 1]) & (
+        other_bounds[None, :, 0] < bounds[:, None, 1]
+    )
+    return is_overlapping.all(axis=2).any(axis=1)
+
+
+def get_chunk_positions_in_range(
+    center: ChunkPosition, distance: int, chunk_y_range: Tuple[int, int]
+) -> Set[ChunkPosition]:
+    """Returns the positions of the chunks within a horizontal distance of a chunk,
+    in a vertical range of chunks.
+    """
+    offsets = np.arange(-distance, distance + 1)
+    offset_x, offset_z = np.meshgrid(offsets, offsets, indexing="ij")
+    in_range = offset_x**2 + offset_z**2 <= distance**2
+    columns = zip(offset_x[in_range] + center[0], offset_z[in_range] + center[2])
+    chunk_ys = range(chunk_y_range[0], chunk_y_range[1] + 1)
+    return {
+        (int(chunk_x), chunk_y, int(chunk_z))
+        for chunk_x, chunk_z in columns
+        for chunk_y in chunk_ys
+    }
+
+
+class ChunkStreamer:
+    """Keeps the chunks within the render distance of the player loaded, by
+    requesting missing chunks from a `ChunkJobSystem` and unloading chunks the
+    player has moved away from.
+
+    Chunks are loaded within a vertical cylinder around the player's chunk whose
+    height is given by the range of heights the terrain generator may fill.
+    Chunks are only unloaded once they are one chunk beyond the render distance,
+    so that moving back and forth across a chunk border does not reload chunks.
+    If a storage is given, modified chunks are saved to it when they are unloaded
+    or when `save` is called, and the job system loads them back from disk.
+
+    With levels of detail enabled, the chunks and the distant tiles to be loaded
+    are instead selected together by `select_lod_tiles`, so that the tiles of
+    reduced detail exactly fill the space around the full-detail chunks. Distant
+    tiles are generated from the terrain generator only and do not show edits.
+    When the selection changes, the chunks and tiles that are no longer selected
+    stay in the scene until every selected chunk and tile replacing them is
+    loaded, and are then swapped for them in one step, so that the transitions
+    between levels never leave holes. Chunks covered by a tile stay loaded, but
+    hidden, up to one chunk beyond the render distance as well.
+
+    Args:
+        world (World): The world the chunks are loaded into.
+        scene (Scene): The scene the chunk meshes are added to.
+        job_system (ChunkJobSystem): The job system that generates and meshes the
+            chunks.
+        render_distance (int): The distance in chunks up to which chunks are
+            loaded.
+        height_range (Tuple[int, int]): The lowest and highest world `y`
+            coordinate the terrain generator may fill.
+        storage (Optional[RegionStorage]): The storage modified chunks are saved
+            to.
+        lod_parameters (LodParameters): The parameters of the level of detail of
+            distant terrain.
+    """
+
+    def __init__(
+        self,
+        world: World,
+        scene: Scene,
+        job_system: ChunkJobSystem,
+        render_distance: int,
+        height_range: Tuple[int, int],
+        storage: Optional[RegionStorage] = None,
+        lod_parameters: LodParameters = LodParameters(),
+    ) -> None:
+        self.world = world
+        self.scene = scene
+        self.job_system = job_system
+        self.render_distance = render_distance
+        self.storage = storage
+        self.chunk_y_range = (
+            height_range[0] // world.chunk_size,
+            height_range[1] // world.chunk_size,
+        )
+        self.loaded: Set[ChunkPosition] = set()
+        # The chunks that stay loaded around the current center, beyond which
+        # chunks are unloaded and chunks that finish loading are dropped.
+        self.kept: Set[ChunkPosition] = set()
+        self.center: Optional[ChunkPosition] = None
+
+        self.lod_level_count = lod_parameters.level_count
+        self.lod_distance_factor = lod_parameters.distance_factor
+        self.selected_chunks: Set[ChunkPosition] = set()
+        self.selected_tiles: Set[LodTile] = set()
+        self.loaded_tiles: Set[LodTile] = set()
+        # With levels of detail, the chunks and tiles whose meshes are in the
+        # scene, and the meshes of the loaded ones that are not, which are held
+        # back until they can be swapped in. Chunks are keyed as tiles of level
+        # `0`, and chunks without faces have no mesh.
+        self.shown: Set[LodTile] = set()
+        self.held_meshes: Dict[LodTile, Optional[ChunkMesh]] = {}
+        self._is_transition_dirty = False
+
+    def get_chunk_positions_in_range(
+        self, center: ChunkPosition, distance: int
+    ) -> Set[ChunkPosition]:
+        """Returns the positions of the chunks within a horizontal distance of a
+        chunk, across the vertical range of the terrain.
+        """
+        return get_chunk_positions_in_range(center, distance, self.chunk_y_range)
+
+    def is_in_range(
+        self, chunk_position: ChunkPosition, center: ChunkPosition, distance: int
+    ) -> bool:
+        """Returns whether a chunk is within a horizontal distance of a chunk and
+        within the vertical range of the terrain.
+        """
+        return (
+            (chunk_position[0] - center[0]) ** 2 + (chunk_position[2] - center[2]) ** 2
+            <= distance**2
+        ) and self.chunk_y_range[0] <= chunk_position[1] <= self.chunk_y_range[1]
+
+    def is_loaded_around(self, position: glm.vec3, margin: float = 2.0) -> bool:
+        """Returns whether all the chunks within `margin` blocks of a world
+        position are loaded, ignoring chunks outside the vertical range of the
+        terrain, which are always empty.
+        """
+        corners = itertools.product(
+            *(
+                (int(np.floor(coordinate - margin)), int(np.floor(coordinate + margin)))
+                for coordinate in position
+            )
+        )
+        for corner in corners:
+            chunk_position = self.world.get_chunk_position(*corner)
+            is_in_height_range = (
+                self.chunk_y_range[0] <= chunk_position[1] <= self.chunk_y_range[1]
+            )
+            if is_in_height_range and chunk_position not in self.loaded:
+                return False
+        return True
+
+    @property
+    def is_loading(self) -> bool:
+        """Whether requested chunks or tiles are still being generated."""
+        return len(self.job_system) > 0
+
+    def wait(self, timeout: Optional[float] = None) -> None:
+        """Blocks until a requested chunk or tile is finished or `timeout` seconds
+        expire.
+        """
+        self.job_system.wait(timeout)
+
+    def set_render_distance(self, render_distance: int) -> None:
+        """Changes the distance in chunks up to which chunks are loaded, along with
+        the radii of the rings of distant tiles. The chunks and tiles are selected
+        again at the next update.
+        """
+        if render_distance == self.render_distance:
+            return
+        self.render_distance = render_distance
+        self.center = None
+
+    def update(self, position: glm.vec3) -> None:
+        """Requests and unloads chunks after the player has moved to another chunk.
+
+        Args:
+            position (glm.vec3): The position of the player.
+        """
+        center = self.world.get_chunk_position(
+            int(np.floor(position.x)),
+            int(np.floor(position.y)),
+            int(np.floor(position.z)),
+        )
+        if center == self.center:
+            return
+        self.center = center
+        self.job_system.set_focus(center)
+
+        if self.lod_level_count > 0:
+            chunk_positions, tiles = select_lod_tiles(
+                center,
+                self.render_distance,
+                self.lod_level_count,
+                self.lod_distance_factor,
+                self.chunk_y_range,
+            )
+            self.selected_chunks = chunk_positions
+            self.kept = chunk_positions | self.get_chunk_positions_in_range(
+                center, self.render_distance + 1
+            )
+            self.update_tiles(tiles)
+        else:
+            chunk_positions = self.get_chunk_positions_in_range(
+                center, self.render_distance
+            )
+            self.kept = self.get_chunk_positions_in_range(
+                center, self.render_distance + 1
+            )
+
+        for chunk_position in chunk_positions:
+            if chunk_position not in self.loaded:
+                self.job_system.request(chunk_position)
+        for chunk_position in list(self.job_system.requested - self.kept):
+            self.job_system.cancel(chunk_position)
+        for chunk_position in self.loaded - self.kept:
+            # Shown chunks are unloaded once the tiles replacing them are loaded.
+            if LodTile(0, chunk_position) not in self.shown:
+                self.unload_chunk(chunk_position)
+        self._is_transition_dirty = True
+        self.update_transitions()
+
+    def update_tiles(self, tiles: Set[LodTile]) -> None:
+        """Requests the newly selected distant tiles and cancels the requests of
+        the tiles that are no longer selected. The loaded tiles that are no longer
+        selected are removed by `update_transitions`.
+        """
+        self.selected_tiles = tiles
+        for tile in tiles - self.loaded_tiles:
+            self.job_system.request_tile(tile)
+        for tile in list(self.job_system.requested_tiles - tiles):
+            self.job_system.cancel_tile(tile)
+
+    def update_transitions(self) -> None:
+        """Swaps the shown chunks and tiles that are no longer selected for the
+        selected ones that were loaded, once every selected chunk and tile that
+        overlaps them is loaded. Loaded chunks and tiles that do not replace any
+        shown one are shown right away.
+        """
+        if not self._is_transition_dirty:
+            return
+        self._is_transition_dirty = False
+        for tile in [tile for tile in self.held_meshes if tile.level > 0]:
+            if tile not in self.selected_tiles:
+                self.release_tile(tile)
+        selected = self.selected_tiles.union(
+            LodTile(0, chunk_position) for chunk_position in self.selected_chunks
+        )
+        retiring = [item for item in self.shown if item not in selected]
+        candidates = [item for item in self.held_meshes if item in selected]
+        if retiring:
+            pending = [
+                item
+                for item in selected
+                if item not in self.shown and item not in self.held_meshes
+            ]
+            retiring_bounds = get_tile_bounds(retiring)
+            is_waiting = get_overlapping(retiring_bounds, get_tile_bounds(pending))
+            for item, is_item_waiting in zip(retiring, is_waiting):
+                if not is_item_waiting:
+                    self.hide(item)
+            retiring = [item for item in retiring if item in self.shown]
+            is_blocked = get_overlapping(
+                get_tile_bounds(candidates), get_tile_bounds(retiring)
+            )
+            candidates = [
+                item
+                for item, is_item_blocked in zip(candidates, is_blocked)
+                if not is_item_blocked
+            ]
+        for item in candidates:
+            self.show(item)
+
+    def show(self, item: LodTile) -> None:
+        """Adds the held mesh of a chunk or a tile to the scene."""
+        mesh = self.held_meshes.pop(item)
+        self.shown.add(item)
+        if mesh is None:
+            return
+        if item.level == 0:
+            self.scene.add_chunk_mesh(mesh)
+        else:
+            self.scene.add_lod_mesh(mesh)
+
+    def hide(self, item: LodTile) -> None:
+        """Removes a chunk or a tile that was replaced from the scene. Chunks are
+        unloaded unless they are kept, in which case their mesh is held back.
+        """
+        self.shown.discard(item)
+        if item.level > 0:
+            self.loaded_tiles.discard(item)
+            self.scene.remove_lod_tile(item)
+        elif item.position in self.kept:
+            self.held_meshes[item] = self.scene.detach_chunk_mesh(item.position)
+        else:
+            self.unload_chunk(item.position)
+
+    def release_tile(self, tile: LodTile) -> None:
+        """Releases the held mesh of a tile that is no longer selected."""
+        self.loaded_tiles.discard(tile)
+        mesh = self.held_meshes.pop(tile)
+        if mesh is not None:
+            mesh.release()
+
+    def unload_chunk(self, chunk_position: ChunkPosition) -> None:
+        """Removes a chunk from the world and the scene, saving it first if it was
+        modified.
+        """
+        self.loaded.discard(chunk_position)
+        item = LodTile(0, chunk_position)
+        self.shown.discard(item)
+        mesh = self.held_meshes.pop(item, None)
+        if mesh is not None:
+            mesh.release()
+        chunk = self.world.remove_chunk(chunk_position)
+        if chunk is not None and chunk.is_modified and self.storage is not None:
+            self.storage.save_chunk(chunk)
+        self.scene.remove_chunk(chunk_position)
+
+    def save(self) -> int:
+        """Saves all modified chunks and returns their number."""
+        if self.storage is None:
+            return 0
+        return self.storage.save_chunks(self.world)
+
+    def remesh_dirty_chunks(self) -> int:
+        """Submits the loaded chunks that were edited since the last call to be
+        remeshed in the background, and uploads the meshes of the chunks that
+        finished remeshing. Returns the number of chunks submitted.
+        """
+        count = 0
+        for chunk_position in self.world.pop_dirty_chunks():
+            if chunk_position not in self.loaded:
+                continue
+            self.remesh_chunk(chunk_position)
+            count += 1
+        self.job_system.drain_meshes(self.update_chunk_mesh)
+        return count
+
+    def remesh_chunk(self, chunk_position: ChunkPosition) -> None:
+        """Submits a loaded chunk to be remeshed in the background from the blocks
+        and light of the world.
+        """
+        size = self.world.chunk_size
+        origin = np.asarray(chunk_position) * size
+        start, end = tuple(origin - 1), tuple(origin + size + 1)
+        padded_blocks = self.world.get_region(start, end)
+        padded_light = (
+            self.world.light_map.get_region(start, end)
+            if self.world.light_map is not None
+            else None
+        )
+        self.job_system.remesh(chunk_position, padded_blocks, padded_light)
+
+    def update_chunk_mesh(
+        self,
+        chunk_position: ChunkPosition,
+        vertex_data: np.ndarray,
+        connectivity: int = FULL_CONNECTIVITY,
+    ) -> None:
+        """Uploads the vertex data and the connectivity mask of a remeshed chunk,
+        unless the chunk was unloaded while it was being remeshed.
+        """
+        if chunk_position not in self.loaded:
+            return
+        item = LodTile(0, chunk_position)
+        if item not in self.held_meshes:
+            self.scene.update_chunk_mesh(chunk_position, vertex_data)
+        elif self.held_meshes[item] is not None:
+            self.held_meshes[item].update_vertex_data(vertex_data)
+        elif len(vertex_data):
+            self.held_meshes[item] = self.scene.create_chunk_mesh(
+                chunk_position, vertex_data
+            )
+        self.scene.set_chunk_connectivity(chunk_position, connectivity)
+
+    def load_chunk(
+        self,
+        chunk_position: ChunkPosition,
+        blocks: Optional[np.ndarray],
+        vertex_data: np.ndarray,
+        is_from_storage: bool = False,
+        connectivity: int = FULL_CONNECTIVITY,
+        light: Optional[np.ndarray] = None,
+    ) -> None:
+        """Adds a generated or loaded chunk and its light to the world, uploads its
+        mesh to the GPU and hands its connectivity mask to the scene for occlusion
+        culling. Chunks start out unmodified whether they were generated or loaded
+        from disk, since generating them again yields the same blocks, so that
+        only the chunks edited since are saved when they are unloaded. Chunks
+        without light are fully lit by the sky. With levels of detail, the mesh is
+        held back until `update_transitions` shows it.
+        """
+        if chunk_position not in self.kept or chunk_position in self.loaded:
+            # The player moved away while the chunk was being generated, or the
+            # chunk is already loaded and may have been edited since.
+            return
+        self.loaded.add(chunk_position)
+        mesh = None
+        if blocks is not None:
+            self.world.create_chunk(
+                chunk_position, blocks=blocks.copy(), is_modified=False
+            )
+            if self.world.light_map is not None:
+                self.world.light_map.set_chunk_light(chunk_position, light)
+            if len(vertex_data):
+                mesh = self.scene.create_chunk_mesh(chunk_position, vertex_data)
+            # Solid chunks have no mesh but still hide the chunks behind them.
+            self.scene.set_chunk_connectivity(chunk_position, connectivity)
+        if self.lod_level_count > 0:
+            self.held_meshes[LodTile(0, chunk_position)] = mesh
+            self._is_transition_dirty = True
+        elif mesh is not None:
+            self.scene.add_chunk_mesh(mesh)
+
+    def load_tile(self, tile: LodTile, vertex_data: np.ndarray) -> None:
+        """Uploads the mesh of a distant tile to the GPU, unless the tile was
+        deselected while it was being generated.
+        """
+        if tile not in self.selected_tiles:
+            return
+        self.loaded_tiles.add(tile)
+        self.held_meshes[tile] = (
+            self.scene.create_chunk_mesh(
+                tile.position, vertex_data, lod_level=tile.level
+            )
+            if len(vertex_data)
+            else None
+        )
+        self._is_transition_dirty = True
+
+    def upload(self, time_budget: float) -> int:
+        """Loads the chunks finished by the job system, nearest to the player first,
+        then the finished distant tiles with the rest of a time budget in
+        milliseconds. Returns the number of chunks and tiles loaded.
+        """
+        start_time = time.perf_counter()
+        count = self.job_system.drain(self.load_chunk, time_budget)
+        remaining_time_budget = time_budget - 1e3 * (time.perf_counter() - start_time)
+        if remaining_time_budget > 0:
+            count += self.job_system.drain_tiles(self.load_tile, remaining_time_budget)
+        self.update_transitions()
+        return count
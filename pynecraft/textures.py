@@ -0,0 +1,259 @@
+import hashlib
+import math
+import os
+from typing import Dict, List, Optional
+
+import moderngl
+import numpy as np
+import pygame
+
+from .world.blocks import BLOCK_COLORS, Block
+
+# The version of the layout of the cached atlases, which is part of their content
+# hash so that a change of the packing invalidates the atlases cached before it.
+TEXTURE_CACHE_VERSION = 1
+
+# The exponent of the gamma curve that the colors of the source images are
+# encoded with. Mipmaps are averaged in linear light, so that textures do not get
+# darker in the distance.
+_GAMMA = 2.2
+
+
+def load_image(path: str, texture_size: int) -> np.ndarray:
+    """Loads an image as RGBA pixels, scaled to a square texture with
+    nearest-neighbour sampling so that the pixels of small textures stay sharp.
+
+    Args:
+        path (str): The path of the image, in any format supported by pygame.
+        texture_size (int): The width and height of the texture in pixels.
+
+    Returns:
+        np.ndarray: A `uint8` array of shape `(texture_size, texture_size, 4)`,
+            indexed as `[row, column, channel]` from the top row of the image.
+    """
+    surface = pygame.image.load(path)
+    width, height = surface.get_size()
+    pixels = np.frombuffer(
+        pygame.image.tobytes(surface, "RGBA"), dtype=np.uint8
+    ).reshape(height, width, 4)
+    rows = np.arange(texture_size) * height // texture_size
+    columns = np.arange(texture_size) * width // texture_size
+    return pixels[rows[:, None], columns[None, :]]
+
+
+def get_mipmaps(texture: np.ndarray) -> List[np.ndarray]:
+    """Returns the mipmap chain of a square texture whose size is a power of two,
+    from the texture itself down to a single pixel. Every level averages the
+    2x2 blocks of pixels of the previous one in linear light.
+
+    Args:
+        texture (np.ndarray): A `uint8` RGBA array of shape `(size, size, 4)`.
+
+    Returns:
+        List[np.ndarray]: The `log2(size) + 1` levels of the chain.
+    """
+    size = texture.shape[0]
+    assert size & (size - 1) == 0, "The size of a texture must be a power of two."
+    levels = [texture]
+    linear = texture.astype("float32") / 255.0
+    linear[..., :3] **= _GAMMA
+    while linear.shape[0] > 1:
+        half = linear.shape[0] // 2
+        linear = linear.reshape(half, 2, half, 2, 4).mean(axis=(1, 3))
+        encoded = linear.copy()
+        encoded[..., :3] **= 1.0 / _GAMMA
+        levels.append(np.round(encoded * 255.0).astype(np.uint8))
+    return levels
+
+
+class BlockTextureAtlas:
+    """Packs the textures of the block types into the tiles of a single atlas,
+    along with the mipmaps of the atlas, which are generated on the CPU.
+
+    The texture of a block is read from the image named after the block in lower
+    case, e.g., `stone.png`, in the texture directory. Blocks without an image get
+    a plain texture of their color, and block IDs without a block type share the
+    plain grey texture of the first tile. Every block ID maps to the index of its
+    tile, called its layer, which the mesher writes into the vertices instead of
+    a color.
+
+    Every tile is downsampled on its own and the tiles keep their place at every
+    level of the atlas, so that no level blends the texels of neighbouring tiles
+    together. Packing is cached on disk under the hash of the contents of the
+    images, so that later starts skip it until an image changes.
+
+    Args:
+        directory (Optional[str]): The directory of the images of the blocks.
+            Every block gets a plain texture of its color if it is `None`.
+        texture_size (int): The width and height in pixels of the texture of every
+            block, which must be a power of two. Images of other sizes are scaled.
+        cache_directory (Optional[str]): The directory in which packed atlases are
+            cached. Atlases are not cached if it is `None`.
+    """
+
+    def __init__(
+        self,
+        directory: Optional[str] = None,
+        texture_size: int = 16,
+        cache_directory: Optional[str] = None,
+    ) -> None:
+        assert (
+            texture_size > 0 and texture_size & (texture_size - 1) == 0
+        ), "The texture size must be a power of two."
+        self.directory = directory
+        self.texture_size = texture_size
+        self.cache_directory = cache_directory
+
+        self.image_paths = self.find_images()
+        # The first layer holds the texture of block IDs without a block type.
+        self.block_types = [block for block in Block if block != Block.AIR]
+        self.layer_count = 1 + len(self.block_types)
+        self.columns = 1 << math.ceil(math.log2(math.sqrt(self.layer_count)))
+        self.rows = math.ceil(self.layer_count / self.columns)
+        self.block_layers = np.zeros(1 << 16, dtype=np.uint16)
+        for layer, block in enumerate(self.block_types, start=1):
+            self.block_layers[block] = layer
+
+        self.content_hash = self.get_content_hash()
+        self.is_from_cache = False
+        self.levels = self.load_cache()
+        if self.levels is None:
+            self.levels = self.pack()
+            self.save_cache()
+        else:
+            self.is_from_cache = True
+
+    def find_images(self) -> Dict[Block, str]:
+        """Returns the paths of the images of the block types found in the texture
+        directory.
+        """
+        if self.directory is None:
+            return {}
+        assert os.path.isdir(
+            self.directory
+        ), f"Texture directory '{self.directory}' does not exist."
+        paths = {}
+        for block in Block:
+            path = os.path.join(self.directory, f"{block.name.lower()}.png")
+            if os.path.isfile(path):
+                paths[block] = path
+        return paths
+
+    def get_content_hash(self) -> str:
+        """Returns the hash of everything the atlas is packed from: the contents of
+        the images, the colors of the blocks without an image, the texture size and
+        the layout of the atlas.
+        """
+        content = hashlib.sha256()
+        content.update(
+            f"{TEXTURE_CACHE_VERSION}:{self.texture_size}:{self.columns}".encode()
+        )
+        for block in self.block_types:
+            content.update(block.name.encode())
+            path = self.image_paths.get(block)
+            if path is None:
+                content.update(BLOCK_COLORS[block].tobytes())
+                continue
+            with open(path, "rb") as file:
+                content.update(hashlib.sha256(file.read()).digest())
+        content.update(BLOCK_COLORS[-1].tobytes())
+        return content.hexdigest()
+
+    @property
+    def cache_path(self) -> Optional[str]:
+        """The path of the cached atlas, or `None` if atlases are not cached."""
+        if self.cache_directory is None:
+            return None
+        return os.path.join(
+            self.cache_directory, f"block_textures_{self.content_hash[:32]}.npz"
+        )
+
+    @property
+    def level_count(self) -> int:
+        """The number of mipmap levels of the atlas."""
+        return self.texture_size.bit_length()
+
+    def get_texture(self, layer: int) -> np.ndarray:
+        """Returns the RGBA texture of a layer, before it is packed."""
+        if layer > 0:
+            block = self.block_types[layer - 1]
+            path = self.image_paths.get(block)
+            if path is not None:
+                return load_image(path, self.texture_size)
+            color = BLOCK_COLORS[block]
+        else:
+            color = BLOCK_COLORS[-1]
+        texture = np.full((self.texture_size, self.texture_size, 4), 255, np.uint8)
+        texture[..., :3] = np.round(color * 255.0)
+        return texture
+
+    def pack(self) -> List[np.ndarray]:
+        """Packs the textures of all layers and their mipmaps into the levels of
+        the atlas.
+
+        Returns:
+            List[np.ndarray]: The levels of the atlas as `uint8` RGBA arrays of
+                shape `(rows * size, columns * size, 4)`, with the texture size
+                halved at every level.
+        """
+        levels = [
+            np.zeros(
+                (self.rows * size, self.columns * size, 4),
+                dtype=np.uint8,
+            )
+            for size in (
+                self.texture_size >> level for level in range(self.level_count)
+            )
+        ]
+        for layer in range(self.layer_count):
+            row, column = divmod(layer, self.columns)
+            for level, mipmap in zip(levels, get_mipmaps(self.get_texture(layer))):
+                size = len(mipmap)
+                level[
+                    row * size : (row + 1) * size, column * size : (column + 1) * size
+                ] = mipmap
+        return levels
+
+    def load_cache(self) -> Optional[List[np.ndarray]]:
+        """Returns the levels of the atlas cached under its content hash, or `None`
+        if they are not cached.
+        """
+        path = self.cache_path
+        if path is None or not os.path.isfile(path):
+            return None
+        with np.load(path) as cache:
+            return [cache[f"level_{level}"] for level in range(self.level_count)]
+
+    def save_cache(self) -> None:
+        """Caches the levels of the atlas under its content hash. The file is
+        written under a temporary name first, so that an interrupted write never
+        leaves a truncated atlas behind.
+        """
+        path = self.cache_path
+        if path is None:
+            return
+        os.makedirs(self.cache_directory, exist_ok=True)
+        temporary_path = f"{path[:-len('.npz')]}.tmp.npz"
+        np.savez(
+            temporary_path,
+            **{f"level_{level}": data for level, data in enumerate(self.levels)},
+        )
+        os.replace(temporary_path, path)
+
+    def create_texture(self, opengl_context: moderngl.Context) -> moderngl.Texture:
+        """Uploads the atlas and its mipmaps to a texture of the OpenGL context.
+
+        The texels are sampled without blending neighbouring texels, which keeps
+        pixelated textures sharp and never samples outside the tile of a layer,
+        while neighbouring mipmap levels are blended to hide the transitions
+        between them.
+        """
+        height, width, _ = self.levels[0].shape
+        texture = opengl_context.texture((width, height), 4, self.levels[0].tobytes())
+        # Generating the mipmaps allocates their storage, which the levels packed
+        # on the CPU then overwrite.
+        texture.build_mipmaps(base=0, max_level=self.level_count - 1)
+        for level, data in enumerate(self.levels[1:], start=1):
+            texture.write(data.tobytes(), level=level)
+        texture.filter = (moderngl.NEAREST_MIPMAP_LINEAR, moderngl.NEAREST)
+        return texture
@@ -0,0 +1,5 @@
+from .chunk import Chunk
+from .palette import PaletteChunk
+from .world import World
+
+__all__ = ["Chunk", "PaletteChunk", "World"]
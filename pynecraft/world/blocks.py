@@ -0,0 +1,71 @@
+from enum import IntEnum
+
+import numpy as np
+
+
+class Block(IntEnum):
+    """The IDs of the built-in block types. The ID `0` is reserved for air, which
+    is never meshed or collided with.
+    """
+
+    AIR = 0
+    STONE = 1
+    DIRT = 2
+    GRASS = 3
+    SAND = 4
+    WATER = 5
+    GLASS = 6
+    WOOD = 7
+    LEAVES = 8
+    SNOW = 9
+    BEDROCK = 10
+    LAMP = 11
+
+
+# The RGB colour of every block ID. Block IDs without a dedicated entry fall back
+# to a neutral grey so that unknown blocks are still visible.
+BLOCK_COLORS = np.full((1 << 16, 3), 0.5, dtype="float32")
+BLOCK_COLORS[Block.AIR] = (0.0, 0.0, 0.0)
+BLOCK_COLORS[Block.STONE] = (0.5, 0.5, 0.52)
+BLOCK_COLORS[Block.DIRT] = (0.45, 0.3, 0.18)
+BLOCK_COLORS[Block.GRASS] = (0.3, 0.65, 0.2)
+BLOCK_COLORS[Block.SAND] = (0.86, 0.8, 0.55)
+BLOCK_COLORS[Block.WATER] = (0.2, 0.4, 0.85)
+BLOCK_COLORS[Block.GLASS] = (0.8, 0.9, 0.95)
+BLOCK_COLORS[Block.WOOD] = (0.4, 0.26, 0.13)
+BLOCK_COLORS[Block.LEAVES] = (0.2, 0.5, 0.15)
+BLOCK_COLORS[Block.SNOW] = (0.95, 0.95, 0.97)
+BLOCK_COLORS[Block.BEDROCK] = (0.2, 0.2, 0.2)
+BLOCK_COLORS[Block.LAMP] = (1.0, 0.85, 0.5)
+
+# Whether every block ID stops moving bodies. Block IDs without a dedicated entry
+# are solid, while air and water can be moved through.
+BLOCK_IS_SOLID = np.ones(1 << 16, dtype=bool)
+BLOCK_IS_SOLID[Block.AIR] = False
+BLOCK_IS_SOLID[Block.WATER] = False
+
+# Whether every block ID hides the blocks behind it, which decides which faces the
+# mesher hides, which chunks can be seen through for occlusion culling and which
+# voxels light spreads through. Air and the translucent blocks are see-through.
+BLOCK_IS_OPAQUE = np.ones(1 << 16, dtype=bool)
+BLOCK_IS_OPAQUE[Block.AIR] = False
+BLOCK_IS_OPAQUE[Block.WATER] = False
+BLOCK_IS_OPAQUE[Block.GLASS] = False
+
+# Whether the faces of every block ID are blended over the geometry behind them,
+# in which case the mesher emits them after the opaque faces of a chunk so that
+# they can be drawn in a separate pass.
+BLOCK_IS_TRANSLUCENT = np.zeros(1 << 16, dtype=bool)
+BLOCK_IS_TRANSLUCENT[Block.WATER] = True
+BLOCK_IS_TRANSLUCENT[Block.GLASS] = True
+
+# The opacity every block ID is drawn with, which is only below `1` for the
+# translucent blocks.
+BLOCK_ALPHAS = np.ones(1 << 16, dtype="float32")
+BLOCK_ALPHAS[Block.WATER] = 0.6
+BLOCK_ALPHAS[Block.GLASS] = 0.3
+
+# The level of block light every block ID emits, from `0` for blocks that emit no
+# light to `15` for the brightest light sources.
+BLOCK_LIGHT_EMISSION = np.zeros(1 << 16, dtype=np.uint8)
+BLOCK_LIGHT_EMISSION[Block.LAMP] = 15
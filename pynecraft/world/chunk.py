@@ -0,0 +1,120 @@
+from typing import Optional, Tuple
+
+import numpy as np
+
+
+class Chunk:
+    """A cubic section of the voxel world that stores the block ID of every voxel
+    in a single contiguous NumPy array indexed as `blocks[x, y, z]`. All the
+    coordinates accepted by a chunk are local to the chunk, i.e., in the range
+    `[0, size)`.
+
+    Args:
+        position (Tuple[int, int, int]): The position of the chunk in chunk
+            coordinates, i.e., the world coordinate of its first voxel divided
+            by the chunk size.
+        size (int): The number of voxels along each edge of the chunk.
+        dtype (np.dtype): The data type used to store the block IDs.
+        blocks (Optional[np.ndarray]): The initial block IDs of the chunk. If not
+            provided, the chunk is filled with air (block ID `0`).
+        is_modified (bool): Whether the chunk holds changes that have not been
+            saved yet.
+    """
+
+    def __init__(
+        self,
+        position: Tuple[int, int, int],
+        size: int = 32,
+        dtype: np.dtype = np.uint8,
+        blocks: Optional[np.ndarray] = None,
+        is_modified: bool = True,
+    ) -> None:
+        self.position = tuple(int(coordinate) for coordinate in position)
+        self.size = size
+        if blocks is None:
+            blocks = np.zeros((size, size, size), dtype=dtype)
+        assert blocks.shape == (
+            size,
+            size,
+            size,
+        ), f"Expected blocks of shape {(size,) * 3}, got {blocks.shape}."
+        self.blocks = np.ascontiguousarray(blocks, dtype=dtype)
+        self.is_modified = is_modified
+
+    @property
+    def origin(self) -> Tuple[int, int, int]:
+        """The world coordinate of the voxel at the local coordinate `(0, 0, 0)`."""
+        return tuple(coordinate * self.size for coordinate in self.position)
+
+    @property
+    def dtype(self) -> np.dtype:
+        """The data type used to store the block IDs."""
+        return self.blocks.dtype
+
+    @property
+    def nbytes(self) -> int:
+        """The number of bytes used to store the block IDs."""
+        return self.blocks.nbytes
+
+    @property
+    def is_empty(self) -> bool:
+        """Whether the chunk consists entirely of air."""
+        return not self.blocks.any()
+
+    def get_blocks(self) -> np.ndarray:
+        """Returns the block IDs of the whole chunk indexed as `[x, y, z]`. The
+        array is the storage of the chunk itself and must not be modified.
+        """
+        return self.blocks
+
+    def set_blocks(self, blocks: np.ndarray) -> None:
+        """Replaces the block IDs of the whole chunk."""
+        self.blocks[...] = blocks
+        self.is_modified = True
+
+    def get_block(self, x: int, y: int, z: int) -> int:
+        """Returns the block ID at a local coordinate."""
+        return int(self.blocks[x, y, z])
+
+    def get_blocks_at(self, positions: np.ndarray) -> np.ndarray:
+        """Returns the block IDs at an array of local coordinates of shape
+        `(n, 3)`.
+        """
+        return self.blocks[positions[:, 0], positions[:, 1], positions[:, 2]]
+
+    def set_block(self, x: int, y: int, z: int, block_id: int) -> None:
+        """Sets the block ID at a local coordinate."""
+        self.blocks[x, y, z] = block_id
+        self.is_modified = True
+
+    def fill(
+        self,
+        start: Tuple[int, int, int],
+        end: Tuple[int, int, int],
+        block_id: int,
+    ) -> None:
+        """Fills the local region `[start, end)` with a single block ID.
+
+        Args:
+            start (Tuple[int, int, int]): The inclusive lower corner of the region.
+            end (Tuple[int, int, int]): The exclusive upper corner of the region.
+            block_id (int): The block ID to fill the region with.
+        """
+        self.blocks[start[0] : end[0], start[1] : end[1], start[2] : end[2]] = block_id
+        self.is_modified = True
+
+    def get_region(
+        self, start: Tuple[int, int, int], end: Tuple[int, int, int]
+    ) -> np.ndarray:
+        """Returns a copy of the block IDs in the local region `[start, end)`."""
+        return self.blocks[
+            start[0] : end[0], start[1] : end[1], start[2] : end[2]
+        ].copy()
+
+    def set_region(self, start: Tuple[int, int, int], blocks: np.ndarray) -> None:
+        """Writes an array of block IDs into the chunk with its lower corner placed
+        at the local coordinate `start`.
+        """
+        end = [start[axis] + blocks.shape[axis] for axis in range(3)]
+        self.blocks[start[0] : end[0], start[1] : end[1], start[2] : end[2]] = blocks
+        self.is_modified = True
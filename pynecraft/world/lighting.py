@@ -0,0 +1,433 @@
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .blocks import BLOCK_IS_OPAQUE, BLOCK_LIGHT_EMISSION
+
+if TYPE_CHECKING:
+    from .world import World
+
+ChunkPosition = Tuple[int, int, int]
+
+# The brightest level of sky light and block light.
+MAX_LIGHT = 15
+
+# Light is stored in one byte per voxel, with the sky light in the high four bits
+# and the block light in the low four bits.
+SKY_LIGHT_SHIFT = 4
+BLOCK_LIGHT_MASK = (1 << SKY_LIGHT_SHIFT) - 1
+
+# The light of a voxel open to the sky and lit by no block, which is also the
+# light of the voxels of chunks that store no light, such as chunks of air.
+FULL_SKY_LIGHT = MAX_LIGHT << SKY_LIGHT_SHIFT
+
+# The brightness of every light level, from `0` to `MAX_LIGHT`. Every level is 80%
+# as bright as the next one, matching the vertex shader.
+LIGHT_LEVEL_BRIGHTNESS = (0.8 ** np.arange(MAX_LIGHT, -1, -1)).astype("float32")
+
+# The six directions light spreads in, as an axis and a step along it. Sky light
+# keeps its level when it spreads straight down from a voxel open to the sky.
+_DIRECTIONS = [(0, 1), (0, -1), (1, 1), (1, -1), (2, 1), (2, -1)]
+_DOWN = (1, -1)
+
+
+def _get_neighbours(
+    indices: np.ndarray, shape: Tuple[int, ...], axis: int, step: int
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Returns the flat indices of the neighbours of voxels of a 3D array along a
+    direction, and whether each voxel has a neighbour inside the array.
+    """
+    stride = int(np.prod(shape[axis + 1 :]))
+    coordinates = indices // stride % shape[axis]
+    has_neighbour = (coordinates + step >= 0) & (coordinates + step < shape[axis])
+    return indices[has_neighbour] + step * stride, has_neighbour
+
+
+def _get_neighbour_mask(mask: np.ndarray, axis: int, step: int) -> np.ndarray:
+    """Returns whether the neighbour of every voxel along a direction is set in a
+    mask, which is never the case for neighbours outside the array.
+    """
+    neighbour_mask = np.zeros_like(mask)
+    target = [slice(None)] * 3
+    source = [slice(None)] * 3
+    if step > 0:
+        target[axis], source[axis] = slice(None, -step), slice(step, None)
+    else:
+        target[axis], source[axis] = slice(-step, None), slice(None, step)
+    neighbour_mask[tuple(target)] = mask[tuple(source)]
+    return neighbour_mask
+
+
+def spread_light(
+    light: np.ndarray, is_open: np.ndarray, seeds: np.ndarray, is_sky: bool = False
+) -> None:
+    """Spreads one channel of light from seed voxels into the open voxels around
+    them with a breadth-first search, in place.
+
+    The search keeps one queue per light level and empties them from the
+    brightest level down, so that every voxel is lit by its brightest neighbour
+    first and is never visited again at a lower level. Every queue is processed
+    as whole arrays of voxels at once. Light loses one level per voxel it spreads
+    into, except that sky light of the full level spreads straight down without
+    losing any.
+
+    Args:
+        light (np.ndarray): The contiguous 3D `uint8` array of one channel of
+            light, which is modified in place.
+        is_open (np.ndarray): Whether light may spread into each voxel.
+        seeds (np.ndarray): The flat indices of the voxels light spreads from.
+        is_sky (bool): Whether the channel is sky light.
+    """
+    flat_light = light.reshape(-1)
+    flat_is_open = is_open.reshape(-1)
+    seeds = np.unique(np.asarray(seeds, dtype=np.int64))
+    seed_levels = flat_light[seeds]
+    queues: List[List[np.ndarray]] = [[] for _ in range(MAX_LIGHT + 1)]
+    for level in range(2, MAX_LIGHT + 1):
+        queues[level].append(seeds[seed_levels == level])
+
+    for level in range(MAX_LIGHT, 1, -1):
+        if not queues[level]:
+            continue
+        frontier = np.unique(np.concatenate(queues[level]))
+        # Seeds may have been lit brighter by the levels processed before.
+        frontier = frontier[flat_light[frontier] == level]
+        while len(frontier):
+            straight_down = []
+            for axis, step in _DIRECTIONS:
+                neighbours, _ = _get_neighbours(frontier, light.shape, axis, step)
+                is_straight_down = (
+                    is_sky and level == MAX_LIGHT and (axis, step) == _DOWN
+                )
+                neighbour_level = level if is_straight_down else level - 1
+                neighbours = neighbours[
+                    flat_is_open[neighbours]
+                    & (flat_light[neighbours] < neighbour_level)
+                ]
+                flat_light[neighbours] = neighbour_level
+                if is_straight_down:
+                    straight_down.append(neighbours)
+                else:
+                    queues[neighbour_level].append(neighbours)
+            frontier = (
+                np.unique(np.concatenate(straight_down))
+                if straight_down
+                else np.zeros(0, dtype=np.int64)
+            )
+
+
+def remove_light(
+    light: np.ndarray,
+    indices: np.ndarray,
+    is_sky: bool = False,
+    is_fixed: Optional[np.ndarray] = None,
+) -> np.ndarray:
+    """Removes one channel of the light of voxels and of every voxel that was lit
+    through them with a breadth-first search, in place, e.g., after an opaque
+    block was placed or a light source was broken.
+
+    A neighbour of a darkened voxel is darkened as well if it is dimmer, since it
+    may have been lit through it, and is otherwise lit by another path. The
+    voxels of the second kind border the darkened area and are returned, so that
+    light is spread back into the darkened area from them with `spread_light`.
+
+    Args:
+        light (np.ndarray): The contiguous 3D `uint8` array of one channel of
+            light, which is modified in place.
+        indices (np.ndarray): The flat indices of the voxels to darken.
+        is_sky (bool): Whether the channel is sky light.
+        is_fixed (Optional[np.ndarray]): Whether each voxel keeps its light, such
+            as the voxels on the border of a region whose surroundings are not
+            updated. Lit fixed voxels are returned along with the others.
+
+    Returns:
+        np.ndarray: The flat indices of the lit voxels bordering the darkened
+            voxels.
+    """
+    flat_light = light.reshape(-1)
+    flat_is_fixed = None if is_fixed is None else is_fixed.reshape(-1)
+    frontier = np.unique(np.asarray(indices, dtype=np.int64))
+    levels = flat_light[frontier].copy()
+    flat_light[frontier] = 0
+    seeds = []
+    while len(frontier):
+        next_frontiers, next_levels = [], []
+        for axis, step in _DIRECTIONS:
+            neighbours, has_neighbour = _get_neighbours(
+                frontier, light.shape, axis, step
+            )
+            source_levels = levels[has_neighbour]
+            neighbour_levels = flat_light[neighbours]
+            is_lit_through = neighbour_levels < source_levels
+            if is_sky and (axis, step) == _DOWN:
+                is_lit_through |= (source_levels == MAX_LIGHT) & (
+                    neighbour_levels == MAX_LIGHT
+                )
+            is_lit_through &= neighbour_levels > 0
+            if flat_is_fixed is not None:
+                is_lit_through &= ~flat_is_fixed[neighbours]
+            seeds.append(neighbours[(neighbour_levels > 0) & ~is_lit_through])
+            darkened = neighbours[is_lit_through]
+            flat_light[darkened] = 0
+            next_frontiers.append(darkened)
+            next_levels.append(neighbour_levels[is_lit_through])
+        frontier, first_indices = np.unique(
+            np.concatenate(next_frontiers), return_index=True
+        )
+        levels = np.concatenate(next_levels)[first_indices]
+    if not seeds:
+        return np.zeros(0, dtype=np.int64)
+    seeds = np.unique(np.concatenate(seeds))
+    return seeds[flat_light[seeds] > 0]
+
+
+def compute_light(blocks: np.ndarray, is_lit_from_above: np.ndarray) -> np.ndarray:
+    """Computes the sky light and block light of a region from scratch.
+
+    The voxels open to the sky are found with one vectorized scan down every
+    column, and only the ones bordering open voxels in the shade spread their
+    light any further, which keeps the search small for terrain under an open
+    sky.
+
+    Args:
+        blocks (np.ndarray): The block IDs of the region, indexed as `[x, y, z]`.
+        is_lit_from_above (np.ndarray): Whether the sky shines into each column
+            of the region from above, as an array of shape `(x, z)`.
+
+    Returns:
+        np.ndarray: The packed light of every voxel of the region.
+    """
+    is_open = ~BLOCK_IS_OPAQUE[blocks]
+    is_open_to_sky = np.logical_and.accumulate(is_open[:, ::-1, :], axis=1)[:, ::-1]
+    is_open_to_sky &= np.asarray(is_lit_from_above, dtype=bool)[:, None, :]
+    sky_light = np.where(is_open_to_sky, MAX_LIGHT, 0).astype(np.uint8)
+    is_in_shade = is_open & ~is_open_to_sky
+    borders_shade = np.zeros_like(is_open)
+    for axis, step in _DIRECTIONS:
+        borders_shade |= _get_neighbour_mask(is_in_shade, axis, step)
+    spread_light(
+        sky_light, is_open, np.flatnonzero(is_open_to_sky & borders_shade), True
+    )
+
+    block_light = BLOCK_LIGHT_EMISSION[blocks]
+    spread_light(block_light, is_open, np.flatnonzero(block_light))
+    return (sky_light << SKY_LIGHT_SHIFT) | block_light
+
+
+class LightMap:
+    """Stores the sky light and block light of the voxels of a world, packed into
+    one byte per voxel, and keeps them up to date as blocks are edited.
+
+    The light of a chunk is usually computed along with its mesh in a worker
+    process by `compute_light` and handed over with `set_chunk_light`. Chunks
+    that store no light, such as chunks of air, are fully lit by the sky.
+
+    Edited regions are queued with `queue_region`, which merges regions close
+    enough to share their relighting, and are relit at once by
+    `update_queued_regions`, which the world calls when the dirty chunks of a
+    frame are collected. Editing a block therefore costs next to nothing, and
+    the blocks edited during a frame are relit together once per frame.
+
+    To relight a region, `update_region` darkens the light that passed through
+    the edited voxels and spreads light back into them, in a window that reaches
+    as far as light travels from the edited region, i.e., `MAX_LIGHT` voxels, and
+    down the sky light column below it, since sky light falls down open columns
+    without fading until it hits an opaque block. Only the voxels whose light
+    comes from the edited voxels are visited, and the chunks whose light changed
+    are marked as dirty so that they are remeshed.
+
+    Args:
+        world (World): The world whose light is stored.
+    """
+
+    def __init__(self, world: "World") -> None:
+        self.world = world
+        self.chunk_size = world.chunk_size
+        self.chunks: Dict[ChunkPosition, np.ndarray] = {}
+        self.queued_regions: List[Tuple[Tuple[int, ...], Tuple[int, ...]]] = []
+
+    @property
+    def nbytes(self) -> int:
+        """The number of bytes used to store the light of all chunks."""
+        return sum(light.nbytes for light in self.chunks.values())
+
+    def get_chunk_light(self, chunk_position: ChunkPosition) -> Optional[np.ndarray]:
+        """Returns the light of a chunk, or `None` if it stores no light."""
+        return self.chunks.get(chunk_position)
+
+    def set_chunk_light(
+        self, chunk_position: ChunkPosition, light: Optional[np.ndarray]
+    ) -> None:
+        """Replaces the light of a chunk, or forgets it if `light` is `None`."""
+        if light is None:
+            self.chunks.pop(chunk_position, None)
+            return
+        assert (
+            light.shape == (self.chunk_size,) * 3
+        ), f"Expected light of shape {(self.chunk_size,) * 3}, got {light.shape}."
+        self.chunks[chunk_position] = np.array(light, dtype=np.uint8)
+
+    def remove_chunk(self, chunk_position: ChunkPosition) -> None:
+        """Forgets the light of a chunk."""
+        self.chunks.pop(chunk_position, None)
+
+    def get_region(
+        self, start: Tuple[int, int, int], end: Tuple[int, int, int]
+    ) -> np.ndarray:
+        """Returns a copy of the packed light of the world region `[start, end)`."""
+        shape = tuple(end[axis] - start[axis] for axis in range(3))
+        region = np.full(shape, FULL_SKY_LIGHT, dtype=np.uint8)
+        for chunk_position, chunk_slices, region_slices in self.world.iterate_region(
+            start, end
+        ):
+            light = self.chunks.get(chunk_position)
+            if light is not None:
+                region[region_slices] = light[chunk_slices]
+        return region
+
+    def set_region(self, start: Tuple[int, int, int], light: np.ndarray) -> None:
+        """Writes an array of packed light into the world with its lower corner
+        placed at the world coordinate `start`.
+        """
+        end = tuple(start[axis] + light.shape[axis] for axis in range(3))
+        for chunk_position, chunk_slices, region_slices in self.world.iterate_region(
+            start, end
+        ):
+            chunk_light = self.chunks.get(chunk_position)
+            if chunk_light is None:
+                chunk_light = np.full(
+                    (self.chunk_size,) * 3, FULL_SKY_LIGHT, dtype=np.uint8
+                )
+                self.chunks[chunk_position] = chunk_light
+            chunk_light[chunk_slices] = light[region_slices]
+
+    def queue_region(
+        self, start: Tuple[int, int, int], end: Tuple[int, int, int]
+    ) -> None:
+        """Queues the world region `[start, end)` to be relit by the next call to
+        `update_queued_regions`, merging it with the queued regions whose light
+        windows overlap its own.
+        """
+        margin = 2 * (MAX_LIGHT + 1)
+        start, end = tuple(start), tuple(end)
+        queued_regions = []
+        for queued_start, queued_end in self.queued_regions:
+            if all(
+                queued_start[axis] < end[axis] + margin
+                and start[axis] < queued_end[axis] + margin
+                for axis in range(3)
+            ):
+                start = tuple(map(min, start, queued_start))
+                end = tuple(map(max, end, queued_end))
+            else:
+                queued_regions.append((queued_start, queued_end))
+        queued_regions.append((start, end))
+        self.queued_regions = queued_regions
+
+    def update_queued_regions(self) -> None:
+        """Relights the regions queued since the last call."""
+        queued_regions = self.queued_regions
+        self.queued_regions = []
+        for start, end in queued_regions:
+            self.update_region(start, end)
+
+    def get_column_bottom(
+        self, start: Tuple[int, int, int], end: Tuple[int, int, int]
+    ) -> int:
+        """Returns the lowest world `y` coordinate down to which sky light falling
+        through the world region `[start, end)` may reach, i.e., the lowest of the
+        first opaque blocks below the region in each of its columns, or the bottom
+        of the lowest chunk with light if a column is open all the way down.
+        """
+        size = self.chunk_size
+        is_open = np.ones((end[0] - start[0], end[2] - start[2]), dtype=bool)
+        top, lowest = start[1], None
+        while True:
+            bottom = ((top - 1) // size) * size
+            if lowest is None and not any(
+                (chunk_position[0], bottom // size, chunk_position[2]) in self.chunks
+                for chunk_position, _, _ in self.world.iterate_region(
+                    (start[0], 0, start[2]), (end[0], 1, end[2])
+                )
+            ):
+                # Chunks without light are skipped, down to the lowest chunk with
+                # light in the world.
+                lowest = min(
+                    (chunk_position[1] * size for chunk_position in self.chunks),
+                    default=bottom,
+                )
+            if lowest is not None and bottom < lowest:
+                return top
+            # The columns of the slab `[bottom, top)` are scanned downwards.
+            is_opaque = BLOCK_IS_OPAQUE[
+                self.world.get_region(
+                    (start[0], bottom, start[2]), (end[0], top, end[2])
+                )[:, ::-1, :]
+            ]
+            is_opaque &= is_open[:, None, :]
+            is_blocked = is_opaque.any(axis=1)
+            is_open &= ~is_blocked
+            if not is_open.any():
+                depth = np.argmax(is_opaque, axis=1)[is_blocked].max()
+                return int(top - 1 - depth)
+            top = bottom
+
+    def update_region(
+        self, start: Tuple[int, int, int], end: Tuple[int, int, int]
+    ) -> None:
+        """Updates the light around the world region `[start, end)` after its
+        blocks were edited, and marks the chunks whose light changed as dirty.
+        """
+        margin = MAX_LIGHT + 1
+        window_start = np.asarray(start, dtype=np.int64) - margin
+        window_end = np.asarray(end, dtype=np.int64) + margin
+        window_start[1] = min(
+            window_start[1], self.get_column_bottom(start, end) - margin
+        )
+        window_start, window_end = tuple(window_start), tuple(window_end)
+
+        blocks = self.world.get_region(window_start, window_end)
+        light = self.get_region(window_start, window_end)
+        # The light of the voxels on the border of the window is left as it is,
+        # and only spreads inwards.
+        is_fixed = np.ones(light.shape, dtype=bool)
+        is_fixed[1:-1, 1:-1, 1:-1] = False
+        is_open = ~BLOCK_IS_OPAQUE[blocks] & ~is_fixed
+        is_edited = np.zeros(light.shape, dtype=bool)
+        is_edited[
+            tuple(
+                slice(start[axis] - window_start[axis], end[axis] - window_start[axis])
+                for axis in range(3)
+            )
+        ] = True
+        edited_indices = np.flatnonzero(is_edited)
+
+        sky_light = light >> SKY_LIGHT_SHIFT
+        seeds = remove_light(sky_light, edited_indices, True, is_fixed)
+        spread_light(sky_light, is_open, seeds, True)
+
+        block_light = light & BLOCK_LIGHT_MASK
+        emission = BLOCK_LIGHT_EMISSION[blocks]
+        # Most edits happen far from any light source, and leave no block light
+        # to remove or spread.
+        if block_light.any() or emission.any():
+            seeds = remove_light(block_light, edited_indices, False, is_fixed)
+            is_emitting = (emission > block_light) & ~is_fixed
+            block_light[is_emitting] = emission[is_emitting]
+            seeds = np.concatenate([seeds, np.flatnonzero(is_emitting)])
+            spread_light(block_light, is_open, seeds)
+
+        updated_light = (sky_light << SKY_LIGHT_SHIFT) | block_light
+        changed = np.argwhere(updated_light != light)
+        if not len(changed):
+            return
+        lower, upper = changed.min(axis=0), changed.max(axis=0) + 1
+        changed_start = tuple(int(a + b) for a, b in zip(window_start, lower))
+        changed_end = tuple(int(a + b) for a, b in zip(window_start, upper))
+        self.set_region(
+            changed_start,
+            updated_light[
+                lower[0] : upper[0], lower[1] : upper[1], lower[2] : upper[2]
+            ],
+        )
+        self.world.mark_region_dirty(changed_start, changed_end)
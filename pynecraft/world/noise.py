@@ -0,0 +1,189 @@
+import numpy as np
+
+# The gradient directions of 2D noise: the four diagonals and the four axes.
+_GRADIENTS_2D = np.array(
+    [(1, 1), (-1, 1), (1, -1), (-1, -1), (1, 0), (-1, 0), (0, 1), (0, -1)],
+    dtype="float64",
+)
+
+# The gradient directions of 3D noise: the twelve edges of a cube, padded to
+# sixteen entries as in Ken Perlin's improved noise.
+_GRADIENTS_3D = np.array(
+    [
+        (1, 1, 0),
+        (-1, 1, 0),
+        (1, -1, 0),
+        (-1, -1, 0),
+        (1, 0, 1),
+        (-1, 0, 1),
+        (1, 0, -1),
+        (-1, 0, -1),
+        (0, 1, 1),
+        (0, -1, 1),
+        (0, 1, -1),
+        (0, -1, -1),
+        (1, 1, 0),
+        (0, -1, 1),
+        (-1, 1, 0),
+        (0, -1, -1),
+    ],
+    dtype="float64",
+)
+
+
+def _fade(t: np.ndarray) -> np.ndarray:
+    """The quintic interpolation curve `6t^5 - 15t^4 + 10t^3`."""
+    return t * t * t * (t * (t * 6.0 - 15.0) + 10.0)
+
+
+def _lerp(t: np.ndarray, a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    return a + t * (b - a)
+
+
+class PerlinNoise:
+    """Seeded gradient (Perlin) noise in two and three dimensions, evaluated on
+    whole NumPy arrays of coordinates at once.
+
+    All computations are element-wise and in `float64`, so the value at a given
+    coordinate only depends on the seed and the coordinate itself, and is
+    bit-identical no matter which other coordinates it is evaluated with.
+
+    Args:
+        seed (int): The seed from which the permutation table and the per-octave
+            offsets are derived.
+        max_octaves (int): The largest number of octaves of fractal noise. The
+            offsets of the first octaves do not depend on it.
+    """
+
+    def __init__(self, seed: int, max_octaves: int = 16) -> None:
+        rng = np.random.default_rng(seed)
+        permutation = rng.permutation(256).astype("int64")
+        # The table is doubled to avoid wrapping the index of the second lookup.
+        self.permutation = np.concatenate([permutation, permutation])
+        # Every octave of fractal noise is sampled at a different offset, so that
+        # the origin does not line up across octaves.
+        self.octave_offsets = rng.uniform(-4096.0, 4096.0, size=(max_octaves, 3))
+
+    def noise2(self, x: np.ndarray, y: np.ndarray) -> np.ndarray:
+        """Returns 2D noise in the range `[-1, 1]` at the given coordinates."""
+        x, y = np.broadcast_arrays(np.asarray(x, "float64"), np.asarray(y, "float64"))
+        x_floor, y_floor = np.floor(x), np.floor(y)
+        x_fraction, y_fraction = x - x_floor, y - y_floor
+        x_index = x_floor.astype("int64") & 255
+        y_index = y_floor.astype("int64") & 255
+        p = self.permutation
+
+        def gradient(x_offset, y_offset):
+            hashed = p[p[x_index + x_offset] + y_index + y_offset] & 7
+            gradients = _GRADIENTS_2D[hashed]
+            return gradients[..., 0] * (x_fraction - x_offset) + gradients[..., 1] * (
+                y_fraction - y_offset
+            )
+
+        u, v = _fade(x_fraction), _fade(y_fraction)
+        return _lerp(
+            v,
+            _lerp(u, gradient(0, 0), gradient(1, 0)),
+            _lerp(u, gradient(0, 1), gradient(1, 1)),
+        )
+
+    def noise3(self, x: np.ndarray, y: np.ndarray, z: np.ndarray) -> np.ndarray:
+        """Returns 3D noise in the range `[-1, 1]` at the given coordinates."""
+        x, y, z = np.broadcast_arrays(
+            np.asarray(x, "float64"), np.asarray(y, "float64"), np.asarray(z, "float64")
+        )
+        x_floor, y_floor, z_floor = np.floor(x), np.floor(y), np.floor(z)
+        x_fraction, y_fraction, z_fraction = x - x_floor, y - y_floor, z - z_floor
+        x_index = x_floor.astype("int64") & 255
+        y_index = y_floor.astype("int64") & 255
+        z_index = z_floor.astype("int64") & 255
+        p = self.permutation
+
+        def gradient(x_offset, y_offset, z_offset):
+            hashed = (
+                p[p[p[x_index + x_offset] + y_index + y_offset] + z_index + z_offset]
+                & 15
+            )
+            gradients = _GRADIENTS_3D[hashed]
+            return (
+                gradients[..., 0] * (x_fraction - x_offset)
+                + gradients[..., 1] * (y_fraction - y_offset)
+                + gradients[..., 2] * (z_fraction - z_offset)
+            )
+
+        u, v, w = _fade(x_fraction), _fade(y_fraction), _fade(z_fraction)
+        return _lerp(
+            w,
+            _lerp(
+                v,
+                _lerp(u, gradient(0, 0, 0), gradient(1, 0, 0)),
+                _lerp(u, gradient(0, 1, 0), gradient(1, 1, 0)),
+            ),
+            _lerp(
+                v,
+                _lerp(u, gradient(0, 0, 1), gradient(1, 0, 1)),
+                _lerp(u, gradient(0, 1, 1), gradient(1, 1, 1)),
+            ),
+        )
+
+    def fractal2(
+        self,
+        x: np.ndarray,
+        y: np.ndarray,
+        octaves: int = 4,
+        persistence: float = 0.5,
+        lacunarity: float = 2.0,
+    ) -> np.ndarray:
+        """Returns fractal Brownian motion made of several octaves of 2D noise,
+        normalized to the range `[-1, 1]`.
+
+        Args:
+            x (np.ndarray): The `x` coordinates.
+            y (np.ndarray): The `y` coordinates.
+            octaves (int): The number of octaves.
+            persistence (float): The factor by which the amplitude of each octave
+                decreases.
+            lacunarity (float): The factor by which the frequency of each octave
+                increases.
+        """
+        assert octaves <= len(
+            self.octave_offsets
+        ), f"Expected at most {len(self.octave_offsets)} octaves, got {octaves}."
+        total, amplitude, frequency, normalization = 0.0, 1.0, 1.0, 0.0
+        for octave in range(octaves):
+            offset = self.octave_offsets[octave]
+            total = total + amplitude * self.noise2(
+                x * frequency + offset[0], y * frequency + offset[1]
+            )
+            normalization += amplitude
+            amplitude *= persistence
+            frequency *= lacunarity
+        return total / normalization
+
+    def fractal3(
+        self,
+        x: np.ndarray,
+        y: np.ndarray,
+        z: np.ndarray,
+        octaves: int = 2,
+        persistence: float = 0.5,
+        lacunarity: float = 2.0,
+    ) -> np.ndarray:
+        """Returns fractal Brownian motion made of several octaves of 3D noise,
+        normalized to the range `[-1, 1]`. See `fractal2` for the arguments.
+        """
+        assert octaves <= len(
+            self.octave_offsets
+        ), f"Expected at most {len(self.octave_offsets)} octaves, got {octaves}."
+        total, amplitude, frequency, normalization = 0.0, 1.0, 1.0, 0.0
+        for octave in range(octaves):
+            offset = self.octave_offsets[octave]
+            total = total + amplitude * self.noise3(
+                x * frequency + offset[0],
+                y * frequency + offset[1],
+                z * frequency + offset[2],
+            )
+            normalization += amplitude
+            amplitude *= persistence
+            frequency *= lacunarity
+        return total / normalization
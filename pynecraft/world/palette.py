@@ -0,0 +1,285 @@
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+# The supported numbers of bits per palette index. Indices of fewer than 8 bits
+# are packed into bytes, while larger indices are stored as plain integers.
+INDEX_BITS = (1, 2, 4, 8, 16)
+
+
+def get_index_bits(palette_size: int) -> int:
+    """Returns the smallest supported number of bits per index that can address a
+    palette of `palette_size` entries.
+    """
+    for bits in INDEX_BITS:
+        if palette_size <= 1 << bits:
+            return bits
+    raise ValueError(f"Palettes of {palette_size} entries are not supported.")
+
+
+def pack_indices(indices: np.ndarray, bits: int) -> np.ndarray:
+    """Packs a flat array of palette indices into an array of `bits` bits per
+    index, with the first index in the lowest bits of the first byte.
+    """
+    if bits >= 8:
+        return indices.astype(f"u{bits // 8}")
+    indices_per_byte = 8 // bits
+    indices = indices.astype(np.uint8)
+    padding = -indices.size % indices_per_byte
+    if padding:
+        indices = np.pad(indices, (0, padding))
+    shifts = np.arange(0, 8, bits, dtype=np.uint8)
+    return np.bitwise_or.reduce(
+        indices.reshape(-1, indices_per_byte) << shifts, axis=1
+    ).astype(np.uint8)
+
+
+def unpack_indices(packed: np.ndarray, bits: int, count: int) -> np.ndarray:
+    """Unpacks the first `count` palette indices of an array packed by
+    `pack_indices`.
+    """
+    if bits >= 8:
+        return packed[:count]
+    shifts = np.arange(0, 8, bits, dtype=np.uint8)
+    mask = np.uint8((1 << bits) - 1)
+    return ((packed[:, None] >> shifts) & mask).ravel()[:count]
+
+
+class PaletteChunk:
+    """A chunk that stores every distinct block ID once in a palette, and every
+    voxel as an index into the palette packed into 1, 2, 4, 8 or 16 bits. The
+    number of bits grows automatically as new block IDs are written. A chunk made
+    of a single block ID, such as a chunk of air or of solid stone, collapses to a
+    palette of one entry and stores no indices at all.
+
+    It has the same interface as a dense `Chunk`, so that worlds can use either.
+    Single blocks are read and written in constant time through bit operations,
+    while bulk operations decode the chunk, apply a NumPy slice operation and
+    re-encode it with the smallest palette, dropping block IDs that are no longer
+    used.
+
+    Args:
+        position (Tuple[int, int, int]): The position of the chunk in chunk
+            coordinates, i.e., the world coordinate of its first voxel divided
+            by the chunk size.
+        size (int): The number of voxels along each edge of the chunk.
+        dtype (np.dtype): The data type of the block IDs.
+        blocks (Optional[np.ndarray]): The initial block IDs of the chunk. If not
+            provided, the chunk is filled with air (block ID `0`).
+        is_modified (bool): Whether the chunk holds changes that have not been
+            saved yet.
+    """
+
+    def __init__(
+        self,
+        position: Tuple[int, int, int],
+        size: int = 32,
+        dtype: np.dtype = np.uint8,
+        blocks: Optional[np.ndarray] = None,
+        is_modified: bool = True,
+    ) -> None:
+        self.position = tuple(int(coordinate) for coordinate in position)
+        self.size = size
+        self._dtype = np.dtype(dtype)
+        self.palette = np.zeros(1, dtype=self._dtype)
+        self.palette_indices: Dict[int, int] = {0: 0}
+        self.index_bits = 0
+        self.indices: Optional[np.ndarray] = None
+        if blocks is not None:
+            assert blocks.shape == (
+                size,
+                size,
+                size,
+            ), f"Expected blocks of shape {(size,) * 3}, got {blocks.shape}."
+            self.set_blocks(blocks)
+        self.is_modified = is_modified
+
+    @property
+    def origin(self) -> Tuple[int, int, int]:
+        """The world coordinate of the voxel at the local coordinate `(0, 0, 0)`."""
+        return tuple(coordinate * self.size for coordinate in self.position)
+
+    @property
+    def dtype(self) -> np.dtype:
+        """The data type of the block IDs."""
+        return self._dtype
+
+    @property
+    def nbytes(self) -> int:
+        """The number of bytes used to store the palette and the packed indices."""
+        indices_nbytes = 0 if self.indices is None else self.indices.nbytes
+        return self.palette.nbytes + indices_nbytes
+
+    @property
+    def is_uniform(self) -> bool:
+        """Whether the chunk consists of a single block ID and stores no indices."""
+        return self.indices is None
+
+    @property
+    def is_empty(self) -> bool:
+        """Whether the chunk consists entirely of air."""
+        if self.is_uniform:
+            return self.palette[0] == 0
+        return not self.get_blocks().any()
+
+    def get_blocks(self) -> np.ndarray:
+        """Returns the block IDs of the whole chunk decoded into a new dense array
+        indexed as `[x, y, z]`.
+        """
+        shape = (self.size,) * 3
+        if self.is_uniform:
+            return np.full(shape, self.palette[0], dtype=self._dtype)
+        indices = unpack_indices(self.indices, self.index_bits, self.size**3)
+        return self.palette[indices].reshape(shape)
+
+    def set_blocks(self, blocks: np.ndarray) -> None:
+        """Replaces the block IDs of the whole chunk, encoding them with the
+        smallest palette.
+        """
+        # Block IDs are small integers, so counting them and mapping them through
+        # a lookup table is much faster than sorting them with `np.unique`.
+        blocks = np.asarray(blocks, dtype=self._dtype).ravel()
+        palette = np.flatnonzero(np.bincount(blocks))
+        lookup_table = np.zeros(palette[-1] + 1, dtype=np.uint16)
+        lookup_table[palette] = np.arange(len(palette))
+        indices = lookup_table[blocks]
+        self.palette = palette.astype(self._dtype)
+        self.palette_indices = {
+            int(block_id): index for index, block_id in enumerate(self.palette)
+        }
+        if len(palette) == 1:
+            self.index_bits = 0
+            self.indices = None
+        else:
+            self.index_bits = get_index_bits(len(palette))
+            self.indices = pack_indices(indices, self.index_bits)
+        self.is_modified = True
+
+    def get_palette_index(self, block_id: int) -> int:
+        """Returns the index of a block ID in the palette, adding it and widening
+        the packed indices if needed.
+        """
+        index = self.palette_indices.get(block_id)
+        if index is not None:
+            return index
+
+        index = len(self.palette)
+        self.palette = np.append(self.palette, self._dtype.type(block_id))
+        self.palette_indices[block_id] = index
+        index_bits = get_index_bits(len(self.palette))
+        if index_bits != self.index_bits:
+            if self.is_uniform:
+                indices = np.zeros(self.size**3, dtype=np.uint8)
+            else:
+                indices = unpack_indices(self.indices, self.index_bits, self.size**3)
+            self.index_bits = index_bits
+            self.indices = pack_indices(indices, index_bits)
+        return index
+
+    def get_block(self, x: int, y: int, z: int) -> int:
+        """Returns the block ID at a local coordinate."""
+        if self.is_uniform:
+            return int(self.palette[0])
+        voxel = (x * self.size + y) * self.size + z
+        if self.index_bits >= 8:
+            return int(self.palette[self.indices[voxel]])
+        byte, slot = divmod(voxel, 8 // self.index_bits)
+        shift = slot * self.index_bits
+        index = (int(self.indices[byte]) >> shift) & ((1 << self.index_bits) - 1)
+        return int(self.palette[index])
+
+    def get_blocks_at_voxels(self, voxels: np.ndarray) -> np.ndarray:
+        """Returns the block IDs at an array of flat voxel indices, i.e., local
+        coordinates `(x, y, z)` flattened to `(x * size + y) * size + z`.
+        """
+        if self.is_uniform:
+            return np.full(voxels.shape, self.palette[0], dtype=self._dtype)
+        if self.index_bits >= 8:
+            return self.palette[self.indices[voxels]]
+        indices_per_byte = 8 // self.index_bits
+        shifts = (voxels % indices_per_byte * self.index_bits).astype(np.uint8)
+        indices = self.indices[voxels // indices_per_byte] >> shifts
+        return self.palette[indices & ((1 << self.index_bits) - 1)]
+
+    def get_blocks_at(self, positions: np.ndarray) -> np.ndarray:
+        """Returns the block IDs at an array of local coordinates of shape
+        `(n, 3)`.
+        """
+        voxels = (positions[:, 0] * self.size + positions[:, 1]) * self.size
+        voxels += positions[:, 2]
+        return self.get_blocks_at_voxels(voxels)
+
+    def set_block(self, x: int, y: int, z: int, block_id: int) -> None:
+        """Sets the block ID at a local coordinate."""
+        self.is_modified = True
+        if self.is_uniform and block_id == self.palette[0]:
+            return
+        index = self.get_palette_index(block_id)
+        voxel = (x * self.size + y) * self.size + z
+        if self.index_bits >= 8:
+            self.indices[voxel] = index
+            return
+        byte, slot = divmod(voxel, 8 // self.index_bits)
+        shift = slot * self.index_bits
+        mask = ((1 << self.index_bits) - 1) << shift
+        self.indices[byte] = (int(self.indices[byte]) & ~mask) | (index << shift)
+
+    def fill(
+        self,
+        start: Tuple[int, int, int],
+        end: Tuple[int, int, int],
+        block_id: int,
+    ) -> None:
+        """Fills the local region `[start, end)` with a single block ID.
+
+        Args:
+            start (Tuple[int, int, int]): The inclusive lower corner of the region.
+            end (Tuple[int, int, int]): The exclusive upper corner of the region.
+            block_id (int): The block ID to fill the region with.
+        """
+        self.is_modified = True
+        covers_chunk = all(
+            start[axis] <= 0 and end[axis] >= self.size for axis in range(3)
+        )
+        if covers_chunk:
+            self.palette = np.array([block_id], dtype=self._dtype)
+            self.palette_indices = {int(block_id): 0}
+            self.index_bits = 0
+            self.indices = None
+            return
+        if self.is_uniform and block_id == self.palette[0]:
+            return
+        blocks = self.get_blocks()
+        blocks[start[0] : end[0], start[1] : end[1], start[2] : end[2]] = block_id
+        self.set_blocks(blocks)
+
+    def get_region(
+        self, start: Tuple[int, int, int], end: Tuple[int, int, int]
+    ) -> np.ndarray:
+        """Returns a copy of the block IDs in the local region `[start, end)`."""
+        if self.is_uniform:
+            shape = tuple(
+                len(range(self.size)[start[axis] : end[axis]]) for axis in range(3)
+            )
+            return np.full(shape, self.palette[0], dtype=self._dtype)
+        x, y, z = (np.arange(self.size)[start[axis] : end[axis]] for axis in range(3))
+        if len(x) * len(y) * len(z) * 4 >= self.size**3:
+            return self.get_blocks()[
+                start[0] : end[0], start[1] : end[1], start[2] : end[2]
+            ]
+        # Small regions, such as the one-voxel borders of the neighbouring chunks
+        # read when remeshing a chunk, only decode the voxels they contain.
+        voxels = (x[:, None, None] * self.size + y[None, :, None]) * self.size
+        return self.get_blocks_at_voxels(voxels + z[None, None, :])
+
+    def set_region(self, start: Tuple[int, int, int], blocks: np.ndarray) -> None:
+        """Writes an array of block IDs into the chunk with its lower corner placed
+        at the local coordinate `start`.
+        """
+        end = [start[axis] + blocks.shape[axis] for axis in range(3)]
+        if blocks.shape == (self.size,) * 3:
+            self.set_blocks(blocks)
+            return
+        chunk_blocks = self.get_blocks()
+        chunk_blocks[start[0] : end[0], start[1] : end[1], start[2] : end[2]] = blocks
+        self.set_blocks(chunk_blocks)
@@ -0,0 +1,229 @@
+import math
+from typing import NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from .world import World
+
+
+class RaycastHit(NamedTuple):
+    """The first non-air block hit by a ray.
+
+    Args:
+        position (Tuple[int, int, int]): The world coordinate of the block.
+        block_id (int): The ID of the block.
+        normal (Tuple[int, int, int]): The normal of the face of the block the
+            ray entered through, e.g., `(0, 1, 0)` for the top face. It is
+            `(0, 0, 0)` if the ray starts inside the block.
+        distance (float): The distance along the ray to the point where it
+            entered the block.
+    """
+
+    position: Tuple[int, int, int]
+    block_id: int
+    normal: Tuple[int, int, int]
+    distance: float
+
+    @property
+    def adjacent_position(self) -> Tuple[int, int, int]:
+        """The world coordinate of the voxel in front of the face that was hit,
+        which is where a block is placed when building.
+        """
+        return tuple(a + b for a, b in zip(self.position, self.normal))
+
+
+class BatchRaycastHits(NamedTuple):
+    """The first non-air blocks hit by a batch of `n` rays.
+
+    Args:
+        is_hit (np.ndarray): Whether each ray hit a block within the maximum
+            distance, of shape `(n,)`. The other arrays are undefined for the
+            rays that did not.
+        positions (np.ndarray): The world coordinates of the blocks, of shape
+            `(n, 3)`.
+        block_ids (np.ndarray): The IDs of the blocks, of shape `(n,)`.
+        normals (np.ndarray): The normals of the faces the rays entered
+            through, of shape `(n, 3)`.
+        distances (np.ndarray): The distances along the rays to the points
+            where they entered the blocks, of shape `(n,)`.
+    """
+
+    is_hit: np.ndarray
+    positions: np.ndarray
+    block_ids: np.ndarray
+    normals: np.ndarray
+    distances: np.ndarray
+
+
+def raycast(
+    world: World,
+    origin: Tuple[float, float, float],
+    direction: Tuple[float, float, float],
+    max_distance: float = 8.0,
+) -> Optional[RaycastHit]:
+    """Finds the first non-air block along a ray by visiting every voxel the ray
+    passes through in order, using the algorithm of Amanatides and Woo, "A Fast
+    Voxel Traversal Algorithm for Ray Tracing" (1987).
+
+    Args:
+        world (World): The world the ray is cast in.
+        origin (Tuple[float, float, float]): The world position the ray starts at.
+        direction (Tuple[float, float, float]): The direction of the ray, which
+            does not need to be normalized.
+        max_distance (float): The distance after which the ray stops.
+
+    Returns:
+        Optional[RaycastHit]: The block hit by the ray, or `None` if there is no
+            block within `max_distance`.
+    """
+    length = math.sqrt(sum(component * component for component in direction))
+    assert length > 0, "The direction of a ray must not be zero."
+    direction = [float(component) / length for component in direction]
+    origin = [float(coordinate) for coordinate in origin]
+    voxel = [math.floor(coordinate) for coordinate in origin]
+
+    block_id = world.get_block(*voxel)
+    if block_id != 0:
+        return RaycastHit(tuple(voxel), block_id, (0, 0, 0), 0.0)
+
+    # For each axis, the direction of the steps from voxel to voxel, the distance
+    # along the ray between two voxel boundaries and the distance along the ray
+    # to the next voxel boundary.
+    steps, distance_deltas, next_distances = [], [], []
+    for axis in range(3):
+        if direction[axis] > 0:
+            steps.append(1)
+            distance_deltas.append(1 / direction[axis])
+            next_distances.append((voxel[axis] + 1 - origin[axis]) / direction[axis])
+        elif direction[axis] < 0:
+            steps.append(-1)
+            distance_deltas.append(-1 / direction[axis])
+            next_distances.append((voxel[axis] - origin[axis]) / direction[axis])
+        else:
+            steps.append(0)
+            distance_deltas.append(math.inf)
+            next_distances.append(math.inf)
+
+    # The chunk containing the current voxel is only looked up again when the ray
+    # crosses into another chunk.
+    size = world.chunk_size
+    chunk_position = None
+    chunk = None
+    while True:
+        # On ties, the axis with the lowest index is stepped first, like the
+        # `np.argmin` of `raycast_batch`, so that both agree on rays through the
+        # edges and corners of voxels.
+        if next_distances[0] <= next_distances[1]:
+            axis = 0 if next_distances[0] <= next_distances[2] else 2
+        else:
+            axis = 1 if next_distances[1] <= next_distances[2] else 2
+        distance = next_distances[axis]
+        if distance > max_distance:
+            return None
+        voxel[axis] += steps[axis]
+        next_distances[axis] += distance_deltas[axis]
+        x, y, z = voxel
+        voxel_chunk_position = (x // size, y // size, z // size)
+        if voxel_chunk_position != chunk_position:
+            chunk_position = voxel_chunk_position
+            chunk = world.chunks.get(chunk_position)
+        if chunk is None:
+            continue
+        block_id = chunk.get_block(x % size, y % size, z % size)
+        if block_id != 0:
+            normal = [0, 0, 0]
+            normal[axis] = -steps[axis]
+            return RaycastHit(tuple(voxel), block_id, tuple(normal), distance)
+
+
+def raycast_batch(
+    world: World,
+    origins: np.ndarray,
+    directions: np.ndarray,
+    max_distance: float = 64.0,
+    max_region_volume: int = 1 << 24,
+) -> BatchRaycastHits:
+    """Finds the first non-air block along each ray of a batch. All rays are
+    traversed together with the same algorithm as `raycast`, advancing every ray
+    that has not hit a block yet by one voxel per vectorized step.
+
+    If the box that all rays can reach holds at most `max_region_volume` voxels,
+    its blocks are copied out of the world once, so that each step only indexes
+    an array. Otherwise the blocks are looked up in the chunks at every step.
+
+    Args:
+        world (World): The world the rays are cast in.
+        origins (np.ndarray): The world positions the rays start at, of shape
+            `(n, 3)`.
+        directions (np.ndarray): The directions of the rays, of shape `(n, 3)`.
+            They do not need to be normalized.
+        max_distance (float): The distance after which the rays stop.
+        max_region_volume (int): The largest number of voxels copied out of the
+            world.
+
+    Returns:
+        BatchRaycastHits: The blocks hit by the rays.
+    """
+    origins = np.asarray(origins, dtype=np.float64).reshape(-1, 3)
+    directions = np.asarray(directions, dtype=np.float64).reshape(-1, 3)
+    lengths = np.linalg.norm(directions, axis=1, keepdims=True)
+    assert np.all(lengths > 0), "The direction of a ray must not be zero."
+    directions = directions / lengths
+    ray_count = len(origins)
+
+    voxels = np.floor(origins).astype(np.int64)
+    steps = np.sign(directions).astype(np.int64)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        distance_deltas = np.abs(1 / directions)
+        next_distances = np.where(
+            steps > 0,
+            (voxels + 1 - origins) / directions,
+            (voxels - origins) / directions,
+        )
+    next_distances[steps == 0] = np.inf
+
+    region_start = np.floor(np.min(origins, axis=0) - max_distance).astype(np.int64)
+    region_end = np.floor(np.max(origins, axis=0) + max_distance).astype(np.int64) + 1
+    if np.prod(region_end - region_start) <= max_region_volume:
+        region = world.get_region(
+            tuple(region_start.tolist()), tuple(region_end.tolist())
+        )
+
+        def get_blocks_at(positions: np.ndarray) -> np.ndarray:
+            local_positions = positions - region_start
+            return region[
+                local_positions[:, 0], local_positions[:, 1], local_positions[:, 2]
+            ]
+
+    else:
+        get_blocks_at = world.get_blocks_at
+
+    is_hit = np.zeros(ray_count, dtype=bool)
+    positions = voxels.copy()
+    block_ids = get_blocks_at(voxels)
+    normals = np.zeros((ray_count, 3), dtype=np.int64)
+    distances = np.zeros(ray_count)
+    is_hit[block_ids != 0] = True
+
+    active = np.flatnonzero(~is_hit)
+    while len(active) > 0:
+        axes = np.argmin(next_distances[active], axis=1)
+        active_distances = next_distances[active, axes]
+        is_in_range = active_distances <= max_distance
+        active, axes = active[is_in_range], axes[is_in_range]
+        active_distances = active_distances[is_in_range]
+
+        voxels[active, axes] += steps[active, axes]
+        next_distances[active, axes] += distance_deltas[active, axes]
+        active_block_ids = get_blocks_at(voxels[active])
+        is_active_hit = active_block_ids != 0
+
+        hits, hit_axes = active[is_active_hit], axes[is_active_hit]
+        is_hit[hits] = True
+        positions[hits] = voxels[hits]
+        block_ids[hits] = active_block_ids[is_active_hit]
+        normals[hits, hit_axes] = -steps[hits, hit_axes]
+        distances[hits] = active_distances[is_active_hit]
+        active = active[~is_active_hit]
+
+    return BatchRaycastHits(is_hit, positions, block_ids, normals, distances)
@@ -0,0 +1,294 @@
+import mmap
+import os
+import struct
+import zlib
+from collections import OrderedDict
+from typing import Iterable, Optional, Tuple, Union
+
+import numpy as np
+
+from .chunk import Chunk
+from .palette import PaletteChunk
+
+ChunkPosition = Tuple[int, int, int]
+
+# The preamble of a region file: the magic bytes, the format version and the
+# number of chunks of the region along each axis, padded to 16 bytes.
+_PREAMBLE = struct.Struct("<4sHHHH4x")
+_REGION_MAGIC = b"PNCR"
+_REGION_VERSION = 1
+
+# An entry of the offset table: the byte offset of the payload of a chunk in the
+# file, its length in bytes and its CRC-32 checksum. A length of 0 marks a chunk
+# that has never been saved.
+_ENTRY = struct.Struct("<QII")
+
+# The header of a chunk payload: the encoding and the item size of the block IDs.
+_PAYLOAD_HEADER = struct.Struct("<BB")
+_ENCODING_ZLIB = 0
+
+
+def encode_blocks(blocks: np.ndarray, compression_level: int = 1) -> bytes:
+    """Compresses the block IDs of a chunk into a payload of a region file."""
+    return _PAYLOAD_HEADER.pack(_ENCODING_ZLIB, blocks.itemsize) + zlib.compress(
+        np.ascontiguousarray(blocks).tobytes(), compression_level
+    )
+
+
+def decode_blocks(payload: bytes, chunk_size: int) -> np.ndarray:
+    """Decompresses a payload of a region file into the block IDs of a chunk."""
+    encoding, itemsize = _PAYLOAD_HEADER.unpack_from(payload)
+    assert encoding == _ENCODING_ZLIB, f"Unknown chunk encoding {encoding}."
+    data = bytearray(zlib.decompress(payload[_PAYLOAD_HEADER.size :]))
+    return np.frombuffer(data, dtype=f"u{itemsize}").reshape((chunk_size,) * 3)
+
+
+class RegionFile:
+    """A file holding the compressed chunks of a box-shaped region of the world.
+
+    The file starts with a fixed-size table holding the offset, length and
+    checksum of the payload of every chunk of the region. The file is memory
+    mapped, so that opening it is cheap and a chunk is only read from disk and
+    decompressed when it is loaded.
+
+    Payloads are never overwritten: saving a chunk appends its new payload to the
+    end of the file before its table entry is updated. Readers in other processes
+    therefore always see either the old or the new payload of a chunk, and the
+    space of outdated payloads is reclaimed by `compact`.
+
+    Args:
+        path (str): The path of the region file.
+        region_shape (Tuple[int, int, int]): The number of chunks of the region
+            along each axis.
+        writable (bool): Whether the file may be written. A missing file is
+            created if it is writable.
+    """
+
+    def __init__(
+        self, path: str, region_shape: Tuple[int, int, int], writable: bool = False
+    ) -> None:
+        self.path = path
+        self.region_shape = tuple(region_shape)
+        self.writable = writable
+        self.table_size = _ENTRY.size * int(np.prod(self.region_shape))
+        if writable and not os.path.exists(path):
+            with open(path, "wb") as file:
+                file.write(
+                    _PREAMBLE.pack(_REGION_MAGIC, _REGION_VERSION, *region_shape)
+                )
+                file.write(bytes(self.table_size))
+        self.file = open(path, "r+b" if writable else "rb")
+        self.mmap = None
+        self.remap()
+
+        magic, version, *shape = _PREAMBLE.unpack_from(self.mmap)
+        assert magic == _REGION_MAGIC, f"'{path}' is not a region file."
+        assert version == _REGION_VERSION, f"Unsupported region file version {version}."
+        assert tuple(shape) == self.region_shape, (
+            f"Region file '{path}' has shape {tuple(shape)}, "
+            f"expected {self.region_shape}."
+        )
+
+    def remap(self) -> None:
+        """Maps the whole file into memory, e.g. after it has grown."""
+        if self.mmap is not None:
+            self.mmap.close()
+        self.mmap = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def get_entry_offset(self, local_position: ChunkPosition) -> int:
+        """Returns the byte offset of the table entry of a chunk."""
+        index = np.ravel_multi_index(local_position, self.region_shape)
+        return _PREAMBLE.size + _ENTRY.size * int(index)
+
+    def read_entry(self, local_position: ChunkPosition) -> Tuple[int, int, int]:
+        """Returns the offset, length and checksum of the payload of a chunk."""
+        return _ENTRY.unpack_from(self.mmap, self.get_entry_offset(local_position))
+
+    def has_chunk(self, local_position: ChunkPosition) -> bool:
+        """Returns whether a chunk has been saved to the region file."""
+        return self.read_entry(local_position)[1] > 0
+
+    def read(self, local_position: ChunkPosition) -> Optional[bytes]:
+        """Returns the payload of a chunk, or `None` if it has never been saved.
+
+        Args:
+            local_position (ChunkPosition): The position of the chunk relative to
+                the first chunk of the region.
+        """
+        offset, length, checksum = self.read_entry(local_position)
+        if length == 0:
+            return None
+        if offset + length > len(self.mmap):
+            # Another region file object has appended to the file since it was
+            # mapped.
+            self.remap()
+        payload = self.mmap[offset : offset + length]
+        assert zlib.crc32(payload) == checksum, f"Corrupt chunk in '{self.path}'."
+        return payload
+
+    def write(self, local_position: ChunkPosition, payload: bytes) -> None:
+        """Appends the payload of a chunk to the file and points its table entry
+        to it.
+
+        Args:
+            local_position (ChunkPosition): The position of the chunk relative to
+                the first chunk of the region.
+            payload (bytes): The payload of the chunk.
+        """
+        assert self.writable, f"Region file '{self.path}' is read-only."
+        file_descriptor = self.file.fileno()
+        offset = os.fstat(file_descriptor).st_size
+        os.pwrite(file_descriptor, payload, offset)
+        os.pwrite(
+            file_descriptor,
+            _ENTRY.pack(offset, len(payload), zlib.crc32(payload)),
+            self.get_entry_offset(local_position),
+        )
+
+    @property
+    def garbage_size(self) -> int:
+        """The number of bytes taken by outdated payloads."""
+        table = np.frombuffer(
+            self.mmap,
+            dtype=[("offset", "<u8"), ("length", "<u4"), ("checksum", "<u4")],
+            count=int(np.prod(self.region_shape)),
+            offset=_PREAMBLE.size,
+        )
+        used_size = _PREAMBLE.size + self.table_size + int(table["length"].sum())
+        del table
+        return os.fstat(self.file.fileno()).st_size - used_size
+
+    def compact(self) -> None:
+        """Rewrites the file without the outdated payloads. Must not be called while
+        other processes read the file.
+        """
+        self.remap()
+        if not self.garbage_size:
+            return
+        temporary_path = self.path + ".tmp"
+        if os.path.exists(temporary_path):
+            os.remove(temporary_path)
+        compacted = RegionFile(temporary_path, self.region_shape, writable=True)
+        for local_position in np.ndindex(*self.region_shape):
+            payload = self.read(local_position)
+            if payload is not None:
+                compacted.write(local_position, payload)
+        compacted.close()
+        self.close()
+        os.replace(temporary_path, self.path)
+        self.file = open(self.path, "r+b")
+        self.remap()
+
+    def close(self) -> None:
+        """Closes the file."""
+        if self.mmap is not None:
+            self.mmap.close()
+            self.mmap = None
+        self.file.close()
+
+
+class RegionStorage:
+    """Persists the chunks of a world in a directory of region files, each holding
+    a box of `region_shape` chunks.
+
+    Region files are opened lazily and at most `max_open_files` of them are kept
+    open, so that memory use stays flat no matter how large the world grows.
+
+    Args:
+        directory (str): The directory holding the region files.
+        chunk_size (int): The number of voxels along each edge of a chunk.
+        region_shape (Tuple[int, int, int]): The number of chunks of a region
+            along each axis.
+        writable (bool): Whether chunks may be saved. Read-only storages are used
+            by the worker processes that load chunks.
+        max_open_files (int): The maximum number of region files kept open.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        chunk_size: int,
+        region_shape: Tuple[int, int, int] = (32, 8, 32),
+        writable: bool = True,
+        max_open_files: int = 64,
+    ) -> None:
+        self.directory = directory
+        self.chunk_size = chunk_size
+        self.region_shape = tuple(region_shape)
+        self.writable = writable
+        self.max_open_files = max_open_files
+        self.region_files: "OrderedDict[Tuple[int, int, int], RegionFile]" = (
+            OrderedDict()
+        )
+        if writable:
+            os.makedirs(directory, exist_ok=True)
+
+    def get_region_file(
+        self, chunk_position: ChunkPosition
+    ) -> Tuple[Optional[RegionFile], ChunkPosition]:
+        """Returns the region file holding a chunk, or `None` if it does not exist
+        and the storage is read-only, along with the position of the chunk
+        relative to the region.
+        """
+        region_position, local_position = zip(
+            *(
+                divmod(coordinate, extent)
+                for coordinate, extent in zip(chunk_position, self.region_shape)
+            )
+        )
+        region_file = self.region_files.get(region_position)
+        if region_file is not None:
+            self.region_files.move_to_end(region_position)
+            return region_file, local_position
+
+        path = os.path.join(self.directory, "r.{}.{}.{}.pncr".format(*region_position))
+        if not self.writable and not os.path.exists(path):
+            return None, local_position
+        region_file = RegionFile(path, self.region_shape, writable=self.writable)
+        self.region_files[region_position] = region_file
+        if len(self.region_files) > self.max_open_files:
+            self.region_files.popitem(last=False)[1].close()
+        return region_file, local_position
+
+    def has_chunk(self, chunk_position: ChunkPosition) -> bool:
+        """Returns whether a chunk has been saved."""
+        region_file, local_position = self.get_region_file(chunk_position)
+        return region_file is not None and region_file.has_chunk(local_position)
+
+    def load_chunk(self, chunk_position: ChunkPosition) -> Optional[np.ndarray]:
+        """Returns the block IDs of a saved chunk, or `None` if it was never saved."""
+        region_file, local_position = self.get_region_file(chunk_position)
+        if region_file is None:
+            return None
+        payload = region_file.read(local_position)
+        if payload is None:
+            return None
+        return decode_blocks(payload, self.chunk_size)
+
+    def save_chunk(self, chunk: Union[Chunk, PaletteChunk]) -> None:
+        """Saves a chunk and marks it as unmodified."""
+        region_file, local_position = self.get_region_file(chunk.position)
+        region_file.write(local_position, encode_blocks(chunk.get_blocks()))
+        chunk.is_modified = False
+
+    def save_chunks(self, chunks: Iterable[Union[Chunk, PaletteChunk]]) -> int:
+        """Saves the chunks that were modified since they were loaded or last
+        saved, and returns their number.
+        """
+        count = 0
+        for chunk in chunks:
+            if chunk.is_modified:
+                self.save_chunk(chunk)
+                count += 1
+        return count
+
+    def compact(self) -> None:
+        """Reclaims the space of outdated payloads in all open region files."""
+        for region_file in self.region_files.values():
+            region_file.compact()
+
+    def close(self) -> None:
+        """Closes all region files."""
+        for region_file in self.region_files.values():
+            region_file.close()
+        self.region_files.clear()
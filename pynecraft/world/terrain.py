@@ -0,0 +1,280 @@
+from typing import Tuple
+
+import numpy as np
+
+from ..parameters import TerrainParameters
+from .blocks import Block
+from .noise import PerlinNoise
+
+
+def get_sample_coordinates(origin: int, count: int, step: int) -> np.ndarray:
+    """Returns the world coordinates along one axis at which the voxels of a
+    region are sampled, which are the centers of the voxels, rounded down, when
+    every voxel covers `step` world voxels.
+    """
+    return origin + step * np.arange(count) + step // 2
+
+
+def contains_coordinate(
+    coordinates: np.ndarray, coordinate: int, step: int
+) -> np.ndarray:
+    """Returns whether the voxels sampled at the given world coordinates along one
+    axis, each covering `step` world voxels, contain a world coordinate.
+    """
+    lower = coordinates - step // 2
+    return (lower <= coordinate) & (coordinate < lower + step)
+
+
+class FlatTerrainGenerator:
+    """Generates a flat ground of grass on top of dirt, dotted with stone pillars
+    on a regular grid.
+
+    Terrain generators compute the blocks of any region of the world from the
+    coordinates alone, so that chunks can be generated independently, in any
+    order and in separate processes.
+
+    Args:
+        ground_height (int): The world `y` coordinate of the grass layer.
+        pillar_spacing (int): The distance between two pillars along `x` and `z`.
+        pillar_height (int): The height of the pillars above the ground.
+    """
+
+    def __init__(
+        self, ground_height: int = -3, pillar_spacing: int = 24, pillar_height: int = 10
+    ) -> None:
+        self.ground_height = ground_height
+        self.pillar_spacing = pillar_spacing
+        self.pillar_height = pillar_height
+
+    @property
+    def height_range(self) -> Tuple[int, int]:
+        """The lowest and highest world `y` coordinate that may contain blocks."""
+        return self.ground_height - 3, self.ground_height + self.pillar_height
+
+    def get_sky_heights(self, x: np.ndarray, z: np.ndarray) -> np.ndarray:
+        """Returns the lowest world `y` coordinate of each column above which every
+        voxel is air and open to the sky.
+        """
+        is_pillar = (x % self.pillar_spacing < 2) & (z % self.pillar_spacing < 2)
+        top = self.ground_height + np.where(is_pillar, self.pillar_height, 0)
+        return (top + 1).astype("int64")
+
+    def generate_region(
+        self,
+        origin: Tuple[int, int, int],
+        shape: Tuple[int, int, int],
+        step: int = 1,
+    ) -> np.ndarray:
+        """Generates the block IDs of a region of the world.
+
+        Args:
+            origin (Tuple[int, int, int]): The world coordinate of the lower corner
+                of the region.
+            shape (Tuple[int, int, int]): The number of voxels of the region along
+                each axis.
+            step (int): The number of world voxels covered by each voxel of the
+                region along each axis. With a step larger than `1`, the region is
+                a downsampled grid whose voxels are sampled at their center,
+                except that a voxel containing the surface of the ground gets the
+                block of the surface.
+
+        Returns:
+            np.ndarray: The block IDs of the region indexed as `[x, y, z]`.
+        """
+        x = get_sample_coordinates(origin[0], shape[0], step)[:, None, None]
+        y = get_sample_coordinates(origin[1], shape[1], step)[None, :, None]
+        z = get_sample_coordinates(origin[2], shape[2], step)[None, None, :]
+        blocks = np.zeros(shape, dtype="uint8")
+        blocks[np.broadcast_to(y < self.ground_height, shape)] = Block.DIRT
+        is_ground = contains_coordinate(y, self.ground_height, step)
+        blocks[np.broadcast_to(is_ground, shape)] = Block.GRASS
+        blocks[np.broadcast_to(y < self.ground_height - 3, shape)] = Block.AIR
+        is_pillar = (
+            (x % self.pillar_spacing < 2)
+            & (z % self.pillar_spacing < 2)
+            & (y > self.ground_height)
+            & (y <= self.ground_height + self.pillar_height)
+        )
+        blocks[is_pillar] = Block.STONE
+        return blocks
+
+
+class NoiseTerrainGenerator:
+    """Generates hilly terrain with caves, lakes and biomes from a seed, using
+    NumPy-vectorized Perlin noise.
+
+    The height of the ground is fractal 2D noise evaluated once per column of a
+    region, caves are carved where fractal 3D noise exceeds a threshold, and a
+    low-frequency 2D noise selects between temperate, desert and cold biomes,
+    which decide the blocks of the surface. Every block only depends on the seed
+    and its world coordinate, so the output is bit-identical for the same seed
+    no matter in which order, or in which process, regions are generated.
+
+    Args:
+        terrain_parameters (TerrainParameters): The parameters of the terrain.
+    """
+
+    # The spacing in voxels of the lattice on which cave noise is evaluated.
+    CAVE_LATTICE_SPACING = 4
+
+    def __init__(self, terrain_parameters: TerrainParameters) -> None:
+        self.parameters = terrain_parameters
+        self.height_noise = PerlinNoise(
+            terrain_parameters.seed, max_octaves=max(terrain_parameters.octaves, 16)
+        )
+        self.cave_noise = PerlinNoise(terrain_parameters.seed + 1)
+        self.biome_noise = PerlinNoise(terrain_parameters.seed + 2)
+
+    @property
+    def height_range(self) -> Tuple[int, int]:
+        """The lowest and highest world `y` coordinate that may contain blocks."""
+        # The fractal noise is a weighted average of octaves within `[-1, 1]`, so
+        # it never exceeds `1`, whatever the weights of the octaves.
+        highest = int(self.shape_heights(np.float64(1.0)))
+        return self.parameters.bedrock_height, max(highest, self.parameters.sea_level)
+
+    def shape_heights(self, noise: np.ndarray) -> np.ndarray:
+        """Returns the world `y` coordinate of the surface for fractal height noise
+        in the range `[-1, 1]`, which grows with the noise.
+        """
+        parameters = self.parameters
+        # Raising the normalized noise to a power flattens valleys and sharpens
+        # peaks, which looks more natural than symmetric hills.
+        normalized = (noise + 1.0) * 0.5
+        heights = parameters.base_height + parameters.height_amplitude * (
+            2.0 * normalized**1.5 - 0.7
+        )
+        return np.floor(heights).astype("int64")
+
+    def get_heights(self, x: np.ndarray, z: np.ndarray) -> np.ndarray:
+        """Returns the world `y` coordinate of the surface of each column."""
+        parameters = self.parameters
+        noise = self.height_noise.fractal2(
+            x / parameters.height_scale,
+            z / parameters.height_scale,
+            octaves=parameters.octaves,
+            persistence=parameters.persistence,
+            lacunarity=parameters.lacunarity,
+        )
+        return self.shape_heights(noise)
+
+    def get_sky_heights(self, x: np.ndarray, z: np.ndarray) -> np.ndarray:
+        """Returns the lowest world `y` coordinate of each column above which every
+        voxel is air and open to the sky, which is just above the surface or the
+        sea.
+        """
+        return np.maximum(self.get_heights(x, z), self.parameters.sea_level) + 1
+
+    def get_cave_noise(self, x: np.ndarray, y: np.ndarray, z: np.ndarray) -> np.ndarray:
+        """Returns the cave noise of the voxels of a region given its `x`, `y` and
+        `z` coordinates as 1D arrays.
+
+        The noise is only evaluated on a lattice aligned to the world with a
+        spacing of `CAVE_LATTICE_SPACING` voxels and trilinearly interpolated in
+        between, which is much cheaper than evaluating it at every voxel and
+        keeps the result independent of the region's bounds.
+        """
+        spacing = self.CAVE_LATTICE_SPACING
+        scale = self.parameters.cave_scale
+        if all(np.all(coordinates % spacing == 0) for coordinates in (x, y, z)):
+            # Every voxel lies on the lattice, as in the downsampled regions of
+            # distant terrain, so the noise is evaluated at the voxels directly.
+            return self.cave_noise.fractal3(
+                x[:, None, None] / scale,
+                y[None, :, None] / (0.5 * scale),
+                z[None, None, :] / scale,
+            )
+        lattices, weights, indices = [], [], []
+        for coordinates in (x, y, z):
+            first = np.floor(coordinates[0] / spacing)
+            last = np.floor(coordinates[-1] / spacing) + 1
+            lattices.append(np.arange(first, last + 1) * spacing)
+            position = coordinates / spacing - first
+            index = np.floor(position).astype("int64")
+            indices.append(index)
+            weights.append(position - index)
+        lattice_noise = self.cave_noise.fractal3(
+            lattices[0][:, None, None] / scale,
+            lattices[1][None, :, None] / (0.5 * scale),
+            lattices[2][None, None, :] / scale,
+        )
+        for axis in range(3):
+            lower = np.take(lattice_noise, indices[axis], axis=axis)
+            upper = np.take(lattice_noise, indices[axis] + 1, axis=axis)
+            shape = [1, 1, 1]
+            shape[axis] = -1
+            lattice_noise = lower + weights[axis].reshape(shape) * (upper - lower)
+        return lattice_noise
+
+    def get_temperatures(self, x: np.ndarray, z: np.ndarray) -> np.ndarray:
+        """Returns the temperature of each column, in the range `[-1, 1]`."""
+        scale = self.parameters.biome_scale
+        return self.biome_noise.fractal2(x / scale, z / scale, octaves=2)
+
+    def generate_region(
+        self,
+        origin: Tuple[int, int, int],
+        shape: Tuple[int, int, int],
+        step: int = 1,
+    ) -> np.ndarray:
+        """Generates the block IDs of a region of the world.
+
+        Args:
+            origin (Tuple[int, int, int]): The world coordinate of the lower corner
+                of the region.
+            shape (Tuple[int, int, int]): The number of voxels of the region along
+                each axis.
+            step (int): The number of world voxels covered by each voxel of the
+                region along each axis. With a step larger than `1`, the region is
+                a downsampled grid whose voxels are sampled at their center,
+                except that a voxel containing the surface of the ground gets the
+                block of the surface.
+
+        Returns:
+            np.ndarray: The block IDs of the region indexed as `[x, y, z]`.
+        """
+        parameters = self.parameters
+        blocks = np.zeros(shape, dtype="uint8")
+        y = get_sample_coordinates(origin[1], shape[1], step)
+        if y[-1] < parameters.bedrock_height:
+            return blocks
+
+        x = get_sample_coordinates(origin[0], shape[0], step).astype("float64")
+        z = get_sample_coordinates(origin[2], shape[2], step).astype("float64")
+        column_x, column_z = np.meshgrid(x, z, indexing="ij")
+        heights = self.get_heights(column_x, column_z)
+        if y[0] > max(heights.max(), parameters.sea_level):
+            return blocks
+
+        temperatures = self.get_temperatures(column_x, column_z)[:, None, :]
+        heights = heights[:, None, :]
+        y = y[None, :, None]
+        depth = heights - y
+
+        # The ground is stone covered by three layers of soil, whose blocks depend
+        # on the biome and the altitude.
+        is_desert = (temperatures > 0.2) | (heights <= parameters.sea_level + 1)
+        is_cold = (temperatures < -0.25) | (heights >= parameters.snow_height)
+        soil = np.where(is_desert, Block.SAND, Block.DIRT).astype("uint8")
+        top_soil = np.where(
+            is_desert, Block.SAND, np.where(is_cold, Block.SNOW, Block.GRASS)
+        ).astype("uint8")
+        blocks[depth >= 0] = Block.STONE
+        blocks[...] = np.where((depth >= 0) & (depth < 3 + step - 1), soil, blocks)
+        blocks[...] = np.where((depth >= 0) & (depth < step), top_soil, blocks)
+
+        # Caves are carved out below the soil, so that they rarely break through
+        # the surface.
+        is_underground = depth >= 4 + step - 1
+        if is_underground.any():
+            cave_noise = self.get_cave_noise(x, y.ravel().astype("float64"), z)
+            blocks[is_underground & (cave_noise > parameters.cave_threshold)] = (
+                Block.AIR
+            )
+
+        blocks[(depth < 0) & (y <= parameters.sea_level)] = Block.WATER
+        is_bedrock = contains_coordinate(y, parameters.bedrock_height, step)
+        is_below_bedrock = y - step // 2 + step <= parameters.bedrock_height
+        blocks[np.broadcast_to(is_bedrock, shape)] = Block.BEDROCK
+        blocks[np.broadcast_to(is_below_bedrock, shape)] = Block.AIR
+        return blocks
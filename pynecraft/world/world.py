@@ -0,0 +1,348 @@
+from typing import Dict, Iterator, Optional, Set, Tuple, Union
+
+import numpy as np
+
+from ..parameters import WorldParameters
+from .chunk import Chunk
+from .lighting import LightMap
+from .palette import PaletteChunk
+
+ChunkPosition = Tuple[int, int, int]
+
+CHUNK_CLASSES = {"dense": Chunk, "palette": PaletteChunk}
+
+
+def _get_slice_bounds(
+    slices: Tuple[slice, ...]
+) -> Tuple[Tuple[int, ...], Tuple[int, ...]]:
+    """Returns the lower and upper corners of the region selected by slices."""
+    return (
+        tuple(axis_slice.start for axis_slice in slices),
+        tuple(axis_slice.stop for axis_slice in slices),
+    )
+
+
+class World:
+    """A voxel world made up of fixed-size chunks that are stored in a map keyed by
+    their chunk coordinates, so that any block can be read or written in constant
+    time from its world coordinate. Chunks are created lazily the first time a
+    block inside them is written; reading a block from a chunk that does not exist
+    returns air (block ID `0`). Depending on the world parameters, chunks store
+    either a dense array of block IDs or a palette-compressed one.
+
+    Bulk operations such as filling, reading or copying a region are split into
+    the parts that overlap each chunk and every part is processed as a single
+    NumPy slice operation, so that the cost scales with the number of chunks
+    touched rather than the number of voxels.
+
+    Every edit marks the chunks whose meshes it may change as dirty: the chunks
+    holding the edited blocks, and their neighbours when the edit touches a chunk
+    border, since faces on a border are culled against the blocks of the
+    neighbouring chunk. The dirty chunks of a frame are collected at once with
+    `pop_dirty_chunks`, so that a chunk edited many times is remeshed only once.
+
+    A lit world also stores the light of its voxels in a `LightMap`. Every edit
+    queues its region to be relit, and the queued regions are relit together
+    by `pop_dirty_chunks`, which marks the chunks whose light changed as dirty
+    as well.
+
+    Args:
+        world_parameters (WorldParameters): The parameters of the world.
+        is_lit (bool): Whether the world stores the light of its voxels.
+    """
+
+    def __init__(self, world_parameters: WorldParameters, is_lit: bool = False) -> None:
+        self.chunk_size = world_parameters.chunk_size
+        self.block_dtype = np.dtype(world_parameters.block_dtype)
+        self.chunk_class = CHUNK_CLASSES[world_parameters.chunk_storage]
+        self.chunks: Dict[ChunkPosition, Union[Chunk, PaletteChunk]] = {}
+        self.dirty_chunks: Set[ChunkPosition] = set()
+        self.light_map: Optional[LightMap] = LightMap(self) if is_lit else None
+
+    def __len__(self) -> int:
+        return len(self.chunks)
+
+    def __iter__(self) -> Iterator[Union[Chunk, PaletteChunk]]:
+        return iter(self.chunks.values())
+
+    def __contains__(self, chunk_position: ChunkPosition) -> bool:
+        return chunk_position in self.chunks
+
+    @property
+    def nbytes(self) -> int:
+        """The number of bytes used to store the block IDs of all chunks."""
+        return sum(chunk.nbytes for chunk in self.chunks.values())
+
+    def get_chunk_position(self, x: int, y: int, z: int) -> ChunkPosition:
+        """Returns the position of the chunk containing a world coordinate."""
+        return (x // self.chunk_size, y // self.chunk_size, z // self.chunk_size)
+
+    def get_chunk(
+        self, chunk_position: ChunkPosition
+    ) -> Optional[Union[Chunk, PaletteChunk]]:
+        """Returns the chunk at a chunk position, or `None` if it does not exist."""
+        return self.chunks.get(chunk_position)
+
+    def create_chunk(
+        self,
+        chunk_position: ChunkPosition,
+        blocks: Optional[np.ndarray] = None,
+        is_modified: bool = True,
+    ) -> Union[Chunk, PaletteChunk]:
+        """Creates a chunk at a chunk position, replacing any existing chunk.
+
+        Args:
+            chunk_position (ChunkPosition): The position of the chunk.
+            blocks (Optional[np.ndarray]): The initial block IDs of the chunk.
+            is_modified (bool): Whether the chunk holds changes that have not been
+                saved yet, which is not the case for chunks loaded from disk.
+
+        Returns:
+            Union[Chunk, PaletteChunk]: The newly created chunk.
+        """
+        chunk = self.chunk_class(
+            position=chunk_position,
+            size=self.chunk_size,
+            dtype=self.block_dtype,
+            blocks=blocks,
+            is_modified=is_modified,
+        )
+        self.chunks[chunk.position] = chunk
+        return chunk
+
+    def get_or_create_chunk(
+        self, chunk_position: ChunkPosition
+    ) -> Union[Chunk, PaletteChunk]:
+        """Returns the chunk at a chunk position, creating an empty one if needed."""
+        chunk = self.chunks.get(chunk_position)
+        if chunk is None:
+            chunk = self.create_chunk(chunk_position)
+        return chunk
+
+    def remove_chunk(
+        self, chunk_position: ChunkPosition
+    ) -> Optional[Union[Chunk, PaletteChunk]]:
+        """Removes the chunk at a chunk position, along with its light, and returns
+        it, if it exists.
+        """
+        if self.light_map is not None:
+            self.light_map.remove_chunk(chunk_position)
+        return self.chunks.pop(chunk_position, None)
+
+    def mark_region_dirty(
+        self, start: Tuple[int, int, int], end: Tuple[int, int, int]
+    ) -> None:
+        """Marks the chunks whose meshes depend on the blocks of the world region
+        `[start, end)` as dirty, i.e., the chunks within one voxel of the region.
+        """
+        first_chunk = self.get_chunk_position(*(coordinate - 1 for coordinate in start))
+        last_chunk = self.get_chunk_position(*end)
+        for chunk_x in range(first_chunk[0], last_chunk[0] + 1):
+            for chunk_y in range(first_chunk[1], last_chunk[1] + 1):
+                for chunk_z in range(first_chunk[2], last_chunk[2] + 1):
+                    self.dirty_chunks.add((chunk_x, chunk_y, chunk_z))
+
+    def pop_dirty_chunks(self) -> Set[ChunkPosition]:
+        """Returns the positions of the chunks marked as dirty since the last call
+        and clears them, after relighting the regions edited since then.
+        """
+        if self.light_map is not None:
+            self.light_map.update_queued_regions()
+        dirty_chunks = self.dirty_chunks
+        self.dirty_chunks = set()
+        return dirty_chunks
+
+    def get_block(self, x: int, y: int, z: int) -> int:
+        """Returns the block ID at a world coordinate."""
+        chunk_x, local_x = divmod(x, self.chunk_size)
+        chunk_y, local_y = divmod(y, self.chunk_size)
+        chunk_z, local_z = divmod(z, self.chunk_size)
+        chunk = self.chunks.get((chunk_x, chunk_y, chunk_z))
+        if chunk is None:
+            return 0
+        return chunk.get_block(local_x, local_y, local_z)
+
+    def set_block(self, x: int, y: int, z: int, block_id: int) -> None:
+        """Sets the block ID at a world coordinate."""
+        chunk_x, local_x = divmod(x, self.chunk_size)
+        chunk_y, local_y = divmod(y, self.chunk_size)
+        chunk_z, local_z = divmod(z, self.chunk_size)
+        chunk = self.chunks.get((chunk_x, chunk_y, chunk_z))
+        if chunk is None:
+            if block_id == 0:
+                return
+            chunk = self.create_chunk((chunk_x, chunk_y, chunk_z))
+        chunk.set_block(local_x, local_y, local_z, block_id)
+        self.mark_region_dirty((x, y, z), (x + 1, y + 1, z + 1))
+        if self.light_map is not None:
+            self.light_map.queue_region((x, y, z), (x + 1, y + 1, z + 1))
+
+    def get_blocks_at(self, positions: np.ndarray) -> np.ndarray:
+        """Returns the block IDs at an array of world coordinates of shape `(n, 3)`.
+        The coordinates are grouped by chunk, so that the blocks of each chunk are
+        gathered with a single NumPy operation.
+        """
+        positions = np.asarray(positions, dtype=np.int64).reshape(-1, 3)
+        chunk_positions = positions // self.chunk_size
+        local_positions = positions - chunk_positions * self.chunk_size
+        blocks = np.zeros(len(positions), dtype=self.block_dtype)
+        if len(positions) == 0:
+            return blocks
+
+        # Sort the coordinates by chunk and find where each run of coordinates
+        # inside the same chunk starts.
+        order = np.lexsort(chunk_positions.T[::-1])
+        sorted_chunk_positions = chunk_positions[order]
+        is_run_start = np.ones(len(order), dtype=bool)
+        is_run_start[1:] = np.any(
+            sorted_chunk_positions[1:] != sorted_chunk_positions[:-1], axis=1
+        )
+        run_starts = np.flatnonzero(is_run_start)
+        run_ends = np.append(run_starts[1:], len(order))
+        for run_start, run_end in zip(run_starts, run_ends):
+            chunk = self.chunks.get(tuple(sorted_chunk_positions[run_start].tolist()))
+            if chunk is not None:
+                indices = order[run_start:run_end]
+                blocks[indices] = chunk.get_blocks_at(local_positions[indices])
+        return blocks
+
+    def iterate_region(
+        self, start: Tuple[int, int, int], end: Tuple[int, int, int]
+    ) -> Iterator[Tuple[ChunkPosition, Tuple[slice, ...], Tuple[slice, ...]]]:
+        """Splits the world region `[start, end)` into the parts that overlap each
+        chunk.
+
+        Args:
+            start (Tuple[int, int, int]): The inclusive lower corner of the region.
+            end (Tuple[int, int, int]): The exclusive upper corner of the region.
+
+        Yields:
+            Tuple[ChunkPosition, Tuple[slice, ...], Tuple[slice, ...]]: The position
+                of an overlapping chunk, the slices selecting the overlap inside the
+                chunk and the slices selecting the overlap inside the region.
+        """
+        size = self.chunk_size
+        first_chunk = self.get_chunk_position(*start)
+        last_chunk = self.get_chunk_position(*(coordinate - 1 for coordinate in end))
+        for chunk_x in range(first_chunk[0], last_chunk[0] + 1):
+            for chunk_y in range(first_chunk[1], last_chunk[1] + 1):
+                for chunk_z in range(first_chunk[2], last_chunk[2] + 1):
+                    chunk_position = (chunk_x, chunk_y, chunk_z)
+                    chunk_slices, region_slices = [], []
+                    for axis in range(3):
+                        chunk_start = chunk_position[axis] * size
+                        lower = max(start[axis], chunk_start)
+                        upper = min(end[axis], chunk_start + size)
+                        chunk_slices.append(
+                            slice(lower - chunk_start, upper - chunk_start)
+                        )
+                        region_slices.append(
+                            slice(lower - start[axis], upper - start[axis])
+                        )
+                    yield chunk_position, tuple(chunk_slices), tuple(region_slices)
+
+    def fill_region(
+        self,
+        start: Tuple[int, int, int],
+        end: Tuple[int, int, int],
+        block_id: int,
+    ) -> None:
+        """Fills the world region `[start, end)` with a single block ID.
+
+        Args:
+            start (Tuple[int, int, int]): The inclusive lower corner of the region.
+            end (Tuple[int, int, int]): The exclusive upper corner of the region.
+            block_id (int): The block ID to fill the region with.
+        """
+        for chunk_position, chunk_slices, _ in self.iterate_region(start, end):
+            chunk = self.chunks.get(chunk_position)
+            if chunk is None:
+                if block_id == 0:
+                    continue
+                chunk = self.create_chunk(chunk_position)
+            chunk.fill(*_get_slice_bounds(chunk_slices), block_id)
+        self.mark_region_dirty(start, end)
+        if self.light_map is not None:
+            self.light_map.queue_region(start, end)
+
+    def get_region(
+        self, start: Tuple[int, int, int], end: Tuple[int, int, int]
+    ) -> np.ndarray:
+        """Returns a copy of the block IDs in the world region `[start, end)`.
+
+        Args:
+            start (Tuple[int, int, int]): The inclusive lower corner of the region.
+            end (Tuple[int, int, int]): The exclusive upper corner of the region.
+
+        Returns:
+            np.ndarray: The block IDs of the region indexed as `[x, y, z]`.
+        """
+        shape = tuple(end[axis] - start[axis] for axis in range(3))
+        region = np.zeros(shape, dtype=self.block_dtype)
+        for chunk_position, chunk_slices, region_slices in self.iterate_region(
+            start, end
+        ):
+            chunk = self.chunks.get(chunk_position)
+            if chunk is not None:
+                region[region_slices] = chunk.get_region(
+                    *_get_slice_bounds(chunk_slices)
+                )
+        return region
+
+    def set_region(self, start: Tuple[int, int, int], blocks: np.ndarray) -> None:
+        """Writes an array of block IDs into the world with its lower corner placed
+        at the world coordinate `start`.
+        """
+        end = tuple(start[axis] + blocks.shape[axis] for axis in range(3))
+        for chunk_position, chunk_slices, region_slices in self.iterate_region(
+            start, end
+        ):
+            part = blocks[region_slices]
+            chunk = self.chunks.get(chunk_position)
+            if chunk is None:
+                if not part.any():
+                    continue
+                chunk = self.create_chunk(chunk_position)
+            chunk.set_region(_get_slice_bounds(chunk_slices)[0], part)
+        self.mark_region_dirty(start, end)
+        if self.light_map is not None:
+            self.light_map.queue_region(start, end)
+
+    def copy_region(
+        self,
+        source_start: Tuple[int, int, int],
+        source_end: Tuple[int, int, int],
+        destination_start: Tuple[int, int, int],
+    ) -> None:
+        """Copies the world region `[source_start, source_end)` so that its lower
+        corner is placed at `destination_start`. Overlapping source and destination
+        regions are handled correctly.
+        """
+        self.set_region(destination_start, self.get_region(source_start, source_end))
+
+    def get_slab(
+        self,
+        axis: int,
+        coordinate: int,
+        start: Tuple[int, int],
+        end: Tuple[int, int],
+    ) -> np.ndarray:
+        """Returns a copy of a one voxel thick slab of the world that is
+        perpendicular to an axis.
+
+        Args:
+            axis (int): The axis perpendicular to the slab (`0`, `1` or `2` for
+                `x`, `y` or `z` respectively).
+            coordinate (int): The world coordinate of the slab along `axis`.
+            start (Tuple[int, int]): The inclusive lower corner of the slab along
+                the two remaining axes, in increasing axis order.
+            end (Tuple[int, int]): The exclusive upper corner of the slab along
+                the two remaining axes, in increasing axis order.
+
+        Returns:
+            np.ndarray: A 2D array of block IDs.
+        """
+        region_start, region_end = list(start), list(end)
+        region_start.insert(axis, coordinate)
+        region_end.insert(axis, coordinate + 1)
+        return np.take(self.get_region(region_start, region_end), 0, axis=axis)
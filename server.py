@@ -0,0 +1,44 @@
+import asyncio
+from typing import Literal, Optional
+
+from fire import Fire
+
+from pynecraft.network.server import run_server
+from pynecraft.parameters import ServerParameters, TerrainParameters, WorldParameters
+
+
+def main(
+    address: str = "localhost:25565",
+    seed: int = 0,
+    save_directory: Optional[str] = None,
+    chunk_storage: Literal["dense", "palette"] = "palette",
+    max_render_distance: int = 32,
+    max_chunks_in_flight: int = 256,
+    num_workers: Optional[int] = None,
+    compression_level: int = 1,
+):
+    server_parameters = ServerParameters(
+        address=address,
+        max_render_distance=max_render_distance,
+        max_chunks_in_flight=max_chunks_in_flight,
+        num_workers=num_workers,
+        compression_level=compression_level,
+    )
+    world_parameters = WorldParameters(
+        save_directory=save_directory, chunk_storage=chunk_storage
+    )
+    print(f"Serving chunks on {address}")
+    try:
+        asyncio.run(
+            run_server(
+                server_parameters=server_parameters,
+                world_parameters=world_parameters,
+                terrain_parameters=TerrainParameters(seed=seed),
+            )
+        )
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    Fire(main)
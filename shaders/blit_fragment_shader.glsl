@@ -0,0 +1,17 @@
+// the shader is writter for OpenGL 3.3 core profile
+#version 330 core
+
+// output of the fragment shader that will store the
+// final color of the fragment (pixel) that is output
+// to the framebuffer
+layout (location = 0) out vec4 frag_color;
+
+// input variable from the vertex shader
+in vec2 texture_coordinates;
+
+uniform sampler2D u_source; // texture the scene was rendered into at a lower resolution.
+
+void main() {
+    // samples the source with bilinear filtering, stretching it over the output
+    frag_color = vec4(texture(u_source, texture_coordinates).rgb, 1.0);
+}
@@ -0,0 +1,15 @@
+// the shader is writter for OpenGL 3.3 core profile
+#version 330 core
+
+// output variable to the fragment shader holding the texture coordinates of the
+// vertex in the source texture
+out vec2 texture_coordinates;
+
+void main() {
+    // generates a single triangle covering the whole output from the vertex
+    // index, with the corners (-1, -1), (3, -1) and (-1, 3) so that the part of
+    // it inside the output maps to texture coordinates from 0 to 1
+    vec2 corner = vec2((gl_VertexID << 1) & 2, gl_VertexID & 2);
+    texture_coordinates = corner;
+    gl_Position = vec4(corner * 2.0 - 1.0, 0.0, 1.0);
+}
@@ -6,10 +6,35 @@
 // to the framebuffer
 layout (location = 0) out vec4 frag_color;
 
-// input variable from the vertex shader
+// input variables from the vertex shader
 in vec3 color;
+in float alpha;
+
+#ifdef BLOCK_TEXTURES
+// input variables from the vertex shader when blocks are textured
+in vec2 texture_coordinates;
+flat in uint texture_layer;
+
+uniform sampler2D u_block_textures; // atlas holding the texture of every layer in a tile.
+uniform uint u_atlas_columns; // number of tiles in every row of the atlas.
+uniform vec2 u_tile_size; // size of a tile in texture coordinates of the atlas.
+#endif
 
 void main() {
-    // adds an alpha value to the color
-    frag_color = vec4(color, 1.0);
+#ifdef BLOCK_TEXTURES
+    // wraps the texture coordinates into the tile of the layer, and selects the
+    // mipmap level from the gradients of the unwrapped coordinates, which unlike
+    // the wrapped ones do not jump at the edges of the voxels
+    vec2 tile = vec2(texture_layer % u_atlas_columns, texture_layer / u_atlas_columns);
+    vec4 texel = textureGrad(
+        u_block_textures,
+        (tile + fract(texture_coordinates)) * u_tile_size,
+        dFdx(texture_coordinates) * u_tile_size,
+        dFdy(texture_coordinates) * u_tile_size
+    );
+    frag_color = vec4(color * texel.rgb, alpha);
+#else
+    // adds the alpha value to the color
+    frag_color = vec4(color, alpha);
+#endif
 }
\ No newline at end of file
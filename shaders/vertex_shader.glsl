@@ -1,23 +1,123 @@
 // the shader is writter for OpenGL 3.3 core profile
 #version 330 core
 
+#ifdef PACKED_VERTICES
+// input variable to the vertex shader when it is compiled for packed vertices,
+// holding two words per vertex:
+//  - x: bits 0-17 hold the chunk-local position (6 bits per axis), bits 18-20
+//       the face normal index, bits 21-22 the ambient occlusion level, bits
+//       23-26 the sky light level and bits 27-30 the block light level
+//  - y: bits 0-15 hold the block id used to look up the color and bits 16-31
+//       the layer of the texture of the block in the block texture atlas
+layout (location = 0) in uvec2 in_packed;
+
+#ifdef CHUNK_ARENA
+// per-draw attribute of chunks drawn from a buffer arena, selected by the base
+// instance of each draw, holding the world-space position of the first voxel of
+// the chunk in xyz and the size in world voxels of a voxel of the chunk in w.
+layout (location = 1) in vec4 in_chunk_transform;
+#define CHUNK_ORIGIN in_chunk_transform.xyz
+#define CHUNK_SCALE in_chunk_transform.w
+#else
+uniform vec3 u_chunk_origin; // world-space position of the first voxel of the chunk.
+uniform float u_chunk_scale; // size in world voxels of a voxel of the chunk, larger than 1 for distant terrain.
+#define CHUNK_ORIGIN u_chunk_origin
+#define CHUNK_SCALE u_chunk_scale
+#endif
+uniform sampler2D u_block_colors; // 256x1 texture holding the color and opacity of every block id.
+
+// constant brightness of each face normal, matching `FACE_SHADES` in the mesher
+const float FACE_SHADES[6] = float[6](0.8, 0.8, 1.0, 0.5, 0.65, 0.65);
+// brightness of each ambient occlusion level, from fully occluded to unoccluded
+const float AMBIENT_OCCLUSION_LEVELS[4] = float[4](0.5, 0.7, 0.85, 1.0);
+#ifdef BLOCK_TEXTURES
+// output variables to the fragment shader when blocks are textured, holding the
+// texture coordinates of the vertex in world voxels, which repeat the texture
+// across every voxel of a merged quad, and the texture layer of its block
+out vec2 texture_coordinates;
+flat out uint texture_layer;
+#endif
+// factor by which the brightness drops with every light level below the maximum
+// of 15, matching `LIGHT_LEVEL_BRIGHTNESS` in the lighting module
+const float LIGHT_FALLOFF = 0.8;
+#else
 // input variables to the vertex shader
 layout (location = 0) in vec3 in_position;
 layout (location = 1) in vec3 in_color;
+#ifdef INSTANCED
+// per-instance attributes of instanced meshes, which advance once per instance:
+// the world-space position of the instance, its scale along each axis, its
+// rotation as a unit quaternion and the color multiplying its vertex colors
+layout (location = 2) in vec3 in_instance_position;
+layout (location = 3) in vec3 in_instance_scale;
+layout (location = 4) in vec4 in_instance_rotation;
+layout (location = 5) in vec3 in_instance_color;
+#endif
+#endif
 
 // uniform variables that remain constant for all
 // vertices processed during a single draw call
-uniform mat4 m_proj; // projection matrix that determines how the 3D coordinates are projected onto the 2D screen.
-uniform mat4 m_view; // view matrix that determines the position and orientation of the camera.
+// uniform block shared by every program and written once per frame
+layout (std140) uniform Camera {
+    mat4 m_proj; // projection matrix that determines how the 3D coordinates are projected onto the 2D screen.
+    mat4 m_view; // view matrix that determines the position and orientation of the camera.
+};
 uniform mat4 m_model; // model matrix that determines the position, orientation, and scale of the object.
 
 // output variables from the vertex shader, passes the
-// color data to the fragment shader
+// color data and the opacity to the fragment shader
 out vec3 color;
+out float alpha;
 
 void main() {
+#ifdef PACKED_VERTICES
+    // decode the bit fields of the packed vertex
+    vec3 in_position = vec3(
+        in_packed.x & 63u, (in_packed.x >> 6u) & 63u, (in_packed.x >> 12u) & 63u
+    ) * CHUNK_SCALE + CHUNK_ORIGIN;
+    uint normal_index = (in_packed.x >> 18u) & 7u;
+    uint ambient_occlusion = (in_packed.x >> 21u) & 3u;
+    uint sky_light = (in_packed.x >> 23u) & 15u;
+    uint block_light = (in_packed.x >> 27u) & 15u;
+    uint block_id = min(in_packed.y & 65535u, 255u);
+    vec4 block_color = texelFetch(u_block_colors, ivec2(int(block_id), 0), 0);
+    // translucent blocks such as water and glass are blended over the geometry
+    // behind them
+    alpha = block_color.a;
+#ifdef BLOCK_TEXTURES
+    // the texture is projected along the normal axis of the face, with its top
+    // row facing up on the side faces
+    uint normal_axis = normal_index / 2u;
+    texture_coordinates = normal_axis == 0u ? vec2(in_position.z, -in_position.y)
+        : normal_axis == 1u ? in_position.xz
+        : vec2(in_position.x, -in_position.y);
+    texture_layer = in_packed.y >> 16u;
+    // the color of the block comes from its texture
+    vec3 albedo = vec3(1.0);
+#else
+    vec3 albedo = block_color.rgb;
+#endif
+    color = albedo
+        * FACE_SHADES[normal_index]
+        * AMBIENT_OCCLUSION_LEVELS[ambient_occlusion]
+        * pow(LIGHT_FALLOFF, float(15u - max(sky_light, block_light)));
+    vec3 position = in_position;
+#elif defined(INSTANCED)
+    // scales, rotates and translates the vertex by the transform of its instance,
+    // rotating with the quaternion as v + 2 q x (q x v + w v)
+    vec3 scaled = in_position * in_instance_scale;
+    vec3 axis = in_instance_rotation.xyz;
+    vec3 position = scaled
+        + 2.0 * cross(axis, cross(axis, scaled) + in_instance_rotation.w * scaled)
+        + in_instance_position;
+    color = in_color * in_instance_color;
+    alpha = 1.0;
+#else
+    vec3 position = in_position;
     color = in_color;
+    alpha = 1.0;
+#endif
     // `gl_Position` is a predefined variable that must
     // be set in every vertex shader
-    gl_Position = m_proj * m_view * m_model * vec4(in_position, 1.0);
-}
\ No newline at end of file
+    gl_Position = m_proj * m_view * m_model * vec4(position, 1.0);
+}